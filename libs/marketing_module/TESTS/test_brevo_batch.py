@@ -0,0 +1,113 @@
+"""test_brevo_batch.py — BrevoProvider.send_batch against a local stub that validates messageVersions."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from marketing_module.channels.email.providers import brevo
+from marketing_module.channels.email.providers.brevo import BATCH_MAX_VERSIONS, BrevoProvider
+
+
+class _Stub(BaseHTTPRequestHandler):
+    requests: list = []
+    invalid: list = []
+    status: int = 201
+
+    @staticmethod
+    def _shape_error(body: dict):
+        if not body.get("sender", {}).get("email") or not body.get("subject"):
+            return "sender/subject missing"
+        versions = body.get("messageVersions")
+        if versions is None:
+            return None if body.get("to") else "to missing"
+        if "to" in body:
+            return "to and messageVersions both set"
+        if not 1 <= len(versions) <= BATCH_MAX_VERSIONS:
+            return f"{len(versions)} versions"
+        for v in versions:
+            if not v.get("to") or not all(t.get("email") for t in v["to"]):
+                return "version without recipient"
+            for field in ("textContent", "htmlContent"):
+                if field in v and field not in body:
+                    return f"version {field} without global {field}"
+        return None
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append(body)
+        err = self._shape_error(body)
+        versions = body.get("messageVersions")
+        rcpts = [v["to"][0]["email"] for v in versions] if versions else [body["to"][0]["email"]]
+        if err:
+            self.invalid.append(err)
+            code, payload = 400, {"code": "invalid_parameter", "message": err}
+        elif any(r.startswith("bad") for r in rcpts):
+            code, payload = 400, {"code": "invalid_parameter", "message": "email is not valid"}
+        elif self.status != 201:
+            code, payload = self.status, {"code": "error"}
+        elif versions:
+            code, payload = 201, {"messageIds": [f"<{r}>" for r in rcpts]}
+        else:
+            code, payload = 201, {"messageId": f"<{rcpts[0]}>"}
+        raw = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *a):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    _Stub.requests, _Stub.invalid, _Stub.status = [], [], 201
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(brevo, "BREVO_API_BASE", f"http://127.0.0.1:{srv.server_address[1]}/v3")
+    yield _Stub
+    assert _Stub.invalid == []
+    srv.shutdown()
+    srv.server_close()
+
+
+def _messages(n, bad=()):
+    return [{"ref": f"d{i}", "to_email": f"{'bad' if i in bad else 'ok'}{i}@test.com",
+             "to_name": f"P{i}", "subject": f"Hello {i}", "text": f"Body {i}",
+             "html": f"<p>Body {i}</p>"} for i in range(n)]
+
+
+def test_batch_single_request_maps_ids(stub):
+    res = BrevoProvider(api_key="k").send_batch("s@test.com", "Sender", _messages(3),
+                                                headers={"X-Tag": "1"})
+    assert len(stub.requests) == 1
+    body = stub.requests[0]
+    assert [v["subject"] for v in body["messageVersions"]] == ["Hello 0", "Hello 1", "Hello 2"]
+    assert body["headers"] == {"X-Tag": "1"}
+    assert [(r["ref"], r["message_id"]) for r in res] == [
+        ("d0", "<ok0@test.com>"), ("d1", "<ok1@test.com>"), ("d2", "<ok2@test.com>")]
+
+
+def test_batch_split_at_limit(stub):
+    res = BrevoProvider(api_key="k").send_batch("s@test.com", "Sender",
+                                                _messages(BATCH_MAX_VERSIONS + 1))
+    assert [len(b["messageVersions"]) for b in stub.requests] == [BATCH_MAX_VERSIONS, 1]
+    assert all(r["success"] for r in res) and len(res) == BATCH_MAX_VERSIONS + 1
+
+
+def test_batch_rejected_falls_back_to_single_sends(stub):
+    res = BrevoProvider(api_key="k").send_batch("s@test.com", "Sender", _messages(3, bad={1}))
+    assert len(stub.requests) == 1 + 3
+    assert [r["success"] for r in res] == [True, False, True]
+    assert all(r["fallback"] for r in res)
+    assert res[1]["code"] == "http_400" and not res[1]["retry"]
+    assert res[2]["message_id"] == "<ok2@test.com>"
+
+
+def test_batch_server_error_no_fallback(stub):
+    stub.status = 503
+    res = BrevoProvider(api_key="k").send_batch("s@test.com", "Sender", _messages(4))
+    assert len(stub.requests) == 1
+    assert all(not r["success"] and r["retry"] for r in res)
@@ -7,12 +7,15 @@ from email.mime.text import MIMEText
 from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from ....models import DnsStatus, SendingMailboxDB
 from .base import AbstractEmailProvider
 
 log = logging.getLogger("mkt.brevo")
 BREVO_API_BASE = "https://api.brevo.com/v3"
+BATCH_MAX_VERSIONS = 1000   # Brevo limit on messageVersions per request
+_OK = (200, 201, 202)
 
 
 class BrevoProvider(AbstractEmailProvider):
@@ -24,10 +27,19 @@ class BrevoProvider(AbstractEmailProvider):
         self.smtp_port = smtp_port or int(os.getenv("BREVO_SMTP_PORT", "587"))
         if not self.api_key:
             raise ValueError("BREVO_API_KEY required")
+        self._http: Optional[requests.Session] = None
 
     def _headers(self) -> dict:
         return {"api-key": self.api_key, "Content-Type": "application/json"}
 
+    def _session(self) -> requests.Session:
+        if self._http is None:
+            s = requests.Session()
+            s.mount("https://", HTTPAdapter(pool_maxsize=8))
+            s.mount("http://",  HTTPAdapter(pool_maxsize=8))
+            self._http = s
+        return self._http
+
     def send(self, mailbox: SendingMailboxDB, to_email: str, to_name: str,
              subject: str, body_html: str, body_text: Optional[str] = None,
              reply_to: Optional[str] = None, headers: Optional[dict] = None) -> dict:
@@ -61,6 +73,120 @@ class BrevoProvider(AbstractEmailProvider):
             log.exception("Brevo send error: %s", e)
             return {"success": False, "error": str(e), "code": "unknown"}
 
+    # ── REST transactional API ────────────────────────────────────────────────
+
+    @staticmethod
+    def _failure(status: int, text: str) -> dict:
+        return {"success": False, "error": f"Brevo HTTP {status}: {text[:300]}",
+                "code": "rate_limited" if status == 429 else f"http_{status}",
+                "retry": status == 429 or status >= 500}
+
+    def send_api(self, sender_email: str, sender_name: str, message: dict,
+                 headers: Optional[dict] = None, timeout: int = 15) -> dict:
+        """
+        Single send through POST /smtp/email.
+        message: {to_email, to_name, subject, text, html, headers} (same shape as send_batch).
+        """
+        payload = {
+            "sender":  {"name": sender_name, "email": sender_email},
+            "to":      [{"email": message["to_email"], **({"name": message["to_name"]}
+                                                         if message.get("to_name") else {})}],
+            "subject": message["subject"],
+        }
+        if message.get("text"):
+            payload["textContent"] = message["text"]
+        if message.get("html"):
+            payload["htmlContent"] = message["html"]
+        if headers or message.get("headers"):
+            payload["headers"] = {**(headers or {}), **(message.get("headers") or {})}
+        try:
+            resp = self._session().post(f"{BREVO_API_BASE}/smtp/email", json=payload,
+                                        headers=self._headers(), timeout=timeout)
+        except requests.RequestException as e:
+            return {"success": False, "error": str(e)[:300], "code": "network", "retry": True}
+        if resp.status_code not in _OK:
+            return self._failure(resp.status_code, resp.text)
+        try:
+            message_id = resp.json().get("messageId")
+        except ValueError:
+            message_id = None
+        return {"success": True, "message_id": message_id}
+
+    def send_batch(self, sender_email: str, sender_name: str, messages: list,
+                   headers: Optional[dict] = None, timeout: int = 30) -> list:
+        """
+        Batch send through POST /smtp/email + messageVersions (≤ BATCH_MAX_VERSIONS per request).
+
+        messages: [{ref, to_email, to_name, subject, text, html, headers}] — `ref` is the
+        caller's id (delivery id, token…) and comes back untouched in the result.
+        Returns one dict per message, same order: {ref, success, message_id | error, code, retry}
+        (+ fallback=True when the message went out through the single-send fallback).
+
+        Brevo rejects the whole request when one version is invalid (4xx): the chunk is
+        then re-sent message by message so valid recipients still go out and the bad one
+        gets its own error. 5xx / network errors fail the chunk with retry=True (nothing
+        re-sent here: the request may have been accepted). Per-message `headers` are only
+        used by the single-send fallback — Brevo versions cannot carry their own headers.
+        """
+        results: list = []
+        for i in range(0, len(messages), BATCH_MAX_VERSIONS):
+            results.extend(self._send_chunk(sender_email, sender_name,
+                                            messages[i:i + BATCH_MAX_VERSIONS], headers, timeout))
+        return results
+
+    def _send_chunk(self, sender_email, sender_name, chunk, headers, timeout) -> list:
+        first = chunk[0]
+        versions = []
+        for m in chunk:
+            v = {"to": [{"email": m["to_email"], **({"name": m["to_name"]}
+                                                    if m.get("to_name") else {})}],
+                 "subject": m["subject"]}
+            if m.get("text"):
+                v["textContent"] = m["text"]
+            if m.get("html"):
+                v["htmlContent"] = m["html"]
+            versions.append(v)
+        payload = {
+            "sender":          {"name": sender_name, "email": sender_email},
+            "subject":         first["subject"],
+            "messageVersions": versions,
+        }
+        # versions may only override content that also exists at top level
+        if any(m.get("text") for m in chunk):
+            payload["textContent"] = first.get("text") or " "
+        if any(m.get("html") for m in chunk):
+            payload["htmlContent"] = first.get("html") or "<p></p>"
+        if headers:
+            payload["headers"] = headers
+
+        try:
+            resp = self._session().post(f"{BREVO_API_BASE}/smtp/email", json=payload,
+                                        headers=self._headers(), timeout=timeout)
+        except requests.RequestException as e:
+            err = {"success": False, "error": str(e)[:300], "code": "network", "retry": True}
+            return [{"ref": m.get("ref"), **err} for m in chunk]
+
+        if resp.status_code in _OK:
+            try:
+                ids = resp.json().get("messageIds") or []
+            except ValueError:
+                ids = []
+            if len(ids) != len(chunk):
+                log.warning("Brevo batch: %d messageIds for %d versions", len(ids), len(chunk))
+                ids = [None] * len(chunk)
+            return [{"ref": m.get("ref"), "success": True, "message_id": mid}
+                    for m, mid in zip(chunk, ids)]
+
+        if 400 <= resp.status_code < 500 and resp.status_code not in (401, 403, 429) and len(chunk) > 1:
+            log.warning("Brevo batch rejected (HTTP %s) — falling back to %d single sends",
+                        resp.status_code, len(chunk))
+            return [{"ref": m.get("ref"), "fallback": True,
+                     **self.send_api(sender_email, sender_name, m, headers, timeout)}
+                    for m in chunk]
+
+        err = self._failure(resp.status_code, resp.text)
+        return [{"ref": m.get("ref"), **err} for m in chunk]
+
     def validate_domain(self, domain_name: str) -> dict:
         resp = requests.get(f"{BREVO_API_BASE}/senders/domains",
                             headers=self._headers(), timeout=10)
@@ -7,9 +7,9 @@ import os
 from datetime import datetime, timedelta
 from typing import Optional
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
 
+from .sqlite_engine import make_engines
 from .models import (
     Base, BounceType, CampaignDB, CampaignSequenceDB, CampaignSequenceStepDB,
     CloserApplicationDB, CloserDB, CommissionDB, CommissionStatus, ComplianceRuleDB,
@@ -20,8 +20,9 @@ from .models import (
 )
 
 _DB_PATH = os.getenv("MKT_DB_PATH", "marketing.db")
-_engine = create_engine(f"sqlite:///{_DB_PATH}", connect_args={"check_same_thread": False})
+_engine, _read_engine = make_engines(_DB_PATH)   # WAL + pragmas, see sqlite_engine
 SessionLocal = sessionmaker(bind=_engine, autocommit=False, autoflush=False)
+ReadSessionLocal = sessionmaker(bind=_read_engine, autocommit=False, autoflush=False)
 
 
 def init_db():
@@ -60,6 +61,10 @@ def _migrate_existing_tables():
                 conn.commit()
             except Exception:
                 pass  # colonne déjà existante
+        # create_all skips existing tables, so their newer indexes are created here
+        for idx in (*ProspectDeliveryDB.__table__.indexes, *MeetingDB.__table__.indexes):
+            idx.create(bind=conn, checkfirst=True)
+        conn.commit()
 
 
 _PROJECT_ID = os.getenv("MKT_PROJECT_ID", "presence_ia")
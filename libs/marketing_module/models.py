@@ -11,7 +11,7 @@ from typing import Any, Optional
 
 from pydantic import BaseModel
 from sqlalchemy import (JSON, Boolean, Column, DateTime, Float, ForeignKey,
-                        Integer, String, Text)
+                        Index, Integer, String, Table, Text, text)
 from sqlalchemy.orm import DeclarativeBase, relationship
 
 
@@ -312,6 +312,15 @@ class CampaignSequenceStepDB(Base):
 
 class ProspectDeliveryDB(Base):
     __tablename__ = "prospect_deliveries"
+    __table_args__ = (
+        # dernier envoi d'un prospect : prospect_id [IN …] (+ project_id) ORDER BY created_at DESC
+        Index("ix_prospect_deliveries_prospect", "prospect_id", "project_id", "created_at"),
+        # moteur de séquences : déjà contacté / a répondu pour (campagne, prospect)
+        Index("ix_prospect_deliveries_campaign_prospect", "campaign_id", "prospect_id"),
+        # webhooks du fournisseur et In-Reply-To IMAP
+        Index("ix_prospect_deliveries_provider_msg", "provider_message_id",
+              sqlite_where=text("provider_message_id IS NOT NULL")),
+    )
     id                  = Column(String, primary_key=True, default=_uid)
     project_id          = Column(String, nullable=False, index=True)
     campaign_id         = Column(String, ForeignKey("campaigns.id"), nullable=False)
@@ -339,6 +348,15 @@ class ProspectDeliveryDB(Base):
     social_account      = relationship("SocialAccountDB", back_populates="deliveries")
 
 
+# Copie froide des anciens envois (déplacés par le job d'archivage du projet consommateur) :
+# mêmes colonnes sans FK ni index chauds, plus archived_at.
+ProspectDeliveryArchive = Table(
+    "prospect_deliveries_archive", Base.metadata,
+    *(Column(c.name, c.type, primary_key=c.primary_key) for c in ProspectDeliveryDB.__table__.columns),
+    Column("archived_at", DateTime, nullable=False),
+    Index("ix_prospect_deliveries_archive_prospect", "prospect_id", "project_id", "created_at"),
+)
+
 class ComplianceRuleDB(Base):
     __tablename__ = "compliance_rules"
     id                = Column(String, primary_key=True, default=_uid)
@@ -447,6 +465,10 @@ class CloserDB(Base):
 
 class MeetingDB(Base):
     __tablename__ = "meetings"
+    __table_args__ = (
+        # latest meeting of a prospect (CRM view): prospect_id + project_id ORDER BY created_at DESC
+        Index("ix_meetings_prospect", "prospect_id", "project_id", "created_at"),
+    )
     id                   = Column(String, primary_key=True, default=_uid)
     project_id           = Column(String, nullable=False, index=True)
     prospect_id          = Column(String, nullable=False)     # ID externe
@@ -0,0 +1,106 @@
+"""
+MARKETING_MODULE — SQLite engine factory
+Shared by marketing.db (this module) and presence_ia.db (src.database).
+
+Every pooled connection is tuned through a "connect" event:
+  journal_mode=WAL      readers no longer block behind a writer (and vice versa)
+  synchronous=NORMAL    fsync at checkpoint only — safe with WAL
+  busy_timeout          wait for the write lock instead of failing immediately
+  cache_size            page cache per connection (negative = KiB)
+  mmap_size             memory-mapped reads
+  temp_store=MEMORY     temp b-trees (ORDER BY / GROUP BY spills) in RAM
+
+make_engines() returns a write engine (bounded pool: SQLite has a single writer anyway)
+and a read engine (its own pool, PRAGMA query_only=ON). maintenance() runs a WAL checkpoint
+and PRAGMA optimize; callers schedule it periodically.
+
+Env (defaults): SQLITE_BUSY_TIMEOUT_MS (10000), SQLITE_CACHE_KB (20000),
+SQLITE_MMAP_MB (256), SQLITE_WRITE_POOL (5), SQLITE_READ_POOL (10),
+SQLITE_POOL_OVERFLOW (10), SQLITE_WAL_TRUNCATE_MB (64).
+In-memory databases keep SQLAlchemy's default pool and skip WAL.
+"""
+import os
+from typing import Dict, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+
+def _is_memory(path: str) -> bool:
+    return path in ("", ":memory:") or path.startswith("file::memory:")
+
+
+def pragmas(readonly: bool = False) -> Dict[str, str]:
+    out = {
+        "journal_mode": "WAL",
+        "synchronous":  "NORMAL",
+        "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"),
+        "cache_size":   str(-int(os.getenv("SQLITE_CACHE_KB", "20000"))),
+        "mmap_size":    str(int(os.getenv("SQLITE_MMAP_MB", "256")) * 1024 * 1024),
+        "temp_store":   "MEMORY",
+    }
+    if readonly:
+        out["query_only"] = "ON"
+    return out
+
+
+def make_engine(path: str, readonly: bool = False, pool_size: int = None, **kwargs) -> Engine:
+    """SQLite engine for `path` with the tuning pragmas applied to every new connection."""
+    memory = _is_memory(path)
+    opts = dict(kwargs)
+    opts.setdefault("connect_args", {"check_same_thread": False})
+    if not memory:
+        size = pool_size or int(os.getenv("SQLITE_READ_POOL" if readonly else "SQLITE_WRITE_POOL",
+                                          "10" if readonly else "5"))
+        opts.setdefault("pool_size", size)
+        opts.setdefault("max_overflow", int(os.getenv("SQLITE_POOL_OVERFLOW", "10")))
+        opts.setdefault("pool_timeout", 30)
+        opts.setdefault("pool_pre_ping", False)
+    engine = create_engine(f"sqlite:///{path}", **opts)
+    values = pragmas(readonly)
+    if memory:
+        values.pop("journal_mode")
+        values.pop("mmap_size")
+
+    @event.listens_for(engine, "connect")
+    def _tune(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for name, value in values.items():
+                cur.execute(f"PRAGMA {name}={value}")
+        finally:
+            cur.close()
+
+    return engine
+
+
+def make_engines(path: str) -> Tuple[Engine, Engine]:
+    """(write_engine, read_engine) on the same file. Same engine twice for in-memory databases."""
+    write = make_engine(path)
+    if _is_memory(path):
+        return write, write
+    return write, make_engine(path, readonly=True)
+
+
+def _wal_size(engine: Engine) -> int:
+    path = engine.url.database or ""
+    try:
+        return os.path.getsize(path + "-wal")
+    except OSError:
+        return 0
+
+
+def maintenance(engine: Engine, optimize: bool = True) -> Dict:
+    """
+    PASSIVE checkpoint (never waits for readers); TRUNCATE when the -wal file has grown
+    past SQLITE_WAL_TRUNCATE_MB; then PRAGMA optimize (re-runs ANALYZE where useful).
+    Returns {"wal_bytes", "mode", "busy", "log", "checkpointed"}.
+    """
+    wal = _wal_size(engine)
+    mode = "TRUNCATE" if wal > int(os.getenv("SQLITE_WAL_TRUNCATE_MB", "64")) * 1024 * 1024 else "PASSIVE"
+    with engine.connect() as conn:
+        busy, log_frames, done = conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").one()
+        if optimize:
+            conn.exec_driver_sql("PRAGMA optimize")
+        conn.commit()
+    return {"wal_bytes": wal, "mode": mode, "busy": busy, "log": log_frames, "checkpointed": done}
@@ -20,6 +20,7 @@ class HeroSeed(BlockSeed):
     cta_secondary_label: Optional[str] = None
     cta_secondary_href: str = "#"
     bg_src: Optional[str] = None
+    bg_srcset: Optional[str] = None   # "url 480w, url 960w, …" — rendu en <img srcset> si présent
     bg_color: Optional[str] = None
 
 
@@ -11,6 +11,8 @@ class ImageStructure(BlockStructure):
 
 class ImageSeed(BlockSeed):
     src: str = ""
+    srcset: Optional[str] = None
+    sizes: Optional[str] = None
     alt: str = ""
     caption: Optional[str] = None
 
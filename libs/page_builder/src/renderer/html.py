@@ -133,7 +133,11 @@ def render_hero_block(b: HeroBlock) -> str:
     # Style inline : min-height + background-image si image
     # (inline évite les conflits CSS parent — cf. leçons apprises)
     inline_styles = [f"min-height:{s.min_height}"]
-    if s.bg_type == "image" and d.bg_src:
+    bg_img_html = ""
+    if s.bg_type == "image" and d.bg_src and d.bg_srcset:
+        # Variantes responsives : le navigateur choisit la largeur utile
+        bg_img_html = f'<img class="hero__bg" src="{d.bg_src}" srcset="{d.bg_srcset}" sizes="100vw" alt="" fetchpriority="high">\n  '
+    elif s.bg_type == "image" and d.bg_src:
         inline_styles.append(f"background-image:url('{d.bg_src}')")
     elif s.bg_type == "color" and d.bg_color:
         inline_styles.append(f"background:{d.bg_color}")
@@ -150,7 +154,7 @@ def render_hero_block(b: HeroBlock) -> str:
         cta_group = f'\n    <div class="hero__cta-group">{primary}{secondary}</div>'
 
     return f"""<div class="{" ".join(classes)}"{style_attr}{id_attr}>
-  <div class="hero__content">
+  {bg_img_html}<div class="hero__content">
     {badge_html}<h1 class="hero__title">{d.title}</h1>
     <p class="hero__subtitle">{d.subtitle}</p>{cta_group}
   </div>
@@ -355,13 +359,16 @@ def render_image_block(b: ImageBlock) -> str:
         classes.append(b.css_class)
 
     aspect = f' style="aspect-ratio:{s.aspect_ratio};"' if s.aspect_ratio else ""
+    srcset_attr = ""
+    if d.srcset:
+        srcset_attr = f' srcset="{d.srcset}" sizes="{d.sizes or "(max-width: 960px) 100vw, 960px"}"'
     caption = ""
     if d.caption:
         caption = f'<figcaption class="image-block__caption">{d.caption}</figcaption>'
 
     return f"""<figure class="{" ".join(classes)}">
   <div class="image-block__wrapper"{aspect}>
-    <img src="{d.src}" alt="{d.alt}">
+    <img src="{d.src}"{srcset_attr} alt="{d.alt}">
     {caption if s.caption_position == "overlay" else ""}
   </div>
   {caption if s.caption_position == "below" else ""}
@@ -44,6 +44,18 @@ def test_hero_block_image_has_inline_style():
     assert "hero--overlay" in html
 
 
+def test_hero_block_image_srcset():
+    b = HeroBlock(
+        structure=HeroStructure(bg_type="image"),
+        seed=HeroSeed(title="T", bg_src="/h/a-2400.webp",
+                      bg_srcset="/h/a-480.webp 480w, /h/a-2400.webp 2400w"),
+    )
+    html = render_module(b)
+    assert 'class="hero__bg"' in html
+    assert 'srcset="/h/a-480.webp 480w, /h/a-2400.webp 2400w"' in html
+    assert "background-image" not in html
+
+
 def test_hero_block_cta_group():
     b = HeroBlock(seed=HeroSeed(
         title="T",
@@ -193,6 +205,13 @@ def test_image_block_render():
     assert 'alt="Photo test"' in html
 
 
+def test_image_block_srcset():
+    b = ImageBlock(seed=ImageSeed(src="/img/p-960.webp", srcset="/img/p-480.webp 480w, /img/p-960.webp 960w"))
+    html = render_module(b)
+    assert 'srcset="/img/p-480.webp 480w, /img/p-960.webp 960w"' in html
+    assert "sizes=" in html
+
+
 # ── TestimonialBlock ──────────────────────────────────────────────────────────
 
 def test_testimonial_block_render():
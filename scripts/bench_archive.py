@@ -0,0 +1,154 @@
+"""
+Benchmark — archivage froid (src.archive) : taille des tables chaudes et latence des pages
+admin qui les parcourent, avant et après archive.run(), sur un jeu synthétique.
+
+Deux bases temporaires (rien n'est écrit dans data/), schéma posé par les migrations.
+--prospects v3_prospects dont --terminal (part) envoyés il y a plus d'un an sans clic ou en
+bounce ; par prospect 3 livraisons et 2 ou 3 snapshots (audit, mensuel, second audit un
+prospect sur deux) ; --history lignes de journal de pilotage étalées sur deux ans.
+
+Mesures : lignes et Mo (dbstat, index compris) par table ; durée médiane du hub
+(_db_dashboard_stats, sans mémo), des pages /admin/contacts et /admin/crm, et de la fiche
+CRM d'un prospect (chaude, puis archivée : lecture à travers) ; durée de l'archivage.
+
+Usage : python scripts/bench_archive.py [--prospects 200000] [--terminal 0.7] [--history 50000] [--runs 5]
+"""
+import argparse, os, random, statistics, sys, tempfile, time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "libs")]
+_TMP = tempfile.mkdtemp(prefix="bench_archive_")
+os.environ["DB_PATH"] = os.path.join(_TMP, "presence_ia.db")
+os.environ["MKT_DB_PATH"] = os.path.join(_TMP, "marketing.db")
+os.environ["ADMIN_TOKEN"] = "bench"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from marketing_module import database as mkt_db
+from marketing_module.models import ProspectDeliveryDB
+from src import archive, database, migrate
+from src.models import IaSnapshotDB, PipelineHistoryLogDB, V3ProspectDB
+
+NOW = datetime.utcnow()
+TABLES = [(database.ENGINE, ("v3_prospects", "ia_snapshots", "pipeline_history_log")),
+          (mkt_db._engine, ("prospect_deliveries",))]
+
+
+def fill(n: int, terminal: float, n_history: int) -> None:
+    rnd = random.Random(42)
+    migrate.ensure_current(database.ENGINE)
+    mkt_db.init_db()
+    html = "<p>rapport</p>" * 150                             # ~2 Ko, ordre de grandeur d'un rapport
+    with database.ENGINE.begin() as c, mkt_db._engine.begin() as mc:
+        for start in range(0, n, 20000):
+            prospects, snaps, deliveries = [], [], []
+            for i in range(start, min(start + 20000, n)):
+                old = rnd.random() < terminal
+                sent = NOW - timedelta(days=rnd.randint(400, 700) if old else rnd.randint(0, 60))
+                status = rnd.choice(("bounced", "sent", "opened")) if old else rnd.choice(("sent", "opened", "clicked"))
+                prospects.append({
+                    "token": f"t{i:07d}", "name": f"Entreprise {i}", "city": rnd.choice(("Lyon", "Nantes", "Lille")),
+                    "profession": rnd.choice(("plombier", "couvreur")), "landing_url": f"/l/t{i:07d}",
+                    "email": f"e{i}@x.fr", "contacted": True, "sent_at": sent, "email_sent_at": sent,
+                    "email_status": status, "email_clicked_at": sent if status == "clicked" else None,
+                    "ia_results": "[]", "is_test": False, "status": "PROSPECT", "paid": False,
+                    "created_at": sent - timedelta(days=1)})
+                for k, rt in enumerate(("audit", "monthly", "audit")[:2 + i % 2]):
+                    snaps.append({"prospect_token": f"t{i:07d}", "report_type": rt, "score": rnd.randint(0, 10),
+                                  "report_html": html, "created_at": sent + timedelta(days=30 * k)})
+                for k in range(3):
+                    deliveries.append({"id": f"d{i}_{k}", "project_id": "presence-ia", "campaign_id": "c1",
+                                       "prospect_id": f"t{i:07d}", "delivery_status": "sent",
+                                       "opened_at": sent if status == "opened" else None,
+                                       "created_at": sent + timedelta(days=k)})
+            c.execute(V3ProspectDB.__table__.insert(), prospects)
+            c.execute(IaSnapshotDB.__table__.insert(), snaps)
+            mc.execute(ProspectDeliveryDB.__table__.insert(), deliveries)
+        c.execute(PipelineHistoryLogDB.__table__.insert(), [
+            {"ts": NOW - timedelta(days=730) * i / n_history, "mode": "AUTO", "paire_city": "Lyon",
+             "paire_profession": "plombier", "statut": "running"} for i in range(n_history)])
+        c.exec_driver_sql("ANALYZE")
+    with mkt_db._engine.begin() as mc:
+        mc.exec_driver_sql("ANALYZE")
+
+
+def sizes() -> dict:
+    out = {}
+    for engine, tables in TABLES:
+        with engine.connect() as c:
+            pages = dict(c.exec_driver_sql("SELECT coalesce(i.tbl_name, s.name), sum(s.pgsize) FROM dbstat s "
+                                           "LEFT JOIN sqlite_master i ON i.name = s.name GROUP BY 1").all())
+            for t in tables:
+                out[t] = (c.exec_driver_sql(f"SELECT count(*) FROM {t}").scalar(), pages.get(t, 0) / 1e6)
+    return out
+
+
+def timed(fn, runs: int) -> float:
+    fn()
+    times = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    return statistics.median(times)
+
+
+def pages(client: TestClient, hot: str, cold: str, runs: int) -> dict:
+    def hub():
+        with database.SessionLocal() as db:
+            database._db_dashboard_stats(db, NOW - timedelta(days=30), NOW)
+
+    def get(url):
+        r = client.get(url)
+        assert r.status_code == 200, (url, r.status_code)
+
+    return {
+        "hub (_db_dashboard_stats)": timed(hub, runs),
+        "/admin/contacts": timed(lambda: get("/admin/contacts?token=bench"), runs),
+        "/admin/crm": timed(lambda: get("/admin/crm?token=bench"), runs),
+        "fiche CRM — prospect actif": timed(lambda: get(f"/admin/crm/prospect/{hot}?token=bench"), runs),
+        "fiche CRM — prospect terminé": timed(lambda: get(f"/admin/crm/prospect/{cold}?token=bench"), runs),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--prospects", type=int, default=200000)
+    ap.add_argument("--terminal", type=float, default=0.7)
+    ap.add_argument("--history", type=int, default=50000)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    from src.api.routes import contacts, crm_admin
+    app = FastAPI()
+    app.include_router(contacts.router)
+    app.include_router(crm_admin.router)
+    client = TestClient(app)
+
+    t = time.perf_counter()
+    fill(args.prospects, args.terminal, args.history)
+    print(f"Bases : {_TMP} — {args.prospects} prospects (remplissage {time.perf_counter() - t:.0f} s)")
+    with database.SessionLocal() as db:
+        hot = db.query(V3ProspectDB.token).filter(V3ProspectDB.sent_at > NOW - timedelta(days=60)).limit(1).scalar()
+        cold = db.query(V3ProspectDB.token).filter(V3ProspectDB.sent_at < NOW - timedelta(days=400)).limit(1).scalar()
+
+    size_before, before = sizes(), pages(client, hot, cold, args.runs)
+    t = time.perf_counter()
+    moved = archive.run()
+    took = time.perf_counter() - t
+    size_after, after = sizes(), pages(client, hot, cold, args.runs)
+
+    print(f"archive.run() : {took:.1f} s — " + ", ".join(f"{k} {v}" for k, v in moved.items()))
+    print(f"{'table':22s} {'lignes avant':>13s} {'Mo avant':>9s} {'lignes après':>13s} {'Mo après':>9s}")
+    for name in size_before:
+        (n0, mb0), (n1, mb1) = size_before[name], size_after[name]
+        print(f"{name:22s} {n0:13d} {mb0:9.1f} {n1:13d} {mb1:9.1f}")
+    print(f"{'page':30s} {'ms avant':>9s} {'ms après':>9s}")
+    for name in before:
+        print(f"{name:30s} {before[name]:9.1f} {after[name]:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
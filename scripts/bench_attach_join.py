@@ -0,0 +1,126 @@
+"""
+Benchmark — vues CRM et Contacts : jointure Python (ancienne implémentation) contre
+src.crossdb en mode attach (une requête) et separate (lots IN par page).
+
+Deux bases temporaires (rien n'est écrit dans data/) : --prospects v3_prospects,
+--deliveries prospect_deliveries et un RDV pour 20 prospects. Mesure la durée médiane
+et le pic mémoire (tracemalloc) pour une page CRM (300) et une page Contacts (500).
+
+Usage : python scripts/bench_attach_join.py [--prospects 100000] [--deliveries 300000] [--runs 3]
+"""
+import argparse, os, statistics, sys, tempfile, time, tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "libs")]
+_TMP = tempfile.mkdtemp(prefix="bench_attach_")
+os.environ["DB_PATH"] = os.path.join(_TMP, "presence_ia.db")
+os.environ["MKT_DB_PATH"] = os.path.join(_TMP, "marketing.db")
+
+from marketing_module import database as mkt_db
+from marketing_module.models import MeetingDB, ProspectDeliveryDB
+from src import crossdb, database
+from src.models import Base, V3ProspectDB
+
+NOW = datetime(2026, 6, 15, 12)
+
+
+def fill(n_prospects: int, n_deliveries: int) -> None:
+    Base.metadata.create_all(database.ENGINE)
+    mkt_db.init_db()
+    with database.ENGINE.begin() as c:
+        for start in range(0, n_prospects, 20000):
+            c.execute(V3ProspectDB.__table__.insert(), [
+                {"token": f"t{i:07d}", "name": f"E{i}", "city": "Lyon", "profession": "plombier",
+                 "landing_url": f"/l/t{i:07d}", "email": f"e{i}@x.fr", "contacted": i % 2 == 0,
+                 "sent_at": NOW - timedelta(minutes=i) if i % 2 == 0 else None,
+                 "created_at": NOW - timedelta(seconds=i)} for i in range(start, min(start + 20000, n_prospects))])
+    with mkt_db._engine.begin() as c:
+        for start in range(0, n_deliveries, 20000):
+            c.execute(ProspectDeliveryDB.__table__.insert(), [
+                {"id": f"d{i}", "project_id": "presence-ia", "campaign_id": "c1",
+                 "prospect_id": f"t{i % n_prospects:07d}", "delivery_status": "sent",
+                 "opened_at": NOW if i % 3 == 0 else None, "created_at": NOW - timedelta(seconds=i)}
+                for i in range(start, min(start + 20000, n_deliveries))])
+        c.execute(MeetingDB.__table__.insert(), [
+            {"id": f"m{i}", "project_id": "presence-ia", "prospect_id": f"t{i * 20:07d}", "status": "scheduled",
+             "scheduled_at": NOW, "created_at": NOW} for i in range(n_prospects // 20)])
+
+
+def legacy_crm() -> int:
+    """Ancienne _load_crm_data : 300 prospects puis toutes les livraisons et RDV du projet."""
+    with database.SessionLocal() as db:
+        m = {p.token: {"delivery": None, "meeting": None} for p in db.query(V3ProspectDB).filter(
+            V3ProspectDB.contacted == True).order_by(V3ProspectDB.sent_at.desc()).limit(300)}
+    with mkt_db.SessionLocal() as mdb:
+        for d in mdb.query(ProspectDeliveryDB).filter_by(project_id="presence-ia").all():
+            if d.prospect_id in m:
+                m[d.prospect_id]["delivery"] = d.opened_at
+        for x in mdb.query(MeetingDB).filter_by(project_id="presence-ia").all():
+            if x.prospect_id in m:
+                m[x.prospect_id]["meeting"] = x.id
+    return len(m)
+
+
+def legacy_contacts() -> int:
+    """Ancienne page Contacts : tous les prospects, puis leurs livraisons (IN sur tous les tokens)."""
+    with database.SessionLocal() as db:
+        contacts = db.query(V3ProspectDB).order_by(V3ProspectDB.created_at.desc()).all()
+    tokens = [c.token for c in contacts]
+    tracking = {}
+    with mkt_db.SessionLocal() as mdb:
+        for i in range(0, len(tokens), 30000):                 # limite de variables SQLite
+            for r in (mdb.query(ProspectDeliveryDB).filter(ProspectDeliveryDB.prospect_id.in_(tokens[i:i + 30000]))
+                      .order_by(ProspectDeliveryDB.created_at.desc())):
+                tracking.setdefault(r.prospect_id, r)
+    return len(contacts)
+
+
+def crm_page() -> int:
+    from src.api.routes.crm_admin import _load_crm_data
+    return len(_load_crm_data())
+
+
+def contacts_page() -> int:
+    from src.api.routes.contacts import _prospects_query
+    return sum(1 for _ in crossdb.rows(_prospects_query().limit(500)))
+
+
+def measure(fn, runs: int) -> dict:
+    fn()                                                      # préchauffage (cache pages, compilation SQL)
+    times = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"ms": statistics.median(times), "mb": peak / 1e6}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--prospects", type=int, default=100000)
+    ap.add_argument("--deliveries", type=int, default=300000)
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    fill(args.prospects, args.deliveries)
+    rows = {"CRM — jointure Python": measure(legacy_crm, args.runs),
+            "Contacts — jointure Python": measure(legacy_contacts, args.runs)}
+    for m in ("attach", "separate"):
+        os.environ["CROSSDB_ATTACH"] = "1" if m == "attach" else "0"
+        rows[f"CRM — crossdb {m}"] = measure(crm_page, args.runs)
+        rows[f"Contacts — crossdb {m}"] = measure(contacts_page, args.runs)
+
+    print(f"Bases : {_TMP} — {args.prospects} prospects, {args.deliveries} livraisons, "
+          f"médiane sur {args.runs} appels")
+    print(f"{'vue':32s} {'ms':>9s} {'pic Mo':>9s}")
+    for name, r in rows.items():
+        print(f"{name:32s} {r['ms']:9.1f} {r['mb']:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
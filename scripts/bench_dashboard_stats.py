@@ -0,0 +1,100 @@
+"""
+Benchmark — stats marketing du hub admin (database._db_mkt_stats_period) :
+ancienne implémentation (toutes les livraisons / RDV chargés puis comptés en Python,
+boucle closers × RDV) vs requêtes agrégées SUM(CASE …) / GROUP BY closer_id.
+
+Mesure durée et pic mémoire (tracemalloc) à volume croissant de livraisons ; avec
+l'agrégation SQL le pic ne dépend plus du volume. Bases dans un dossier temporaire.
+
+Usage : python scripts/bench_dashboard_stats.py [--deliveries 50000 500000] [--meetings 5000]
+"""
+import argparse, os, sys, tempfile, time, tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "libs")]
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(prefix="bench_dash_"), "presence_ia.db"))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from marketing_module import database as mkt_db
+from marketing_module.models import (Base, CloserDB, DeliveryStatus, MeetingDB, MeetingStatus,
+                                     ProspectDeliveryDB, ReplyStatus)
+from src import database
+
+NOW = datetime.utcnow()
+FROM, TO = NOW - timedelta(days=365), NOW
+
+
+def legacy(date_from, date_to) -> dict:
+    """Ancienne version : lignes chargées en ORM, comptage en Python."""
+    with mkt_db.SessionLocal() as mdb:
+        deliveries = mdb.query(ProspectDeliveryDB).filter(
+            ProspectDeliveryDB.project_id == "presence-ia",
+            ProspectDeliveryDB.created_at.between(date_from, date_to)).all()
+        meetings = mdb.query(MeetingDB).filter(
+            MeetingDB.project_id == "presence-ia", MeetingDB.scheduled_at.between(date_from, date_to)).all()
+        closers = mdb.query(CloserDB).filter_by(project_id="presence-ia", is_active=True).all()
+        top = sorted(({"name": c.name, "deals": sum(1 for m in meetings if m.closer_id == c.id
+                                                    and m.status == MeetingStatus.completed)} for c in closers),
+                     key=lambda x: -x["deals"])
+        return {"sent": sum(1 for d in deliveries if d.delivery_status == DeliveryStatus.sent),
+                "opened": sum(1 for d in deliveries if d.opened_at),
+                "replied": sum(1 for d in deliveries if d.reply_status == ReplyStatus.positive),
+                "rdv": len(meetings), "top_closers": top[:3]}
+
+
+def fill(engine, start: int, stop: int, meetings: int) -> None:
+    with engine.begin() as c:
+        for lo in range(start, stop, 50000):
+            c.execute(ProspectDeliveryDB.__table__.insert(), [
+                {"id": f"d{i}", "project_id": "presence-ia", "campaign_id": f"c{i % 40}", "prospect_id": f"p{i}",
+                 "delivery_status": ("sent", "bounced", "sent", "pending")[i % 4],
+                 "reply_status": ("none", "positive")[i % 25 == 0], "opened_at": NOW if i % 3 else None,
+                 "clicked_at": NOW if i % 11 == 0 else None, "created_at": NOW - timedelta(minutes=i)}
+                for i in range(lo, min(lo + 50000, stop))])
+        if start == 0:
+            c.execute(CloserDB.__table__.insert(), [
+                {"id": f"k{i}", "project_id": "presence-ia", "name": f"Closer {i}", "is_active": True}
+                for i in range(40)])
+            c.execute(MeetingDB.__table__.insert(), [
+                {"id": f"m{i}", "project_id": "presence-ia", "prospect_id": f"p{i}", "closer_id": f"k{i % 40}",
+                 "status": ("completed", "scheduled")[i % 2], "deal_value": 490.0 if i % 4 == 0 else None,
+                 "scheduled_at": NOW - timedelta(hours=i)} for i in range(meetings)])
+
+
+def measure(fn) -> tuple:
+    fn(FROM, TO)                                    # préchauffage : cache de pages SQLite, compilation
+    tracemalloc.start()
+    t = time.perf_counter()
+    fn(FROM, TO)
+    ms = (time.perf_counter() - t) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ms, peak / 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--deliveries", type=int, nargs="+", default=[50000, 500000])
+    ap.add_argument("--meetings", type=int, default=5000)
+    args = ap.parse_args()
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_mkt_'), 'marketing.db')}")
+    Base.metadata.create_all(engine)
+    mkt_db.SessionLocal = sessionmaker(bind=engine)
+    print(f"{'livraisons':>11s} {'version':10s} {'ms':>9s} {'pic Mo':>8s}")
+    done = 0
+    for n in sorted(args.deliveries):
+        fill(engine, done, n, args.meetings)
+        done = n
+        assert legacy(FROM, TO)["sent"] == database._db_mkt_stats_period(FROM, TO)["sent"]
+        for name, fn in (("legacy", legacy), ("agrégé", database._db_mkt_stats_period)):
+            ms, mb = measure(fn)
+            print(f"{n:11d} {name:10s} {ms:9.1f} {mb:8.2f}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark — N lecteurs contre 1 écrivain sur une base SQLite :
+moteur historique (create_engine sans pragma, journal rollback) vs moteur WAL
+(marketing_module.sqlite_engine : pragmas + pool lecture séparé en query_only).
+
+L'écrivain imite le scheduler : petites transactions en continu et, toutes les
+--long-every secondes, une transaction longue qui garde le verrou d'écriture
+--long-ms millisecondes (UPDATE de masse + travail applicatif avant le commit).
+Les lecteurs imitent les routes : SELECT indexé + petit agrégat, en boucle.
+
+Base dans un dossier temporaire (rien n'est écrit dans data/).
+
+Usage : python scripts/bench_sqlite_concurrency.py [--rows 50000] [--readers 8] [--seconds 8]
+"""
+import argparse, os, random, statistics, sys, tempfile, threading, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "libs")]
+
+from sqlalchemy import create_engine, text
+
+from marketing_module.sqlite_engine import make_engines
+
+DDL = [
+    "CREATE TABLE prospects (id INTEGER PRIMARY KEY, token TEXT, city TEXT, profession TEXT, "
+    "score INTEGER, status TEXT, payload TEXT)",
+    "CREATE UNIQUE INDEX ix_token ON prospects (token)",
+    "CREATE INDEX ix_city_prof ON prospects (city, profession)",
+]
+CITIES = ["Lyon", "Nantes", "Rennes", "Lille", "Brest", "Dijon", "Metz", "Pau"]
+PROFS  = ["plombier", "couvreur", "electricien", "peintre"]
+
+
+def seed(path: str, rows: int) -> None:
+    eng = create_engine(f"sqlite:///{path}")
+    with eng.begin() as c:
+        for ddl in DDL:
+            c.exec_driver_sql(ddl)
+        c.execute(text("INSERT INTO prospects (token, city, profession, score, status, payload) "
+                       "VALUES (:t, :c, :p, :s, 'new', :pl)"),
+                  [{"t": f"{i:016x}", "c": CITIES[i % 8], "p": PROFS[i % 4], "s": i % 100,
+                    "pl": "x" * 400} for i in range(rows)])
+    eng.dispose()
+
+
+def run(mode: str, path: str, rows: int, readers: int, seconds: float, long_every: float, long_ms: int) -> dict:
+    if mode == "legacy":
+        write = read = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        with write.begin() as c:
+            c.exec_driver_sql("PRAGMA journal_mode=DELETE")
+    else:
+        write, read = make_engines(path)
+    stop = time.time() + seconds
+    lat, errors, writes = [], [0], [0]
+    lock = threading.Lock()
+
+    def reader():
+        mine, errs = [], 0
+        while time.time() < stop:
+            t = time.perf_counter()
+            try:
+                with read.connect() as c:
+                    c.execute(text("SELECT id, score, status FROM prospects WHERE token = :t"),
+                              {"t": f"{random.randrange(rows):016x}"}).all()
+                    c.execute(text("SELECT status, count(*) FROM prospects WHERE city = :c AND profession = :p "
+                                   "GROUP BY status"), {"c": random.choice(CITIES), "p": random.choice(PROFS)}).all()
+                mine.append((time.perf_counter() - t) * 1000)
+            except Exception:
+                errs += 1
+        with lock:
+            lat.extend(mine)
+            errors[0] += errs
+
+    def writer():
+        next_long = time.time() + long_every
+        while time.time() < stop:
+            try:
+                with write.begin() as c:
+                    if time.time() >= next_long:
+                        next_long = time.time() + long_every
+                        c.execute(text("UPDATE prospects SET score = score + 1 WHERE city = :c"),
+                                  {"c": random.choice(CITIES)})
+                        time.sleep(long_ms / 1000)          # travail applicatif dans la transaction
+                    else:
+                        c.execute(text("UPDATE prospects SET status = 'sent' WHERE token = :t"),
+                                  {"t": f"{random.randrange(rows):016x}"})
+                writes[0] += 1
+            except Exception:
+                errors[0] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    write.dispose()
+    if read is not write:
+        read.dispose()
+    return {"lat": sorted(lat), "errors": errors[0], "writes": writes[0]}
+
+
+def _stats(r: dict, seconds: float) -> str:
+    lat = r["lat"]
+    if not lat:
+        return f"aucune lecture réussie — erreurs={r['errors']}"
+    p = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))]
+    return (f"lectures={len(lat) / seconds:7.0f}/s  p50={statistics.median(lat):6.2f} ms  "
+            f"p95={p(0.95):7.2f} ms  p99={p(0.99):7.2f} ms  max={lat[-1]:7.1f} ms  "
+            f"écritures={r['writes'] / seconds:5.0f}/s  erreurs={r['errors']}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=8)
+    ap.add_argument("--long-every", type=float, default=1.0)
+    ap.add_argument("--long-ms", type=int, default=300)
+    args = ap.parse_args()
+
+    print(f"{args.rows} lignes, {args.readers} lecteurs, 1 écrivain "
+          f"(transaction longue {args.long_ms} ms toutes les {args.long_every} s), {args.seconds} s")
+    for mode in ("legacy", "wal"):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            seed(path, args.rows)
+            res = run(mode, path, args.rows, args.readers, args.seconds, args.long_every, args.long_ms)
+            print(f"  [{mode:6s}] {_stats(res, args.seconds)}")
+
+
+if __name__ == "__main__":
+    main()
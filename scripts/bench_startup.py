@@ -0,0 +1,63 @@
+"""
+Benchmark — coût de init_db au démarrage : base neuve, redémarrage (schéma et seeds à
+jour) et ancien comportement (tous les seeds rejoués à chaque démarrage, SEED_FORCE=1).
+
+Mesure la durée et le nombre de requêtes SQL émises. Base dans un dossier temporaire
+(rien n'est écrit dans data/), avec --prospects prospects existants pour le backfill.
+
+Usage : python scripts/bench_startup.py [--prospects 20000] [--runs 5]
+"""
+import argparse, os, statistics, sys, tempfile, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "libs")]
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_startup_"), "presence_ia.db")
+
+from sqlalchemy import event
+
+from src import database, seeds
+from src.models import V3ProspectDB
+
+CITIES = ["Lyon", "Nantes", "Rennes", "Lille", "Trifouillis", "Dijon", "Metz", "Pau"]
+
+
+def measure(fn, runs: int) -> dict:
+    count = [0]
+
+    def _on(*_a, **_k):
+        count[0] += 1
+    event.listen(database.ENGINE, "before_cursor_execute", _on)
+    times = []
+    try:
+        for _ in range(runs):
+            count[0] = 0
+            t = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - t) * 1000)
+    finally:
+        event.remove(database.ENGINE, "before_cursor_execute", _on)
+    return {"ms": statistics.median(times), "statements": count[0]}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--prospects", type=int, default=20000)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    rows = {"cold": measure(database.init_db, 1)}
+    with database.ENGINE.begin() as c:
+        c.execute(V3ProspectDB.__table__.insert(), [
+            {"token": f"b{i:06d}", "name": f"E{i}", "city": CITIES[i % 8], "profession": "plombier",
+             "landing_url": f"/l/b{i:06d}"} for i in range(args.prospects)])
+    rows["warm"] = measure(database.init_db, args.runs)
+    rows["legacy (tous les seeds)"] = measure(lambda: (database.init_db(), seeds.run(force="*")), args.runs)
+
+    print(f"Base : {database.DB_PATH} — {args.prospects} prospects, médiane sur {args.runs} démarrages")
+    print(f"{'démarrage':28s} {'ms':>9s} {'requêtes':>9s}")
+    for name, r in rows.items():
+        print(f"{name:28s} {r['ms']:9.1f} {r['statements']:9d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark — explorateur de suspects sur une table sirene_suspects synthétique :
+page N par OFFSET (ancienne pagination) contre pagination par clé, et recherche ilike
+contre FTS5 (sirene_suspects_fts, migration 0005).
+
+Base dans un dossier temporaire (rien n'est écrit dans data/), schéma posé par les
+migrations. Durées médianes de db_suspects_list, sans le COUNT (with_total=False).
+
+Usage : python scripts/bench_suspects.py [--rows 2000000] [--page 1000] [--runs 5]
+"""
+import argparse, os, random, statistics, sys, tempfile, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "libs")]
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_suspects_"), "presence_ia.db")
+
+from src import database, migrate
+from src.database import db_suspects_list
+from src.models import SireneSuspectDB
+
+VILLES = ["Lyon", "Nantes", "Rennes", "Lille", "Brest", "Dijon", "Metz", "Pau", "Nîmes", "Saint-Étienne",
+          "Toulouse", "Bordeaux", "Angers", "Tours", "Caen", "Reims", "Amiens", "Limoges", "Nancy", "Orléans"]
+MOTS   = ["Plomberie", "Couverture", "Électricité", "Peinture", "Maçonnerie", "Menuiserie", "Chauffage",
+          "Toiture", "Carrelage", "Isolation", "Services", "Bâtiment", "Rénovation", "Habitat", "Artisan"]
+NOMS   = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau"]
+
+
+def fill(n: int) -> None:
+    rnd = random.Random(42)
+    migrate.ensure_current(database.ENGINE)
+    with database.ENGINE.begin() as c:
+        for start in range(0, n, 50000):
+            c.execute(SireneSuspectDB.__table__.insert(), [
+                {"id": f"{i:014d}", "ville": rnd.choice(VILLES), "departement": f"{rnd.randint(1, 95):02d}",
+                 "raison_sociale": f"{rnd.choice(MOTS)} {rnd.choice(NOMS)} {rnd.randint(1, 9999)}",
+                 "profession_id": rnd.choice(("plombier", "couvreur", "electricien", "peintre")),
+                 "actif": True, "contactable": False} for i in range(start, min(start + 50000, n))])
+        c.exec_driver_sql("ANALYZE sirene_suspects")
+
+
+def timed(fn, runs: int) -> float:
+    fn()
+    times = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    return statistics.median(times)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--page", type=int, default=1000)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    t = time.perf_counter()
+    fill(args.rows)
+    print(f"Base : {database.DB_PATH} — {args.rows} suspects (remplissage + FTS {time.perf_counter() - t:.0f} s)")
+
+    with database.SessionLocal() as db:
+        # clé de la fin de la page N-1, obtenue une fois par OFFSET
+        _, prev = db_suspects_list(db, page=args.page - 1, per_page=100, with_total=False)
+        key = (prev[-1].ville, prev[-1].raison_sociale, prev[-1].id)
+        _, prev_p = db_suspects_list(db, profession_id="plombier", page=args.page - 1, per_page=100, with_total=False)
+        key_p = (prev_p[-1].ville, prev_p[-1].raison_sociale, prev_p[-1].id)
+        rows = {
+            f"page {args.page} — OFFSET": lambda: db_suspects_list(db, page=args.page, with_total=False),
+            f"page {args.page} — clé": lambda: db_suspects_list(db, after=key, with_total=False),
+            f"page {args.page} métier — OFFSET": lambda: db_suspects_list(db, profession_id="plombier",
+                                                                           page=args.page, with_total=False),
+            f"page {args.page} métier — clé": lambda: db_suspects_list(db, profession_id="plombier",
+                                                                        after=key_p, with_total=False),
+        }
+        for q in ("martin 42", "isolation nimes", "plomberie"):
+            database._FTS_TABLES[str(db.get_bind().url)] = False
+            ilike = timed(lambda: db_suspects_list(db, search=q, with_total=False), args.runs)
+            database._FTS_TABLES[str(db.get_bind().url)] = True
+            rows[f"recherche « {q} » — ilike"] = ilike
+            rows[f"recherche « {q} » — FTS5"] = lambda q=q: db_suspects_list(db, search=q, with_total=False)
+        print(f"{'requête':42s} {'ms':>9s}")
+        for name, fn in rows.items():
+            ms = fn if isinstance(fn, float) else timed(fn, args.runs)
+            print(f"{name:42s} {ms:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Benchmark — latence de la landing /l/{token} pendant un _job_outbound :
+job exécuté dans le process API (SCHEDULER_MODE=inprocess) vs dans un process
+séparé `src.worker` (SCHEDULER_MODE=worker, l'API ne fait que mettre en file).
+
+Pour chaque mode : un serveur uvicorn (routes v3), N clients concurrents sur des
+landings, d'abord au repos puis pendant un _job_outbound(force=True) déclenché via
+jobqueue.submit() — exactement le chemin des boutons admin.
+
+Base SQLite et état de paire active dans un dossier temporaire (rien n'est écrit
+dans data/), OUTBOUND_DRY_RUN=true, images villes et résultats IA pré-remplis :
+aucun appel réseau sortant.
+
+Usage : python scripts/bench_worker_latency.py [--prospects 3000] [--clients 8] [--ia-kb 40]
+"""
+import argparse, json, os, random, socket, statistics, subprocess, sys, tempfile, threading, time
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "libs")]
+
+CITIES      = ["Lyon", "Nantes", "Rennes", "Lille", "Brest", "Dijon"]
+PROFESSIONS = ["plombier", "couvreur", "électricien"]
+
+
+# ── Process enfants (serveur API / worker) ────────────────────────────────────
+
+def _child_setup(tmp: str) -> None:
+    """Env commun : DB temporaire + état paire active hors de data/."""
+    os.environ["DB_PATH"]          = os.path.join(tmp, "presence_ia.db")
+    os.environ["MKT_DB_PATH"]      = os.path.join(tmp, "marketing.db")
+    os.environ["OUTBOUND_DRY_RUN"] = "true"
+    os.environ["OUTBOUND_MAX_EMAIL"] = "100000"         # toute la file en un run
+    from pathlib import Path
+    import src.active_pair as ap
+    ap._STATE_FILE = Path(tmp) / "active_pair_state.json"
+
+
+def serve(tmp: str, port: int) -> None:
+    _child_setup(tmp)
+    import logging, uvicorn
+    from fastapi import FastAPI
+    from src.api.routes import v3
+    from src.jobqueue import submit
+
+    logging.disable(logging.INFO)
+    v3._mkt.record_landing_visit = lambda token: None   # pas de marketing.db dans le bench
+    app = FastAPI()
+    app.include_router(v3.router)
+
+    @app.post("/bench/outbound")
+    def _trigger():
+        return submit("outbound", force=True)
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def work(tmp: str) -> None:
+    _child_setup(tmp)
+    import logging, signal
+    from src.worker import Worker, lower_priority
+    logging.disable(logging.INFO)
+    lower_priority()
+    w = Worker(threads=1, poll=0.2)
+    signal.signal(signal.SIGTERM, lambda *a: w.stop.set())
+    w.loop()
+
+
+# ── Préparation des données ───────────────────────────────────────────────────
+
+def _ia_results(kb: int) -> str:
+    words = ["entreprise", "artisan", "devis", "chantier", "qualité", "avis", "intervention"]
+    text  = " ".join(random.choice(words) for _ in range(kb * 120))
+    return json.dumps([{"model": m, "ok": True, "response": text[: kb * 1024 // 3],
+                        "cited": [f"Société {i}" for i in range(30)]}
+                       for m in ("chatgpt", "gemini", "claude")], ensure_ascii=False)
+
+
+def seed(tmp: str, n: int, ia_kb: int) -> list:
+    os.environ["DB_PATH"] = os.path.join(tmp, "presence_ia.db")
+    from src.database import ENGINE, SessionLocal
+    from src.models import Base, RefCityDB, V3ProspectDB
+    Base.metadata.create_all(ENGINE)
+    ia = _ia_results(ia_kb)
+    tokens = []
+    with SessionLocal() as db:
+        for c in CITIES:
+            db.add(RefCityDB(city_name=c.upper(), city_type="prefecture",
+                             header_image_url=f"/dist/headers/{c.lower()}.webp"))
+        for i in range(n):
+            city, prof = CITIES[i % len(CITIES)], PROFESSIONS[i % len(PROFESSIONS)]
+            tok = f"{i:032x}"
+            tokens.append(tok)
+            db.add(V3ProspectDB(token=tok, name=f"Entreprise Dupont {i}", city=city,
+                                profession=prof, landing_url=f"/l/{tok}", city_reference=city.upper(),
+                                email=f"contact{i}@artisan-{i}.fr", ia_results=ia))
+        db.commit()
+    return tokens
+
+
+# ── Mesure ────────────────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str) -> float:
+    t = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as r:
+        r.read()
+    return (time.perf_counter() - t) * 1000
+
+
+def _load(base: str, tokens: list, clients: int, seconds: float) -> list:
+    lat, stop = [], time.time() + seconds
+
+    def run():
+        while time.time() < stop:
+            lat.append(_get(f"{base}/l/{random.choice(tokens)}"))
+
+    threads = [threading.Thread(target=run) for _ in range(clients)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return lat
+
+
+def _stats(lat: list) -> str:
+    lat = sorted(lat)
+    p = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))]
+    return (f"n={len(lat):5d}  p50={statistics.median(lat):7.1f} ms  "
+            f"p95={p(0.95):7.1f} ms  p99={p(0.99):7.1f} ms  max={lat[-1]:7.1f} ms")
+
+
+def _job_seconds(tmp: str) -> float:
+    """Durée d'un _job_outbound(force=True) seul, pour dimensionner la fenêtre de mesure."""
+    _child_setup(tmp)
+    import logging
+    logging.disable(logging.INFO)
+    from src.scheduler import _job_outbound
+    t = time.perf_counter()
+    _job_outbound(force=True)
+    return time.perf_counter() - t
+
+
+def bench(mode: str, tmp: str, tokens: list, clients: int, window: float) -> dict:
+    port = _free_port()
+    env  = {**os.environ, "SCHEDULER_MODE": mode}
+    me   = os.path.abspath(__file__)
+    procs = [subprocess.Popen([sys.executable, me, "--serve", tmp, str(port)], env=env)]
+    if mode == "worker":
+        procs.append(subprocess.Popen([sys.executable, me, "--work", tmp], env=env))
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                _get(f"{base}/l/{tokens[0]}"); break
+            except Exception:
+                time.sleep(0.2)
+        _load(base, tokens, clients, 2)                       # chauffe
+        idle = _load(base, tokens, clients, window)
+        urllib.request.urlopen(urllib.request.Request(f"{base}/bench/outbound", method="POST")).read()
+        busy = _load(base, tokens, clients, window)
+        return {"idle": idle, "busy": busy}
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait(timeout=60)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--prospects", type=int, default=3000)
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--ia-kb", type=int, default=40)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tokens = seed(tmp, args.prospects, args.ia_kb)
+        job_s  = _job_seconds(tmp)
+        window = max(3.0, job_s)
+        print(f"_job_outbound(force=True) seul : {job_s:.1f} s — fenêtre de mesure {window:.1f} s, "
+              f"{args.clients} clients, {args.prospects} prospects")
+        for mode in ("inprocess", "worker"):
+            res = bench(mode, tmp, tokens, args.clients, window)
+            print(f"\n[{mode}]")
+            print(f"  repos          {_stats(res['idle'])}")
+            print(f"  outbound actif {_stats(res['busy'])}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        serve(sys.argv[2], int(sys.argv[3]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--work":
+        work(sys.argv[2])
+    else:
+        main()
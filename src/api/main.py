@@ -56,10 +56,15 @@ def startup():
     offers_init(db_url=f"sqlite:///{db_path}")
     log.info("offers_module initialisé")
 
-    # Scheduler — prospection automatique toutes les heures
+    # Scheduler — un seul worker leader (bail SQLite) fait tourner les jobs,
+    # ou aucun si SCHEDULER_MODE=worker (jobs dans `python -m src.worker`)
     try:
-        from ..scheduler import start_scheduler
-        start_scheduler()
+        from ..jobqueue import worker_mode
+        from ..scheduler import start_leader_scheduler
+        if worker_mode():
+            log.info("Scheduler délégué au process worker (SCHEDULER_MODE=worker)")
+        else:
+            start_leader_scheduler()
     except Exception as e:
         log.warning("Scheduler non démarré : %s", e)
 
@@ -88,6 +93,15 @@ def startup():
         except Exception as e:
             log.warning("Impossible de monter %s : %s", route, e)
 
+    # Images : traitements perdus au dernier arrêt (pending figés, sources _src-* orphelines)
+    try:
+        from ..image_pipeline import sweep as _sweep_images
+        from .routes.headers import _headers_dir
+        from .routes.upload import _uploads_dir
+        _sweep_images([_headers_dir(), _uploads_dir()])
+    except Exception as e:
+        log.warning("Nettoyage image_pipeline échoué : %s", e)
+
 
 @app.on_event("shutdown")
 def shutdown():
@@ -96,6 +110,11 @@ def shutdown():
         stop_scheduler()
     except Exception:
         pass
+    try:
+        from ..image_pipeline import shutdown as _stop_images
+        _stop_images(wait=False)
+    except Exception:
+        pass
 
 
 @app.get("/health")
@@ -8,7 +8,7 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session
 
-from ...database import get_db, db_get_campaign, db_list_campaigns, db_list_prospects, db_get_prospect, jl, db_dashboard_stats, db_cost_stats
+from ...database import get_db, get_read_db, db_get_campaign, db_list_campaigns, db_list_prospects, db_get_prospect, jl, db_dashboard_stats, db_cost_stats
 from ...models import ProspectStatus, ProspectDB, V3ProspectDB, V3CityImageDB, ProspectionTargetDB
 from ._nav import admin_nav
 
@@ -335,7 +335,7 @@ def _build_cron_section(db, token: str = "") -> str:
                "tous les jours à 9h UTC")
         + _row("Email warming", None,
                jobs_map.get("email_warming", {}).get("next_run"),
-               "~toutes les 4h")
+               "toutes les 5 min (plan du jour)")
     )
 
     return (
@@ -678,16 +678,16 @@ def _build_cost_section(costs: dict) -> str:
 
 
 @router.get("/admin", response_class=HTMLResponse)
-def admin_dashboard(request: Request, db: Session = Depends(get_db),
+def admin_dashboard(request: Request, db: Session = Depends(get_db), rdb: Session = Depends(get_read_db),
                     period: str = "exercice", date_from: str = None, date_to: str = None):
     if (r := _check_token(request)) is not None: return r
     token = _admin_token()
 
     dt_from, dt_to, period_label, prev_from, prev_to = _period_bounds(period, date_from, date_to)
 
-    s  = db_dashboard_stats(db, dt_from, dt_to)
-    sp = db_dashboard_stats(db, prev_from, prev_to)
-    costs = db_cost_stats(db)
+    s  = db_dashboard_stats(rdb, dt_from, dt_to)
+    sp = db_dashboard_stats(rdb, prev_from, prev_to)
+    costs = db_cost_stats(rdb)
 
     # Slot coverage (Calendly)
     try:
@@ -1245,11 +1245,36 @@ def admin_scheduler(request: Request):
         jobs = scheduler_status()
     except Exception as e:
         jobs = [{"id": "error", "next_run": str(e), "trigger": "—"}]
+    try:
+        from ...leader import lease_status
+        lease = lease_status("scheduler")
+        lease_txt = (f'Leader : <b>{lease["holder"]}</b> (heartbeat {lease["heartbeat_at"]}'
+                     f'{"" if lease["active"] else " — bail expiré"})'
+                     f' · ce worker : {"leader" if lease["is_leader"] else "HTTP seul"}'
+                     if lease["holder"] else "Leader : aucun bail")
+    except Exception as e:
+        lease_txt = f"Leader : {e}"
 
     rows = "".join(
         f'<tr><td>{j["id"]}</td><td>{j["next_run"]}</td><td>{j["trigger"]}</td></tr>'
         for j in jobs
     )
+    try:
+        from ...jobruns import stats
+        from ...scheduler import job_intervals
+        runs, runs_txt = stats(days=7, intervals=job_intervals()), "Aucune exécution enregistrée"
+    except Exception as e:
+        runs, runs_txt = [], f"Registre indisponible : {e}"
+    _ms = lambda v: "—" if v is None else (f"{v / 1000:.1f} s" if v >= 1000 else f"{v} ms")
+    run_rows = "".join(
+        f'<tr><td>{j["job"]}</td><td>{j["runs"]}</td><td>{_ms(j["p50_ms"])}</td><td>{_ms(j["p95_ms"])}</td>'
+        f'<td>{_ms(j["max_ms"])}</td>'
+        f'<td style="color:{"#dc2626" if (j.get("headroom") or 0) > 0.8 else "inherit"}">'
+        f'{"—" if j.get("headroom") is None else format(j["headroom"], ".0%")}</td>'
+        f'<td>{j["errors"]}</td><td>{j["overlapped"]}</td><td>{j["skipped"]}</td>'
+        f'<td>{" · ".join(_ms(d["p50_ms"]) for d in j["trend"][-7:])}</td></tr>'
+        for j in runs
+    ) or f'<tr><td colspan="10" style="color:#6b7280">{runs_txt}</td></tr>'
     return HTMLResponse(f"""<!DOCTYPE html><html lang="fr"><head>
 <meta charset="UTF-8"><title>Scheduler — PRESENCE_IA</title>
 <style>*{{box-sizing:border-box}}body{{font-family:'Segoe UI',sans-serif;background:#f9fafb;color:#1a1a2e;margin:0}}
@@ -1264,7 +1289,12 @@ td{{padding:10px;border-bottom:1px solid #e5e7eb;color:#1a1a2e}}a{{color:#e94560
 <div class="wrap">
 <h1>Planificateur</h1>
 <p class="sub">Jobs APScheduler actifs — prospections automatiques et tâches récurrentes</p>
+<p class="sub">{lease_txt}</p>
 <table><tr><th>ID</th><th>Prochain run</th><th>Trigger</th></tr>{rows}</table>
+<h1 style="margin-top:28px">Exécutions — 7 derniers jours</h1>
+<p class="sub">Durées p50 / p95 par job · charge = p95 / intervalle entre deux déclenchements (rouge au-delà de 80 %)</p>
+<table><tr><th>Job</th><th>Runs</th><th>p50</th><th>p95</th><th>Max</th><th>Charge</th><th>Erreurs</th>
+<th>Chevauch.</th><th>Sautés</th><th>Tendance p50 / jour</th></tr>{run_rows}</table>
 </div></body></html>""")
 
 
@@ -1559,6 +1589,23 @@ def active_pair_status(request: Request, db: Session = Depends(get_db)):
     return _JSONResponse(state or {})
 
 
+@router.get("/api/admin/scheduler/lease")
+def scheduler_lease(request: Request):
+    """Process détenteur du bail scheduler (multi-workers) et état de ce worker."""
+    if (r := _check_token(request)) is not None: return r
+    from ...leader import lease_status
+    return _JSONResponse(lease_status("scheduler"))
+
+
+@router.get("/api/admin/scheduler/runs")
+def scheduler_runs(request: Request, days: int = 7):
+    """Registre des exécutions : p50 / p95 de durée par job, erreurs, chevauchements, tendance par jour."""
+    if (r := _check_token(request)) is not None: return r
+    from ...jobruns import stats
+    from ...scheduler import job_intervals
+    return _JSONResponse({"days": days, "jobs": stats(days=max(1, min(days, 90)), intervals=job_intervals())})
+
+
 @router.get("/api/admin/pipeline-history")
 def pipeline_history(request: Request, db: Session = Depends(get_db)):
     """Retourne les 50 dernières entrées du journal de pilotage."""
@@ -1592,11 +1639,10 @@ def pipeline_history(request: Request, db: Session = Depends(get_db)):
 def trigger_outbound(request: Request):
     """Déclenche immédiatement le job outbound (sans attendre le cron 9h UTC)."""
     if (r := _check_token(request)) is not None: return r
-    import threading
-    from ...scheduler import _job_outbound
-    t = threading.Thread(target=_job_outbound, kwargs={"force": False}, daemon=True)
-    t.start()
-    return _JSONResponse({"ok": True, "message": "Job outbound lancé en arrière-plan"})
+    from ...jobqueue import submit
+    res = submit("outbound", force=False)
+    return _JSONResponse({"ok": True, "message": "Job outbound " + (
+        f"mis en file (#{res['id']}) — exécuté par le worker" if res["queued"] else "lancé en arrière-plan")})
 
 
 @router.post("/api/admin/sync-brevo")
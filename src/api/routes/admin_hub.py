@@ -14,7 +14,7 @@ from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from sqlalchemy.orm import Session
 
-from ...database import get_db, SessionLocal
+from ...database import get_db, get_read_db, ReadSessionLocal
 from ...models import V3ProspectDB, V3CityImageDB, LeadProvisioningConfigDB, SireneSegmentDB
 from ._nav import admin_nav, admin_token
 
@@ -97,37 +97,11 @@ h1{{font-size:20px;font-weight:700;margin:0 0 4px}}
 </body></html>""")
 
 
-# ── Mkt stats helper (copie légère de analytics.py) ─────────────────────────
+# ── Mkt stats helper (requêtes agrégées de analytics.py) ─────────────────────
 
 def _mkt_stats() -> dict:
-    empty = {"sent": 0, "opened": 0, "clicked": 0, "landing": 0,
-             "calendly": 0, "bounced": 0, "rdv": 0, "rdv_done": 0,
-             "sales": 0, "revenue": 0.0}
-    try:
-        from marketing_module.database import SessionLocal as MktSess
-        from marketing_module.models import ProspectDeliveryDB, DeliveryStatus, MeetingDB, MeetingStatus
-        mdb = MktSess()
-        try:
-            dl = mdb.query(ProspectDeliveryDB).filter_by(project_id="presence-ia").all()
-            s = {
-                "sent":     sum(1 for d in dl if d.delivery_status == DeliveryStatus.sent),
-                "opened":   sum(1 for d in dl if d.opened_at),
-                "clicked":  sum(1 for d in dl if d.clicked_at),
-                "landing":  sum(1 for d in dl if getattr(d, "landing_visited_at", None)),
-                "calendly": sum(1 for d in dl if getattr(d, "calendly_clicked_at", None)),
-                "bounced":  sum(1 for d in dl if d.delivery_status == DeliveryStatus.bounced),
-                "rdv": 0, "rdv_done": 0, "sales": 0, "revenue": 0.0,
-            }
-            mtgs = mdb.query(MeetingDB).filter_by(project_id="presence-ia").all()
-            s["rdv"]      = len(mtgs)
-            s["rdv_done"] = sum(1 for m in mtgs if m.status == MeetingStatus.completed)
-            s["sales"]    = sum(1 for m in mtgs if (m.deal_value or 0) > 0)
-            s["revenue"]  = sum((m.deal_value or 0) for m in mtgs)
-            return s
-        finally:
-            mdb.close()
-    except Exception:
-        return empty
+    from .analytics import _mkt_delivery_stats
+    return _mkt_delivery_stats()
 
 
 def _pct(a, b):
@@ -313,7 +287,7 @@ def closers_hub(request: Request, db: Session = Depends(get_db)):
     nb_closers_actifs = 0
     commissions_dues = 0.0
     try:
-        from marketing_module.database import SessionLocal as MktSess
+        from marketing_module.database import ReadSessionLocal as MktSess
         from marketing_module.models import MeetingDB, MeetingStatus, CloserDB
         mdb = MktSess()
         try:
@@ -435,7 +409,7 @@ def closers_hub(request: Request, db: Session = Depends(get_db)):
 # ── /admin/finances ──────────────────────────────────────────────────────────
 
 @router.get("/admin/finances", response_class=HTMLResponse)
-def finances_hub(request: Request, db: Session = Depends(get_db)):
+def finances_hub(request: Request, db: Session = Depends(get_read_db)):
     token, redir = _check(request)
     if redir: return redir
 
@@ -446,14 +420,16 @@ def finances_hub(request: Request, db: Session = Depends(get_db)):
     offer_ca: dict = {}
     ia_cost_data: dict = {}
     try:
-        from marketing_module.database import SessionLocal as MktSess
+        from marketing_module.database import ReadSessionLocal as MktSess
         from marketing_module.models import MeetingDB
+        from sqlalchemy import func
         mdb = MktSess()
         try:
-            for mt in mdb.query(MeetingDB).filter_by(project_id="presence-ia").all():
-                if (mt.deal_value or 0) > 0:
-                    name = getattr(mt, "offer_name", None) or "—"
-                    offer_ca[name] = offer_ca.get(name, 0.0) + (mt.deal_value or 0)
+            # MeetingDB n'a pas d'offre : tout le CA va sous "—"
+            ca = (mdb.query(func.sum(MeetingDB.deal_value))
+                     .filter(MeetingDB.project_id == "presence-ia", MeetingDB.deal_value > 0).scalar())
+            if ca:
+                offer_ca["—"] = float(ca)
         finally:
             mdb.close()
     except Exception:
@@ -468,6 +444,12 @@ def finances_hub(request: Request, db: Session = Depends(get_db)):
     ia_cost_est = ia_tested * 0.005
     cost_per_lead_ia = ia_cost_est / max(ia_tested, 1)
 
+    # Coûts API mesurés (Places / Gemini) : rollup quotidien, pas les lignes brutes
+    from ...job_costs import totals as cost_totals
+    from datetime import timedelta
+    api_all = cost_totals(db)
+    api_30d = cost_totals(db, since=datetime.utcnow().date() - timedelta(days=29))
+
     # Coûts saisis manuellement
     total_costs_recur = sum(c["montant"] for c in costs if c.get("type_freq") == "recurrent")
     total_costs_ponct = sum(c["montant"] for c in costs if c.get("type_freq") == "ponctuel")
@@ -508,6 +490,8 @@ def finances_hub(request: Request, db: Session = Depends(get_db)):
         + _stat_row("Coût IA estimé", f"~{ia_cost_est:.2f} €", "(~0.005€/test)", "#f59e0b")
         + _stat_row("Coût IA / lead", f"~{cost_per_lead_ia:.4f} €")
         + _stat_row("Coût IA déclaré", f"{total_costs_ia_m:.2f} €")
+        + _stat_row("Coût API mesuré (Places + Gemini)", f"${api_all['cost_estimated']:.2f}",
+                    f"30 j : ${api_30d['cost_estimated']:.2f} · {api_all['nb_leads_generes']:,} leads", "#0ea5e9")
         + _stat_row("Coût marketing", f"{total_costs_mkt:.2f} €")
         + _stat_row("Coût / deal signé", f"{total_costs / max(m['sales'], 1):.2f} €" if m['sales'] else "—",
                     color="#e94560")
@@ -667,7 +651,7 @@ async def pipeline_health(request: Request):
     from sqlalchemy import func
     from datetime import timedelta
 
-    db = SessionLocal()
+    db = ReadSessionLocal()
     now = datetime.utcnow()
 
     cfg = db.get(LeadProvisioningConfigDB, "default")
@@ -683,6 +667,9 @@ async def pipeline_health(request: Request):
         .all()
     )
 
+    from ...job_costs import daily as cost_daily
+    api_costs = cost_daily(db, 7)
+
     v3_history = []
     for d in range(7, 0, -1):
         day_start = (now - timedelta(days=d)).replace(hour=0, minute=0, second=0)
@@ -746,6 +733,20 @@ async def pipeline_health(request: Request):
         for d, c in v3_history
     )
 
+    cost_rows = "".join(
+        f'<tr style="{"" if i%2 else "background:#f9fafb"}"><td style="padding:6px 12px">{c["day"].strftime("%d/%m")}</td>'
+        f'<td style="padding:6px 12px;text-align:right">{c["nb_runs"]}</td>'
+        f'<td style="padding:6px 12px;text-align:right">{c["nb_appels_google"]:,}</td>'
+        f'<td style="padding:6px 12px;text-align:right">{c["nb_leads_generes"]:,}</td>'
+        f'<td style="padding:6px 12px;text-align:right;font-weight:600">${c["cost_estimated"]:.2f}</td></tr>'
+        for i, c in enumerate(api_costs)
+    )
+    cost_html = (f'<table style="width:100%;border-collapse:collapse;font-size:13px">'
+                 f'<tr style="color:#9ca3af;font-size:11px"><th style="text-align:left;padding:6px 12px">Jour</th>'
+                 f'<th style="text-align:right;padding:6px 12px">Runs</th><th style="text-align:right;padding:6px 12px">Places</th>'
+                 f'<th style="text-align:right;padding:6px 12px">Leads</th><th style="text-align:right;padding:6px 12px">Coût</th></tr>'
+                 f'{cost_rows}</table>')
+
     body = f"""
     <h1 style="font-size:22px;font-weight:700;margin-bottom:24px">Pipeline Health</h1>
     <div style="margin-bottom:24px">{alert_html}</div>
@@ -757,6 +758,7 @@ async def pipeline_health(request: Request):
       <div>
         <div class="card"><h2>V3 créés / 7 jours</h2>{bars}</div>
         <div class="card" style="margin-top:24px"><h2>Suspects disponibles (top 20)</h2>{avail_html}</div>
+        <div class="card" style="margin-top:24px"><h2>Coûts API / 7 jours</h2>{cost_html}</div>
       </div>
     </div>
     <div style="margin-top:24px;display:flex;gap:12px;flex-wrap:wrap">
@@ -783,9 +785,8 @@ async def pipeline_force_provision(request: Request):
     token = form.get("token", "")
     if token != admin_token():
         return RedirectResponse("/admin/login", status_code=302)
-    from ... import scheduler as sched_mod
-    import threading
-    threading.Thread(target=sched_mod._job_provision_leads, kwargs={"force": True}, daemon=True).start()
+    from ...jobqueue import submit
+    submit("provision_leads", force=True)
     return RedirectResponse(f"/admin/pipeline-health?token={token}", status_code=303)
 
 
@@ -795,7 +796,6 @@ async def pipeline_force_refresh_ia(request: Request):
     token = form.get("token", "")
     if token != admin_token():
         return RedirectResponse("/admin/login", status_code=302)
-    from ... import scheduler as sched_mod
-    import threading
-    threading.Thread(target=sched_mod._job_refresh_ia, daemon=True).start()
+    from ...jobqueue import submit
+    submit("refresh_ia")
     return RedirectResponse(f"/admin/pipeline-health?token={token}", status_code=303)
@@ -46,34 +46,41 @@ def _pct(num: int, denom: int) -> str:
 
 
 def _mkt_delivery_stats() -> dict:
-    """Lit les stats de livraison depuis marketing.db (graceful si absent)."""
+    """Lit les stats de livraison depuis marketing.db (graceful si absent) — une requête agrégée par table."""
     empty = {"sent": 0, "opened": 0, "clicked": 0, "landing": 0, "calendly": 0,
              "bounced": 0, "rdv": 0, "rdv_done": 0, "sales": 0, "revenue": 0.0}
     try:
-        from marketing_module.database import SessionLocal as MktSession
+        from sqlalchemy import case, func
+        from marketing_module.database import ReadSessionLocal as MktSession
         from marketing_module.models import (
             ProspectDeliveryDB, DeliveryStatus, MeetingDB, MeetingStatus,
         )
+
+        def n(cond):
+            return func.coalesce(func.sum(case((cond, 1), else_=0)), 0)
+
+        D, M = ProspectDeliveryDB, MeetingDB
         mdb = MktSession()
         try:
-            deliveries = (mdb.query(ProspectDeliveryDB)
-                          .filter_by(project_id="presence-ia").all())
-            stats = {
-                "sent":     sum(1 for d in deliveries if d.delivery_status == DeliveryStatus.sent),
-                "opened":   sum(1 for d in deliveries if d.opened_at),
-                "clicked":  sum(1 for d in deliveries if d.clicked_at),
-                "landing":  sum(1 for d in deliveries if getattr(d, "landing_visited_at", None)),
-                "calendly": sum(1 for d in deliveries if getattr(d, "calendly_clicked_at", None)),
-                "bounced":  sum(1 for d in deliveries if d.delivery_status == DeliveryStatus.bounced),
-                "rdv": 0, "rdv_done": 0, "sales": 0, "revenue": 0.0,
-            }
+            d = (mdb.query(
+                    n(D.delivery_status == DeliveryStatus.sent.value).label("sent"),
+                    n(D.opened_at.isnot(None)).label("opened"),
+                    n(D.clicked_at.isnot(None)).label("clicked"),
+                    n(D.landing_visited_at.isnot(None)).label("landing"),
+                    n(D.calendly_clicked_at.isnot(None)).label("calendly"),
+                    n(D.delivery_status == DeliveryStatus.bounced.value).label("bounced"))
+                 .filter(D.project_id == "presence-ia").one())
+            stats = {**d._asdict(), "rdv": 0, "rdv_done": 0, "sales": 0, "revenue": 0.0}
             try:
-                meetings = (mdb.query(MeetingDB)
-                            .filter_by(project_id="presence-ia").all())
-                stats["rdv"]      = len(meetings)
-                stats["rdv_done"] = sum(1 for m in meetings if m.status == MeetingStatus.completed)
-                stats["sales"]    = sum(1 for m in meetings if (m.deal_value or 0) > 0)
-                stats["revenue"]  = sum((m.deal_value or 0) for m in meetings if (m.deal_value or 0) > 0)
+                m = (mdb.query(
+                        func.count(M.id).label("rdv"),
+                        n(M.status == MeetingStatus.completed.value).label("rdv_done"),
+                        n(M.deal_value > 0).label("sales"),
+                        func.coalesce(func.sum(case((M.deal_value > 0, M.deal_value), else_=0.0)), 0.0)
+                            .label("revenue"))
+                     .filter(M.project_id == "presence-ia").one())
+                stats.update(m._asdict())
+                stats["revenue"] = float(stats["revenue"])
             except Exception:
                 pass
             return stats
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from ...database import get_db, SessionLocal
 from ...models import V3ProspectDB
+from ...ref_cities_seed import city_reference_for
 from ._nav import admin_nav
 from . import v3_mkt_bridge as _mkt
 from .v3 import DEPT_PREFECTURE
@@ -28,9 +29,24 @@ def _offer_labels(db: Session) -> dict:
     return {o.name: o.name for o in offers} if offers else {}
 
 
-def _list_prospects(db: Session) -> list:
-    """Liste tous les v3_prospects (vrais + tests), ordonnés par created_at desc."""
-    return db.query(V3ProspectDB).order_by(V3ProspectDB.created_at.desc()).all()
+_LIST_COLS = ("token", "name", "status", "email", "phone", "city", "profession", "created_at",
+              "is_test", "contacted", "email_sent_at", "sent_at", "sent_method")
+
+
+def _prospects_query(status_filter: str = "", search: str = "", show_test: str = ""):
+    """SELECT des v3_prospects (vrais + tests) filtrés en SQL, ordonnés par created_at desc."""
+    from sqlalchemy import or_, select
+    P = V3ProspectDB
+    q = select(*(getattr(P, c) for c in _LIST_COLS)).order_by(P.created_at.desc())
+    if status_filter:
+        q = q.where(P.status == status_filter)
+    if show_test == "0":
+        q = q.where(P.is_test == False)
+    if search:
+        like = f"%{search}%"
+        q = q.where(or_(P.name.ilike(like), P.email.ilike(like), P.city.ilike(like),
+                        P.profession.ilike(like)))
+    return q
 
 
 def _get_prospect(db: Session, cid: str):
@@ -38,31 +54,6 @@ def _get_prospect(db: Session, cid: str):
     return db.query(V3ProspectDB).filter_by(token=cid).first()
 
 
-def _tracking_map(contact_ids: list) -> dict:
-    """Retourne {token: delivery} avec opened_at/clicked_at/calendly_clicked_at."""
-    if not contact_ids:
-        return {}
-    try:
-        db = _mkt._mkt_db()
-        if not db:
-            return {}
-        from marketing_module.models import ProspectDeliveryDB
-        rows = (
-            db.query(ProspectDeliveryDB)
-            .filter(ProspectDeliveryDB.prospect_id.in_(contact_ids))
-            .order_by(ProspectDeliveryDB.created_at.desc())
-            .all()
-        )
-        db.close()
-        result = {}
-        for r in rows:
-            if r.prospect_id not in result:
-                result[r.prospect_id] = r
-        return result
-    except Exception:
-        return {}
-
-
 def _image_readiness(db, prospects) -> tuple[set, dict]:
     """
     Retourne (ready_cities, city_to_dept).
@@ -120,23 +111,19 @@ STATUS_BADGE = {
 
 @router.get("/admin/contacts", response_class=HTMLResponse)
 def contacts_page(request: Request, db: Session = Depends(get_db),
-                  status_filter: str = "", search: str = "", show_test: str = ""):
+                  status_filter: str = "", search: str = "", show_test: str = "", page: int = 1):
     token = _check_token(request)
+    from sqlalchemy import func, select
+    from ... import crossdb
 
-    contacts = list(_list_prospects(db))
-
-    # Filtres
-    if status_filter:
-        contacts = [c for c in contacts if c.status == status_filter]
-    if show_test == "0":
-        contacts = [c for c in contacts if not c.is_test]
-    if search:
-        q = search.lower()
-        contacts = [c for c in contacts if q in (c.name or "").lower()
-                    or q in (c.email or "").lower() or q in (c.city or "").lower()
-                    or q in (c.profession or "").lower()]
+    # Filtres + page en SQL ; suivi (dernière livraison) joint sur marketing.db
+    per_page = int(os.getenv("CONTACTS_PAGE_SIZE", "500"))
+    page     = max(page, 1)
+    query    = _prospects_query(status_filter, search, show_test)
+    n_match  = db.execute(select(func.count()).select_from(query.order_by(None).subquery())).scalar()
+    n_pages  = max((n_match + per_page - 1) // per_page, 1)
+    contacts = list(crossdb.rows(query.limit(per_page).offset((page - 1) * per_page)))
 
-    tracking = _tracking_map([c.token for c in contacts])
     ready_cities, city_to_dept = _image_readiness(db, contacts)
 
     # Préfectures / sous-préfectures
@@ -193,16 +180,15 @@ def contacts_page(request: Request, db: Session = Depends(get_db),
         else:
             ref_badge = '<span style="color:#d1d5db;font-size:10px">—</span>'
             has_p = "0"; has_sp = "0"
-        trk = tracking.get(c.token)
         def _trk_icon(val, emoji, label):
             if not val:
                 return f'<span title="{label}" style="color:#d1d5db;font-size:13px">{emoji}</span>'
             ts = val.strftime("%d/%m %H:%M")
             return f'<span title="{label} {ts}" style="color:#16a34a;font-size:13px">{emoji}</span>'
         trk_html = (
-            _trk_icon(trk.opened_at if trk else None, "👁", "Email ouvert") + " " +
-            _trk_icon(getattr(trk, "landing_visited_at", None) if trk else None, "🏠", "Landing visitée") + " " +
-            _trk_icon(getattr(trk, "calendly_clicked_at", None) if trk else None, "📅", "Calendly cliqué")
+            _trk_icon(c.d_opened_at, "👁", "Email ouvert") + " " +
+            _trk_icon(c.d_landing_visited_at, "🏠", "Landing visitée") + " " +
+            _trk_icon(c.d_calendly_clicked_at, "📅", "Calendly cliqué")
         ) if True else ""
         status_cell = ('<span style="font-size:10px;font-weight:700;padding:2px 7px;border-radius:10px;background:#fde68a;color:#92400e">TEST</span>'
                        if is_test else
@@ -224,11 +210,24 @@ def contacts_page(request: Request, db: Session = Depends(get_db),
   </td>
 </tr>"""
 
-    all_real = db.query(V3ProspectDB).filter_by(is_test=False).all()
-    count_total      = len(all_real)
-    count_prospect   = sum(1 for c in all_real if c.status == "PROSPECT")
-    count_client     = sum(1 for c in all_real if c.status == "CLIENT")
-    count_never_sent = sum(1 for c in all_real if not (c.contacted or c.email_sent_at or c.sent_at or c.sent_method))
+    P = V3ProspectDB
+    never = (((P.contacted == False) | P.contacted.is_(None)) & P.email_sent_at.is_(None)
+             & P.sent_at.is_(None) & (P.sent_method.is_(None) | (P.sent_method == "")))
+    count_total, count_prospect, count_client, count_never_sent = db.execute(
+        select(func.count(), func.count().filter(P.status == "PROSPECT"),
+               func.count().filter(P.status == "CLIENT"), func.count().filter(never))
+        .where(P.is_test == False)).one()
+
+    def _page_url(n):
+        from urllib.parse import urlencode
+        return "/admin/contacts?" + urlencode({"token": token, "search": search, "status_filter": status_filter,
+                                               "show_test": show_test, "page": n})
+    pager = "" if n_pages == 1 else (
+        f'<div style="display:flex;gap:10px;align-items:center;justify-content:flex-end;padding:10px 16px;font-size:12px;color:#6b7280">'
+        + (f'<a href="{_page_url(page - 1)}">← Précédent</a>' if page > 1 else "")
+        + f'<span>Page {page} / {n_pages} · {n_match} contacts</span>'
+        + (f'<a href="{_page_url(page + 1)}">Suivant →</a>' if page < n_pages else "")
+        + '</div>')
 
     nav = admin_nav(token, "contacts")
     return HTMLResponse(f"""<!DOCTYPE html><html lang="fr"><head>
@@ -354,6 +353,7 @@ tr:hover td{{background:#fafafa}}
         {rows if rows else '<tr><td colspan="11" style="text-align:center;color:#9ca3af;padding:40px">Aucun contact</td></tr>'}
       </tbody>
     </table>
+    {pager}
   </div>
 </div>
 
@@ -680,6 +680,7 @@ async def contact_create_async(request: Request, db: Session = Depends(get_db)):
         email=data.get("email"),
         phone=data.get("phone"),
         city=data.get("city") or "",
+        city_reference=city_reference_for(data.get("city")),
         profession=data.get("profession") or "",
         status=data.get("status", "SUSPECT"),
         offer_selected=data.get("offer_selected"),
@@ -230,58 +230,41 @@ def _delivery_badge(d: dict) -> str:
     return _badge("En attente", "#9ca3af")
 
 
-def _load_crm_data() -> dict:
-    """Fusionne V3ProspectDB + ProspectDeliveryDB + MeetingDB."""
-    prospects_map = {}
-    with SessionLocal() as db:
-        for p in db.query(V3ProspectDB).filter(V3ProspectDB.contacted == True).order_by(
-            V3ProspectDB.sent_at.desc()
-        ).limit(300).all():
-            prospects_map[p.token] = {
-                "token":      p.token,
-                "name":       p.name or "—",
-                "city":       p.city or "—",
-                "profession": p.profession or "—",
-                "email":      p.email or "",
-                "phone":      p.phone or "",
-                "landing_url": p.landing_url or "",
-                "sent_at":    p.sent_at.strftime("%d/%m %H:%M") if p.sent_at else "—",
-                "sent_method": p.sent_method or "—",
-                "delivery":   None,
-                "meeting":    None,
-            }
-
-    try:
-        from marketing_module.database import SessionLocal as MktSession
-        from marketing_module.models import ProspectDeliveryDB, MeetingDB
-        with MktSession() as mdb:
-            for d in mdb.query(ProspectDeliveryDB).filter_by(project_id="presence-ia").all():
-                pid = d.prospect_id
-                if pid in prospects_map:
-                    prospects_map[pid]["delivery"] = {
-                        "delivery_status": d.delivery_status,
-                        "opened_at":       d.opened_at,
-                        "clicked_at":      d.clicked_at,
-                        "landing_visited_at": getattr(d, "landing_visited_at", None),
-                        "calendly_clicked_at": getattr(d, "calendly_clicked_at", None),
-                        "reply_status":    d.reply_status,
-                        "bounce_type":     d.bounce_type,
-                    }
-            for m in mdb.query(MeetingDB).filter_by(project_id="presence-ia").all():
-                pid = m.prospect_id
-                if pid in prospects_map:
-                    prospects_map[pid]["meeting"] = {
-                        "id":           m.id,
-                        "status":       m.status,
-                        "scheduled_at": m.scheduled_at.strftime("%d/%m/%y %H:%M") if m.scheduled_at else "—",
-                        "deal_value":   m.deal_value,
-                        "notes":        m.notes or "",
-                        "closer_id":    m.closer_id,
-                    }
-    except Exception:
-        pass
-
-    return list(prospects_map.values())
+def _load_crm_data(limit: int = 300, offset: int = 0) -> list:
+    """
+    Fusionne V3ProspectDB + dernière ProspectDeliveryDB + dernier MeetingDB de chaque prospect
+    contacté — une seule requête sur les deux bases (src.crossdb), paginée côté SQL.
+    """
+    from sqlalchemy import select
+    from ... import crossdb
+
+    P = V3ProspectDB
+    stmt = (select(P.token, P.name, P.city, P.profession, P.email, P.phone, P.landing_url,
+                   P.sent_at, P.sent_method)
+            .where(P.contacted == True).order_by(P.sent_at.desc()).limit(limit).offset(offset))
+    out = []
+    for r in crossdb.rows(stmt, order_by="sent_at", meetings=True):
+        out.append({
+            "token":      r.token,
+            "name":       r.name or "—",
+            "city":       r.city or "—",
+            "profession": r.profession or "—",
+            "email":      r.email or "",
+            "phone":      r.phone or "",
+            "landing_url": r.landing_url or "",
+            "sent_at":    r.sent_at.strftime("%d/%m %H:%M") if r.sent_at else "—",
+            "sent_method": r.sent_method or "—",
+            "delivery":   {c: getattr(r, f"d_{c}") for c in crossdb.DELIVERY_COLS[1:]} if r.d_id else None,
+            "meeting":    {
+                "id":           r.m_id,
+                "status":       r.m_status,
+                "scheduled_at": r.m_scheduled_at.strftime("%d/%m/%y %H:%M") if r.m_scheduled_at else "—",
+                "deal_value":   r.m_deal_value,
+                "notes":        r.m_notes or "",
+                "closer_id":    r.m_closer_id,
+            } if r.m_id else None,
+        })
+    return out
 
 
 def _derive_stage(r: dict) -> str:
@@ -561,6 +544,16 @@ async function dropCard(e, newStage) {{
 </body></html>""")
 
 
+@router.post("/admin/crm/prospect/{token}/restore")
+def crm_prospect_restore(token: str, request: Request):
+    """Remet un prospect archivé (et ses livraisons / snapshots) en table chaude."""
+    from fastapi.responses import RedirectResponse
+    from ...archive import restore
+    admin_token = _check_token(request)
+    restore([token])
+    return RedirectResponse(f"/admin/crm/prospect/{token}?token={admin_token}", status_code=303)
+
+
 @router.post("/admin/crm/journey")
 async def update_journey(request: Request):
     """Met à jour le stage kanban d'un prospect."""
@@ -584,9 +577,10 @@ async def update_journey(request: Request):
 @router.get("/admin/crm/prospect/{token}", response_class=HTMLResponse)
 def crm_prospect_detail(token: str, request: Request):
     """Fiche prospect détaillée (livraisons, RDV, notes)."""
+    from ...archive import deliveries as archived_deliveries, get_prospect
     admin_token = _check_token(request)
     with SessionLocal() as db:
-        p = db.get(V3ProspectDB, token)
+        p = get_prospect(db, token)                     # chaud, sinon archivé (lecture seule)
     if not p:
         return HTMLResponse("<p>Prospect introuvable</p>", status_code=404)
 
@@ -594,11 +588,9 @@ def crm_prospect_detail(token: str, request: Request):
     meetings   = []
     try:
         from marketing_module.database import SessionLocal as MktSession
-        from marketing_module.models import ProspectDeliveryDB, MeetingDB
+        from marketing_module.models import MeetingDB
         with MktSession() as mdb:
-            deliveries = mdb.query(ProspectDeliveryDB).filter_by(
-                project_id="presence-ia", prospect_id=token
-            ).order_by(ProspectDeliveryDB.created_at.desc()).all()
+            deliveries = archived_deliveries(mdb, token)
             meetings = mdb.query(MeetingDB).filter_by(
                 project_id="presence-ia", prospect_id=token
             ).order_by(MeetingDB.scheduled_at.desc()).all()
@@ -644,6 +636,7 @@ tr:hover{{background:#f0f4f8}}
 <h1 style="color:#394455;font-size:18px;margin:16px 0 4px">{p.name}</h1>
 <p style="color:#6b7280;font-size:13px">{p.city} · {p.profession} · {p.email}</p>
 {f'<p style="color:#6b7280;font-size:12px;margin-top:4px">📞 {p.phone}</p>' if p.phone else ""}
+{f'<form method="post" action="/admin/crm/prospect/{p.token}/restore?token={admin_token}" style="margin-top:8px;color:#b45309;font-size:12px">🗄 Archivé le {_fmt(p.archived_at)} (lecture seule) — <button style="background:none;border:none;color:#527fb3;cursor:pointer;font-size:12px;text-decoration:underline">restaurer</button></form>' if getattr(p, "archived_at", None) else ""}
 
 <div style="margin:24px 0 16px">
   <div style="color:#6b7280;font-size:10px;font-weight:600;letter-spacing:.08em;text-transform:uppercase;margin-bottom:12px">Rapports IA</div>
@@ -2090,6 +2083,9 @@ def _gcal_sync(project_id: str) -> tuple[int, str]:
                 slot_start = slot_end
                 slice_idx  += 1
 
+    if created:
+        from ...outbound_counters import refresh_slots
+        refresh_slots()
     return created, f"{created} créneau(x) importé(s) depuis Google Calendar."
 
 
@@ -2287,7 +2283,10 @@ async def admin_create_slot(request: Request):
                 "status":     SlotStatus.available,
                 "notes":      notes,
             })
-        return JSONResponse({"ok": True, "id": slot.id})
+            slot_id = slot.id
+        from ...outbound_counters import refresh_slots
+        refresh_slots()
+        return JSONResponse({"ok": True, "id": slot_id})
     except Exception as e:
         return JSONResponse({"ok": False, "error": str(e)}, status_code=400)
 
@@ -2299,6 +2298,9 @@ def admin_delete_slot(slot_id: str, request: Request):
         from marketing_module.database import SessionLocal as MktSession, db_delete_slot
         with MktSession() as mdb:
             ok = db_delete_slot(mdb, slot_id)
+        if ok:
+            from ...outbound_counters import refresh_slots
+            refresh_slots()
         return JSONResponse({"ok": ok})
     except Exception as e:
         return JSONResponse({"ok": False, "error": str(e)})
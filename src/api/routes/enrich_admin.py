@@ -3,6 +3,8 @@ Admin — Enrichissement suspects SIRENE → prospects V3
 GET  /admin/enrich         → formulaire (profession + dept + quantité)
 POST /admin/enrich/run     → démarre l'enrichissement en arrière-plan
 GET  /admin/enrich/status  → polling état
+GET  /admin/enrich/cache-stats  → cache Gemini : taux de hit + dépense évitée
+POST /admin/enrich/cache/purge  → supprime les entrées expirées du cache
 """
 import json, logging, os, secrets, threading
 from datetime import datetime
@@ -271,6 +273,7 @@ def _run_enrich(profession_id: str, dept: Optional[str], qty: int):
     from ...google_places import fetch_text_search, fetch_place_details
     from ...enrich import enrich_website
     from ...models import V3ProspectDB, ProfessionDB
+    from ...ref_cities_seed import city_reference_for
 
     api_key = os.getenv("GOOGLE_MAPS_API_KEY", "")
 
@@ -287,7 +290,7 @@ def _run_enrich(profession_id: str, dept: Optional[str], qty: int):
             prof = db.query(ProfessionDB).filter_by(id=profession_id).first()
             prof_label = prof.label if prof else profession_id
 
-        page = 1
+        after = None  # clé (ville, raison_sociale, id) du dernier suspect du lot précédent
         contactable = 0
 
         while contactable < qty:
@@ -295,7 +298,7 @@ def _run_enrich(profession_id: str, dept: Optional[str], qty: int):
             with SessionLocal() as db:
                 _, suspects = db_suspects_list(
                     db, profession_id=profession_id, dept=dept,
-                    page=page, per_page=BATCH
+                    per_page=BATCH, after=after, with_total=False
                 )
             if not suspects:
                 break  # plus de suspects disponibles
@@ -351,6 +354,7 @@ def _run_enrich(profession_id: str, dept: Optional[str], qty: int):
                                     v3 = V3ProspectDB(
                                         token=tok, name=s.raison_sociale,
                                         city=ville, profession=prof_label,
+                                        city_reference=city_reference_for(ville),
                                         phone=mobile or fixe, website=website, email=email,
                                         rating=rating, reviews_count=reviews,
                                         landing_url=f"/l/{tok}", scrape_status="done",
@@ -378,7 +382,7 @@ def _run_enrich(profession_id: str, dept: Optional[str], qty: int):
                     if len(_STATE["results"]) > 200:
                         _STATE["results"] = _STATE["results"][-200:]
 
-            page += 1
+            after = (suspects[-1].ville, suspects[-1].raison_sociale, suspects[-1].id)
 
     except Exception as e:
         log.error(f"Enrichissement fatal: {e}")
@@ -393,3 +397,17 @@ def enrich_status(token: str = ""):
     _require_admin(token)
     with _LOCK:
         return JSONResponse(dict(_STATE))
+
+
+@router.get("/admin/enrich/cache-stats")
+def enrich_cache_stats(token: str = ""):
+    _require_admin(token)
+    from ...gemini_places import cache_stats
+    return JSONResponse(cache_stats())
+
+
+@router.post("/admin/enrich/cache/purge")
+def enrich_cache_purge(token: str = ""):
+    _require_admin(token)
+    from ...gemini_places import purge_expired_cache
+    return JSONResponse({"ok": True, "deleted": purge_expired_cache()})
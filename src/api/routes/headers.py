@@ -1,17 +1,18 @@
 """
 City Headers — image header par ville.
 
-POST /api/headers/upload?city=...         → upload + processing 16:9 WEBP
+POST /api/headers/upload?city=...         → 202 ; 16:9 + variantes WEBP/AVIF via image_pipeline
 GET  /api/headers/{city}                  → URL publique du header
 DELETE /api/headers/{city}?token=...      → suppression
 GET  /admin/headers                       → onglet admin
 """
 import logging
 import os
+import re
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Query
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from sqlalchemy.orm import Session
 
 from ...database import get_db, db_get_header, db_upsert_header, db_delete_header, db_list_headers
@@ -41,27 +42,6 @@ def _check_token(request: Request):
     return token
 
 
-def _process_header(src: Path, dest: Path) -> bool:
-    """Resize + center-crop 16:9 → WEBP 2400px."""
-    try:
-        from PIL import Image
-        img = Image.open(src).convert("RGB")
-        w, h = img.size
-        if w != 2400:
-            ratio = 2400 / w
-            img = img.resize((2400, int(h * ratio)), Image.LANCZOS)
-        w, h = img.size
-        target_h = int(w * 9 / 16)
-        if h >= target_h:
-            top = (h - target_h) // 2
-            img = img.crop((0, top, w, top + target_h))
-        img.save(dest, "WEBP", quality=88)
-        return True
-    except Exception as e:
-        log.warning("Pillow header processing failed: %s", e)
-        return False
-
-
 @router.get("/api/headers/{city}")
 def get_header(city: str, db: Session = Depends(get_db)):
     row = db_get_header(db, city)
@@ -80,28 +60,35 @@ def upload_header(
     db: Session = Depends(get_db),
 ):
     _check_token(request)
+    from ... import image_pipeline
     city_slug = city.lower().strip().replace(" ", "-")
-    filename  = f"{city_slug}.webp"
-    dest      = _headers_dir() / filename
 
-    # Sauvegarder d'abord le fichier brut en tmp
     raw_bytes = file.file.read()
-    tmp = _headers_dir() / f"_tmp_{city_slug}.orig"
-    tmp.write_bytes(raw_bytes)
 
-    # Traitement 16:9 WEBP 2400px
-    ok = _process_header(tmp, dest)
-    tmp.unlink(missing_ok=True)
-
-    if not ok:
-        # Fallback : sauvegarder tel quel
-        dest.write_bytes(raw_bytes)
-        log.warning("Header %s sauvegardé sans traitement Pillow", city_slug)
-
-    url = f"/{HEADERS_SUBPATH}/{filename}"
-    row = db_upsert_header(db, city_slug, filename, url)
-    log.info("Header uploadé pour %s → %s", city_slug, dest)
-    return {"city": row.city, "url": row.url, "filename": row.filename}
+    # Traitement 16:9 + variantes 480…2400 hors du thread de requête ;
+    # la ligne CityHeaderDB (plus grande variante) est écrite quand tout est prêt
+    def _on_ready(asset: dict):
+        from ...database import SessionLocal
+        with SessionLocal() as s:
+            db_upsert_header(s, city_slug, asset["url"].rsplit("/", 1)[-1], asset["url"])
+        log.info("Header prêt pour %s → %s", city_slug, asset["url"])
+
+    # Fallback : Pillow en échec → l'original est sauvegardé tel quel
+    def _on_error(asset: dict):
+        from ...database import SessionLocal
+        filename = f"{city_slug}.webp"
+        url = image_pipeline.store_original(raw_bytes, _headers_dir(), f"/{HEADERS_SUBPATH}", filename)
+        with SessionLocal() as s:
+            db_upsert_header(s, city_slug, filename, url)
+        log.warning("Header %s sauvegardé sans traitement Pillow : %s", city_slug, asset["error"])
+
+    asset = image_pipeline.submit(
+        raw_bytes, _headers_dir(), f"/{HEADERS_SUBPATH}",
+        stem=city_slug, kind="header", crop_16_9=True, on_ready=_on_ready, on_error=_on_error,
+    )
+    return JSONResponse({"city": city_slug, "image_id": asset["id"], "status": asset["status"],
+                         "url": asset["url"], "status_url": f"/api/images/{asset['id']}"},
+                        status_code=202)
 
 
 @router.delete("/api/headers/{city}")
@@ -113,6 +100,11 @@ def delete_header_api(city: str, request: Request, db: Session = Depends(get_db)
     f = _headers_dir() / row.filename
     if f.exists():
         f.unlink()
+    # Variantes image_pipeline : {slug}-{hash}-{largeur}.{webp|avif}
+    m = re.match(r"^(.+-[0-9a-f]{12})-\d+\.webp$", row.filename)
+    if m:
+        for v in _headers_dir().glob(m.group(1) + "-*"):
+            v.unlink(missing_ok=True)
     db_delete_header(db, city)
     return {"ok": True}
 
@@ -321,7 +313,16 @@ async function uploadHeader(btn) {{
     method: 'POST', body: form
   }});
   btn.disabled = false; btn.textContent = 'Uploader';
-  if (r.ok) {{ status.textContent = '✅ Uploadé'; location.reload(); }}
+  if (r.ok) {{
+    const d = await r.json();
+    status.textContent = '⏳ Uploadé — génération des variantes…';
+    for (let i = 0; i < 60 && d.status === 'pending'; i++) {{
+      await new Promise(res => setTimeout(res, 1000));
+      Object.assign(d, await (await fetch(d.status_url)).json());
+    }}
+    if (d.status === 'error') {{ status.textContent = '❌ ' + (d.error || 'Traitement échoué'); return; }}
+    status.textContent = '✅ Uploadé'; location.reload();
+  }}
   else {{ const d = await r.json(); status.textContent = '❌ ' + (d.detail || 'Erreur'); }}
 }}
 async function deleteHeader(city, btn) {{
@@ -205,6 +205,7 @@ def _phase2_enrich(profession_id: str, qty: int, dept: Optional[str]):
     from ...gemini_places import fetch_company_info
     from ...enrich import enrich_website
     from ...models import V3ProspectDB, ProfessionDB, SireneSuspectDB
+    from ...ref_cities_seed import city_reference_for
     from ...api.routes.enrich_admin import _valid_email, _is_mobile
 
     gemini_key = os.getenv("GEMINI_API_KEY", "")
@@ -267,7 +268,8 @@ def _phase2_enrich(profession_id: str, qty: int, dept: Optional[str]):
             entry = {"name": raison_sociale, "city": ville_str,
                      "contact": False, "email": None, "mobile": None}
             try:
-                details = fetch_company_info(raison_sociale, ville_str, gemini_key) if gemini_key else {}
+                details = fetch_company_info(raison_sociale, ville_str, gemini_key,
+                                             siren=(s_id or "")[:9] or None) if gemini_key else {}
                 website = details.get("website") or ""
                 phone   = details.get("formatted_phone_number") or ""
 
@@ -302,6 +304,7 @@ def _phase2_enrich(profession_id: str, qty: int, dept: Optional[str]):
                     with SessionLocal() as db2:
                         db2.add(V3ProspectDB(
                             token=tok, name=raison_sociale, city=ville_str,
+                            city_reference=city_reference_for(ville_str),
                             profession=prof_label, phone=mobile or fixe,
                             website=website or None, email=email,
                             rating=details.get("rating"),
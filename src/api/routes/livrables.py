@@ -274,7 +274,8 @@ def api_list_livrables(pid: str, t: str = "", db: Session = Depends(get_db)):
 # ── Rapports HTML — V3 prospects ──────────────────────────────────────────────
 
 def _v3_or_404(token: str, db: Session) -> V3ProspectDB:
-    p = db.query(V3ProspectDB).filter(V3ProspectDB.token == token).first()
+    from ...archive import get_prospect
+    p = get_prospect(db, token)                         # archivé : rapports en lecture
     if not p:
         raise HTTPException(404, "Prospect V3 introuvable")
     if not p.ia_results:
@@ -373,15 +374,10 @@ def api_report_history(
     token: str,
     db: Session = Depends(get_db),
 ):
-    """Liste tous les snapshots d'un prospect (historique des scores)."""
-    from ...models import IaSnapshotDB
+    """Liste tous les snapshots d'un prospect (historique des scores, archives comprises)."""
+    from ...archive import snapshots
     _v3_or_404(token, db)
-    snaps = (
-        db.query(IaSnapshotDB)
-        .filter(IaSnapshotDB.prospect_token == token)
-        .order_by(IaSnapshotDB.created_at.asc())
-        .all()
-    )
+    snaps = snapshots(db, token)
     return {
         "token":    token,
         "count":    len(snaps),
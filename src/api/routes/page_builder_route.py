@@ -134,7 +134,7 @@ _PLACEHOLDER_DEFAULTS = {
 # ── Seeds par section — construits depuis ContentBlockDB ──────────────────────
 
 def _seed_hero(db: Session, page_type: str, city: Optional[str], profession: Optional[str],
-               header_url: Optional[str]) -> dict:
+               header_url: Optional[str], header_srcset: Optional[str] = None) -> dict:
     B = lambda fk, d="": get_block(db, page_type, "hero", fk, profession, city) or d
     return {
         "title":              B("title",    "Votre visibilité IA en 48h"),
@@ -145,6 +145,7 @@ def _seed_hero(db: Session, page_type: str, city: Optional[str], profession: Opt
         "cta_secondary_label": B("cta_secondary_label") or None,
         "cta_secondary_href": B("cta_secondary_href", "#how"),
         "bg_src":             header_url,
+        "bg_srcset":          header_srcset or None,
     }
 
 
@@ -321,10 +322,14 @@ def build_manifest_from_db(
         if not hdr:
             hdr = db.query(CityHeaderDB).first()
         header_url = hdr.url if hdr else None
+    header_srcset = None
+    if header_url:
+        from ...image_pipeline import srcset_for_url
+        header_srcset = srcset_for_url(db, header_url)
 
     # 4. Seeds des blocs
     seed_builders = {
-        "hero":        lambda: _seed_hero(db, page_type, city, profession, header_url),
+        "hero":        lambda: _seed_hero(db, page_type, city, profession, header_url, header_srcset),
         "proof_stat":  lambda: _seed_proof_stat(db, page_type, city, profession),
         "proof_visual": lambda: _seed_proof_visual(db, page_type, city, profession),
         "pricing":     lambda: _seed_pricing(db),
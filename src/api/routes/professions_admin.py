@@ -79,10 +79,9 @@ async def run_leads_now(request: Request):
     """Déclenche la fourniture de leads immédiatement (ignore heure/jour config)."""
     data = await request.json()
     _require_admin(data.get("token", ""))
-    import threading
-    from ...scheduler import _job_provision_leads
-    threading.Thread(target=lambda: _job_provision_leads(force=True), daemon=True).start()
-    return JSONResponse({"ok": True, "msg": "Job provision_leads lancé"})
+    from ...jobqueue import submit
+    res = submit("provision_leads", force=True)
+    return JSONResponse({"ok": True, "msg": "Job provision_leads " + ("mis en file" if res["queued"] else "lancé")})
 
 
 @router.post("/api/admin/leads/config")
@@ -995,11 +994,8 @@ async def launch_qualify(token: str = "", request: Request = None):
     if not profs:
         from fastapi import HTTPException
         raise HTTPException(400, "Aucune profession active dans la sélection")
-    import threading
-    from ...scheduler import run_sirene_qualify
-    t = threading.Thread(target=run_sirene_qualify,
-                         kwargs={"profession_ids": profession_ids}, daemon=True)
-    t.start()
+    from ...jobqueue import submit
+    submit("sirene_qualify", profession_ids=profession_ids)
     log.info(f"Qualification SIRENE lancée pour {len(profs)} professions: {[p.id for p in profs]}")
     return JSONResponse({"ok": True, "message": f"✓ Qualification lancée pour {len(profs)} profession(s)"})
 
@@ -1180,19 +1176,37 @@ NJ_LABEL = {
     "6532": "SELARL",
 }
 
+def _suspect_cursor(s) -> str:
+    """Clé (ville, raison_sociale, id) d'un suspect → paramètre d'URL opaque."""
+    import base64
+    raw = json.dumps([s.ville, s.raison_sociale, s.id], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _parse_suspect_cursor(after: str):
+    import base64
+    try:
+        ville, rs, siret = json.loads(base64.urlsafe_b64decode(after + "=" * (-len(after) % 4)))
+        return ville, rs, siret
+    except Exception:
+        return None
+
+
 @router.get("/admin/suspects", response_class=HTMLResponse)
 def suspects_page(token: str = "", profession_id: str = "", dept: str = "",
-                  search: str = "", page: int = 1):
+                  search: str = "", page: int = 1, after: str = "", before: str = ""):
     _require_admin(token)
 
     # ── Si drill-down entreprises demandé ────────────────────────────────────
     if profession_id or search or dept:
         per_page = 100
+        cursor = _parse_suspect_cursor(after) if after else None
+        back   = _parse_suspect_cursor(before) if before else None
         with SessionLocal() as db:
             total, items = db_suspects_list(
                 db, profession_id=profession_id or None,
                 dept=dept or None, search=search or None,
-                page=page, per_page=per_page
+                page=page, per_page=per_page, after=cursor, before=back
             )
             if profession_id:
                 from ...models import ProfessionDB
@@ -1203,15 +1217,22 @@ def suspects_page(token: str = "", profession_id: str = "", dept: str = "",
 
         total_pages = max(1, (total + per_page - 1) // per_page)
 
-        def page_link(p, label=None):
-            label = label or str(p)
-            active = "font-weight:700;color:#1d4ed8;" if p == page else "color:#6b7280;"
-            return f'<a href="/admin/suspects?token={token}&profession_id={profession_id}&dept={dept}&search={search}&page={p}" style="text-decoration:none;padding:4px 8px;{active}">{label}</a>'
-
-        pages_html = page_link(max(1, page-1), "‹")
-        for p in range(max(1, page-2), min(total_pages+1, page+3)):
-            pages_html += page_link(p)
-        pages_html += page_link(min(total_pages, page+1), "›")
+        # Pagination par clé : « Suivant » porte la clé du dernier suspect affiché,
+        # « Précédent » celle du premier
+        from urllib.parse import urlencode
+        def page_link(label, p, cursor: dict = None, style="color:#6b7280;"):
+            qs = urlencode({"token": token, "profession_id": profession_id, "dept": dept,
+                            "search": search, "page": p, **(cursor or {})})
+            return f'<a href="/admin/suspects?{qs}" style="text-decoration:none;padding:4px 8px;{style}">{label}</a>'
+
+        pages_html = page_link("« Début", 1) if page > 1 else ""
+        if page > 2 and items:
+            pages_html += page_link("‹", page - 1, {"before": _suspect_cursor(items[0])})
+        elif page == 2:
+            pages_html += page_link("‹", 1)
+        pages_html += f'<span style="padding:4px 8px;font-weight:700;color:#1d4ed8">{page}</span>'
+        if page < total_pages and len(items) == per_page:
+            pages_html += page_link("›", page + 1, {"after": _suspect_cursor(items[-1])})
 
         rows = []
         for s in items:
@@ -1,8 +1,9 @@
 """
 Upload + enrichissement email + envoi Brevo
 Routes :
-  POST /admin/prospect/{pid}/upload-proof-image
-  POST /admin/prospect/{pid}/upload-city-image
+  POST /admin/prospect/{pid}/upload-proof-image   → 202, variantes générées par image_pipeline
+  POST /admin/prospect/{pid}/upload-city-image    → 202, idem
+  GET  /api/images/{image_id}                     → statut + variantes + srcset
   POST /admin/prospect/{pid}/upload-video
   POST /admin/prospect/{pid}/enrich-email
   POST /admin/prospect/{pid}/send-email
@@ -16,6 +17,7 @@ from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
+from ... import image_pipeline
 from ...database import get_db, db_get_prospect
 from ...enrich import extract_email_from_website
 from ...generate import landing_url
@@ -51,16 +53,46 @@ def _get_prospect_or_404(db: Session, pid: str):
     return p
 
 
-def _upload_file(pid: str, filename: str, file: UploadFile) -> str:
+def _upload_file(pid: str, filename: str, file: UploadFile, content: bytes = None) -> str:
     """Sauvegarde le fichier, retourne l'URL publique."""
     dest_dir = _uploads_dir() / pid
     dest_dir.mkdir(parents=True, exist_ok=True)
     dest = dest_dir / filename
-    content = file.file.read()
+    if content is None:
+        content = file.file.read()
     dest.write_bytes(content)
     return f"{os.getenv('BASE_URL', 'http://localhost:8001')}/dist/uploads/{pid}/{filename}"
 
 
+def _upload_image(db: Session, p, pid: str, filename: str, file: UploadFile,
+                  kind: str, field: str) -> dict:
+    """
+    Sauvegarde l'original (servi tout de suite, commité avant traitement) puis délègue
+    les variantes à image_pipeline. Une fois prêtes, `field` du prospect pointe sur la
+    plus grande variante WEBP.
+    """
+    content = file.file.read()
+    url = _upload_file(pid, filename, file, content)
+    setattr(p, field, url)
+    db.commit()
+
+    def _on_ready(asset: dict):
+        from ...database import SessionLocal
+        with SessionLocal() as s:
+            row = db_get_prospect(s, pid)
+            if row:
+                setattr(row, field, asset["url"])
+                s.commit()
+
+    asset = image_pipeline.submit(
+        content, _uploads_dir() / pid,
+        f"{os.getenv('BASE_URL', 'http://localhost:8001')}/dist/uploads/{pid}",
+        stem=kind, kind=kind, on_ready=_on_ready,
+    )
+    return {"url": asset["url"] or url, "prospect_id": pid, "image_id": asset["id"],
+            "status": asset["status"], "status_url": f"/api/images/{asset['id']}"}
+
+
 # ── Upload proof image ───────────────────────────────────────────────────────
 
 @router.post("/admin/prospect/{pid}/upload-proof-image")
@@ -72,10 +104,8 @@ def upload_proof_image(
 ):
     _check_token(request)
     p = _get_prospect_or_404(db, pid)
-    url = _upload_file(pid, "proof.jpg", file)
-    p.proof_image_url = url
-    db.commit()
-    return {"url": url, "prospect_id": pid}
+    out = _upload_image(db, p, pid, "proof.jpg", file, "proof", "proof_image_url")
+    return JSONResponse(out, status_code=202)
 
 
 # ── Upload city image ────────────────────────────────────────────────────────
@@ -89,10 +119,16 @@ def upload_city_image(
 ):
     _check_token(request)
     p = _get_prospect_or_404(db, pid)
-    url = _upload_file(pid, "city.jpg", file)
-    p.city_image_url = url
-    db.commit()
-    return {"url": url, "prospect_id": pid}
+    out = _upload_image(db, p, pid, "city.jpg", file, "city", "city_image_url")
+    return JSONResponse(out, status_code=202)
+
+
+@router.get("/api/images/{image_id}")
+def image_status(image_id: str):
+    asset = image_pipeline.get_status(image_id)
+    if not asset:
+        raise HTTPException(404, f"Image {image_id} introuvable")
+    return asset
 
 
 # ── Upload vidéo (fichier) ou enregistrer URL ────────────────────────────────
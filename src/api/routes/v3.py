@@ -30,7 +30,9 @@ from pydantic import BaseModel
 
 from ...models import V3ProspectDB, V3CityImageDB, V3LandingTextDB, ContentBlockDB
 from ._nav import admin_nav
-from ...database import SessionLocal, get_block, set_block
+from ...database import ReadSessionLocal, SessionLocal, get_block, set_block
+from ...archive import get_prospect
+from ...outbound_counters import note_sent, note_booking
 from . import v3_mkt_bridge as _mkt
 
 log = logging.getLogger(__name__)
@@ -388,6 +390,38 @@ def _send_brevo_email(to_email: str, to_name: str, subject: str, body: str,
         return False
 
 
+def _send_brevo_email_batch(messages: list) -> list:
+    """
+    Envoi groupé Brevo (messageVersions, 1 requête pour ≤ 1000 destinataires).
+    messages : [{ref, to_email, to_name, subject, body, delivery_id, landing_url}]
+    Retourne [{ref, success, message_id | error}] dans le même ordre.
+    """
+    api_key = os.getenv("BREVO_API_KEY", "")
+    if not api_key:
+        log.error("BREVO_API_KEY manquante")
+        return [{"ref": m.get("ref"), "success": False, "error": "BREVO_API_KEY manquante"}
+                for m in messages]
+    from marketing_module.channels.email.providers.brevo import BrevoProvider
+    versions = [{
+        "ref":      m.get("ref"),
+        "to_email": m["to_email"],
+        "to_name":  m.get("to_name"),
+        "subject":  m["subject"],
+        "text":     m["body"],
+        "html":     _body_to_html(m["body"], landing_url=m.get("landing_url", ""),
+                                  delivery_id=m.get("delivery_id") or ""),
+    } for m in messages]
+    results = BrevoProvider(api_key=api_key).send_batch(
+        os.getenv("SENDER_EMAIL", "contact@presence-ia.online"),
+        os.getenv("SENDER_NAME", "Présence IA"),
+        versions,
+    )
+    for r in results:
+        if not r["success"]:
+            log.error("Brevo email batch %s : %s", r["ref"], r.get("error"))
+    return results
+
+
 def _send_brevo_sms(to_phone: str, message: str) -> bool:
     api_key = os.getenv("BREVO_API_KEY", "")
     if not api_key:
@@ -454,8 +488,8 @@ def _resolve_termes(profession: str) -> list:
 
 def _run_ia_test(profession: str, city: str) -> dict:
     """Interroge ChatGPT, Gemini et Claude sur les 3 prompts. Retourne 9 résultats max.
-    RÈGLE ABSOLUE : appelé 1 fois par paire active, jamais en boucle sur toutes les paires.
-    Le scheduler garantit max 1 paire par run via assert.
+    Coût : ~9 appels payants. Le job refresh_ia ne l'appelle que pour les paires retenues par
+    src.refresh_planner, dans la limite du budget quotidien (REFRESH_IA_DAILY_CALLS / _COST).
     """
     city_cap = _title_city(city)
 
@@ -669,6 +703,7 @@ def _render_landing(
     ia_results_list: Optional[list] = None,
     landing_text=None,       # V3LandingTextDB or None
     evidence_images: Optional[list] = None,
+    city_image_srcset: str = "",  # variantes image_pipeline ("url 480w, …")
 ) -> str:
     name       = p.name
     city_cap   = _title_city(p.city)
@@ -1001,8 +1036,14 @@ def _render_landing(
     )
 
     _bg_style = f"background-image:linear-gradient(to bottom,rgba(0,0,15,.42) 0%,rgba(0,0,15,.58) 50%,rgba(0,0,15,.74) 100%),url('{city_image_url}')" if city_image_url else ""
+    _bg_img   = ""
+    if city_image_url and city_image_srcset:
+        # Variantes responsives : <img srcset> sous un voile dégradé (remplace background-image)
+        _bg_style = "isolation:isolate"
+        _bg_img   = (f'<img class="hero-bg" src="{city_image_url}" srcset="{city_image_srcset}" '
+                     f'sizes="100vw" alt="" fetchpriority="high"><div class="hero-shade"></div>')
     hero_html = (
-        f'<div class="hero" style="{_bg_style}">'
+        f'<div class="hero" style="{_bg_style}">{_bg_img}'
         f'<div class="c">'
         f'<div class="hero-pill">Audit Visibilité IA — {name}</div>'
         f'<h1>À <em>{city_cap}</em>,<br>les IA recommandent des <em>{pro_plural}</em>.<em>Mais pas vous.</em></h1>'
@@ -1081,6 +1122,8 @@ a{{color:inherit;text-decoration:none}}
 @media(max-width:640px){{.sn-cta{{font-size:11px;padding:6px 12px}}}}
 .hero{{min-height:100vh;display:flex;align-items:center;justify-content:center;text-align:center;background-size:cover;background-position:center;padding:120px 24px 64px;position:relative}}
 .hero::after{{content:"";position:absolute;bottom:0;left:0;right:0;height:80px;background:linear-gradient(transparent,#fff);pointer-events:none}}
+.hero-bg{{position:absolute;inset:0;width:100%;height:100%;object-fit:cover;z-index:-1}}
+.hero-shade{{position:absolute;inset:0;z-index:-1;background:linear-gradient(to bottom,rgba(0,0,15,.42) 0%,rgba(0,0,15,.58) 50%,rgba(0,0,15,.74) 100%)}}
 .hero-pill{{display:inline-block;background:rgba(255,255,255,.28);backdrop-filter:blur(10px);color:#fff;font-size:11px;font-weight:700;letter-spacing:1.8px;text-transform:uppercase;padding:7px 20px;border-radius:30px;border:1px solid rgba(255,255,255,.50);margin-bottom:28px;text-shadow:0 1px 3px rgba(0,0,0,.3)}}
 .hero h1{{font-size:clamp(22px,3.8vw,42px);font-weight:800;color:#fff;max-width:820px;margin:0 auto 36px;letter-spacing:-.8px;line-height:1.25;text-shadow:0 2px 12px rgba(0,0,0,.5)}}
 .hero h1 em{{font-style:normal;color:#93c5fd}}
@@ -1678,7 +1721,7 @@ def prospect_book(token: str):
     # Pré-remplir depuis v3_prospects si dispo
     prefill = {}
     with SessionLocal() as db:
-        p = db.get(V3ProspectDB, token)
+        p = get_prospect(db, token)
         if p:
             prefill = {
                 "name":    p.name    or "",
@@ -1709,9 +1752,12 @@ async def prospect_book_submit(token: str, request: Request):
     if not all([first_name, last_name, email, phone, website, start_iso, end_iso]):
         return JSONResponse({"ok": False, "error": "Tous les champs sont requis"}, status_code=400)
 
-    # Infos prospect
+    # Infos prospect — un prospect archivé qui réserve redevient chaud (RDV compté, suivi CRM)
     with SessionLocal() as db:
-        p = db.get(V3ProspectDB, token)
+        p = get_prospect(db, token)
+    if p is not None and getattr(p, "archived_at", None):
+        from ...archive import restore
+        restore([token])
     profession = p.profession if p else "votre secteur"
     city       = p.city if p else ""
 
@@ -1755,6 +1801,7 @@ async def prospect_book_submit(token: str, request: Request):
             gcal_event_url = gcal_result.get("html_link"),
             ics_uid        = gcal_result.get("ics_uid"),
         ))
+        note_booking(db, token, start_iso)
         db.commit()
 
     # Liens calendrier pour le prospect (description neutre — pas d'URL interne)
@@ -1881,7 +1928,7 @@ def landing_v3(token: str, d: str = ""):
         except Exception:
             pass
     with SessionLocal() as db:
-        p = db.get(V3ProspectDB, token)
+        p = get_prospect(db, token)
         if not p:
             from starlette.responses import RedirectResponse
             return RedirectResponse(url="https://presence-ia.com", status_code=302)
@@ -1901,20 +1948,20 @@ def landing_v3(token: str, d: str = ""):
                     header = db_get_header(db, prefecture.lower().strip().replace(" ", "-"))
         base_url = os.getenv("BASE_URL", "https://presence-ia.com")
         city_image_url = (header.url if header.url.startswith("http") else base_url + header.url) if header else ""
-        # Chercher d'abord l'image de la ville de référence (RefCityDB)
+        # Chercher d'abord l'image de la ville de référence (RefCityDB) — cache uniquement,
+        # rempli par le job prefetch_city_headers (aucun appel Unsplash ici)
+        from ...city_images import cached_city_header_url, DEFAULT_HEADER_URL
         _header_img = None
         try:
-            from ...models import RefCityDB
-            _ref = db.query(RefCityDB).filter_by(city_name=(p.city or "").upper()).first()
-            if _ref:
-                _header_img = _ref.header_image_url
-                if not _header_img:
-                    from ...city_images import fetch_city_header_image
-                    _header_img = fetch_city_header_image(p.city)
+            _header_img = cached_city_header_url(db, p.city)
         except Exception:
             pass
         if _header_img:
-            city_image_url = _header_img
+            city_image_url = _header_img if _header_img.startswith("http") else base_url + _header_img
+        if not city_image_url:
+            city_image_url = DEFAULT_HEADER_URL if DEFAULT_HEADER_URL.startswith("http") else base_url + DEFAULT_HEADER_URL
+        from ...image_pipeline import srcset_for_url
+        city_image_srcset = srcset_for_url(db, city_image_url, base_url)
         competitors    = json.loads(p.competitors) if p.competitors else []
         if not competitors:
             others = db.query(V3ProspectDB).filter(
@@ -1946,7 +1993,8 @@ def landing_v3(token: str, d: str = ""):
                     competitors = _names[:3]
                     break
     return HTMLResponse(_render_landing(p, competitors, city_image_url,
-                                        ia_results_list, landing_text, evidence_images))
+                                        ia_results_list, landing_text, evidence_images,
+                                        city_image_srcset=city_image_srcset))
 
 
 # ── Admin ─────────────────────────────────────────────────────────────────────
@@ -2819,6 +2867,7 @@ class BulkSendRequest(BaseModel):
     test_email: Optional[str] = None  # Mode test : envoie ici au lieu du vrai email
     test_phone: Optional[str] = None  # Mode test : envoie ici au lieu du vrai tel
     prospect_tokens: Optional[List[str]] = None  # Si fourni, envoie uniquement à ces tokens
+    batch_size: int = 50    # emails par requête Brevo (messageVersions, max 1000)
 
 
 class LandingTextRequest(BaseModel):
@@ -2842,6 +2891,7 @@ def generate_v3(req: GenerateRequest, token: str = ""):
     if not api_key:
         raise HTTPException(500, "GOOGLE_MAPS_API_KEY manquante")
     from ...google_places import search_prospects
+    from ...ref_cities_seed import city_reference_for
     results = []
     with SessionLocal() as db:
         for t in req.targets:
@@ -2860,7 +2910,7 @@ def generate_v3(req: GenerateRequest, token: str = ""):
                 tok = _make_token(p["name"], t.city, t.profession)
                 landing_url = f"{BASE_URL}/l/{tok}"
                 competitors = [n for n in all_names if n != p["name"]][:3]
-                existing = db.get(V3ProspectDB, tok)
+                existing = get_prospect(db, tok)          # archivé : ni recréé ni mis à jour
                 ia_results_json = json.dumps(ia_data.get("results", []), ensure_ascii=False) if ia_data.get("results") else None
                 if not existing:
                     # Scrape inline : email + CMS depuis le site
@@ -2881,6 +2931,7 @@ def generate_v3(req: GenerateRequest, token: str = ""):
                     new_count += 1
                     db.add(V3ProspectDB(
                         token=tok, name=p["name"], city=t.city, profession=t.profession,
+                        city_reference=city_reference_for(t.city),
                         phone=phone, website=website,
                         email=email, contact_url=contact_url, cms=cms,
                         scrape_status="done",
@@ -3093,6 +3144,7 @@ async def send_email_prospect(tok: str, request: Request):
             msg = _contact_message_sms(p.name, p.city, p.profession, abs_url, tpl)
             ok  = _send_brevo_sms(p.phone, msg)
             if ok:
+                note_sent(db, [p.token])
                 p.sent_at     = datetime.utcnow()
                 p.sent_method = "sms"
                 p.contacted   = True
@@ -3110,6 +3162,7 @@ async def send_email_prospect(tok: str, request: Request):
                                   landing_url=abs_url)
         _mkt.mark_sent(delivery_id, ok, error="" if ok else "Brevo API error")
         if ok:
+            note_sent(db, [p.token])
             p.sent_at     = datetime.utcnow()
             p.sent_method = "email"
             p.contacted   = True
@@ -3134,6 +3187,7 @@ async def send_sms_prospect(tok: str, request: Request):
         msg   = _contact_message_sms(p.name, p.city, p.profession, abs_lu, tpl)
         ok    = _send_brevo_sms(p.phone, msg)
         if ok:
+            note_sent(db, [p.token])
             p.sent_at     = datetime.utcnow()
             p.sent_method = "sms"
             p.contacted   = True
@@ -3176,8 +3230,25 @@ async def bulk_send(req: BulkSendRequest, token: str = ""):
     _bulk_status.update({"running": True, "done": 0, "total": len(tokens), "errors": [],
                          "test_mode": test_mode})
 
+    def _after(tok: str, ok: bool, method: str):
+        if ok:
+            _bulk_status["done"] += 1
+            if not test_mode:
+                with SessionLocal() as db:
+                    p = db.get(V3ProspectDB, tok)
+                    if p:
+                        note_sent(db, [tok])
+                        p.sent_at = datetime.utcnow()
+                        p.sent_method = method
+                        p.contacted = True
+                        db.commit()
+        else:
+            _bulk_status["errors"].append(tok)
+
     def _do_bulk():
-        for i, (tok, name, city, profession, email, phone, landing_url) in enumerate(tokens):
+        email_queue = []   # envoyés ensuite par lots messageVersions
+        sms_sent = 0
+        for tok, name, city, profession, email, phone, landing_url in tokens:
             abs_lu = landing_url or ""
             if abs_lu.startswith("/"): abs_lu = BASE_URL + abs_lu
             # Gmail + mobile → forcer SMS même si méthode demandée = email
@@ -3186,47 +3257,50 @@ async def bulk_send(req: BulkSendRequest, token: str = ""):
             _phone_dest = req.test_phone if test_mode else phone
             force_sms = req.method == "email" and _is_gmail(_email_dest) and _phone_dest
             if force_sms or req.method == "sms":
+                if sms_sent:
+                    time.sleep(req.delay_seconds)
                 dest = _phone_dest
                 msg  = _contact_message_sms(name, city, profession, abs_lu, sms_tpl)
                 delivery_id = _mkt.create_sms_delivery(tok) if not test_mode else None
                 ok   = _send_brevo_sms(dest, msg) if dest else False
                 _mkt.mark_sent(delivery_id, ok, error="" if ok else "Brevo SMS error")
-            elif req.method == "email":
-                dest   = req.test_email if test_mode else email
+                sms_sent += 1
+                _after(tok, ok, "sms")
+            elif req.method == "email" and _email_dest:
                 msg    = _contact_message(name, city, profession, abs_lu, email_tpl)
                 metier = profession.lower(); metiers = metier + "s" if not metier.endswith("s") else metier
                 subj_real = subj_tpl.format(ville=city, metier=metier, metiers=metiers,
                                             city=city, profession=profession, name=name)
-                subj   = f"[TEST] {subj_real}" if test_mode else subj_real
-                delivery_id = _mkt.create_delivery(tok) if not test_mode else None
-                ok     = _send_brevo_email(dest, name, subj, msg,
-                                           delivery_id=delivery_id or "",
-                                           landing_url=abs_lu) if dest else False
-                _mkt.mark_sent(delivery_id, ok, error="" if ok else "Brevo error")
-            else:
-                ok = False
-
-            if ok:
-                _bulk_status["done"] += 1
-                if not test_mode:
-                    with SessionLocal() as db:
-                        p = db.get(V3ProspectDB, tok)
-                        if p:
-                            p.sent_at = datetime.utcnow()
-                            p.sent_method = "sms" if force_sms else req.method
-                            p.contacted = True
-                            db.commit()
+                email_queue.append({
+                    "ref":         tok,
+                    "to_email":    _email_dest,
+                    "to_name":     name,
+                    "subject":     f"[TEST] {subj_real}" if test_mode else subj_real,
+                    "body":        msg,
+                    "delivery_id": _mkt.create_delivery(tok) if not test_mode else None,
+                    "landing_url": abs_lu,
+                })
             else:
-                _bulk_status["errors"].append(tok)
+                _after(tok, False, req.method)
 
-            if i < len(tokens) - 1:
+        # Emails : 1 requête Brevo par lot de batch_size, delay_seconds entre deux lots
+        size = max(1, req.batch_size)
+        for i in range(0, len(email_queue), size):
+            if i:
                 time.sleep(req.delay_seconds)
+            chunk = email_queue[i:i + size]
+            for m, r in zip(chunk, _send_brevo_email_batch(chunk)):
+                _mkt.mark_sent(m["delivery_id"], r["success"],
+                               error="" if r["success"] else (r.get("error") or "Brevo error"),
+                               message_id=r.get("message_id"))
+                _after(m["ref"], r["success"], "email")
         _bulk_status["running"] = False
 
     threading.Thread(target=_do_bulk, daemon=True).start()
     mode_label = f"MODE TEST → {req.test_email or req.test_phone}" if test_mode else "envoi réel"
     return {"ok": True, "total": len(tokens), "test_mode": test_mode,
-            "note": f"{mode_label} · 1 envoi/{req.delay_seconds}s · max {req.max_per_day}/jour"}
+            "note": f"{mode_label} · emails par lots de {req.batch_size} · "
+                    f"1 lot ou SMS/{req.delay_seconds}s · max {req.max_per_day}/jour"}
 
 
 @router.get("/api/v3/bulk-status")
@@ -3645,7 +3719,7 @@ def delete_prospect(tok: str, token: str = "", request: Request = None):
 @router.get("/api/v3/prospects")
 def list_v3_prospects(token: str = ""):
     _require_admin(token)
-    with SessionLocal() as db:
+    with ReadSessionLocal() as db:
         rows = db.query(V3ProspectDB).order_by(V3ProspectDB.created_at.desc()).all()
     return [{"token": r.token, "nom": r.name, "ville": r.city, "metier": r.profession,
              "telephone": r.phone, "email": r.email, "site": r.website,
@@ -3660,7 +3734,7 @@ def list_v3_prospects(token: str = ""):
 @router.get("/api/v3/prospects.csv")
 def export_v3_csv(token: str = ""):
     _require_admin(token)
-    with SessionLocal() as db:
+    with ReadSessionLocal() as db:
         rows = db.query(V3ProspectDB).order_by(V3ProspectDB.created_at.desc()).all()
     buf = io.StringIO()
     fields = ["nom","ville","metier","telephone","email","site","avis_google","note",
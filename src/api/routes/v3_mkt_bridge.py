@@ -118,8 +118,9 @@ def create_sms_delivery(prospect_token: str) -> Optional[str]:
         db.close()
 
 
-def mark_sent(delivery_id: Optional[str], ok: bool, error: str = ""):
-    """Met à jour le statut de livraison après envoi."""
+def mark_sent(delivery_id: Optional[str], ok: bool, error: str = "",
+              message_id: Optional[str] = None):
+    """Met à jour le statut de livraison après envoi (message_id Brevo si connu)."""
     if not delivery_id:
         return
     db = _mkt_db()
@@ -130,10 +131,13 @@ def mark_sent(delivery_id: Optional[str], ok: bool, error: str = ""):
         from marketing_module.models import DeliveryStatus
         from datetime import datetime
         if ok:
-            db_update_delivery(db, delivery_id, {
+            fields = {
                 "delivery_status": DeliveryStatus.sent,
                 "sent_at":         datetime.utcnow(),
-            })
+            }
+            if message_id:
+                fields["provider_message_id"] = message_id
+            db_update_delivery(db, delivery_id, fields)
         else:
             db_update_delivery(db, delivery_id, {
                 "delivery_status": DeliveryStatus.failed,
@@ -0,0 +1,306 @@
+"""
+ARCHIVE — Archivage froid des prospects terminés, de leurs livraisons et des vieux snapshots.
+
+v3_prospects, ia_snapshots, pipeline_history_log (presence_ia.db) et prospect_deliveries
+(marketing.db) grossissaient sans limite, et avec eux chaque page admin qui les parcourt
+(hub, Contacts, CRM). run() — job nocturne _job_archive — déplace vers les tables
+<table>_archive (même fichier, mêmes colonnes + archived_at, migration 0006) les lignes
+dont la dernière activité date de plus de ARCHIVE_AFTER_DAYS jours (défaut 180) et qui
+sont dans un état terminal :
+
+  v3_prospects          email bounced / unsubscribed, ou perdu : envoyé, jamais cliqué ni
+                        répondu. Jamais un prospect pas encore envoyé, CLIENT, payé ou
+                        ayant réservé (email_booked_at, v3_bookings)
+  prospect_deliveries   celles des prospects archivés (projet presence-ia), juste après eux
+  ia_snapshots          supplantés (un plus récent du même prospect et type), ou d'un
+                        prospect archivé
+  pipeline_history_log  à l'âge seul
+
+Par lots de ARCHIVE_BATCH clés (défaut 1000), parcourus par clé primaire, une transaction
+par lot : INSERT … SELECT dans l'archive puis DELETE, sous le même filtre — une ligne est
+toujours d'un seul côté. Les livraisons d'un lot sont déplacées après le commit de ses
+prospects (autre base) : un arrêt entre les deux les laisse chaudes, sans autre effet.
+
+Lecture : get_prospect(), snapshots() et deliveries() lisent la table chaude puis l'archive
+(landing /l/{token}, fiche CRM, rapports). Un prospect archivé est rendu détaché, avec
+archived_at renseigné : ses modifications ne sont pas enregistrées (restore() d'abord).
+Le provisioning et l'import Google Places consultent aussi l'archive — une entreprise
+archivée n'est ni recréée ni recontactée ; sent_total (outbound_counters) la compte.
+
+Les totaux « depuis toujours » des pages admin ne portent plus que sur les lignes chaudes.
+
+CLI : python -m src.archive [status|run|restore] [tokens…] [--days N] [--batch N]
+                            [--history-since AAAA-MM-JJ] [--db chemin]
+"""
+import logging, os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+import sqlalchemy as sa
+
+log = logging.getLogger(__name__)
+
+_PROJECT  = "presence-ia"
+_TERMINAL = ("bounced", "unsubscribed")
+_ENGAGED  = ("clicked", "replied")
+
+
+def _settings(days: int = None, batch: int = None) -> tuple:
+    return (days or int(os.getenv("ARCHIVE_AFTER_DAYS", "180")),
+            batch or int(os.getenv("ARCHIVE_BATCH", "1000")))
+
+
+def _move(conn, src: sa.Table, dst: sa.Table, where) -> int:
+    """Copie dans dst puis supprime de src les lignes de src qui vérifient where (évalué deux
+    fois : ne doit pas dépendre de dst). Colonnes de dst ; archived_at (absente de src) = maintenant."""
+    now  = datetime.utcnow()
+    cols = [c.name for c in dst.columns]
+    conn.execute(sa.insert(dst).from_select(cols, sa.select(
+        *(src.c[c] if c in src.c else sa.literal(now, sa.DateTime).label(c) for c in cols)).where(where)))
+    return conn.execute(sa.delete(src).where(where)).rowcount
+
+
+def _unarchive_by_id(conn, arch: sa.Table, hot: sa.Table, where) -> int:
+    """Restauration d'une table à id entier : un id repris entre-temps par la table chaude
+    (SQLite réutilise max(id)+1) est réattribué, les autres sont conservés."""
+    cols  = [c.name for c in hot.columns]
+    clash = conn.execute(sa.select(arch.c.id).where(where, arch.c.id.in_(sa.select(hot.c.id)))).scalars().all()
+    conn.execute(sa.insert(hot).from_select(cols, sa.select(*(arch.c[c] for c in cols)).where(
+        where, arch.c.id.notin_(clash))))
+    if clash:
+        fresh = [c for c in cols if c != "id"]
+        conn.execute(sa.insert(hot).from_select(fresh, sa.select(*(arch.c[c] for c in fresh)).where(
+            where, arch.c.id.in_(clash))))
+    return conn.execute(sa.delete(arch).where(where)).rowcount
+
+
+# ── Critères ──────────────────────────────────────────────────────────────────
+
+def _prospect_due(cutoff: datetime):
+    """Prospect archivable : dernière activité avant cutoff, état terminal, jamais client ni réservé."""
+    from .models import V3BookingDB, V3ProspectDB as P
+
+    last = sa.func.coalesce(P.email_opened_at, P.email_bounced_at, P.followup_sent_at,
+                            P.email_sent_at, P.sent_at, P.created_at)
+    return sa.and_(
+        last < cutoff,
+        sa.func.coalesce(P.status, "") != "CLIENT",
+        P.paid.isnot(True),
+        P.date_payment.is_(None),
+        P.email_booked_at.is_(None),
+        ~sa.exists().where(V3BookingDB.prospect_token == P.token),
+        sa.or_(P.email_status.in_(_TERMINAL),
+               sa.and_(P.sent_at.isnot(None), P.email_clicked_at.is_(None),
+                       sa.func.coalesce(P.email_status, "").notin_(_ENGAGED))),
+    )
+
+
+def _snapshot_due(cutoff: datetime):
+    """Snapshot archivable : supplanté et antérieur à cutoff, ou d'un prospect archivé."""
+    from sqlalchemy.orm import aliased
+    from .models import IaSnapshotDB as S, V3ProspectArchive as PA, V3ProspectDB as P
+
+    newer = aliased(S)
+    return sa.or_(
+        sa.and_(S.created_at < cutoff,
+                sa.exists().where(newer.prospect_token == S.prospect_token,
+                                  newer.report_type == S.report_type,
+                                  newer.created_at > S.created_at)),
+        sa.and_(sa.exists().where(PA.c.token == S.prospect_token),
+                ~sa.exists().where(P.token == S.prospect_token)),
+    )
+
+
+# ── Archivage ─────────────────────────────────────────────────────────────────
+
+def _batches(engine, key, where, batch: int):
+    """Lots de clés vérifiant where, dans l'ordre de la clé primaire (reprise après le dernier lot)."""
+    after = None
+    while True:
+        q = sa.select(key).where(where)
+        if after is not None:
+            q = q.where(key > after)
+        with engine.connect() as conn:
+            keys = conn.execute(q.order_by(key).limit(batch)).scalars().all()
+        if not keys:
+            return
+        yield keys
+        after = keys[-1]
+
+
+def _deliveries(tokens: List[str], restore: bool = False) -> int:
+    """Livraisons presence-ia de ces prospects : vers l'archive de marketing.db, ou retour."""
+    from marketing_module import database as mkt_db
+    from marketing_module.models import ProspectDeliveryArchive as DA, ProspectDeliveryDB
+
+    D = ProspectDeliveryDB.__table__
+    with mkt_db._engine.begin() as conn:
+        if restore:
+            return _move(conn, DA, D, sa.and_(DA.c.prospect_id.in_(tokens), DA.c.project_id == _PROJECT))
+        return _move(conn, D, DA, sa.and_(D.c.prospect_id.in_(tokens), D.c.project_id == _PROJECT))
+
+
+def run(days: int = None, batch: int = None) -> Dict[str, int]:
+    """Archive ce qui est dû ; lignes déplacées par table. Reprend sans risque après une interruption."""
+    from . import database
+    from .models import (IaSnapshotArchive, IaSnapshotDB, PipelineHistoryLogArchive,
+                         PipelineHistoryLogDB, V3ProspectArchive, V3ProspectDB)
+
+    days, batch = _settings(days, batch)
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    engine = database.ENGINE
+    out = dict.fromkeys(("v3_prospects", "prospect_deliveries", "ia_snapshots", "pipeline_history_log"), 0)
+
+    due = _prospect_due(cutoff)
+    for tokens in _batches(engine, V3ProspectDB.token, due, batch):
+        with engine.begin() as conn:
+            out["v3_prospects"] += _move(conn, V3ProspectDB.__table__, V3ProspectArchive,
+                                         sa.and_(V3ProspectDB.token.in_(tokens), due))
+        try:
+            out["prospect_deliveries"] += _deliveries(tokens)
+        except Exception as e:                      # reprises par restore() si besoin, jamais perdues
+            log.warning("[ARCHIVE] livraisons laissées dans marketing.db : %s", e)
+
+    for model, arch, where in (
+        (IaSnapshotDB, IaSnapshotArchive, _snapshot_due(cutoff)),
+        (PipelineHistoryLogDB, PipelineHistoryLogArchive, PipelineHistoryLogDB.ts < cutoff),
+    ):
+        for ids in _batches(engine, model.id, where, batch):
+            with engine.begin() as conn:
+                out[model.__tablename__] += _move(conn, model.__table__, arch, sa.and_(model.id.in_(ids), where))
+
+    if any(out.values()):
+        log.info("[ARCHIVE] plus de %d jours : %s", days,
+                 ", ".join(f"{k} {v}" for k, v in out.items()))
+    return out
+
+
+def restore(tokens: Iterable[str] = (), history_since: datetime = None, batch: int = None) -> Dict[str, int]:
+    """Remet en table chaude des prospects archivés (avec leurs snapshots et livraisons) et/ou
+    le journal de pilotage depuis history_since. Un token déjà chaud (recréé depuis) est laissé
+    dans l'archive ; ses snapshots et livraisons sont restaurés."""
+    from . import database
+    from .models import (IaSnapshotArchive as SA, IaSnapshotDB, PipelineHistoryLogArchive as HA,
+                         PipelineHistoryLogDB, V3ProspectArchive as PA, V3ProspectDB)
+
+    _, batch = _settings(None, batch)
+    tokens = list(dict.fromkeys(tokens))
+    out = dict.fromkeys(("v3_prospects", "prospect_deliveries", "ia_snapshots", "pipeline_history_log"), 0)
+    P = V3ProspectDB.__table__
+    for i in range(0, len(tokens), batch):
+        chunk = tokens[i:i + batch]
+        with database.ENGINE.begin() as conn:
+            hot = set(conn.execute(sa.select(P.c.token).where(P.c.token.in_(chunk))).scalars())
+            out["v3_prospects"] += _move(conn, PA, P, PA.c.token.in_([t for t in chunk if t not in hot]))
+            out["ia_snapshots"] += _unarchive_by_id(conn, SA, IaSnapshotDB.__table__, SA.c.prospect_token.in_(chunk))
+        out["prospect_deliveries"] += _deliveries(chunk, restore=True)
+    if history_since is not None:
+        with database.ENGINE.begin() as conn:
+            out["pipeline_history_log"] = _unarchive_by_id(conn, HA, PipelineHistoryLogDB.__table__,
+                                                           HA.c.ts >= history_since)
+    log.info("[ARCHIVE] restauré : %s", ", ".join(f"{k} {v}" for k, v in out.items()))
+    return out
+
+
+def counts() -> Dict[str, Dict[str, int]]:
+    """Lignes chaudes / archivées par table (CLI status)."""
+    from marketing_module import database as mkt_db
+    from . import database
+
+    out = {}
+    for engine, tables in ((database.ENGINE, ("v3_prospects", "ia_snapshots", "pipeline_history_log")),
+                           (mkt_db._engine, ("prospect_deliveries",))):
+        with engine.connect() as conn:
+            for t in tables:
+                out[t] = {side: conn.exec_driver_sql(f"SELECT count(*) FROM {name}").scalar()
+                          for side, name in (("chaud", t), ("archive", f"{t}_archive"))}
+    return out
+
+
+# ── Lecture à travers l'archive ───────────────────────────────────────────────
+
+def _detached(model, row):
+    obj = model(**{c.name: row[c.name] for c in model.__table__.columns})
+    obj.archived_at = row["archived_at"]
+    return obj
+
+
+def get_prospect(db, token: str):
+    """V3ProspectDB chaud, sinon archivé (détaché, archived_at renseigné), sinon None."""
+    from .models import V3ProspectArchive as PA, V3ProspectDB
+
+    p = db.get(V3ProspectDB, token) if token else None
+    if p is not None or not token:
+        return p
+    row = db.execute(sa.select(PA).where(PA.c.token == token)).mappings().first()
+    return _detached(V3ProspectDB, row) if row else None
+
+
+def snapshots(db, token: str, report_type: str = None) -> list:
+    """Snapshots IA d'un prospect, chauds et archivés, du plus ancien au plus récent."""
+    from .models import IaSnapshotArchive as SA, IaSnapshotDB
+
+    q = db.query(IaSnapshotDB).filter(IaSnapshotDB.prospect_token == token)
+    qa = sa.select(SA).where(SA.c.prospect_token == token)
+    if report_type:
+        q, qa = q.filter(IaSnapshotDB.report_type == report_type), qa.where(SA.c.report_type == report_type)
+    rows = q.all() + [_detached(IaSnapshotDB, r) for r in db.execute(qa).mappings()]
+    return sorted(rows, key=lambda s: (s.created_at or datetime.min, s.id))
+
+
+def deliveries(mdb, token: str, project_id: str = _PROJECT) -> list:
+    """Livraisons d'un prospect, chaudes et archivées, les plus récentes d'abord."""
+    from marketing_module.models import ProspectDeliveryArchive as DA, ProspectDeliveryDB
+
+    hot = mdb.query(ProspectDeliveryDB).filter_by(project_id=project_id, prospect_id=token).all()
+    cold = mdb.execute(sa.select(DA).where(DA.c.project_id == project_id, DA.c.prospect_id == token)).mappings()
+    rows = hot + [_detached(ProspectDeliveryDB, r) for r in cold]
+    return sorted(rows, key=lambda d: d.created_at or datetime.min, reverse=True)
+
+
+def archived_keys(db, professions: Iterable[str]) -> set:
+    """(nom, ville, métier) des prospects archivés de ces métiers — dédoublonnage du provisioning."""
+    from .models import V3ProspectArchive as PA
+
+    professions = list(professions)
+    if not professions:
+        return set()
+    return {tuple(r) for r in db.execute(
+        sa.select(PA.c.name, PA.c.city, PA.c.profession).where(PA.c.profession.in_(professions)))}
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+def main(argv: List[str] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m src.archive", description="Archivage froid des prospects terminés")
+    ap.add_argument("command", nargs="?", default="status", choices=("status", "run", "restore"))
+    ap.add_argument("tokens", nargs="*", help="restore : tokens des prospects à remettre en table chaude")
+    ap.add_argument("--days", type=int, help="run : âge minimal (défaut ARCHIVE_AFTER_DAYS)")
+    ap.add_argument("--batch", type=int, help="taille des lots (défaut ARCHIVE_BATCH)")
+    ap.add_argument("--history-since", type=datetime.fromisoformat,
+                    help="restore : journal de pilotage depuis cette date")
+    ap.add_argument("--db", help="chemin de la base (défaut : DB_PATH / data/presence_ia.db)")
+    args = ap.parse_args(argv)
+    if args.db:
+        os.environ["DB_PATH"] = args.db             # avant l'import de src.database
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    if args.command == "run":
+        res = run(days=args.days, batch=args.batch)
+    elif args.command == "restore":
+        if not args.tokens and args.history_since is None:
+            ap.error("restore : au moins un token ou --history-since")
+        res = restore(args.tokens, history_since=args.history_since, batch=args.batch)
+    else:
+        for table, n in counts().items():
+            print(f"  {table:22s} chaud {n['chaud']:>9d}   archive {n['archive']:>9d}")
+        return 0
+    for table, n in res.items():
+        print(f"  {table:22s} {n:>9d}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
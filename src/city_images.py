@@ -1,9 +1,28 @@
 """
 city_images.py — Récupération et mise en cache des images header de villes de référence.
 Utilise Unsplash Search (UNSPLASH_ACCESS_KEY en env) ou retourne None.
+
+Cache local : l'image choisie est téléchargée, passée par image_pipeline
+(16:9, variantes WEBP 480…2400) et servie depuis /dist/headers/ref-{ville}-{hash}-{largeur}.webp ;
+RefCityDB.header_image_url pointe alors sur la plus grande variante locale (ou sur l'original tel
+quel, ref-{ville}.webp, si Pillow échoue). Le remplissage se fait en tâche de fond
+(prefetch_city_headers, job scheduler) — la landing ne lit que le cache
+(cached_city_header_url) et retombe sur DEFAULT_HEADER_URL, sans appel réseau.
+
+Un échec (recherche vide, téléchargement ou copie locale ratés) est daté dans
+RefCityDB.header_failed_at : le prefetch ne retente pas la ville avant
+CITY_HEADER_RETRY_HOURS (défaut 24).
 """
 from __future__ import annotations
 
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+_UNSPLASH_SEARCH_URL = "https://api.unsplash.com/search/photos"
+DEFAULT_HEADER_URL   = os.getenv("CITY_HEADER_DEFAULT_URL", "/assets/header-default.svg")
+
 # Mots dans la description/alt qui indiquent une photo de ville ou paysage urbain
 _GOOD_TAGS = {"city", "ville", "town", "village", "street", "rue", "church", "cathedral",
               "église", "paysage", "landscape", "architecture", "building", "aerial",
@@ -30,9 +49,21 @@ def _score(img: dict) -> int:
     return score
 
 
-def fetch_city_header_image(city_name: str) -> str | None:
+def _slug(city_name: str) -> str:
+    return (city_name or "").lower().strip().replace(" ", "-")
+
+
+def _is_local(url: str | None) -> bool:
+    """True si l'URL pointe sur un fichier du cache local encore présent sur disque."""
+    from .api.routes.headers import HEADERS_SUBPATH, _headers_dir
+    prefix = f"/{HEADERS_SUBPATH}/"
+    if not url or not url.startswith(prefix):
+        return False
+    return (_headers_dir() / url[len(prefix):]).exists()
+
+
+def _search_unsplash(city_name: str, key: str) -> str | None:
     """
-    Récupère et stocke une image header pour une ville de référence.
     Stratégie :
       1. "{city} ville France"     — photo de la ville elle-même
       2. "{city} paysage"          — paysage local
@@ -41,8 +72,84 @@ def fetch_city_header_image(city_name: str) -> str | None:
     Pour chaque query on récupère les 5 premiers résultats et on prend
     celui qui a le meilleur score (favorise ville/paysage, pénalise sport/voiture).
     """
-    import os
     import requests as _req
+
+    queries = [
+        f"{city_name} ville France",
+        f"{city_name} paysage",
+        f"{city_name} France",
+        "village France paysage ensoleillé",
+    ]
+    best_url   = None
+    best_score = -99
+    for query in queries:
+        try:
+            resp = _req.get(
+                _UNSPLASH_SEARCH_URL,
+                params={"query": query, "orientation": "landscape",
+                        "per_page": 5, "client_id": key},
+                timeout=10,
+            )
+            results = resp.json().get("results", [])
+            for img in results:
+                s = _score(img)
+                if s > best_score:
+                    best_score = s
+                    best_url   = img["urls"]["regular"]
+        except Exception:
+            continue
+        # Si on a un candidat avec un bon score, pas besoin d'aller plus loin
+        if best_url and best_score >= 2:
+            break
+
+    if best_url:
+        # Forcer la haute résolution (1920px au lieu de 1080px par défaut)
+        best_url = best_url.replace("w=1080", "w=1920")
+    return best_url
+
+
+def _store_local(remote_url: str, city_name: str) -> str | None:
+    """Télécharge remote_url → image_pipeline (16:9, variantes) → URL locale. None si échec."""
+    import requests as _req
+    from . import image_pipeline
+    from .api.routes.headers import HEADERS_SUBPATH, _headers_dir
+
+    try:
+        resp = _req.get(remote_url, timeout=20)
+        resp.raise_for_status()
+        asset = image_pipeline.process(
+            resp.content, _headers_dir(), f"/{HEADERS_SUBPATH}",
+            stem=f"ref-{_slug(city_name)}", kind="header", crop_16_9=True,
+        )
+    except Exception as e:
+        log.warning("city_images: téléchargement %s échoué : %s", remote_url, e)
+        return None
+    if asset and asset["status"] == "error":        # Pillow en échec : original tel quel
+        log.warning("Header %s mis en cache sans traitement Pillow : %s", city_name, asset["error"])
+        return image_pipeline.store_original(resp.content, _headers_dir(), f"/{HEADERS_SUBPATH}",
+                                             f"ref-{_slug(city_name)}.webp")
+    if not asset or asset["status"] != "ready":
+        log.warning("city_images: traitement %s non terminé", city_name)
+        return None
+    return asset["url"]
+
+
+def cached_city_header_url(db, city_name: str) -> str | None:
+    """Lecture seule du cache (RefCityDB.header_image_url) — aucun appel réseau."""
+    from .models import RefCityDB
+    ref = db.query(RefCityDB).filter_by(city_name=(city_name or "").upper()).first()
+    return ref.header_image_url if ref and ref.header_image_url else None
+
+
+def fetch_city_header_image(city_name: str) -> str | None:
+    """
+    Récupère et stocke une image header pour une ville de référence.
+    Recherche Unsplash (_search_unsplash) si aucune URL connue, puis copie locale
+    (_store_local). Une ancienne URL Unsplash déjà en base est simplement rapatriée.
+    Appels réseau : réservé aux jobs de fond, jamais au chemin d'une requête landing.
+    Sans copie locale, l'échec est daté (header_failed_at) ; un succès l'efface.
+    """
+    from datetime import datetime
     from .database import SessionLocal
     from .models import RefCityDB
 
@@ -50,44 +157,71 @@ def fetch_city_header_image(city_name: str) -> str | None:
         ref = db.query(RefCityDB).filter_by(city_name=city_name.upper()).first()
         if not ref:
             return None
-        if ref.header_image_url:
+        if _is_local(ref.header_image_url):
             return ref.header_image_url  # déjà en cache
 
-        key = os.getenv("UNSPLASH_ACCESS_KEY", "")
-        if not key:
-            return None
+        remote = ref.header_image_url
+        if not remote:
+            key = os.getenv("UNSPLASH_ACCESS_KEY", "")
+            if not key:
+                return None
+            remote = _search_unsplash(city_name, key)
+
+        local = _store_local(remote, city_name) if remote else None
+        ref.header_image_url = local or remote
+        ref.header_failed_at = None if local else datetime.utcnow()
+        db.commit()
+        return ref.header_image_url
+
+
+def prefetch_city_headers(limit: int | None = None) -> dict:
+    """
+    Remplit le cache local pour les villes des paires (paire active + paires avec stock
+    non envoyé) puis pour toutes les villes de RefCityDB. Les villes déjà en cache sont ignorées,
+    celles en échec depuis moins de CITY_HEADER_RETRY_HOURS aussi ; `limit` borne le nombre
+    de tentatives (fetched + failed) du run.
+    Retourne {checked, cached, cooldown, fetched, failed}.
+    """
+    from datetime import datetime, timedelta
+    from .active_pair import get_active_pair
+    from .database import SessionLocal
+    from .models import RefCityDB, V3ProspectDB
+
+    retry_after = datetime.utcnow() - timedelta(hours=float(os.getenv("CITY_HEADER_RETRY_HOURS", "24")))
+    with SessionLocal() as db:
+        rows = db.query(RefCityDB.city_name, RefCityDB.header_image_url, RefCityDB.header_failed_at).all()
+        refs = {name: url for name, url, _ in rows}
+        failed_at = {name: at for name, _, at in rows if at is not None}
+        pair_cities = [c for (c,) in db.query(V3ProspectDB.city).filter(
+            V3ProspectDB.sent_at.is_(None), V3ProspectDB.city.isnot(None),
+        ).distinct().all()]
+
+    active = get_active_pair() or {}
+    order: list[str] = []
+    for c in [active.get("city")] + pair_cities + sorted(refs):
+        c = (c or "").upper()
+        if c in refs and c not in order:
+            order.append(c)
 
-        queries = [
-            f"{city_name} ville France",
-            f"{city_name} paysage",
-            f"{city_name} France",
-            "village France paysage ensoleillé",
-        ]
-        best_url   = None
-        best_score = -99
-        for query in queries:
-            try:
-                resp = _req.get(
-                    "https://api.unsplash.com/search/photos",
-                    params={"query": query, "orientation": "landscape",
-                            "per_page": 5, "client_id": key},
-                    timeout=10,
-                )
-                results = resp.json().get("results", [])
-                for img in results:
-                    s = _score(img)
-                    if s > best_score:
-                        best_score = s
-                        best_url   = img["urls"]["regular"]
-            except Exception:
-                continue
-            # Si on a un candidat avec un bon score, pas besoin d'aller plus loin
-            if best_url and best_score >= 2:
-                break
-
-        if best_url:
-            # Forcer la haute résolution (1920px au lieu de 1080px par défaut)
-            best_url = best_url.replace("w=1080", "w=1920")
-            ref.header_image_url = best_url
-            db.commit()
-        return best_url
+    stats = {"checked": 0, "cached": 0, "cooldown": 0, "fetched": 0, "failed": 0}
+    for city in order:
+        if limit is not None and stats["fetched"] + stats["failed"] >= limit:
+            break
+        stats["checked"] += 1
+        if _is_local(refs[city]):
+            stats["cached"] += 1
+            continue
+        if city in failed_at and failed_at[city] > retry_after:
+            stats["cooldown"] += 1
+            continue
+        try:
+            url = fetch_city_header_image(city)
+        except Exception as e:
+            log.warning("prefetch header %s : %s", city, e)
+            url = None
+        if _is_local(url):
+            stats["fetched"] += 1
+        else:
+            stats["failed"] += 1
+    log.info("prefetch_city_headers : %s", stats)
+    return stats
@@ -6,9 +6,20 @@ Usage :
     tracker.increment_google()   # dans google_places.py
     tracker.increment_gemini()   # dans gemini_places.py
     counts = tracker.get_and_reset()  # en fin de job
+    cost   = estimate_cost(counts)    # $ selon PRICE_GOOGLE / PRICE_GEMINI
 """
+import os
 import threading
 
+# Prix unitaires estimés ($ / appel) — surchargeables par env
+PRICE_GOOGLE = float(os.getenv("PRICE_GOOGLE_CALL", "0.017"))   # Places Details
+PRICE_GEMINI = float(os.getenv("PRICE_GEMINI_CALL", "0.035"))   # Gemini + Search grounding
+
+
+def estimate_cost(counts: dict) -> float:
+    """Coût estimé en $ pour un dict {"google": n, "gemini": n}."""
+    return counts.get("google", 0) * PRICE_GOOGLE + counts.get("gemini", 0) * PRICE_GEMINI
+
 
 class _ApiTracker:
     def __init__(self):
@@ -0,0 +1,186 @@
+"""
+CROSSDB — Lectures croisées presence_ia.db × marketing.db (v3_prospects ⋈ livraisons / RDV).
+
+Les vues CRM et Contacts chargeaient leurs prospects d'un côté, puis toutes les livraisons
+(et tous les RDV) du projet de l'autre, et joignaient en Python. Ici :
+
+- mode "attach"   : connexion en lecture seule sur presence_ia.db, marketing.db attachée
+                    sous le schéma `mkt` ; une seule requête SQL — la dernière livraison et
+                    le dernier RDV de chaque prospect sont trouvés par sous-requête corrélée
+                    sur les index (prospect_id, project_id, created_at)
+- mode "separate" : repli quand les deux fichiers ne sont pas sur le même volume (ou ATTACH
+                    désactivé) — la requête prospects d'abord, puis livraisons / RDV des seuls
+                    tokens lus, par lots de CROSSDB_BATCH (défaut 500)
+
+Filtres, tri et pagination restent dans la requête prospects de l'appelant (un SELECT sur
+v3_prospects qui inclut `token`). rows() est un générateur : les lignes sont produites au
+fil de la lecture, dans les deux modes, avec les colonnes du prospect plus d_* (livraison)
+et m_* (RDV, si meetings=True) — None quand il n'y en a pas.
+
+CROSSDB_ATTACH : auto (défaut), 1 (toujours ATTACH), 0 (jamais).
+"""
+import logging, os
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Tuple
+
+log = logging.getLogger(__name__)
+
+SCHEMA  = "mkt"
+PROJECT = "presence-ia"
+
+DELIVERY_COLS = ("id", "delivery_status", "opened_at", "clicked_at", "landing_visited_at",
+                 "calendly_clicked_at", "reply_status", "bounce_type")
+MEETING_COLS  = ("id", "status", "scheduled_at", "deal_value", "notes", "closer_id")
+
+_ENGINES: Dict[Tuple, object] = {}
+
+
+def _paths() -> Tuple[str, str]:
+    from . import database
+    from marketing_module import database as mkt_db
+    return database.DB_PATH, mkt_db._DB_PATH
+
+
+def _same_volume(a: str, b: str) -> bool:
+    """Les deux fichiers sont-ils sur le même périphérique (condition pour ATTACH) ?"""
+    return os.stat(a).st_dev == os.stat(b).st_dev
+
+
+def mode() -> str:
+    """"attach" ou "separate" selon CROSSDB_ATTACH et l'emplacement des deux fichiers."""
+    env = os.getenv("CROSSDB_ATTACH", "auto").strip().lower()
+    main, mkt = _paths()
+    if env in ("0", "false", "no") or not (os.path.isfile(main) and os.path.isfile(mkt)):
+        return "separate"
+    if env in ("1", "true", "yes"):
+        return "attach"
+    return "attach" if _same_volume(main, mkt) else "separate"
+
+
+def _shared_read_engine(path: str):
+    """Pool lecture seule déjà ouvert sur `path` par src.database / marketing_module.database."""
+    from . import database
+    from marketing_module import database as mkt_db
+    for e in (database.READ_ENGINE, mkt_db._read_engine):
+        if e.url.database == path:
+            return e
+    return None
+
+
+def _engine(path: str, attach: str = None):
+    """
+    Engine lecture seule sur `path` (marketing.db attachée si `attach`), une par couple.
+    Sans ATTACH, le READ_ENGINE de la base est réutilisé plutôt qu'un pool de plus.
+    """
+    from sqlalchemy import event
+    from marketing_module.sqlite_engine import make_engine
+
+    if not attach and (shared := _shared_read_engine(path)) is not None:
+        return shared
+    key = (path, attach)
+    if key not in _ENGINES:
+        e = make_engine(path, readonly=True, pool_size=int(os.getenv("CROSSDB_POOL", "2")))
+        if attach:
+            @event.listens_for(e, "connect")
+            def _attach(dbapi_conn, _record):
+                cur = dbapi_conn.cursor()
+                try:
+                    cur.execute(f"ATTACH DATABASE ? AS {SCHEMA}", (attach,))
+                finally:
+                    cur.close()
+        _ENGINES[key] = e
+    return _ENGINES[key]
+
+
+def dispose() -> None:
+    """Ferme les pools (tests, changement de DB_PATH / MKT_DB_PATH)."""
+    for e in _ENGINES.values():
+        e.dispose()
+    _ENGINES.clear()
+
+
+@lru_cache(maxsize=1)
+def _mkt_tables():
+    """Copies de prospect_deliveries / meetings qualifiées par le schéma attaché."""
+    from sqlalchemy import MetaData
+    from marketing_module.models import MeetingDB, ProspectDeliveryDB
+    md = MetaData()
+    return (ProspectDeliveryDB.__table__.to_metadata(md, schema=SCHEMA),
+            MeetingDB.__table__.to_metadata(md, schema=SCHEMA))
+
+
+def _latest_id(t, token, project: str):
+    from sqlalchemy import select
+    a = t.alias()
+    return (select(a.c.id).where(a.c.prospect_id == token, a.c.project_id == project)
+            .order_by(a.c.created_at.desc()).limit(1).scalar_subquery())
+
+
+def _joined(stmt, order_by: str, desc: bool, meetings: bool, project: str):
+    from sqlalchemy import select
+    D, M = _mkt_tables()
+    p = stmt.subquery("p")
+    cols = [p, *(D.c[c].label(f"d_{c}") for c in DELIVERY_COLS)]
+    j = p.outerjoin(D, D.c.id == _latest_id(D, p.c.token, project))
+    if meetings:
+        cols += [M.c[c].label(f"m_{c}") for c in MEETING_COLS]
+        j = j.outerjoin(M, M.c.id == _latest_id(M, p.c.token, project))
+    key = p.c[order_by]
+    return select(*cols).select_from(j).order_by(key.desc() if desc else key)
+
+
+def _latest_by_token(conn, t, tokens: List[str], cols, project: str) -> Dict[str, Tuple]:
+    """{token: (cols…)} — dernière ligne par prospect, pour un lot de tokens."""
+    from sqlalchemy import select
+    out = {}
+    q = (select(t.c.prospect_id, *(t.c[c] for c in cols))
+         .where(t.c.prospect_id.in_(tokens), t.c.project_id == project)
+         .order_by(t.c.prospect_id, t.c.created_at.desc()))
+    for r in conn.execute(q):
+        out.setdefault(r[0], tuple(r[1:]))
+    return out
+
+
+def _separate(stmt, meetings: bool, project: str, main: str, mkt: str) -> Iterator[SimpleNamespace]:
+    from marketing_module.models import MeetingDB, ProspectDeliveryDB
+
+    batch = int(os.getenv("CROSSDB_BATCH", "500"))
+    empty_d, empty_m = (None,) * len(DELIVERY_COLS), (None,) * len(MEETING_COLS)
+    with _engine(main).connect() as conn:
+        result = conn.execute(stmt)
+        while True:
+            chunk = result.fetchmany(batch)
+            if not chunk:
+                break
+            tokens = [r.token for r in chunk]
+            dl, ms = {}, {}
+            try:
+                with _engine(mkt).connect() as mconn:
+                    dl = _latest_by_token(mconn, ProspectDeliveryDB.__table__, tokens, DELIVERY_COLS, project)
+                    if meetings:
+                        ms = _latest_by_token(mconn, MeetingDB.__table__, tokens, MEETING_COLS, project)
+            except Exception as e:
+                log.warning("crossdb : marketing.db illisible (%s) — lignes sans suivi", e)
+            for r in chunk:
+                row = dict(r._mapping)
+                row.update(zip((f"d_{c}" for c in DELIVERY_COLS), dl.get(r.token, empty_d)))
+                if meetings:
+                    row.update(zip((f"m_{c}" for c in MEETING_COLS), ms.get(r.token, empty_m)))
+                yield SimpleNamespace(**row)
+
+
+def rows(stmt, order_by: str = "created_at", desc: bool = True, meetings: bool = False,
+         project: str = PROJECT) -> Iterator[SimpleNamespace]:
+    """
+    Prospects de `stmt` (filtres / tri / LIMIT déjà posés par l'appelant) avec leur dernière
+    livraison (d_*) et, si meetings, leur dernier RDV (m_*). `order_by` : colonne de tri de
+    `stmt`, réappliquée autour de la jointure.
+    """
+    main, mkt = _paths()
+    if mode() == "separate":
+        yield from _separate(stmt, meetings, project, main, mkt)
+        return
+    with _engine(main, attach=mkt).connect() as conn:
+        for r in conn.execute(_joined(stmt, order_by, desc, meetings, project)):
+            yield SimpleNamespace(**r._mapping)
@@ -3,8 +3,8 @@ import json, os
 from pathlib import Path
 from typing import List, Optional
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
+from marketing_module.sqlite_engine import make_engines
 
 from .models import Base, CampaignDB, ProspectDB, TestRunDB, ProspectStatus, JobDB, JobStatus, CityEvidenceDB, CityHeaderDB, ContentBlockDB, CmsBlockDB, ThemeConfigDB, MessageTemplateDB, MetierConfigDB, IAQueryTemplateDB, ProfessionDB, ScoringConfigDB, SireneSuspectDB, SireneSegmentDB, IaSnapshotDB, RefCityDB  # noqa: F401
 
@@ -12,126 +12,52 @@ DATA_DIR = Path(__file__).parent.parent / "data"
 DATA_DIR.mkdir(exist_ok=True)
 
 DB_PATH      = os.getenv("DB_PATH", str(DATA_DIR / "presence_ia.db"))
-ENGINE       = create_engine(f"sqlite:///{DB_PATH}", connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=ENGINE)
+# WAL + pragmas sur chaque connexion (marketing_module.sqlite_engine) ; READ_ENGINE : pool
+# séparé en query_only pour les lectures lourdes hors du pool d'écriture — hub et coûts
+# (get_read_db), finances / pipeline-health, exports CSV v3, crossdb
+ENGINE, READ_ENGINE = make_engines(DB_PATH)
+SessionLocal     = sessionmaker(autocommit=False, autoflush=False, bind=ENGINE)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=READ_ENGINE)
 
 
 
 def init_db():
-    Base.metadata.create_all(bind=ENGINE)
-    # Migration colonnes ajoutées après création initiale
-    from sqlalchemy import text
-    with ENGINE.connect() as conn:
-        for tbl, col in [
-            ("prospects", "email TEXT"),
-            ("prospects", "mobile TEXT"),
-            ("prospects", "cms TEXT"),
-            ("prospects", "proof_image_url TEXT"),
-            ("prospects", "city_image_url TEXT"),
-            ("prospects", "paid INTEGER DEFAULT 0"),
-            ("prospects", "stripe_session_id TEXT"),
-            ("v3_landing_texts", "email_subject TEXT"),
-            ("v3_landing_texts", "budget_min TEXT"),
-            ("v3_landing_texts", "budget_max TEXT"),
-            ("v3_landing_texts", "updated_at DATETIME"),
-            ("v3_landing_texts", "email_template TEXT"),
-            ("v3_landing_texts", "sms_template TEXT"),
-            ("sirene_suspects", "nature_juridique TEXT"),
-            ("sirene_suspects", "date_creation TEXT"),
-            ("professions", "mots_cles_sirene TEXT"),
-            ("v3_prospects", "email_status TEXT"),
-            ("v3_prospects", "email_sent_at DATETIME"),
-            ("v3_prospects", "email_opened_at DATETIME"),
-            ("v3_prospects", "email_bounced_at DATETIME"),
-            ("v3_prospects", "email_clicked_at DATETIME"),
-            ("v3_prospects", "email_booked_at DATETIME"),
-            ("v3_prospects", "city_reference VARCHAR"),
-            ("v3_prospects", "is_test INTEGER DEFAULT 0"),
-            ("v3_prospects", "status TEXT DEFAULT 'PROSPECT'"),
-            ("v3_prospects", "paid INTEGER DEFAULT 0"),
-            ("v3_prospects", "offer_selected TEXT"),
-            ("v3_prospects", "acquisition_cost REAL"),
-            ("v3_prospects", "campaign_id TEXT"),
-            ("v3_prospects", "date_payment DATETIME"),
-            ("v3_prospects", "sms_status TEXT"),
-            ("v3_prospects", "sms_delivered_at DATETIME"),
-            ("scoring_config", "outbound_refs_only INTEGER DEFAULT 1"),
-        ]:
-            try:
-                conn.execute(text(f"ALTER TABLE {tbl} ADD COLUMN {col}"))
-            except Exception:
-                pass
-        conn.commit()
-    # Corriger les URLs localhost stockées pour les headers (utiliser chemins relatifs)
-    with ENGINE.connect() as conn:
-        try:
-            conn.execute(text(
-                "UPDATE city_headers SET url = '/dist/headers/' || filename "
-                "WHERE url LIKE 'http://localhost%' OR url LIKE 'http://127.0.0.1%'"
+    """
+    Schéma à jour via les migrations versionnées (src.migrate, scripts src/migrations),
+    puis seeds dont l'empreinte a changé (src.seeds, table seed_state). Base à jour et
+    seeds inchangés : deux requêtes. SEED_FORCE=1 (ou liste de seeds) force le rejeu.
+    """
+    from .migrate import ensure_current
+    from .seeds import run as run_seeds
+    ensure_current(ENGINE)
+    run_seeds()
+
+
+# Profils de test dans V3ProspectDB (is_test=True)
+_TEST_CONTACTS = [
+    ("Pisciniste Paris TEST",         "PARIS",    "Pisciniste",                  "nathalie.brigitte@gmail.com",  "+393514459617"),
+    ("Fleuriste Bordeaux TEST",       "BORDEAUX", "Fleuriste événementiel",      "nathaliecbrigitte@gmail.com",  "+33660474292"),
+    ("Consultant Communication TEST", "ANTIBES",  "Consultant en communication", "contact@nathaliebrigitte.com", "+393514459617"),
+    ("Chef Cuisinier Mende TEST",     "MENDE",    "Chef cuisinier événementiel", "contact@presence-ia.com",      "+33660474292"),
+]
+
+
+def _seed_test_contacts(db: Session):
+    import secrets as _secrets
+    from .models import V3ProspectDB as _V3P
+    from .ref_cities_seed import city_reference_for
+    for name, city, prof, email, phone in _TEST_CONTACTS:
+        exists = db.query(_V3P).filter_by(name=name, is_test=True).first()
+        if not exists:
+            _tok = _secrets.token_hex(16)
+            db.add(_V3P(
+                token=_tok, name=name, city=city, profession=prof,
+                email=email, phone=phone, status="PROSPECT",
+                is_test=True, landing_url=f"/l/{_tok}", city_reference=city_reference_for(city),
             ))
-            conn.commit()
-        except Exception:
-            pass
-    # Seed requêtes IA par défaut (si table vide)
-    with SessionLocal() as db:
-        _seed_ia_query_templates(db)
-    # Seed content blocks + theme
-    with SessionLocal() as db:
-        _seed_content_blocks(db)
-        _seed_theme(db)
-    # Seed CMS blocks (lazy import to avoid circular)
-    try:
-        from .api.routes.cms import seed_cms_blocks
-        with SessionLocal() as db:
-            seed_cms_blocks(db)
-    except Exception:
-        pass
-    # Seed message templates
-    with SessionLocal() as db:
-        _seed_message_templates(db)
-    # Seed scoring config par défaut
-    with SessionLocal() as db:
-        _seed_scoring_config(db)
-    # Seed villes de référence + backfill city_reference
-    try:
-        from .ref_cities_seed import seed_ref_cities, backfill_city_reference
-        with SessionLocal() as _db:
-            n_cities = seed_ref_cities(_db)
-            n_refs   = backfill_city_reference(_db)
-            if n_cities or n_refs:
-                import logging
-                logging.getLogger(__name__).info(
-                    "ref_cities: %d villes insérées, %d prospects backfillés", n_cities, n_refs
-                )
-    except Exception as _e:
-        import logging
-        logging.getLogger(__name__).warning("ref_cities seed: %s", _e)
-    # Seed profils de test dans V3ProspectDB (is_test=True)
-    try:
-        import secrets as _secrets
-        _TEST_CONTACTS = [
-            ("Pisciniste Paris TEST",         "PARIS",    "Pisciniste",                  "nathalie.brigitte@gmail.com",  "+393514459617"),
-            ("Fleuriste Bordeaux TEST",       "BORDEAUX", "Fleuriste événementiel",      "nathaliecbrigitte@gmail.com",  "+33660474292"),
-            ("Consultant Communication TEST", "ANTIBES",  "Consultant en communication", "contact@nathaliebrigitte.com", "+393514459617"),
-            ("Chef Cuisinier Mende TEST",     "MENDE",    "Chef cuisinier événementiel", "contact@presence-ia.com",      "+33660474292"),
-        ]
-        from .models import V3ProspectDB as _V3P
-        with SessionLocal() as _db:
-            for name, city, prof, email, phone in _TEST_CONTACTS:
-                exists = _db.query(_V3P).filter_by(name=name, is_test=True).first()
-                if not exists:
-                    _tok = _secrets.token_hex(16)
-                    _db.add(_V3P(
-                        token=_tok, name=name, city=city, profession=prof,
-                        email=email, phone=phone, status="PROSPECT",
-                        is_test=True, landing_url=f"/l/{_tok}",
-                    ))
-                else:
-                    exists.phone = phone
-            _db.commit()
-    except Exception as _e:
-        import logging
-        logging.getLogger(__name__).warning("test contacts seed: %s", _e)
+        else:
+            exists.phone = phone
+    db.commit()
 
 
 def get_db():
@@ -142,6 +68,15 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """Comme get_db, sur le pool lecture seule (pages de stats : aucune écriture possible)."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 # ── JSON helpers ──
 def jl(s: str) -> list:
     try: return json.loads(s or "[]")
@@ -285,6 +220,39 @@ def _seed_content_blocks(db: Session):
                 value=value
             ))
     db.commit()
+    invalidate_blocks()
+
+
+# Index en mémoire de content_blocks : get_block faisait jusqu'à 3 requêtes par champ
+# (profession+ville, profession, générique), une vingtaine de champs par page. La table
+# entière est chargée en une requête, par base, et le fallback est résolu en mémoire.
+# Reconstruit quand _BLOCKS_VERSION change (set_block, seed : invalidate_blocks) ou après
+# CONTENT_BLOCKS_TTL_S secondes (écritures d'un autre process) ; 0 = pas de cache.
+_BLOCKS_TTL_S   = float(os.getenv("CONTENT_BLOCKS_TTL_S", "300"))
+_BLOCKS_VERSION = 0
+_BLOCKS_CACHE: dict = {}                            # url → (version, expire_ts, index)
+
+
+def invalidate_blocks() -> None:
+    """À appeler après toute écriture dans content_blocks."""
+    global _BLOCKS_VERSION
+    _BLOCKS_VERSION += 1
+
+
+def _blocks_index(db: Session) -> dict:
+    """{(page_type, section_key, field_key, profession, city): value} — 1re ligne par clé, comme .first()."""
+    import time
+    key = str(db.get_bind().url)
+    hit = _BLOCKS_CACHE.get(key)
+    if hit and hit[0] == _BLOCKS_VERSION and hit[1] > time.monotonic():
+        return hit[2]
+    version = _BLOCKS_VERSION
+    B = ContentBlockDB
+    index: dict = {}
+    for r in db.query(B.page_type, B.section_key, B.field_key, B.profession, B.city, B.value):
+        index.setdefault((r.page_type, r.section_key, r.field_key, r.profession, r.city), r.value)
+    _BLOCKS_CACHE[key] = (version, time.monotonic() + _BLOCKS_TTL_S, index)
+    return index
 
 
 def get_block(db: Session, page_type: str, section_key: str, field_key: str,
@@ -297,6 +265,13 @@ def get_block(db: Session, page_type: str, section_key: str, field_key: str,
     if profession:
         candidates.append((profession, None))
     candidates.append((None, None))
+    if _BLOCKS_TTL_S > 0:
+        index = _blocks_index(db)
+        for p, c in candidates:
+            value = index.get((page_type, section_key, field_key, p, c))
+            if value:
+                return value
+        return default
     for p, c in candidates:
         row = db.query(ContentBlockDB).filter_by(
             page_type=page_type, section_key=section_key,
@@ -320,7 +295,7 @@ def set_block(db: Session, page_type: str, section_key: str, field_key: str,
         row = ContentBlockDB(page_type=page_type, section_key=section_key,
                              field_key=field_key, profession=profession, city=city, value=value)
         db.add(row)
-    db.commit(); db.refresh(row); return row
+    db.commit(); invalidate_blocks(); db.refresh(row); return row
 
 
 def db_list_content_blocks(db: Session, page_type: Optional[str] = None,
@@ -778,74 +753,144 @@ def db_segment_list(db: Session, status: str = None, limit: int = 100):
     return q.order_by(SireneSegmentDB.score.desc()).limit(limit).all()
 
 
+def _suspects_fts_query(search: str) -> Optional[str]:
+    """Recherche utilisateur → requête FTS5 : chaque mot en préfixe, tous requis."""
+    import re
+    words = re.findall(r"\w+", search or "")
+    return " ".join(f'"{w}"*' for w in words) or None
+
+
+_FTS_TABLES: dict = {}                              # url → sirene_suspects_fts présente
+
+
+def _has_suspects_fts(db: Session) -> bool:
+    key = str(db.get_bind().url)
+    if key not in _FTS_TABLES:
+        from sqlalchemy import text
+        _FTS_TABLES[key] = db.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sirene_suspects_fts'")).first() is not None
+    return _FTS_TABLES[key]
+
+
 def db_suspects_list(db: Session, profession_id: str = None, dept: str = None,
-                     search: str = None, page: int = 1, per_page: int = 100):
-    """Liste paginée des suspects SIRENE avec filtres."""
-    q = db.query(SireneSuspectDB)
+                     search: str = None, page: int = 1, per_page: int = 100,
+                     after: tuple = None, with_total: bool = True, before: tuple = None):
+    """
+    Liste paginée des suspects SIRENE avec filtres, triée par (ville, raison_sociale, id).
+
+    after : clé (ville, raison_sociale, id) du dernier suspect de la page précédente —
+    pagination par clé sur ix_sirene_suspects_(prof_)keyset, coût constant quelle que soit
+    la profondeur ; before : clé du premier suspect de la page suivante (page précédente,
+    même index parcouru à rebours) ; sans after ni before, `page` garde l'ancien OFFSET.
+    search passe par la table FTS5 sirene_suspects_fts (préfixes de mots, sans accents)
+    quand la migration 0005 est appliquée, sinon par ilike. Retourne (total, items) ; total = None si not with_total.
+    """
+    from sqlalchemy import or_, text, tuple_
+    S = SireneSuspectDB
+    q = db.query(S)
     if profession_id: q = q.filter_by(profession_id=profession_id)
     if dept:          q = q.filter_by(departement=dept)
-    if search:
-        like = f"%{search.upper()}%"
-        from sqlalchemy import or_
-        q = q.filter(or_(
-            SireneSuspectDB.raison_sociale.ilike(f"%{search}%"),
-            SireneSuspectDB.ville.ilike(f"%{search}%"),
-        ))
-    total = q.count()
-    items = q.order_by(SireneSuspectDB.raison_sociale).offset((page - 1) * per_page).limit(per_page).all()
+    if search and _has_suspects_fts(db):
+        fts = _suspects_fts_query(search)
+        if fts:
+            q = q.filter(text("sirene_suspects.rowid IN (SELECT rowid FROM sirene_suspects_fts "
+                              "WHERE sirene_suspects_fts MATCH :fts)")).params(fts=fts)
+    elif search:
+        q = q.filter(or_(S.raison_sociale.ilike(f"%{search}%"), S.ville.ilike(f"%{search}%")))
+    total = q.count() if with_total else None
+    order = (S.ville, S.raison_sociale, S.id)
+    if before is not None:
+        ville, raison_sociale, siret = before
+        desc = [c.desc() for c in order]
+        items = []
+        if ville is not None:
+            items = (q.filter(S.ville.isnot(None), tuple_(*order) < (ville, raison_sociale, siret))
+                      .order_by(*desc).limit(per_page).all())
+            nulls = q.filter(S.ville.is_(None))
+        else:
+            nulls = q.filter(S.ville.is_(None), tuple_(S.raison_sociale, S.id) < (raison_sociale, siret))
+        if len(items) < per_page:
+            items += nulls.order_by(*desc).limit(per_page - len(items)).all()
+        return total, items[::-1]
+    if after is None:
+        items = q.order_by(*order).offset((page - 1) * per_page).limit(per_page).all()
+        return total, items
+
+    ville, raison_sociale, siret = after
+    # NULL d'abord en tri croissant : finir le groupe ville IS NULL, puis les villes renseignées
+    items = []
+    if ville is None:
+        items = (q.filter(S.ville.is_(None), tuple_(S.raison_sociale, S.id) > (raison_sociale, siret))
+                  .order_by(*order).limit(per_page).all())
+        rest = q.filter(S.ville.isnot(None))
+    else:
+        rest = q.filter(tuple_(*order) > (ville, raison_sociale, siret))
+    if len(items) < per_page:
+        items += rest.order_by(*order).limit(per_page - len(items)).all()
     return total, items
 
 
 # ── Dashboard stats ────────────────────────────────────────────────────────────
 
+# Hub admin : la page calcule la période courante et la précédente à chaque affichage ;
+# résultat mémorisé DASHBOARD_STATS_TTL_S secondes (0 = désactivé) par (base, période),
+# au plus DASHBOARD_STATS_MAX périodes (les expirées sont purgées à chaque insertion)
+_DASH_TTL_S  = float(os.getenv("DASHBOARD_STATS_TTL_S", "60"))
+_DASH_MAX    = int(os.getenv("DASHBOARD_STATS_MAX", "32"))
+_DASH_CACHE: dict = {}                              # (url, from, to) → (expire_ts, stats), ordre d'insertion
+
+
 def db_dashboard_stats(db: Session, date_from, date_to) -> dict:
     """
     Calcule tous les KPIs du dashboard pour une période donnée.
     Retourne un dict avec les valeurs absolues + taux.
+
+    Une requête agrégée (SUM(CASE …)) par table au lieu d'un COUNT par KPI ;
+    mémorisé _DASH_TTL_S secondes.
     """
+    import time
+    key = (str(db.get_bind().url), date_from, date_to)
+    hit = _DASH_CACHE.get(key)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+    stats = _db_dashboard_stats(db, date_from, date_to)
+    if _DASH_TTL_S > 0:
+        now = time.monotonic()
+        for k, (exp, _) in list(_DASH_CACHE.items()):
+            if exp <= now:
+                _DASH_CACHE.pop(k, None)
+        _DASH_CACHE.pop(key, None)
+        while len(_DASH_CACHE) >= _DASH_MAX:      # périodes arbitraires (?from=…&to=…) : plus ancienne d'abord
+            _DASH_CACHE.pop(next(iter(_DASH_CACHE)), None)
+        _DASH_CACHE[key] = (now + _DASH_TTL_S, stats)
+    return stats
+
+
+def _db_dashboard_stats(db: Session, date_from, date_to) -> dict:
     from sqlalchemy import or_, and_, func, case
     from .models import V3ProspectDB
 
-    # ── Suspects SIRENE ──
-    suspects = db.query(SireneSuspectDB).filter(
-        SireneSuspectDB.created_at.between(date_from, date_to)
-    ).count()
-    suspects_total = db.query(SireneSuspectDB).count()
-
-    # ── Enrichis (Google lookup fait) ──
-    enrichis = db.query(SireneSuspectDB).filter(
-        SireneSuspectDB.enrichi_at.between(date_from, date_to)
-    ).count()
-
-    # ── Contactables V3 (email ou tél) créés sur la période ──
-    contactables = db.query(V3ProspectDB).filter(
-        V3ProspectDB.created_at.between(date_from, date_to),
-        or_(V3ProspectDB.email.isnot(None), V3ProspectDB.phone.isnot(None))
-    ).count()
-    contactables_total = db.query(V3ProspectDB).filter(
-        or_(V3ProspectDB.email.isnot(None), V3ProspectDB.phone.isnot(None))
-    ).count()
-
-    # ── Scorés IA (ia_results présent, email ok, pas encore envoyés) ──
-    ia_scored = db.query(V3ProspectDB).filter(
-        V3ProspectDB.ia_results.isnot(None),
-        V3ProspectDB.email.isnot(None),
-        V3ProspectDB.sent_at.is_(None),
-    ).count()
-    ia_scored_total = ia_scored  # pas de filtre période ici : c'est un état courant
-
-    # ── En attente scoring IA (email ok, pas de ia_results, pas envoyés) ──
-    sans_scoring_ia = db.query(V3ProspectDB).filter(
-        V3ProspectDB.email.isnot(None),
-        V3ProspectDB.ia_results.is_(None),
-        V3ProspectDB.sent_at.is_(None),
-    ).count()
-
-    # ── Contactés (envoi réalisé sur la période) ──
-    contactes = db.query(V3ProspectDB).filter(
-        V3ProspectDB.sent_at.between(date_from, date_to),
-        V3ProspectDB.contacted == True
-    ).count()
+    def n(cond):
+        return func.coalesce(func.sum(case((cond, 1), else_=0)), 0)
+
+    # ── Suspects SIRENE : total, créés / enrichis (Google lookup fait) sur la période ──
+    sus = db.query(
+        func.count(SireneSuspectDB.id).label("total"),
+        n(SireneSuspectDB.created_at.between(date_from, date_to)).label("periode"),
+        n(SireneSuspectDB.enrichi_at.between(date_from, date_to)).label("enrichis"),
+    ).one()
+
+    # ── V3 : contactables (email ou tél), scorés IA / en attente (états courants, pas de
+    #    filtre période), contactés (envoi réalisé sur la période) ──
+    contactable = or_(V3ProspectDB.email.isnot(None), V3ProspectDB.phone.isnot(None))
+    unsent_email = and_(V3ProspectDB.email.isnot(None), V3ProspectDB.sent_at.is_(None))
+    v3 = db.query(
+        n(and_(V3ProspectDB.created_at.between(date_from, date_to), contactable)).label("contactables"),
+        n(contactable).label("contactables_total"),
+        n(and_(unsent_email, V3ProspectDB.ia_results.isnot(None))).label("ia_scored"),
+        n(and_(unsent_email, V3ProspectDB.ia_results.is_(None))).label("sans_scoring_ia"),
+        n(and_(V3ProspectDB.sent_at.between(date_from, date_to), V3ProspectDB.contacted == True)).label("contactes"),
+    ).one()
 
     # ── Breakdown métier × ville (contactables période) ──
     breakdown_rows = (
@@ -854,7 +899,7 @@ def db_dashboard_stats(db: Session, date_from, date_to) -> dict:
                  func.sum(case((V3ProspectDB.contacted == True, 1), else_=0)).label("n_contactes"))
         .filter(
             V3ProspectDB.created_at.between(date_from, date_to),
-            or_(V3ProspectDB.email.isnot(None), V3ProspectDB.phone.isnot(None))
+            contactable,
         )
         .group_by(V3ProspectDB.profession, V3ProspectDB.city)
         .order_by(func.count(V3ProspectDB.token).desc())
@@ -866,14 +911,14 @@ def db_dashboard_stats(db: Session, date_from, date_to) -> dict:
     mkt = _db_mkt_stats_period(date_from, date_to)
 
     return {
-        "suspects":           suspects,
-        "suspects_total":     suspects_total,
-        "enrichis":           enrichis,
-        "contactables":       contactables,
-        "contactables_total": contactables_total,
-        "ia_scored":          ia_scored,
-        "sans_scoring_ia":    sans_scoring_ia,
-        "contactes":          contactes,
+        "suspects":           sus.periode,
+        "suspects_total":     sus.total,
+        "enrichis":           sus.enrichis,
+        "contactables":       v3.contactables,
+        "contactables_total": v3.contactables_total,
+        "ia_scored":          v3.ia_scored,
+        "sans_scoring_ia":    v3.sans_scoring_ia,
+        "contactes":          v3.contactes,
         "envoyes":            mkt["sent"],
         "ouvertures":         mkt["opened"],
         "clics":              mkt["clicked"],
@@ -893,27 +938,26 @@ def db_dashboard_stats(db: Session, date_from, date_to) -> dict:
 
 def db_cost_stats(db: Session) -> dict:
     """
-    Agrège les coûts API depuis job_cost_log.
-    Retourne : total, par job, par lead, par client (si nb ventes connu).
+    Agrège les coûts API depuis le rollup quotidien job_cost_daily (src.job_costs).
+    Retourne : total, par job, par jour (14 j), par lead, derniers jobs (job_cost_log).
     """
-    from sqlalchemy import func
-    from .models import JobCostLogDB
+    from . import job_costs
 
-    rows = db.query(JobCostLogDB).order_by(JobCostLogDB.started_at.desc()).all()
-    if not rows:
+    t = job_costs.totals(db)
+    if not t["nb_runs"]:
         return {
             "total_cost": 0.0,
             "total_google": 0,
             "total_gemini": 0,
             "total_leads": 0,
             "cost_per_lead": None,
+            "by_job": [],
+            "daily": [],
             "recent_jobs": [],
         }
 
-    total_cost   = round(sum(r.cost_estimated   for r in rows), 4)
-    total_google = sum(r.nb_appels_google for r in rows)
-    total_gemini = sum(r.nb_appels_gemini for r in rows)
-    total_leads  = sum(r.nb_leads_generes for r in rows)
+    total_cost  = round(t["cost_estimated"], 4)
+    total_leads = t["nb_leads_generes"]
 
     cost_per_lead = round(total_cost / total_leads, 4) if total_leads > 0 else None
 
@@ -927,72 +971,90 @@ def db_cost_stats(db: Session) -> dict:
             "leads":   r.nb_leads_generes,
             "cost":    round(r.cost_estimated, 4),
         }
-        for r in rows[:20]
+        for r in job_costs.recent(db, 20)
     ]
 
     return {
         "total_cost":   total_cost,
-        "total_google": total_google,
-        "total_gemini": total_gemini,
+        "total_google": t["nb_appels_google"],
+        "total_gemini": t["nb_appels_gemini"],
         "total_leads":  total_leads,
         "cost_per_lead": cost_per_lead,
+        "by_job":       job_costs.by_job(db),
+        "daily":        job_costs.daily(db, 14),
         "recent_jobs":  recent,
     }
 
 
 def _db_mkt_stats_period(date_from, date_to) -> dict:
-    """Lit les stats marketing pour une période depuis marketing_module."""
+    """
+    Lit les stats marketing pour une période depuis marketing_module : une requête
+    agrégée sur les livraisons, une sur les RDV (GROUP BY closer_id), une sur les
+    closers actifs — mémoire constante quel que soit le volume de livraisons.
+    """
     empty = {"sent":0,"opened":0,"clicked":0,"bounced":0,"replied":0,
              "rdv":0,"deals":0,"ca_total":0.0,"ca_par_offre":{},"closers_actifs":0,"top_closers":[]}
     try:
-        from marketing_module.database import SessionLocal as MktSession
+        from sqlalchemy import and_, case, func
+        from marketing_module.database import ReadSessionLocal as MktSession
         from marketing_module.models import (
             ProspectDeliveryDB, DeliveryStatus, MeetingDB, MeetingStatus,
             CloserDB, ReplyStatus
         )
+
+        def n(cond):
+            return func.coalesce(func.sum(case((cond, 1), else_=0)), 0)
+
+        D, M = ProspectDeliveryDB, MeetingDB
+        done = M.status == MeetingStatus.completed.value
         with MktSession() as mdb:
-            deliveries = mdb.query(ProspectDeliveryDB).filter(
-                ProspectDeliveryDB.project_id == "presence-ia",
-                ProspectDeliveryDB.created_at.between(date_from, date_to)
-            ).all()
-            meetings = mdb.query(MeetingDB).filter(
-                MeetingDB.project_id == "presence-ia",
-                MeetingDB.scheduled_at.between(date_from, date_to)
-            ).all()
-            closers = mdb.query(CloserDB).filter_by(
+            d = mdb.query(
+                n(D.delivery_status == DeliveryStatus.sent.value).label("sent"),
+                n(D.opened_at.isnot(None)).label("opened"),
+                n(D.clicked_at.isnot(None)).label("clicked"),
+                n(D.delivery_status == DeliveryStatus.bounced.value).label("bounced"),
+                n(D.reply_status == ReplyStatus.positive.value).label("replied"),
+            ).filter(
+                D.project_id == "presence-ia",
+                D.created_at.between(date_from, date_to)
+            ).one()
+            by_closer = {
+                r.closer_id: r for r in mdb.query(
+                    M.closer_id,
+                    func.count(M.id).label("rdv"),
+                    n(done).label("deals"),
+                    func.coalesce(func.sum(case((done, M.deal_value), else_=0.0)), 0.0).label("ca"),
+                    func.coalesce(func.sum(case((and_(done, M.deal_value > 0), M.deal_value), else_=0.0)),
+                                  0.0).label("ca_pos"),
+                ).filter(
+                    M.project_id == "presence-ia",
+                    M.scheduled_at.between(date_from, date_to)
+                ).group_by(M.closer_id)
+            }
+            closers = mdb.query(CloserDB.id, CloserDB.name).filter_by(
                 project_id="presence-ia", is_active=True
             ).all()
 
-            # Top closers par deals signés sur la période
-            from marketing_module.models import MeetingStatus
-            top = []
-            for c in closers:
-                n = sum(1 for m in meetings
-                        if m.closer_id == c.id and m.status == MeetingStatus.completed)
-                top.append({"name": c.name, "deals": n})
-            top.sort(key=lambda x: -x["deals"])
-
-            deals_closed = [m for m in meetings if m.status == MeetingStatus.completed]
-            ca_total = sum((m.deal_value or 0.0) for m in deals_closed)
-            ca_par_offre: dict = {}
-            for m in deals_closed:
-                if (m.deal_value or 0) > 0:
-                    offer = getattr(m, "offer_name", None) or "—"
-                    ca_par_offre[offer] = ca_par_offre.get(offer, 0.0) + (m.deal_value or 0)
-
-            return {
-                "sent":          sum(1 for d in deliveries if d.delivery_status == DeliveryStatus.sent),
-                "opened":        sum(1 for d in deliveries if d.opened_at),
-                "clicked":       sum(1 for d in deliveries if d.clicked_at),
-                "bounced":       sum(1 for d in deliveries if d.delivery_status == DeliveryStatus.bounced),
-                "replied":       sum(1 for d in deliveries if d.reply_status == ReplyStatus.positive),
-                "rdv":           len(meetings),
-                "deals":         len(deals_closed),
-                "ca_total":      ca_total,
-                "ca_par_offre":  ca_par_offre,
-                "closers_actifs": len(closers),
-                "top_closers":   top[:3],
-            }
+        # Top closers par deals signés sur la période
+        top = [{"name": c.name, "deals": by_closer[c.id].deals if c.id in by_closer else 0}
+               for c in closers]
+        top.sort(key=lambda x: -x["deals"])
+
+        # MeetingDB n'a pas d'offre : tout le CA va sous "—"
+        ca_pos = sum(r.ca_pos for r in by_closer.values())
+        return {
+            "sent":          d.sent,
+            "opened":        d.opened,
+            "clicked":       d.clicked,
+            "bounced":       d.bounced,
+            "replied":       d.replied,
+            "rdv":           sum(r.rdv for r in by_closer.values()),
+            "deals":         sum(r.deals for r in by_closer.values()),
+            "ca_total":      float(sum(r.ca for r in by_closer.values())),
+            "ca_par_offre":  {"—": float(ca_pos)} if ca_pos else {},
+            "closers_actifs": len(closers),
+            "top_closers":   top[:3],
+        }
     except Exception:
         return empty
 
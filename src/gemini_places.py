@@ -1,25 +1,144 @@
 """
 GEMINI_PLACES — Enrichissement entreprise via Gemini + Google Search grounding.
 Remplace Google Places API pour trouver site web + téléphone d'une entreprise connue.
+
+Cache persistant (table company_info_cache) :
+  clé      = modèle + SIREN si connu, sinon modèle + nom normalisé + ville normalisée
+  positif  = COMPANY_INFO_CACHE_TTL_DAYS      (défaut 90 j)
+  négatif  = COMPANY_INFO_CACHE_NEG_TTL_DAYS  (défaut 30 j) — "introuvable" mis en cache aussi
+  erreurs réseau / HTTP → jamais mises en cache
 """
-import os, re, json, logging, requests
-from typing import Dict
+import os, re, json, logging, requests, unicodedata
+from datetime import datetime, timedelta
+from typing import Dict, Optional
 
 log = logging.getLogger(__name__)
 
-_GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+_GEMINI_MODEL = os.getenv("GEMINI_PLACES_MODEL", "gemini-2.0-flash")
+_GEMINI_URL   = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+
+
+def _norm(s: str) -> str:
+    s = unicodedata.normalize("NFD", (s or "").lower().strip())
+    s = "".join(c for c in s if unicodedata.category(c) != "Mn")
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]", " ", s)).strip()
+
+
+def _cache_key(name: str, city: str, siren: Optional[str] = None) -> str:
+    if siren:
+        return f"{_GEMINI_MODEL}|siren:{siren}"
+    return f"{_GEMINI_MODEL}|{_norm(name)}|{_norm(city)}"
+
+
+def _ttl(found: bool) -> timedelta:
+    if found:
+        return timedelta(days=float(os.getenv("COMPANY_INFO_CACHE_TTL_DAYS", "90")))
+    return timedelta(days=float(os.getenv("COMPANY_INFO_CACHE_NEG_TTL_DAYS", "30")))
+
+
+def _cache_get(key: str) -> Optional[Dict]:
+    """Retourne le payload en cache (dict, éventuellement vide = négatif) ou None si absent/expiré."""
+    try:
+        from .database import SessionLocal
+        from .models import CompanyInfoCacheDB
+        with SessionLocal() as db:
+            row = db.get(CompanyInfoCacheDB, key)
+            if not row or row.expires_at <= datetime.utcnow():
+                return None
+            row.hits = (row.hits or 0) + 1
+            db.commit()
+            return json.loads(row.payload or "{}") if row.found else {}
+    except Exception as e:
+        log.debug("gemini_places cache get %s: %s", key, e)
+        return None
+
+
+def _cache_put(key: str, name: str, city: str, siren: Optional[str], info: Dict):
+    try:
+        from .database import SessionLocal
+        from .models import CompanyInfoCacheDB
+        found = bool(info.get("website") or info.get("formatted_phone_number"))
+        now   = datetime.utcnow()
+        with SessionLocal() as db:
+            row = db.get(CompanyInfoCacheDB, key)
+            if not row:
+                row = CompanyInfoCacheDB(id=key, model=_GEMINI_MODEL, hits=0, fetches=0)
+                db.add(row)
+            row.name_norm  = _norm(name)
+            row.city_norm  = _norm(city)
+            row.siren      = siren
+            row.found      = found
+            row.payload    = json.dumps(info if found else {}, ensure_ascii=False)
+            row.fetches    = (row.fetches or 0) + 1
+            row.created_at = now
+            row.expires_at = now + _ttl(found)
+            db.commit()
+    except Exception as e:
+        log.debug("gemini_places cache put %s: %s", key, e)
+
 
+def cache_stats() -> Dict:
+    """Taux de hit + dépense évitée (prix Gemini de cost_tracker)."""
+    from sqlalchemy import func, case
+    from .cost_tracker import PRICE_GEMINI
+    from .database import SessionLocal
+    from .models import CompanyInfoCacheDB
 
-def fetch_company_info(name: str, city: str, api_key: str = None) -> Dict:
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        row = db.query(
+            func.count(CompanyInfoCacheDB.id),
+            func.coalesce(func.sum(CompanyInfoCacheDB.hits), 0),
+            func.coalesce(func.sum(CompanyInfoCacheDB.fetches), 0),
+            func.coalesce(func.sum(case((CompanyInfoCacheDB.found == False, 1), else_=0)), 0),  # noqa: E712
+            func.coalesce(func.sum(case((CompanyInfoCacheDB.expires_at <= now, 1), else_=0)), 0),
+        ).one()
+    entries, hits, fetches, negative, expired = (int(v or 0) for v in row)
+    lookups = hits + fetches
+    return {
+        "entries":     entries,
+        "negative":    negative,
+        "expired":     expired,
+        "hits":        hits,
+        "fetches":     fetches,
+        "hit_rate":    round(hits / lookups, 4) if lookups else 0.0,
+        "spent":       round(fetches * PRICE_GEMINI, 4),
+        "saved":       round(hits * PRICE_GEMINI, 4),
+        "model":       _GEMINI_MODEL,
+    }
+
+
+def purge_expired_cache() -> int:
+    """Supprime les entrées expirées. Retourne le nombre de lignes supprimées."""
+    from .database import SessionLocal
+    from .models import CompanyInfoCacheDB
+    with SessionLocal() as db:
+        n = db.query(CompanyInfoCacheDB).filter(
+            CompanyInfoCacheDB.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+    return n
+
+
+def fetch_company_info(name: str, city: str, api_key: str = None,
+                       siren: Optional[str] = None) -> Dict:
     """
     Cherche le site web et téléphone d'une entreprise via Gemini + Search Grounding.
-    Retourne dict avec website, formatted_phone_number (même interface que fetch_place_details).
+    Retourne dict avec website, formatted_phone_number (même interface que fetch_place_details),
+    ou {} si introuvable — frais ou servi par le cache négatif, même forme.
+    Sert depuis company_info_cache si une entrée valide existe (y compris "introuvable").
     """
     if not api_key:
         api_key = os.getenv("GEMINI_API_KEY", "")
     if not api_key:
         return {}
 
+    key = _cache_key(name, city, siren)
+    cached = _cache_get(key)
+    if cached is not None:
+        log.debug("gemini_places: cache hit %s", key)
+        return cached
+
     prompt = (
         f"Trouve le site web officiel et le numéro de téléphone de l'entreprise "
         f"'{name}' située à {city} en France. "
@@ -41,7 +160,7 @@ def fetch_company_info(name: str, city: str, api_key: str = None) -> Dict:
         except Exception:
             pass
         r = requests.post(
-            f"{_GEMINI_URL}?key={api_key}",
+            f"{_GEMINI_URL.format(model=_GEMINI_MODEL)}?key={api_key}",
             json=payload,
             timeout=20,
         )
@@ -49,6 +168,7 @@ def fetch_company_info(name: str, city: str, api_key: str = None) -> Dict:
         data = r.json()
         candidates = data.get("candidates", [])
         if not candidates:
+            _cache_put(key, name, city, siren, {})
             return {}
         parts = candidates[0].get("content", {}).get("parts", [])
         text = "".join(p.get("text", "") for p in parts)
@@ -56,6 +176,7 @@ def fetch_company_info(name: str, city: str, api_key: str = None) -> Dict:
         m = re.search(r'\{[^{}]+\}', text, re.DOTALL)
         if not m:
             log.debug("gemini_places: pas de JSON pour %s / %s", name, city)
+            _cache_put(key, name, city, siren, {})
             return {}
 
         info = json.loads(m.group(0))
@@ -65,12 +186,16 @@ def fetch_company_info(name: str, city: str, api_key: str = None) -> Dict:
         if website and not website.startswith("http"):
             website = f"https://{website}"
 
-        return {
+        result = {
             "website":                  website if website and "." in website else None,
             "formatted_phone_number":   phone or None,
             "rating":                   None,
             "user_ratings_total":       None,
         }
+        if not (result["website"] or result["formatted_phone_number"]):
+            result = {}                                   # introuvable : même forme qu'en cache
+        _cache_put(key, name, city, siren, result)
+        return result
     except Exception as e:
         log.warning("gemini_places %s/%s: %s", name, city, e)
         return {}
@@ -1,17 +1,35 @@
 """
 Module GOOGLE_PLACES — Récupération automatique de prospects
 Google Places API : Text Search + Place Details
+
+Place Details :
+  - pool borné de GOOGLE_PLACES_DETAILS_WORKERS threads (défaut 8) sur une session HTTP partagée
+  - masque de champs réduit aux champs réellement lus (pas de "name" : on garde celui du Text Search)
+  - cache mémoire par place_id, TTL GOOGLE_PLACES_DETAILS_TTL_S (défaut 24 h), erreurs non cachées
 """
-import logging, re
-from typing import Dict, List, Optional, Tuple
+import logging, os, re, threading, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
 log = logging.getLogger(__name__)
 
 _TEXT_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
 _DETAILS_URL     = "https://maps.googleapis.com/maps/api/place/details/json"
-_DETAIL_FIELDS   = "name,website,formatted_phone_number,international_phone_number,user_ratings_total,rating"
+_DETAIL_FIELDS   = "website,formatted_phone_number,international_phone_number,user_ratings_total,rating"
+
+_DETAILS_WORKERS = int(os.getenv("GOOGLE_PLACES_DETAILS_WORKERS", "8"))
+_DETAILS_TTL_S   = float(os.getenv("GOOGLE_PLACES_DETAILS_TTL_S", "86400"))
+_ENRICH_WORKERS  = int(os.getenv("GOOGLE_PLACES_ENRICH_WORKERS", "4"))
+
+_DETAILS_CACHE: Dict[str, Tuple[float, Dict]] = {}   # place_id → (expire_ts, result)
+_CACHE_LOCK = threading.Lock()
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
 
 # Statuts Google qui signifient "pas de résultat" (pas une erreur)
 _EMPTY_STATUSES = {"ZERO_RESULTS"}
@@ -103,6 +121,25 @@ def _domain(url: str) -> str:
     return u if "." in u else ""
 
 
+def _session() -> requests.Session:
+    """Session partagée (keep-alive) — pool de connexions dimensionné sur le pool de threads."""
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                s = requests.Session()
+                size = max(_DETAILS_WORKERS, _ENRICH_WORKERS, 1)
+                s.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=size))
+                s.mount("http://",  HTTPAdapter(pool_connections=2, pool_maxsize=size))
+                _SESSION = s
+    return _SESSION
+
+
+def clear_details_cache():
+    with _CACHE_LOCK:
+        _DETAILS_CACHE.clear()
+
+
 # ── Appels API ────────────────────────────────────────────────────────────
 
 def fetch_text_search(profession: str, city: str, api_key: str,
@@ -119,7 +156,7 @@ def fetch_text_search(profession: str, city: str, api_key: str,
         _tracker.increment_google()
     except Exception:
         pass
-    resp = requests.get(_TEXT_SEARCH_URL, params=params, timeout=10)
+    resp = _session().get(_TEXT_SEARCH_URL, params=params, timeout=10)
     resp.raise_for_status()
     data = resp.json()
 
@@ -134,7 +171,13 @@ def fetch_text_search(profession: str, city: str, api_key: str,
 
 
 def fetch_place_details(place_id: str, api_key: str) -> Dict:
-    """Place Details → website, phone, user_ratings_total."""
+    """Place Details → website, phone, user_ratings_total (servi depuis le cache si frais)."""
+    now = time.time()
+    with _CACHE_LOCK:
+        hit = _DETAILS_CACHE.get(place_id)
+    if hit and hit[0] > now:
+        return dict(hit[1])
+
     params = {
         "place_id": place_id,
         "fields":   _DETAIL_FIELDS,
@@ -146,22 +189,34 @@ def fetch_place_details(place_id: str, api_key: str) -> Dict:
         _tracker.increment_google()
     except Exception:
         pass
-    resp = requests.get(_DETAILS_URL, params=params, timeout=10)
+    resp = _session().get(_DETAILS_URL, params=params, timeout=10)
     resp.raise_for_status()
     data = resp.json()
     status = data.get("status", "")
     if status not in _OK_STATUSES:
         log.warning("Place Details status=%s place_id=%s", status, place_id)
         return {}
-    return data.get("result", {})
+    result = data.get("result", {})
+    if place_id and _DETAILS_TTL_S > 0:
+        with _CACHE_LOCK:
+            _DETAILS_CACHE[place_id] = (now + _DETAILS_TTL_S, dict(result))
+    return result
 
 
 # ── Pipeline complet ──────────────────────────────────────────────────────
 
 def search_prospects(profession: str, city: str, api_key: str,
-                     max_results: int = 30) -> Tuple[List[Dict], List[str]]:
+                     max_results: int = 30,
+                     on_accept: Optional[Callable[[Dict], None]] = None) -> Tuple[List[Dict], List[str]]:
     """
-    Text Search → Place Details → filtre (website requis) → dédupe par domaine.
+    Text Search → Place Details (en parallèle) → filtre (website requis) → dédupe par domaine.
+
+    Les détails sont récupérés par le pool mais traités dans l'ordre du Text Search :
+    le résultat est identique à la version séquentielle (premier domaine gardé, etc.).
+    Soumission paresseuse : au plus min(_DETAILS_WORKERS, max_results - retenus) requêtes
+    Details (payantes) en vol, la fenêtre se recharge au fil des résultats lus — aucun
+    appel n'est lancé au-delà de ce qui peut encore servir.
+    on_accept(prospect) est appelé à chaque prospect retenu (permet de chevaucher l'enrichissement).
 
     Retourne:
         prospects : list[{name, website, phone, reviews_count}]
@@ -173,52 +228,70 @@ def search_prospects(profession: str, city: str, api_key: str,
     prospects: List[Dict] = []
     reasons:   List[str]  = []
     seen_domains: set     = set()
+    if not raw:
+        return prospects, reasons
 
-    for place in raw:
-        if len(prospects) >= max_results:
-            break
-
-        place_id = place.get("place_id", "")
-        name     = _clean_name(place.get("name", ""), city=city)
-
-        try:
-            details = fetch_place_details(place_id, api_key)
-        except Exception as exc:
-            log.warning("Détails %s (%s): %s", place_id, name, exc)
-            reasons.append(f"{name}: erreur détails ({exc})")
-            continue
-
-        website = details.get("website") or ""
-
-        if not website:
-            reasons.append(f"{name}: pas de site web")
-            continue
-
-        d = _domain(website)
-        if not d:
-            reasons.append(f"{name}: domaine invalide ({website})")
-            continue
-
-        if d in seen_domains:
-            reasons.append(f"{name}: doublon ({d})")
-            continue
-
-        seen_domains.add(d)
-
-        # Téléphone : priorité au numéro international (plus fiable pour classification)
-        raw_phone = (details.get("international_phone_number")
-                     or details.get("formatted_phone_number") or "")
-        tel, mobile = _classify_phone(raw_phone)
-
-        prospects.append({
-            "name":          name,
-            "website":       website,
-            "tel":           tel,
-            "mobile":        mobile,
-            "reviews_count": details.get("user_ratings_total")
-                             or place.get("user_ratings_total"),
-            "rating":        details.get("rating") or place.get("rating"),
-        })
+    pool = ThreadPoolExecutor(max_workers=max(1, min(_DETAILS_WORKERS, len(raw))),
+                              thread_name_prefix="places-details")
+    window: deque = deque()          # (place, future), dans l'ordre du Text Search
+    todo = iter(raw)
+    try:
+        while len(prospects) < max_results:
+            while len(window) < min(_DETAILS_WORKERS, max_results - len(prospects)):
+                place = next(todo, None)
+                if place is None:
+                    break
+                window.append((place, pool.submit(fetch_place_details, place.get("place_id", ""), api_key)))
+            if not window:
+                break
+            place, fut = window.popleft()
+
+            place_id = place.get("place_id", "")
+            name     = _clean_name(place.get("name", ""), city=city)
+
+            try:
+                details = fut.result()
+            except Exception as exc:
+                log.warning("Détails %s (%s): %s", place_id, name, exc)
+                reasons.append(f"{name}: erreur détails ({exc})")
+                continue
+
+            website = details.get("website") or ""
+
+            if not website:
+                reasons.append(f"{name}: pas de site web")
+                continue
+
+            d = _domain(website)
+            if not d:
+                reasons.append(f"{name}: domaine invalide ({website})")
+                continue
+
+            if d in seen_domains:
+                reasons.append(f"{name}: doublon ({d})")
+                continue
+
+            seen_domains.add(d)
+
+            # Téléphone : priorité au numéro international (plus fiable pour classification)
+            raw_phone = (details.get("international_phone_number")
+                         or details.get("formatted_phone_number") or "")
+            tel, mobile = _classify_phone(raw_phone)
+
+            p = {
+                "name":          name,
+                "website":       website,
+                "tel":           tel,
+                "mobile":        mobile,
+                "reviews_count": details.get("user_ratings_total")
+                                 or place.get("user_ratings_total"),
+                "rating":        details.get("rating") or place.get("rating"),
+            }
+            prospects.append(p)
+            if on_accept:
+                on_accept(p)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
 
     return prospects, reasons
 
@@ -230,14 +303,15 @@ def search_prospects_enriched(profession: str, city: str, api_key: str,
     - email et mobile extraits de la homepage
     - CMS détecté
 
+    L'enrichissement d'un prospect démarre dès qu'il est retenu, pendant que
+    les Place Details suivants sont encore en vol.
+
     Retourne : list[{name, website, tel, mobile, email, cms, reviews_count, rating}]
     """
     from .enrich import enrich_website
     from .cms_detector import detect_cms
 
-    prospects, reasons = search_prospects(profession, city, api_key, max_results)
-
-    for p in prospects:
+    def _enrich(p: Dict):
         url = p.get("website") or ""
         web_data = enrich_website(url)
         p["email"]  = web_data["email"]
@@ -246,4 +320,14 @@ def search_prospects_enriched(profession: str, city: str, api_key: str,
             p["mobile"] = web_data["mobile"]
         p["cms"] = detect_cms(url)
 
+    with ThreadPoolExecutor(max_workers=max(1, _ENRICH_WORKERS),
+                            thread_name_prefix="places-enrich") as pool:
+        pending = []
+        prospects, reasons = search_prospects(
+            profession, city, api_key, max_results,
+            on_accept=lambda p: pending.append(pool.submit(_enrich, p)),
+        )
+        for fut in pending:
+            fut.result()
+
     return prospects, reasons
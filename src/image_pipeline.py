@@ -0,0 +1,302 @@
+"""
+IMAGE_PIPELINE — Variantes responsives des images (headers villes, uploads prospects).
+
+Le traitement Pillow (resize LANCZOS + encodage) tourne dans un ProcessPoolExecutor,
+jamais dans le thread de la requête HTTP :
+  - largeurs 480 / 960 / 1600 / 2400 (pas d'agrandissement au-delà de l'original)
+  - WEBP toujours, AVIF en plus si Pillow sait l'encoder
+  - noms par hash du contenu : {stem}-{sha256[:12]}-{largeur}.{ext}
+  - option 16:9 (center-crop) pour les headers
+
+Suivi en base (table image_assets) : pending → ready | error, consultable via get_status().
+Un contenu déjà traité vers le même dossier est réutilisé sans retraitement.
+Si Pillow échoue, l'appelant peut garder l'original tel quel (on_error + store_original).
+Au démarrage, sweep() clôt les traitements perdus avec un process arrêté.
+
+Env :
+  IMAGE_PIPELINE_WORKERS    nombre de processus (défaut min(4, CPU))
+  IMAGE_PIPELINE_STALE_MIN  âge (min) au-delà duquel un asset "pending" est abandonné (défaut 30)
+"""
+import hashlib, json, logging, multiprocessing, os, threading, uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+WIDTHS       = (480, 960, 1600, 2400)
+WEBP_QUALITY = 82
+AVIF_QUALITY = 60
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+_DONE: Dict[str, threading.Event] = {}   # asset_id → signalé après écriture du statut
+
+
+def _workers() -> int:
+    return int(os.getenv("IMAGE_PIPELINE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                # spawn : pas de fork d'un process serveur multi-threadé
+                _POOL = ProcessPoolExecutor(max_workers=_workers(),
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _POOL
+
+
+def shutdown(wait: bool = True):
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=wait, cancel_futures=not wait)
+            _POOL = None
+
+
+def avif_supported() -> bool:
+    try:
+        from PIL import features
+        return bool(features.check("avif"))
+    except Exception:
+        return False
+
+
+def _target_widths(src_w: int) -> List[int]:
+    widths = [w for w in WIDTHS if w < src_w]
+    widths.append(min(src_w, WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def _render(src: str, out_dir: str, stem: str, digest: str, crop_16_9: bool) -> Dict:
+    """Exécuté dans un processus du pool — Pillow uniquement, aucun accès DB."""
+    from PIL import Image
+
+    img = Image.open(src).convert("RGB")
+    if crop_16_9:
+        w, h = img.size
+        target_h = int(w * 9 / 16)
+        if h > target_h:
+            top = (h - target_h) // 2
+            img = img.crop((0, top, w, top + target_h))
+        elif h < target_h:
+            target_w = int(h * 16 / 9)
+            left = (w - target_w) // 2
+            img = img.crop((left, 0, left + target_w, h))
+    src_w, src_h = img.size
+
+    formats = [("webp", "WEBP", WEBP_QUALITY)]
+    if avif_supported():
+        formats.append(("avif", "AVIF", AVIF_QUALITY))
+
+    variants = []
+    for w in _target_widths(src_w):
+        h = max(1, round(src_h * w / src_w))
+        resized = img if w == src_w else img.resize((w, h), Image.LANCZOS)
+        for ext, fmt, quality in formats:
+            filename = f"{stem}-{digest[:12]}-{w}.{ext}"
+            resized.save(Path(out_dir) / filename, fmt, quality=quality)
+            variants.append({"width": w, "height": h, "format": ext, "file": filename})
+    return {"width": src_w, "height": src_h, "variants": variants}
+
+
+# ── Soumission / suivi ────────────────────────────────────────────────────────
+
+def _main_url(url_prefix: str, variants: List[Dict]) -> Optional[str]:
+    webp = [v for v in variants if v["format"] == "webp"]
+    if not webp:
+        return None
+    return f"{url_prefix}/{max(webp, key=lambda v: v['width'])['file']}"
+
+
+def _to_dict(row) -> Dict:
+    return {
+        "id":         row.id,
+        "kind":       row.kind,
+        "status":     row.status,
+        "width":      row.width,
+        "height":     row.height,
+        "url":        row.main_url,
+        "url_prefix": row.url_prefix,
+        "variants":   json.loads(row.variants or "[]"),
+        "srcset":     srcset(row.url_prefix, json.loads(row.variants or "[]")),
+        "error":      row.error,
+    }
+
+
+def _finish(asset_id: str, src: Path, fut: Future,
+            on_ready: Optional[Callable[[Dict], None]],
+            on_error: Optional[Callable[[Dict], None]] = None):
+    """Callback de fin de traitement (thread du pool côté parent) : écrit le statut en base."""
+    from .database import SessionLocal
+    from .models import ImageAssetDB
+
+    src.unlink(missing_ok=True)
+    with SessionLocal() as db:
+        row = db.get(ImageAssetDB, asset_id)
+        if row is None:
+            _DONE.pop(asset_id, threading.Event()).set()
+            return
+        try:
+            out = fut.result()
+            row.status    = "ready"
+            row.width     = out["width"]
+            row.height    = out["height"]
+            row.variants  = json.dumps(out["variants"])
+            row.main_url  = _main_url(row.url_prefix, out["variants"])
+        except Exception as e:
+            log.warning("image_pipeline %s : %s", asset_id, e)
+            row.status = "error"
+            row.error  = str(e)[:500]
+        row.updated_at = datetime.utcnow()
+        db.commit()
+        asset = _to_dict(row)
+    callback = on_ready if asset["status"] == "ready" else on_error
+    if callback:
+        try:
+            callback(asset)
+        except Exception as e:
+            log.error("image_pipeline %s %s : %s", asset["status"], asset_id, e)
+    ev = _DONE.pop(asset_id, None)
+    if ev:
+        ev.set()
+
+
+def submit(raw: bytes, out_dir: Path, url_prefix: str, stem: str, kind: str,
+           crop_16_9: bool = False,
+           on_ready: Optional[Callable[[Dict], None]] = None,
+           on_error: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Enregistre l'image et lance le traitement en arrière-plan. Retourne immédiatement
+    le statut (pending, ou ready si ce contenu a déjà été traité vers out_dir).
+    on_ready(asset) est appelé une fois les variantes écrites, on_error(asset) si le
+    traitement a échoué (Pillow absent, image illisible…).
+    """
+    from .database import SessionLocal
+    from .models import ImageAssetDB
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    url_prefix = url_prefix.rstrip("/")
+    digest = hashlib.sha256(raw).hexdigest()
+
+    with SessionLocal() as db:
+        done = db.query(ImageAssetDB).filter_by(
+            content_hash=digest, url_prefix=url_prefix, stem=stem,
+            crop_16_9=crop_16_9, status="ready",
+        ).first()
+        if done and all((out_dir / v["file"]).exists() for v in json.loads(done.variants or "[]")):
+            asset = _to_dict(done)
+            if on_ready:
+                on_ready(asset)
+            return asset
+
+        row = ImageAssetDB(id=uuid.uuid4().hex, kind=kind, stem=stem, content_hash=digest,
+                           url_prefix=url_prefix, crop_16_9=crop_16_9, status="pending")
+        db.add(row)
+        db.commit()
+        asset = _to_dict(row)
+
+    src = out_dir / f"_src-{asset['id']}"
+    src.write_bytes(raw)
+    _DONE[asset["id"]] = threading.Event()
+    fut = _pool().submit(_render, str(src), str(out_dir), stem, digest, crop_16_9)
+    fut.add_done_callback(lambda f, aid=asset["id"]: _finish(aid, src, f, on_ready, on_error))
+    return asset
+
+
+def store_original(raw: bytes, out_dir: Path, url_prefix: str, filename: str) -> str:
+    """Repli sans Pillow : écrit l'original tel quel sous `filename`, retourne son URL."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / filename).write_bytes(raw)
+    return f"{url_prefix.rstrip('/')}/{filename}"
+
+
+def sweep(dirs: List[Path], stale_minutes: Optional[float] = None) -> Dict:
+    """
+    Au démarrage : un asset "pending" plus vieux que stale_minutes (IMAGE_PIPELINE_STALE_MIN)
+    et sans traitement dans ce process a perdu son worker → "error". Les sources _src-{id}
+    sous `dirs` dont l'asset n'est plus en cours sont supprimées — celles d'un traitement
+    récent (autre worker uvicorn) sont laissées. Retourne {"failed", "removed"}.
+    """
+    from .database import SessionLocal
+    from .models import ImageAssetDB
+
+    if stale_minutes is None:
+        stale_minutes = float(os.getenv("IMAGE_PIPELINE_STALE_MIN", "30"))
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        rows = (db.query(ImageAssetDB)
+                .filter(ImageAssetDB.status == "pending",
+                        ImageAssetDB.created_at < now - timedelta(minutes=stale_minutes))
+                .all())
+        failed = 0
+        for row in rows:
+            if row.id in _DONE:
+                continue
+            row.status, row.error, row.updated_at = "error", "traitement interrompu (process arrêté)", now
+            failed += 1
+        db.commit()
+        live = {i for (i,) in db.query(ImageAssetDB.id).filter(ImageAssetDB.status == "pending")}
+
+    removed = 0
+    for d in dirs:
+        if not Path(d).is_dir():
+            continue
+        for f in Path(d).rglob("_src-*"):
+            asset_id = f.name[len("_src-"):]
+            if asset_id in live or asset_id in _DONE:
+                continue
+            f.unlink(missing_ok=True)
+            removed += 1
+    if failed or removed:
+        log.info("image_pipeline sweep : %d asset(s) abandonné(s), %d source(s) supprimée(s)", failed, removed)
+    return {"failed": failed, "removed": removed}
+
+
+def process(raw: bytes, out_dir: Path, url_prefix: str, stem: str, kind: str,
+            crop_16_9: bool = False, timeout: float = 120) -> Dict:
+    """Comme submit mais attend la fin du traitement (jobs de fond uniquement)."""
+    asset = submit(raw, out_dir, url_prefix, stem, kind, crop_16_9)
+    return wait(asset["id"], timeout) if asset["status"] == "pending" else asset
+
+
+def wait(asset_id: str, timeout: float = 120) -> Optional[Dict]:
+    ev = _DONE.get(asset_id)
+    if ev is not None:
+        ev.wait(timeout)
+    return get_status(asset_id)
+
+
+def get_status(asset_id: str) -> Optional[Dict]:
+    from .database import SessionLocal
+    from .models import ImageAssetDB
+    with SessionLocal() as db:
+        row = db.get(ImageAssetDB, asset_id)
+        return _to_dict(row) if row else None
+
+
+# ── Rendu ─────────────────────────────────────────────────────────────────────
+
+def srcset(url_prefix: str, variants: List[Dict], fmt: str = "webp") -> str:
+    """"{prefix}/{file} 480w, …" pour un format donné."""
+    items = sorted((v for v in variants if v["format"] == fmt), key=lambda v: v["width"])
+    return ", ".join(f"{url_prefix}/{v['file']} {v['width']}w" for v in items)
+
+
+def srcset_for_url(db, url: Optional[str], base_url: str = "") -> str:
+    """srcset WEBP de l'image dont la variante principale est `url` ("" si inconnue)."""
+    from .models import ImageAssetDB
+    if not url:
+        return ""
+    if base_url and url.startswith(base_url):
+        url = url[len(base_url):]
+    row = db.query(ImageAssetDB).filter_by(main_url=url, status="ready").first()
+    if not row:
+        return ""
+    prefix = row.url_prefix if row.url_prefix.startswith("http") else base_url + row.url_prefix
+    return srcset(prefix, json.loads(row.variants or "[]"))
@@ -0,0 +1,442 @@
+"""
+IMAP_REPLIES — Détection des réponses prospects dans la boîte IMAP.
+
+L'ancien _job_imap_reply_poll ouvrait une connexion toutes les 5 min, cherchait les
+UNSEEN, téléchargeait chaque message complet (RFC822) et faisait une requête DB par
+email — les non-prospects restant non lus étaient re-téléchargés à chaque passage.
+
+Désormais, par boîte (IMAP_USER@IMAP_HOST/IMAP_FOLDER) :
+  - une connexion persistante (reconnexion au premier échec)
+  - un filigrane imap_watermark (UIDVALIDITY + dernier UID examiné) : chaque message
+    n'est examiné qu'une fois ; au 1er passage ou si UIDVALIDITY change, seuls les
+    UNSEEN existants sont examinés
+  - les en-têtes seulement : UID FETCH par lots de IMAP_FETCH_BATCH UID (défaut 500)
+    de BODY.PEEK[HEADER.FIELDS (FROM SUBJECT IN-REPLY-TO MESSAGE-ID)] ; le début du
+    corps (IMAP_SNIPPET_BYTES, défaut 8192) n'est lu que pour les réponses retenues
+  - un prospect est reconnu par In-Reply-To (provider_message_id de ses envois,
+    marketing.db) ou par l'adresse From (v3_prospects) : une requête IN (...) par lot
+  - IMAP IDLE (RFC 2177) si le serveur l'annonce : thread ReplyWatcher démarré avec le
+    scheduler, réveillé par EXISTS, relancé toutes les IMAP_IDLE_S secondes (défaut 600).
+    Sans IDLE (ou IMAP_IDLE=false), le job 5 min reste le chemin de polling
+
+Les réponses reconnues passent reply_status à positive, déclenchent l'alerte admin et
+sont marquées \\Seen ; les autres messages restent non lus (boîte humaine).
+
+Variables d'env : IMAP_HOST, IMAP_PORT (993), IMAP_USER, IMAP_PASSWORD,
+IMAP_FOLDER (INBOX), IMAP_SSL (true).
+"""
+import logging, os, re, select, threading, time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+HEADER_FIELDS = "FROM SUBJECT IN-REPLY-TO MESSAGE-ID"
+_PROJECT      = "presence-ia"
+
+
+def mailbox_config() -> Optional[Dict]:
+    host, user, pwd = os.getenv("IMAP_HOST", ""), os.getenv("IMAP_USER", ""), os.getenv("IMAP_PASSWORD", "")
+    if not (host and user and pwd):
+        return None
+    return {
+        "host":     host,
+        "port":     int(os.getenv("IMAP_PORT", "993")),
+        "user":     user,
+        "password": pwd,
+        "folder":   os.getenv("IMAP_FOLDER", "INBOX"),
+        "ssl":      os.getenv("IMAP_SSL", "true").lower() != "false",
+    }
+
+
+# ── Parsing ───────────────────────────────────────────────────────────────────
+
+def _uid_set(uids: List[int]) -> str:
+    """[1, 2, 3, 7] → "1:3,7" (UID triés)."""
+    parts, start, prev = [], None, None
+    for u in uids:
+        if start is None:
+            start = prev = u
+        elif u == prev + 1:
+            prev = u
+        else:
+            parts.append(f"{start}:{prev}" if prev != start else str(start))
+            start = prev = u
+    if start is not None:
+        parts.append(f"{start}:{prev}" if prev != start else str(start))
+    return ",".join(parts)
+
+
+def _parse_fetch(data) -> List[Tuple[int, bool, bytes]]:
+    """Réponse UID FETCH imaplib → [(uid, seen, littéral)]."""
+    msgs, cur = [], None
+    for item in data or []:
+        if isinstance(item, tuple):
+            if cur:
+                msgs.append(cur)
+            cur = [item[0], item[1]]
+        elif cur is not None and item:
+            cur[0] += b" " + item          # attributs envoyés après le littéral
+    if cur:
+        msgs.append(cur)
+    out = []
+    for meta, body in msgs:
+        m = re.search(rb"UID (\d+)", meta)
+        if not m:
+            continue
+        f = re.search(rb"FLAGS \(([^)]*)\)", meta)
+        out.append((int(m.group(1)), bool(f and b"\\Seen" in f.group(1)), body or b""))
+    return out
+
+
+def _from_email(from_raw: str) -> str:
+    from email.header import decode_header
+    decoded = ""
+    for part, enc in decode_header(from_raw or ""):
+        if isinstance(part, bytes):
+            enc = enc if enc and enc != "unknown-8bit" else "utf-8"   # en-tête 8 bits brut
+            try:
+                decoded += part.decode(enc, errors="replace")
+            except LookupError:
+                decoded += part.decode("utf-8", errors="replace")
+        else:
+            decoded += part
+    m = re.search(r"<([^>]+)>", decoded)
+    return m.group(1).strip().lower() if m else decoded.strip().lower()
+
+
+def _snippet(raw: bytes) -> str:
+    """300 premiers caractères du 1er text/plain (message éventuellement tronqué)."""
+    import email as _email
+    msg = _email.message_from_bytes(raw)
+    for part in (msg.walk() if msg.is_multipart() else [msg]):
+        if part.get_content_type() == "text/plain":
+            try:
+                return part.get_payload(decode=True).decode("utf-8", errors="replace")[:300]
+            except Exception:
+                return ""
+    return ""
+
+
+# ── Filigrane ─────────────────────────────────────────────────────────────────
+
+def _load_watermark(key: str) -> Optional[Tuple[int, int]]:
+    from .database import SessionLocal
+    from .models import ImapWatermarkDB
+    with SessionLocal() as db:
+        row = db.get(ImapWatermarkDB, key)
+        return (row.uidvalidity, row.last_uid) if row else None
+
+
+def _save_watermark(key: str, uidvalidity: int, last_uid: int) -> None:
+    from sqlalchemy.dialects.sqlite import insert
+    from .database import SessionLocal
+    from .models import ImapWatermarkDB
+
+    now  = datetime.utcnow()
+    stmt = insert(ImapWatermarkDB).values(mailbox=key, uidvalidity=uidvalidity,
+                                          last_uid=last_uid, updated_at=now)
+    with SessionLocal() as db:
+        db.connection().execute(stmt.on_conflict_do_update(
+            index_elements=["mailbox"],
+            set_={"uidvalidity": uidvalidity, "last_uid": last_uid, "updated_at": now}))
+        db.commit()
+
+
+# ── Résolution des prospects (une requête par base et par lot) ────────────────
+
+def _resolve(items: List[Dict]) -> Dict[int, object]:
+    """uid → V3ProspectDB, par In-Reply-To puis par adresse From."""
+    import sqlalchemy as sa
+    from .database import SessionLocal
+    from .models import V3ProspectDB
+
+    by_msgid: Dict[str, str] = {}
+    refs = {i["in_reply_to"] for i in items if i["in_reply_to"]}
+    if refs:
+        try:
+            from marketing_module import database as mkt_db
+            from marketing_module.models import ProspectDeliveryDB
+            keys = refs | {r.strip("<>") for r in refs}
+            with mkt_db.SessionLocal() as mdb:
+                for msgid, token in mdb.query(ProspectDeliveryDB.provider_message_id,
+                                              ProspectDeliveryDB.prospect_id).filter(
+                        ProspectDeliveryDB.project_id == _PROJECT,
+                        ProspectDeliveryDB.provider_message_id.in_(keys)):
+                    by_msgid[msgid.strip("<>")] = token
+        except Exception as e:
+            log.debug("IMAP In-Reply-To : %s", e)
+
+    tokens = set(by_msgid.values())
+    emails = {i["from_email"] for i in items}
+    with SessionLocal() as db:
+        rows = db.query(V3ProspectDB).filter(
+            sa.or_(V3ProspectDB.email.in_(emails), V3ProspectDB.token.in_(tokens))
+        ).order_by(V3ProspectDB.token).all()
+        db.expunge_all()
+    by_token = {p.token: p for p in rows}
+    by_email: Dict[str, object] = {}
+    for p in rows:
+        if p.email:
+            by_email.setdefault(p.email.lower(), p)
+
+    out = {}
+    for i in items:
+        p = by_token.get(by_msgid.get(i["in_reply_to"].strip("<>"))) or by_email.get(i["from_email"])
+        if p is not None:
+            out[i["uid"]] = p
+    return out
+
+
+def _mark_replied(tokens: Iterable[str]) -> None:
+    """reply_status none → positive sur le dernier envoi de chaque prospect."""
+    tokens = set(tokens)
+    if not tokens:
+        return
+    try:
+        from marketing_module import database as mkt_db
+        from marketing_module.models import ProspectDeliveryDB, ReplyStatus
+        with mkt_db.SessionLocal() as mdb:
+            latest: Dict[str, object] = {}
+            for d in (mdb.query(ProspectDeliveryDB)
+                      .filter(ProspectDeliveryDB.project_id == _PROJECT,
+                              ProspectDeliveryDB.prospect_id.in_(tokens))
+                      .order_by(ProspectDeliveryDB.created_at.desc())):
+                latest.setdefault(d.prospect_id, d)
+            for d in latest.values():
+                if d.reply_status == ReplyStatus.none:
+                    mkt_db.db_update_delivery(mdb, d.id, {"reply_status": ReplyStatus.positive})
+    except Exception as e:
+        log.warning("IMAP CRM update : %s", e)
+
+
+# ── Poller ────────────────────────────────────────────────────────────────────
+
+class MailboxPoller:
+    """Connexion persistante + filigrane pour une boîte. Thread-safe via self.lock."""
+
+    def __init__(self, cfg: Dict, batch: Optional[int] = None):
+        self.cfg      = cfg
+        self.key      = f"{cfg['user']}@{cfg['host']}/{cfg['folder']}"
+        self.batch    = batch or int(os.getenv("IMAP_FETCH_BATCH", "500"))
+        self.snippet  = int(os.getenv("IMAP_SNIPPET_BYTES", "8192"))
+        self.lock     = threading.RLock()
+        self.conn     = None
+        self.can_idle = False
+
+    def _connect(self):
+        if self.conn is None:
+            import imaplib
+            cls  = imaplib.IMAP4_SSL if self.cfg["ssl"] else imaplib.IMAP4
+            conn = cls(self.cfg["host"], self.cfg["port"])
+            conn.login(self.cfg["user"], self.cfg["password"])
+            self.can_idle = "IDLE" in conn.capabilities
+            self.conn = conn
+            log.info("IMAP : connecté à %s (IDLE=%s)", self.key, self.can_idle)
+        return self.conn
+
+    def close(self) -> None:
+        with self.lock:
+            if self.conn is not None:
+                try:
+                    self.conn.logout()
+                except Exception:
+                    pass
+            self.conn = None
+
+    def _drop(self) -> None:
+        if self.conn is not None:
+            try:
+                self.conn.shutdown()
+            except Exception:
+                pass
+        self.conn = None
+
+    def poll(self) -> Dict:
+        """Examine les nouveaux messages. Une reconnexion si la connexion persistante est morte."""
+        import imaplib
+        with self.lock:
+            try:
+                return self._poll()
+            except (imaplib.IMAP4.abort, OSError) as e:
+                log.info("IMAP %s : reconnexion (%s)", self.key, e)
+                self._drop()
+                return self._poll()
+
+    def _poll(self) -> Dict:
+        conn = self._connect()
+        typ, _ = conn.select(self.cfg["folder"])
+        if typ != "OK":
+            raise RuntimeError(f"SELECT {self.cfg['folder']} : {typ}")
+        validity = int(conn.response("UIDVALIDITY")[1][0])
+        nxt      = conn.response("UIDNEXT")[1][0]
+        if nxt is None:
+            _, data = conn.uid("SEARCH", None, "ALL")
+            nxt = max((int(u) for u in data[0].split()), default=0) + 1
+        uidnext = int(nxt)
+
+        stats = {"examined": 0, "replies": 0, "batches": 0}
+        wm = _load_watermark(self.key)
+        if wm is None or wm[0] != validity:
+            if wm is not None:
+                log.warning("IMAP %s : UIDVALIDITY %s → %s, filigrane réinitialisé", self.key, wm[0], validity)
+            _, data = conn.uid("SEARCH", None, "UNSEEN")
+            unseen = sorted(int(u) for u in (data[0] or b"").split())
+            for i in range(0, len(unseen), self.batch):
+                self._batch(conn, _uid_set(unseen[i:i + self.batch]), stats)
+            _save_watermark(self.key, validity, uidnext - 1)
+        else:
+            last = wm[1]
+            while last + 1 < uidnext:
+                hi = min(last + self.batch, uidnext - 1)
+                self._batch(conn, f"{last + 1}:{hi}", stats)
+                last = hi
+                _save_watermark(self.key, validity, last)
+        if stats["examined"]:
+            log.info("IMAP %s : %d message(s) examiné(s), %d réponse(s) prospect",
+                     self.key, stats["examined"], stats["replies"])
+        return stats
+
+    def _batch(self, conn, uid_set: str, stats: Dict) -> None:
+        from email.parser import BytesHeaderParser
+        from .scheduler import _send_reply_alert
+
+        typ, data = conn.uid("FETCH", uid_set, f"(UID FLAGS BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])")
+        if typ != "OK":
+            raise RuntimeError(f"UID FETCH {uid_set} : {typ}")
+        stats["batches"] += 1
+        parser, items, junk = BytesHeaderParser(), [], []
+        for uid, seen, raw in _parse_fetch(data):
+            stats["examined"] += 1
+            if seen:
+                continue
+            h = parser.parsebytes(raw)
+            from_email = _from_email(h.get("From", ""))
+            if not from_email or "@" not in from_email:
+                junk.append(uid)               # lu quand même pour éviter de le revoir à la main
+                continue
+            items.append({"uid": uid, "from_email": from_email,
+                          "in_reply_to": (h.get("In-Reply-To") or "").strip()})
+        matched = _resolve(items) if items else {}
+
+        if matched:
+            uids = sorted(matched)
+            _, bodies = conn.uid("FETCH", _uid_set(uids), f"(UID BODY.PEEK[]<0.{self.snippet}>)")
+            snippets = {uid: raw for uid, _, raw in _parse_fetch(bodies)}
+            _mark_replied(p.token for p in matched.values())
+            by_uid = {i["uid"]: i for i in items}
+            for uid in uids:
+                p, email_ = matched[uid], by_uid[uid]["from_email"]
+                log.info("IMAP : réponse détectée de %s (%s)", p.name, email_)
+                try:
+                    snippet = _snippet(snippets.get(uid, b""))
+                except Exception:
+                    snippet = ""
+                _send_reply_alert(prospect_name=p.name or email_, prospect_email=email_,
+                                  snippet=snippet, channel="email")
+            stats["replies"] += len(uids)
+        done = sorted(set(matched) | set(junk))
+        if done:
+            conn.uid("STORE", _uid_set(done), "+FLAGS", "(\\Seen)")
+
+    def idle(self, timeout: float, stop: threading.Event) -> bool:
+        """
+        IDLE (RFC 2177) jusqu'à un EXISTS, `timeout` secondes ou `stop`.
+        True si le serveur a signalé un nouveau message.
+        """
+        import imaplib
+        with self.lock:
+            conn = self._connect()
+            tag  = conn._new_tag()
+            conn.send(tag + b" IDLE\r\n")
+            line = conn.readline()
+            if not line.startswith(b"+"):
+                raise imaplib.IMAP4.error(f"IDLE refusé : {line!r}")
+            got, deadline = False, time.monotonic() + timeout
+            while not stop.is_set() and not got:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                ready, _, _ = select.select([conn.sock], [], [], min(1.0, left))
+                if ready or getattr(conn.sock, "pending", lambda: 0)():
+                    line = conn.readline()
+                    if not line:
+                        raise imaplib.IMAP4.abort("connexion fermée pendant IDLE")
+                    got = b"EXISTS" in line
+            conn.send(b"DONE\r\n")
+            while True:
+                line = conn.readline()
+                if not line:
+                    raise imaplib.IMAP4.abort("connexion fermée après IDLE")
+                if line.startswith(tag):
+                    break
+            return got
+
+
+class ReplyWatcher(threading.Thread):
+    """Boucle poll → IDLE → poll… sur la connexion persistante du poller."""
+
+    def __init__(self, poller: MailboxPoller, idle_s: Optional[float] = None):
+        super().__init__(name="imap-idle", daemon=True)
+        self.poller = poller
+        self.idle_s = idle_s or float(os.getenv("IMAP_IDLE_S", "600"))
+        self.stop   = threading.Event()
+
+    def run(self) -> None:
+        while not self.stop.is_set():
+            try:
+                self.poller.poll()
+                if not self.poller.can_idle:
+                    log.info("IMAP %s : IDLE non supporté, polling par le job 5 min", self.poller.key)
+                    return
+                self.poller.idle(self.idle_s, self.stop)
+            except Exception as e:
+                log.warning("IMAP %s : %s — nouvel essai dans 30 s", self.poller.key, e)
+                with self.poller.lock:
+                    self.poller._drop()
+                self.stop.wait(30)
+        self.poller.close()
+
+
+_pollers: Dict[str, MailboxPoller] = {}
+_watcher: Optional[ReplyWatcher] = None
+
+
+def get_poller() -> Optional[MailboxPoller]:
+    cfg = mailbox_config()
+    if cfg is None:
+        return None
+    key = f"{cfg['user']}@{cfg['host']}/{cfg['folder']}"
+    if key not in _pollers:
+        _pollers[key] = MailboxPoller(cfg)
+    return _pollers[key]
+
+
+def poll_once() -> Optional[Dict]:
+    """Job 5 min : ne fait rien si le thread IDLE tourne (il est déjà à jour)."""
+    if _watcher is not None and _watcher.is_alive():
+        return None
+    poller = get_poller()
+    return poller.poll() if poller else None
+
+
+def start_watcher() -> None:
+    """Démarre le thread IDLE (process leader). Sans config IMAP ou IMAP_IDLE=false : rien."""
+    global _watcher
+    if os.getenv("IMAP_IDLE", "true").lower() == "false":
+        return
+    poller = get_poller()
+    if poller is None or (_watcher is not None and _watcher.is_alive()):
+        return
+    _watcher = ReplyWatcher(poller)
+    _watcher.start()
+
+
+def stop_watcher(timeout: float = 10) -> None:
+    global _watcher
+    w, _watcher = _watcher, None
+    if w is not None:
+        w.stop.set()
+        w.join(timeout=timeout)
+    for p in list(_pollers.values()):
+        p.close()
@@ -0,0 +1,104 @@
+"""
+JOB_COSTS — Coûts API par exécution de job (job_cost_log) et rollup quotidien (job_cost_daily).
+
+db_cost_stats chargeait toutes les lignes de job_cost_log à chaque affichage du hub admin.
+Désormais :
+
+- record()  : insère la ligne brute ET incrémente la ligne (jour, job) du rollup dans la
+              même transaction — le rollup est toujours à jour, sans recalcul
+- compact() : supprime les lignes brutes plus anciennes que JOB_COST_RETENTION_DAYS
+              (défaut 90) ; elles sont déjà comptées dans le rollup, conservé sans limite
+- totals() / daily() : lectures du rollup (une ligne par jour et par job), agrégées en SQL
+
+Les lignes brutes restent la source des derniers jobs affichés (recent()).
+"""
+import logging, os
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+log = logging.getLogger(__name__)
+
+_SUMS = ("nb_appels_google", "nb_appels_gemini", "nb_leads_generes", "cost_estimated")
+
+
+def record(db, job_id: str, started_at: datetime, ended_at: datetime = None, paire: str = None,
+           nb_appels_google: int = 0, nb_appels_gemini: int = 0, nb_leads_generes: int = 0,
+           cost_estimated: float = 0.0) -> None:
+    """Ligne brute + rollup du jour, dans la transaction de l'appelant (commit par l'appelant)."""
+    from sqlalchemy.dialects.sqlite import insert
+    from .models import JobCostDailyDB, JobCostLogDB
+
+    now = datetime.utcnow()
+    row = {"nb_appels_google": nb_appels_google or 0, "nb_appels_gemini": nb_appels_gemini or 0,
+           "nb_leads_generes": nb_leads_generes or 0, "cost_estimated": cost_estimated or 0.0}
+    db.add(JobCostLogDB(job_id=job_id, started_at=started_at, ended_at=ended_at, paire=paire,
+                        created_at=now, **row))
+    stmt = insert(JobCostDailyDB).values(day=now.date(), job_id=job_id, nb_runs=1, **row)
+    db.connection().execute(stmt.on_conflict_do_update(
+        index_elements=["day", "job_id"],
+        set_={"nb_runs": JobCostDailyDB.nb_runs + 1,
+              **{c: getattr(JobCostDailyDB, c) + getattr(stmt.excluded, c) for c in _SUMS}}))
+
+
+def compact(days: int = None) -> int:
+    """Supprime les lignes brutes plus anciennes que JOB_COST_RETENTION_DAYS (déjà dans le rollup)."""
+    from .database import SessionLocal
+    from .models import JobCostLogDB
+
+    days = days or int(os.getenv("JOB_COST_RETENTION_DAYS", "90"))
+    with SessionLocal() as db:
+        n = (db.query(JobCostLogDB)
+               .filter(JobCostLogDB.created_at < datetime.utcnow() - timedelta(days=days))
+               .delete(synchronize_session=False))
+        db.commit()
+    if n:
+        log.info("job_cost_log : %d ligne(s) de plus de %d jours compactées", n, days)
+    return n
+
+
+def totals(db, since: date = None) -> Dict:
+    """Sommes depuis le rollup (tout l'historique, ou depuis `since`)."""
+    from sqlalchemy import func
+    from .models import JobCostDailyDB as R
+
+    q = db.query(func.coalesce(func.sum(R.nb_runs), 0).label("nb_runs"),
+                 *(func.coalesce(func.sum(getattr(R, c)), 0).label(c) for c in _SUMS))
+    if since:
+        q = q.filter(R.day >= since)
+    return q.one()._asdict()
+
+
+def by_job(db, since: date = None) -> List[Dict]:
+    """Sommes par job depuis le rollup, les plus coûteux d'abord."""
+    from sqlalchemy import func
+    from .models import JobCostDailyDB as R
+
+    q = db.query(R.job_id, func.sum(R.nb_runs).label("nb_runs"),
+                 *(func.sum(getattr(R, c)).label(c) for c in _SUMS))
+    if since:
+        q = q.filter(R.day >= since)
+    return [r._asdict() for r in q.group_by(R.job_id).order_by(func.sum(R.cost_estimated).desc())]
+
+
+def daily(db, days: int = 14) -> List[Dict]:
+    """Un point par jour (tous jobs confondus) sur les `days` derniers jours, jours vides à 0."""
+    from sqlalchemy import func
+    from .models import JobCostDailyDB as R
+
+    start = datetime.utcnow().date() - timedelta(days=days - 1)
+    rows = {r.day: r for r in db.query(R.day, func.sum(R.nb_runs).label("nb_runs"),
+                                        *(func.sum(getattr(R, c)).label(c) for c in _SUMS))
+                                 .filter(R.day >= start).group_by(R.day)}
+    out = []
+    for i in range(days):
+        d = start + timedelta(days=i)
+        r = rows.get(d)
+        out.append({"day": d, "nb_runs": r.nb_runs if r else 0,
+                    **{c: (getattr(r, c) if r else 0) for c in _SUMS}})
+    return out
+
+
+def recent(db, limit: int = 20) -> List:
+    """Dernières exécutions (lignes brutes)."""
+    from .models import JobCostLogDB
+    return db.query(JobCostLogDB).order_by(JobCostLogDB.created_at.desc()).limit(limit).all()
@@ -0,0 +1,164 @@
+"""
+JOBQUEUE — File de jobs persistante (table job_queue) entre l'API et le worker.
+
+SCHEDULER_MODE=inprocess (défaut) : comportement historique, le BackgroundScheduler
+tourne dans le process API (un seul worker leader, cf. src.leader) et submit() lance
+le job dans un thread du process.
+
+SCHEDULER_MODE=worker : le process API ne fait tourner aucun job. Le scheduler et
+l'exécution des jobs vivent dans `python -m src.worker` ; les boutons admin ne font
+qu'appeler submit(), qui insère une ligne job_queue (un job déjà en file ou en cours
+avec les mêmes arguments n'est pas dupliqué). Le travail CPU des jobs (parsing JSON,
+fuzzy matching, rendu HTML) ne dispute plus le GIL aux requêtes HTTP.
+
+Une ligne "running" dont le worker ne donne plus de heartbeat depuis
+JOB_QUEUE_LEASE_S secondes (défaut 300) est remise en file, au plus
+JOB_QUEUE_MAX_ATTEMPTS fois (défaut 3).
+"""
+import importlib, json, logging, os, threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+# nom → "module:fonction" (import paresseux côté worker)
+JOBS: Dict[str, str] = {
+    "outbound":         "src.scheduler:_job_outbound",
+    "refresh_ia":       "src.scheduler:_job_refresh_ia",
+    "provision_leads":  "src.scheduler:_job_provision_leads",
+    "sirene_qualify":   "src.scheduler:run_sirene_qualify",
+}
+
+
+def worker_mode() -> bool:
+    return os.getenv("SCHEDULER_MODE", "inprocess").lower() == "worker"
+
+
+def _resolve(name: str):
+    mod, func = JOBS[name].split(":")
+    return getattr(importlib.import_module(mod), func)
+
+
+def submit(name: str, **kwargs) -> Dict:
+    """
+    Point d'entrée des routes API. Mode worker : mise en file (retourne {"queued": True, "id"}).
+    Mode inprocess : thread daemon comme avant (retourne {"queued": False}).
+    """
+    if name not in JOBS:
+        raise KeyError(f"job inconnu : {name}")
+    if worker_mode():
+        return {"queued": True, "id": enqueue(name, kwargs)}
+    threading.Thread(target=_resolve(name), kwargs=kwargs, daemon=True, name=f"job-{name}").start()
+    return {"queued": False, "id": None}
+
+
+def enqueue(name: str, kwargs: Optional[Dict] = None) -> int:
+    """Insère le job sauf si le même (nom + arguments) est déjà en file ou en cours. Retourne son id."""
+    from .database import SessionLocal
+    from .models import JobQueueDB
+
+    payload = json.dumps(kwargs or {}, sort_keys=True)
+    with SessionLocal() as db:
+        existing = db.query(JobQueueDB.id).filter(
+            JobQueueDB.name == name, JobQueueDB.kwargs == payload,
+            JobQueueDB.status.in_(("queued", "running")),
+        ).first()
+        if existing:
+            return existing[0]
+        row = JobQueueDB(name=name, kwargs=payload, status="queued", enqueued_at=datetime.utcnow())
+        db.add(row)
+        db.commit()
+        log.info("[JOBQ] %s en file (#%d) %s", name, row.id, payload)
+        return row.id
+
+
+def claim(worker: str) -> Optional[Dict]:
+    """Réserve le plus ancien job en file (UPDATE … RETURNING atomique). None si file vide."""
+    import sqlalchemy as sa
+    from .database import SessionLocal
+    from .models import JobQueueDB
+
+    now = datetime.utcnow()
+    oldest = (sa.select(JobQueueDB.id).where(JobQueueDB.status == "queued")
+              .order_by(JobQueueDB.id).limit(1).scalar_subquery())
+    with SessionLocal() as db:
+        row = db.execute(
+            sa.update(JobQueueDB)
+            .where(JobQueueDB.id == oldest, JobQueueDB.status == "queued")
+            .values(status="running", worker=worker, started_at=now, heartbeat_at=now,
+                    attempts=JobQueueDB.attempts + 1)
+            .returning(JobQueueDB.id, JobQueueDB.name, JobQueueDB.kwargs, JobQueueDB.attempts)
+        ).mappings().first()
+        db.commit()
+    return dict(row) if row else None
+
+
+def run(job: Dict) -> bool:
+    """Exécute un job réservé et enregistre son issue (done / failed)."""
+    import sqlalchemy as sa
+    from .database import SessionLocal
+    from .models import JobQueueDB
+
+    error = None
+    try:
+        _resolve(job["name"])(**json.loads(job["kwargs"] or "{}"))
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        log.error("[JOBQ] %s (#%d) échoué : %s", job["name"], job["id"], error)
+    with SessionLocal() as db:
+        db.execute(sa.update(JobQueueDB).where(JobQueueDB.id == job["id"]).values(
+            status="failed" if error else "done", finished_at=datetime.utcnow(), error=error))
+        db.commit()
+    return error is None
+
+
+def heartbeat(job_ids: List[int]) -> None:
+    """Le worker signale que ses jobs en cours tournent toujours."""
+    import sqlalchemy as sa
+    from .database import SessionLocal
+    from .models import JobQueueDB
+
+    if not job_ids:
+        return
+    with SessionLocal() as db:
+        db.execute(sa.update(JobQueueDB).where(JobQueueDB.id.in_(job_ids),
+                                               JobQueueDB.status == "running")
+                   .values(heartbeat_at=datetime.utcnow()))
+        db.commit()
+
+
+def requeue_stale() -> int:
+    """Remet en file les jobs "running" orphelins (worker mort). Retourne le nombre de lignes."""
+    import sqlalchemy as sa
+    from .database import SessionLocal
+    from .models import JobQueueDB
+
+    now   = datetime.utcnow()
+    limit = now - timedelta(seconds=float(os.getenv("JOB_QUEUE_LEASE_S", "300")))
+    max_attempts = int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", "3"))
+    stale = sa.and_(JobQueueDB.status == "running", JobQueueDB.heartbeat_at < limit)
+    with SessionLocal() as db:
+        dead = db.execute(sa.update(JobQueueDB)
+                          .where(stale, JobQueueDB.attempts >= max_attempts)
+                          .values(status="failed", finished_at=now,
+                                  error="worker perdu (heartbeat expiré)")).rowcount
+        back = db.execute(sa.update(JobQueueDB).where(stale)
+                          .values(status="queued", worker=None)).rowcount
+        db.commit()
+    if dead or back:
+        log.warning("[JOBQ] jobs orphelins : %d remis en file, %d abandonnés", back, dead)
+    return back
+
+
+def recent(limit: int = 20) -> List[Dict]:
+    """Derniers jobs (admin)."""
+    from .database import SessionLocal
+    from .models import JobQueueDB
+
+    with SessionLocal() as db:
+        rows = db.query(JobQueueDB).order_by(JobQueueDB.id.desc()).limit(limit).all()
+        return [{"id": r.id, "name": r.name, "kwargs": r.kwargs, "status": r.status,
+                 "worker": r.worker, "attempts": r.attempts,
+                 "enqueued_at": r.enqueued_at.isoformat() if r.enqueued_at else None,
+                 "finished_at": r.finished_at.isoformat() if r.finished_at else None,
+                 "error": r.error} for r in rows]
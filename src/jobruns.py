@@ -0,0 +1,275 @@
+"""
+JOBRUNS — Registre des exécutions des jobs du scheduler (table job_runs).
+
+Chaque fonction `_job_*` de src.scheduler est décorée par @tracked("<id APScheduler>") :
+une ligne job_runs est ouverte au démarrage (status "running") puis fermée à la fin avec
+la durée, les volumes traités (count()), les erreurs et la hausse du pic RSS du process.
+
+- items_in / items_out : renseignés par le job via count(items_in=…, items_out=…)
+- errors / error       : exception levée par le job, ou log.error émis par un logger
+                         src.* dans le thread du job (la plupart des jobs avalent leurs
+                         exceptions et se contentent de les logger)
+- overlapped           : une autre exécution du même job était encore "running" au
+                         démarrage (même process ou autre process : worker, leader)
+- status "skipped"     : exécution refusée par APScheduler (max_instances atteint) ou
+                         ratée (misfire), cf. record_skipped()
+
+Les écritures du registre ne font jamais échouer le job (log.warning seulement).
+stats() calcule p50 / p95 par job et la tendance par jour pour l'admin.
+"""
+import functools, logging, math, os, socket, threading, time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_local = threading.local()
+_handler_lock = threading.Lock()
+_handler_installed = False
+_RUNNING: Dict[str, int] = {}          # job → exécutions en cours dans ce process
+_RUNNING_LOCK = threading.Lock()
+
+
+def _host() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _peak_rss_kb() -> Optional[int]:
+    """Pic de RSS du process (ko sous Linux) ; None si le module resource est indisponible."""
+    try:
+        import resource
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    except Exception:
+        return None
+
+
+class _Run:
+    __slots__ = ("job", "items_in", "items_out", "errors", "error")
+
+    def __init__(self, job: str):
+        self.job, self.items_in, self.items_out, self.errors, self.error = job, 0, 0, 0, None
+
+
+class _ErrorCapture(logging.Handler):
+    """Compte les log.error des loggers src.* émis dans le thread d'un job suivi."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+
+    def emit(self, record):
+        stack = getattr(_local, "stack", None)
+        if not stack:
+            return
+        run = stack[-1]
+        run.errors += 1
+        if run.error is None:
+            try:
+                run.error = record.getMessage()[:1000]
+            except Exception:
+                run.error = str(record.msg)[:1000]
+
+
+def _install_handler() -> None:
+    global _handler_installed
+    if _handler_installed:
+        return
+    with _handler_lock:
+        if not _handler_installed:
+            logging.getLogger("src").addHandler(_ErrorCapture())
+            _handler_installed = True
+
+
+def count(items_in: int = 0, items_out: int = 0) -> None:
+    """Ajoute des volumes à l'exécution en cours dans ce thread (sans effet hors job suivi)."""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].items_in += int(items_in or 0)
+        stack[-1].items_out += int(items_out or 0)
+
+
+def _open(job: str, started: datetime) -> Tuple[Optional[int], bool]:
+    """Insère la ligne "running". Retourne (id, overlapped)."""
+    from .database import SessionLocal
+    from .models import JobRunDB
+
+    stale = started - timedelta(hours=float(os.getenv("JOB_RUNS_STALE_H", "6")))
+    try:
+        with SessionLocal() as db:
+            other = (db.query(JobRunDB.id)
+                       .filter(JobRunDB.job == job, JobRunDB.status == "running",
+                               JobRunDB.started_at >= stale)
+                       .first())
+            row = JobRunDB(job=job, host=_host(), started_at=started, status="running",
+                           overlapped=other is not None)
+            db.add(row)
+            db.commit()
+            return row.id, other is not None
+    except Exception as e:
+        log.warning("[JOBRUNS] ouverture %s impossible : %s", job, e)
+        return None, False
+
+
+def _close(run_id: Optional[int], run: _Run, finished: datetime, duration_ms: int,
+           rss_delta: Optional[int], exc: Optional[BaseException]) -> None:
+    from .database import SessionLocal
+    from .models import JobRunDB
+
+    if run_id is None:
+        return
+    error = run.error
+    if exc is not None:
+        error = f"{type(exc).__name__}: {exc}"[:1000]
+    try:
+        with SessionLocal() as db:
+            db.query(JobRunDB).filter(JobRunDB.id == run_id).update({
+                JobRunDB.finished_at: finished,
+                JobRunDB.duration_ms: duration_ms,
+                JobRunDB.status:      "error" if (exc is not None or run.errors) else "ok",
+                JobRunDB.items_in:    run.items_in,
+                JobRunDB.items_out:   run.items_out,
+                JobRunDB.errors:      run.errors + (1 if exc is not None else 0),
+                JobRunDB.error:       error,
+                JobRunDB.rss_peak_delta_kb: rss_delta,
+            }, synchronize_session=False)
+            db.commit()
+    except Exception as e:
+        log.warning("[JOBRUNS] clôture %s impossible : %s", run.job, e)
+
+
+def tracked(job: str) -> Callable:
+    """Décorateur : enregistre chaque exécution de la fonction sous le nom `job`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            _install_handler()
+            started = datetime.utcnow()
+            t0, rss0 = time.perf_counter(), _peak_rss_kb()
+            with _RUNNING_LOCK:
+                _RUNNING[job] = _RUNNING.get(job, 0) + 1
+                concurrent = _RUNNING[job] > 1
+            run_id, overlapped = _open(job, started)
+            overlapped = overlapped or concurrent
+            if overlapped:
+                log.warning("[JOBRUNS] %s démarre alors qu'une exécution précédente tourne encore", job)
+            run = _Run(job)
+            stack = getattr(_local, "stack", None)
+            if stack is None:
+                stack = _local.stack = []
+            stack.append(run)
+            exc = None
+            try:
+                return fn(*args, **kwargs)
+            except BaseException as e:
+                exc = e
+                raise
+            finally:
+                stack.pop()
+                with _RUNNING_LOCK:
+                    _RUNNING[job] -= 1
+                rss1 = _peak_rss_kb()
+                _close(run_id, run, datetime.utcnow(), int((time.perf_counter() - t0) * 1000),
+                       rss1 - rss0 if rss0 is not None and rss1 is not None else None, exc)
+        wrapper.job_name = job
+        return wrapper
+    return deco
+
+
+def running(job: str) -> int:
+    """Exécutions en cours de `job` dans ce process."""
+    with _RUNNING_LOCK:
+        return _RUNNING.get(job, 0)
+
+
+def record_skipped(job: str, reason: str, at: Optional[datetime] = None) -> None:
+    """Exécution non lancée par APScheduler (max_instances atteint, misfire)."""
+    from .database import SessionLocal
+    from .models import JobRunDB
+
+    at = at or datetime.utcnow()
+    try:
+        with SessionLocal() as db:
+            db.add(JobRunDB(job=job, host=_host(), started_at=at, finished_at=at, status="skipped",
+                            overlapped=reason == "max_instances", error=reason))
+            db.commit()
+    except Exception as e:
+        log.warning("[JOBRUNS] skip %s non enregistré : %s", job, e)
+
+
+def purge(days: int = None) -> int:
+    """Supprime les exécutions plus anciennes que JOB_RUNS_RETENTION_DAYS (défaut 30)."""
+    from .database import SessionLocal
+    from .models import JobRunDB
+
+    days = days or int(os.getenv("JOB_RUNS_RETENTION_DAYS", "30"))
+    with SessionLocal() as db:
+        n = (db.query(JobRunDB)
+               .filter(JobRunDB.started_at < datetime.utcnow() - timedelta(days=days))
+               .delete(synchronize_session=False))
+        db.commit()
+    return n
+
+
+def _pct(values: List[int], p: float) -> Optional[int]:
+    """Percentile au rang le plus proche (valeurs triées)."""
+    if not values:
+        return None
+    k = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+    return values[k]
+
+
+def stats(days: int = 7, intervals: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """
+    Agrégats par job sur `days` jours : runs, erreurs, sauts, chevauchements, p50 / p95 /
+    max de la durée, volumes moyens, pic RSS, et tendance jour par jour (p50 / p95).
+    `intervals` (job → secondes entre deux déclenchements) ajoute headroom = p95 / intervalle :
+    au-delà de ~0.8 le job est proche de chevaucher l'exécution suivante.
+    """
+    from .database import SessionLocal
+    from .models import JobRunDB
+
+    since = datetime.utcnow() - timedelta(days=days)
+    with SessionLocal() as db:
+        rows = (db.query(JobRunDB.job, JobRunDB.started_at, JobRunDB.status, JobRunDB.duration_ms,
+                         JobRunDB.overlapped, JobRunDB.items_in, JobRunDB.items_out,
+                         JobRunDB.rss_peak_delta_kb, JobRunDB.error)
+                  .filter(JobRunDB.started_at >= since)
+                  .order_by(JobRunDB.job, JobRunDB.started_at)
+                  .all())
+
+    by_job: Dict[str, list] = {}
+    for r in rows:
+        by_job.setdefault(r.job, []).append(r)
+
+    out = []
+    for job, runs in sorted(by_job.items()):
+        done = [r for r in runs if r.duration_ms is not None]
+        durations = sorted(r.duration_ms for r in done)
+        per_day: Dict[str, List[int]] = {}
+        for r in done:
+            per_day.setdefault(r.started_at.strftime("%Y-%m-%d"), []).append(r.duration_ms)
+        trend = [{"day": d, "runs": len(v), "p50_ms": _pct(sorted(v), 50), "p95_ms": _pct(sorted(v), 95)}
+                 for d, v in sorted(per_day.items())]
+        last_err = next((r for r in reversed(runs) if r.status == "error"), None)
+        rss = [r.rss_peak_delta_kb for r in done if r.rss_peak_delta_kb is not None]
+        item = {
+            "job":        job,
+            "runs":       len(done),
+            "running":    sum(1 for r in runs if r.status == "running"),
+            "errors":     sum(1 for r in runs if r.status == "error"),
+            "skipped":    sum(1 for r in runs if r.status == "skipped"),
+            "overlapped": sum(1 for r in runs if r.overlapped),
+            "p50_ms":     _pct(durations, 50),
+            "p95_ms":     _pct(durations, 95),
+            "max_ms":     durations[-1] if durations else None,
+            "items_in_avg":  round(sum(r.items_in or 0 for r in done) / len(done), 1) if done else None,
+            "items_out_avg": round(sum(r.items_out or 0 for r in done) / len(done), 1) if done else None,
+            "rss_peak_delta_kb_max": max(rss) if rss else None,
+            "last_run":   runs[-1].started_at.isoformat(),
+            "last_error": last_err.error if last_err else None,
+            "trend":      trend,
+        }
+        if intervals and intervals.get(job) and item["p95_ms"] is not None:
+            item["interval_s"] = intervals[job]
+            item["headroom"] = round(item["p95_ms"] / 1000 / intervals[job], 3)
+        out.append(item)
+    return out
@@ -0,0 +1,177 @@
+"""
+LEADER — Élection d'un process leader par bail (lease) dans SQLite.
+
+Avec plusieurs workers uvicorn / gunicorn, chaque process passe par le startup FastAPI.
+Un seul doit faire tourner le BackgroundScheduler (outbound, warming, IMAP…) ; les
+autres ne servent que le HTTP.
+
+Bail = une ligne scheduler_lease par nom :
+  - acquisition / renouvellement atomiques : un seul UPSERT conditionnel
+    (libre, expiré, ou déjà à nous), exécuté sous le verrou d'écriture SQLite
+  - heartbeat toutes les LEADER_HEARTBEAT_S secondes (défaut 10), bail valable
+    LEADER_LEASE_TTL_S secondes (défaut 30)
+  - leader mort (kill -9, OOM) : le bail expire, un autre process le reprend au
+    heartbeat suivant (bascule en TTL + heartbeat au pire)
+  - arrêt propre : les jobs en cours sont attendus (au plus LEADER_DRAIN_S secondes,
+    défaut 10), puis le bail est rendu tout de suite (expires_at = maintenant)
+  - renouvellement impossible (DB verrouillée…) : le leader garde la main jusqu'à
+    LEADER_DRAIN_S secondes avant l'expiration de son bail, puis s'arrête de lui-même :
+    ses jobs en cours finissent avant qu'un autre process puisse reprendre le bail
+"""
+import logging, os, socket, threading, uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+log = logging.getLogger(__name__)
+
+
+def _ttl() -> float:
+    return float(os.getenv("LEADER_LEASE_TTL_S", "30"))
+
+
+def _heartbeat() -> float:
+    return float(os.getenv("LEADER_HEARTBEAT_S", "10"))
+
+
+def _drain() -> float:
+    return float(os.getenv("LEADER_DRAIN_S", "10"))
+
+
+def acquire(name: str, holder: str, ttl: float) -> bool:
+    """Prend ou renouvelle le bail `name` pour `holder`. True si holder le détient à la sortie."""
+    import sqlalchemy as sa
+    from sqlalchemy.dialects.sqlite import insert
+    from .database import SessionLocal
+    from .models import SchedulerLeaseDB
+
+    now  = datetime.utcnow()
+    exp  = now + timedelta(seconds=ttl)
+    stmt = insert(SchedulerLeaseDB).values(name=name, holder=holder, acquired_at=now,
+                                           heartbeat_at=now, expires_at=exp)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={
+            "holder":       holder,
+            "acquired_at":  sa.case((SchedulerLeaseDB.holder == holder, SchedulerLeaseDB.acquired_at),
+                                    else_=now),
+            "heartbeat_at": now,
+            "expires_at":   exp,
+        },
+        where=(SchedulerLeaseDB.holder == holder) | (SchedulerLeaseDB.expires_at < now),
+    )
+    with SessionLocal() as db:
+        db.connection().execute(stmt)
+        current = db.execute(sa.select(SchedulerLeaseDB.holder)
+                             .where(SchedulerLeaseDB.name == name)).scalar()
+        db.commit()
+    return current == holder
+
+
+def release(name: str, holder: str) -> None:
+    """Rend le bail s'il est à nous (les autres process peuvent le prendre immédiatement)."""
+    import sqlalchemy as sa
+    from .database import SessionLocal
+    from .models import SchedulerLeaseDB
+
+    with SessionLocal() as db:
+        db.execute(sa.update(SchedulerLeaseDB)
+                   .where(SchedulerLeaseDB.name == name, SchedulerLeaseDB.holder == holder)
+                   .values(expires_at=datetime.utcnow()))
+        db.commit()
+
+
+def lease_status(name: str = "scheduler") -> Dict:
+    """État du bail pour l'admin : détenteur, dernier heartbeat, expiration, ce process."""
+    from .database import SessionLocal
+    from .models import SchedulerLeaseDB
+
+    me = _ELECTORS.get(name)
+    with SessionLocal() as db:
+        row = db.get(SchedulerLeaseDB, name)
+        data = {
+            "name":         name,
+            "holder":       row.holder if row else None,
+            "acquired_at":  row.acquired_at.isoformat() if row else None,
+            "heartbeat_at": row.heartbeat_at.isoformat() if row else None,
+            "expires_at":   row.expires_at.isoformat() if row else None,
+            "active":       bool(row and row.expires_at > datetime.utcnow()),
+        }
+    data["me"]        = me.holder if me else None
+    data["is_leader"] = bool(me and me.is_leader)
+    return data
+
+
+_ELECTORS: Dict[str, "LeaderElector"] = {}
+
+
+class LeaderElector:
+    """
+    Thread d'élection : appelle on_acquire() quand ce process devient leader,
+    on_release() quand il perd le bail ou s'arrête. on_release() doit attendre les jobs
+    en cours (au plus `drain` secondes) : le bail n'est rendu qu'après son retour.
+    """
+
+    def __init__(self, name: str, on_acquire: Callable[[], None], on_release: Callable[[], None],
+                 ttl: Optional[float] = None, heartbeat: Optional[float] = None,
+                 drain: Optional[float] = None):
+        self.name       = name
+        self.holder     = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl        = ttl or _ttl()
+        self.heartbeat  = heartbeat or _heartbeat()
+        self.drain      = min(_drain() if drain is None else drain, self.ttl / 2)
+        self.is_leader  = False
+        self._on_acquire = on_acquire
+        self._on_release = on_release
+        self._expires_at = 0.0
+        self._stop       = threading.Event()
+        self._lock       = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        _ELECTORS[self.name] = self
+        self._tick()   # 1er essai synchrone : un process seul démarre ses jobs tout de suite
+        self._thread = threading.Thread(target=self._loop, name=f"leader-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.heartbeat + 5)
+        with self._lock:
+            if self.is_leader:
+                self.is_leader = False
+                self._on_release()
+                try:
+                    release(self.name, self.holder)
+                except Exception as e:
+                    log.warning("[LEADER] %s : bail non rendu — %s", self.name, e)
+        if _ELECTORS.get(self.name) is self:
+            del _ELECTORS[self.name]
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.heartbeat):
+            self._tick()
+
+    def _tick(self) -> None:
+        import time
+        with self._lock:
+            if self._stop.is_set():
+                return
+            t0 = time.monotonic()
+            try:
+                held = acquire(self.name, self.holder, self.ttl)
+                if held:
+                    self._expires_at = t0 + self.ttl
+            except Exception as e:
+                # marge `drain` : les jobs en cours finissent avant l'expiration du bail
+                held = self.is_leader and time.monotonic() < self._expires_at - self.drain
+                log.warning("[LEADER] %s : heartbeat échoué (%s) — leader=%s", self.name, e, held)
+
+            if held and not self.is_leader:
+                self.is_leader = True
+                log.info("[LEADER] %s : bail acquis par %s", self.name, self.holder)
+                self._on_acquire()
+            elif not held and self.is_leader:
+                self.is_leader = False
+                log.warning("[LEADER] %s : bail perdu par %s", self.name, self.holder)
+                self._on_release()
@@ -0,0 +1,252 @@
+"""
+MIGRATE — Migrations de schéma versionnées de presence_ia.db (table schema_migrations).
+
+init_db rejouait à chaque démarrage une trentaine d'ALTER TABLE … ADD COLUMN dans des
+try/except muets. Le schéma évolue désormais par scripts numérotés
+src/migrations/NNNN_nom.py, chacun définissant upgrade(op) :
+
+  - appliqué une seule fois, dans sa propre transaction (BEGIN IMMEDIATE : DDL, index et
+    backfill de données sont annulés ensemble si le script échoue — l'erreur remonte)
+  - enregistré dans schema_migrations avec le sha256 de son source ; un script modifié
+    après application lève MigrationError (ne jamais réécrire un script appliqué :
+    en ajouter un nouveau)
+  - plusieurs process qui démarrent ensemble (API, worker) : le verrou d'écriture
+    sérialise, la version est revérifiée sous le verrou
+
+  op.execute(sql, **params)           SQL brut (backfill, UPDATE de données…)
+  op.add_column(table, "col TYPE …")  ALTER TABLE ADD COLUMN si la colonne manque
+  op.create_index(nom, table, cols)   CREATE [UNIQUE] INDEX IF NOT EXISTS [… WHERE partiel]
+  op.create_tables(*modèles)          tables absentes (toutes si aucun modèle ; modèle ou nom de table)
+  op.columns(table) / op.has_table(table)
+
+Démarrage (ensure_current) : une seule requête, SELECT max(version) ; si elle vaut la
+dernière version connue rien d'autre n'est fait. Sinon : checksums vérifiés, scripts en
+attente appliqués. Les seeds sont gérés à part (src.seeds, empreinte par seed) ; un
+backfill de données ponctuel va dans une migration, pas dans un seed.
+
+CLI : python -m src.migrate [status|up|verify|seed] [--db chemin] [--to version]
+"""
+import hashlib, importlib.util, logging, os, re, time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+def discover(directory: Path = None) -> List[Dict]:
+    """Scripts de migration triés par version : [{"version", "name", "path", "checksum"}]."""
+    directory = Path(directory or MIGRATIONS_DIR)
+    out: Dict[int, Dict] = {}
+    for path in sorted(directory.iterdir()):
+        m = _FILE_RE.match(path.name)
+        if not m:
+            continue
+        version = int(m.group(1))
+        if version in out:
+            raise MigrationError(f"version {version:04d} en double : {out[version]['path'].name}, {path.name}")
+        out[version] = {"version": version, "name": m.group(2), "path": path,
+                        "checksum": hashlib.sha256(path.read_bytes()).hexdigest()}
+    return [out[v] for v in sorted(out)]
+
+
+def latest_version(directory: Path = None) -> int:
+    """Dernière version connue du code — noms de fichiers seulement, aucun script lu."""
+    directory = Path(directory or MIGRATIONS_DIR)
+    return max((int(m.group(1)) for m in map(_FILE_RE.match, os.listdir(directory)) if m), default=0)
+
+
+def _load(migration: Dict):
+    spec = importlib.util.spec_from_file_location(
+        f"src.migrations.m{migration['version']:04d}_{migration['name']}", migration["path"])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.upgrade
+
+
+class Op:
+    """Opérations offertes aux scripts — toutes dans la transaction de la migration."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql: str, **params):
+        from sqlalchemy import text
+        return self.conn.execute(text(sql), params)
+
+    def has_table(self, table: str) -> bool:
+        return self.conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).first() is not None
+
+    def columns(self, table: str) -> set:
+        return {r[1] for r in self.conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+    def add_column(self, table: str, coldef: str) -> bool:
+        """ALTER TABLE … ADD COLUMN coldef si la table existe et n'a pas encore la colonne."""
+        if not self.has_table(table) or coldef.split()[0] in self.columns(table):
+            return False
+        self.conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {coldef}")
+        return True
+
+    def create_index(self, name: str, table: str, cols: str, unique: bool = False, where: str = None) -> None:
+        """where : index partiel (seules les requêtes dont le WHERE implique ce prédicat l'utilisent)."""
+        self.conn.exec_driver_sql(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({cols})"
+            + (f" WHERE {where}" if where else ""))
+
+    def create_tables(self, *models) -> None:
+        from .models import Base
+        tables = [Base.metadata.tables[m] if isinstance(m, str) else m.__table__ for m in models] or None
+        Base.metadata.create_all(bind=self.conn, tables=tables, checkfirst=True)
+
+
+def current_version(conn) -> Optional[int]:
+    """max(version) appliquée ; None si schema_migrations n'existe pas encore."""
+    from sqlalchemy.exc import OperationalError
+    try:
+        return conn.exec_driver_sql("SELECT max(version) FROM schema_migrations").scalar() or 0
+    except OperationalError:
+        return None
+
+
+def _applied(conn) -> Dict[int, str]:
+    return dict(conn.exec_driver_sql("SELECT version, checksum FROM schema_migrations").all())
+
+
+def _verify(applied: Dict[int, str], migrations: List[Dict]) -> None:
+    known = {m["version"]: m for m in migrations}
+    for version, checksum in sorted(applied.items()):
+        m = known.get(version)
+        if m is None:
+            log.warning("migration %04d appliquée mais absente du code (version plus récente ?)", version)
+        elif m["checksum"] != checksum:
+            raise MigrationError(f"{m['path'].name} modifié après application (checksum "
+                                 f"{checksum[:12]} en base, {m['checksum'][:12]} sur disque)")
+
+
+def _rollback(conn) -> None:
+    try:
+        conn.exec_driver_sql("ROLLBACK")
+    except Exception:
+        pass                                        # SQLite a déjà annulé (erreur fatale)
+
+
+def upgrade(engine, target: int = None, directory: Path = None) -> List[Dict]:
+    """Applique les migrations en attente (jusqu'à target incluse) ; renvoie celles appliquées."""
+    from .models import SchemaMigrationDB
+
+    migrations = discover(directory)
+    done = []
+    # AUTOCOMMIT : pysqlite n'ouvre plus de transaction implicite (et laisse passer le DDL
+    # hors transaction) — BEGIN / COMMIT explicites pour que chaque script soit atomique
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        SchemaMigrationDB.__table__.create(bind=conn, checkfirst=True)
+        applied = _applied(conn)
+        _verify(applied, migrations)
+        for m in migrations:
+            if m["version"] in applied or (target is not None and m["version"] > target):
+                continue
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                if conn.exec_driver_sql("SELECT 1 FROM schema_migrations WHERE version = ?",
+                                        (m["version"],)).first():
+                    conn.exec_driver_sql("ROLLBACK")        # appliquée entre-temps par un autre process
+                    continue
+                t0 = time.perf_counter()
+                _load(m)(Op(conn))
+                ms = int((time.perf_counter() - t0) * 1000)
+                conn.exec_driver_sql(
+                    "INSERT INTO schema_migrations (version, name, checksum, applied_at, duration_ms) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (m["version"], m["name"], m["checksum"], datetime.utcnow().isoformat(" "), ms))
+                conn.exec_driver_sql("COMMIT")
+            except Exception as e:
+                _rollback(conn)
+                raise MigrationError(f"{m['path'].name} : {e}") from e
+            log.info("migration %04d_%s appliquée (%d ms)", m["version"], m["name"], ms)
+            done.append({"version": m["version"], "name": m["name"], "duration_ms": ms})
+    return done
+
+
+def ensure_current(engine, directory: Path = None) -> Dict:
+    """
+    Chemin de démarrage : une requête si le schéma est à jour, sinon upgrade().
+    Renvoie {"version", "applied"}.
+    """
+    latest = latest_version(directory)
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version is not None and version >= latest:
+        if version > latest:
+            log.warning("schéma en version %04d, code en %04d — aucune migration appliquée", version, latest)
+        return {"version": version, "applied": []}
+    applied = upgrade(engine, directory=directory)
+    return {"version": max([version or 0] + [a["version"] for a in applied]), "applied": applied}
+
+
+def status(engine, directory: Path = None) -> List[Dict]:
+    """Chaque script : appliqué ou non, date, durée, checksum conforme."""
+    migrations = discover(directory)
+    with engine.connect() as conn:
+        rows = {} if current_version(conn) is None else {
+            r.version: r for r in conn.exec_driver_sql(
+                "SELECT version, checksum, applied_at, duration_ms FROM schema_migrations")}
+    out = []
+    for m in migrations:
+        r = rows.get(m["version"])
+        out.append({"version": m["version"], "name": m["name"], "applied": r is not None,
+                    "applied_at": r.applied_at if r else None,
+                    "duration_ms": r.duration_ms if r else None,
+                    "checksum_ok": None if r is None else r.checksum == m["checksum"]})
+    return out
+
+
+def main(argv: List[str] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m src.migrate", description="Migrations de schéma de presence_ia.db")
+    ap.add_argument("command", nargs="?", default="status", choices=("status", "up", "verify", "seed"))
+    ap.add_argument("--db", help="chemin de la base (défaut : DB_PATH / data/presence_ia.db)")
+    ap.add_argument("--to", type=int, help="up : s'arrêter à cette version")
+    args = ap.parse_args(argv)
+    if args.db:
+        os.environ["DB_PATH"] = args.db             # avant l'import de src.database
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    from .database import DB_PATH, ENGINE
+    from . import seeds
+
+    print(f"Base : {DB_PATH}")
+    if args.command == "up":
+        applied = upgrade(ENGINE, target=args.to)
+        for a in applied:
+            print(f"  ✅ {a['version']:04d}_{a['name']} ({a['duration_ms']} ms)")
+        if args.to is None:                         # schéma complet : seeds dont l'empreinte a changé
+            seeds.run()
+        print(f"{len(applied)} migration(s) appliquée(s)")
+        return 0
+    if args.command == "seed":
+        res = seeds.run(force="*")
+        print(f"Seeds rejoués : {', '.join(res['ran']) or 'aucun'}"
+              + (f" — en échec : {', '.join(res['failed'])}" if res["failed"] else ""))
+        return 1 if res["failed"] else 0
+    rows = status(ENGINE)
+    for r in rows:
+        mark = "⚠️ " if r["checksum_ok"] is False else ("✅" if r["applied"] else "⏳")
+        print(f"  {mark} {r['version']:04d}_{r['name']:30s} {r['applied_at'] or 'en attente'}")
+    bad = [r for r in rows if r["checksum_ok"] is False]
+    pending = [r for r in rows if not r["applied"]]
+    if args.command == "verify" and (bad or pending):
+        print(f"{len(bad)} script(s) modifié(s), {len(pending)} en attente")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
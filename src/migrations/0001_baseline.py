@@ -0,0 +1,53 @@
+"""
+Baseline — schéma de presence_ia.db à l'introduction des migrations versionnées.
+
+Base neuve : toutes les tables des modèles. Base créée par l'ancien init_db : tables
+manquantes, colonnes ajoutées au fil du temps par sa boucle d'ALTER TABLE, index
+ix_v3_prospects_followup, et URLs localhost des headers de villes rendues relatives.
+"""
+
+COLUMNS = [
+    ("prospects",        "email TEXT"),
+    ("prospects",        "mobile TEXT"),
+    ("prospects",        "cms TEXT"),
+    ("prospects",        "proof_image_url TEXT"),
+    ("prospects",        "city_image_url TEXT"),
+    ("prospects",        "paid INTEGER DEFAULT 0"),
+    ("prospects",        "stripe_session_id TEXT"),
+    ("v3_landing_texts", "email_subject TEXT"),
+    ("v3_landing_texts", "budget_min TEXT"),
+    ("v3_landing_texts", "budget_max TEXT"),
+    ("v3_landing_texts", "updated_at DATETIME"),
+    ("v3_landing_texts", "email_template TEXT"),
+    ("v3_landing_texts", "sms_template TEXT"),
+    ("sirene_suspects",  "nature_juridique TEXT"),
+    ("sirene_suspects",  "date_creation TEXT"),
+    ("professions",      "mots_cles_sirene TEXT"),
+    ("v3_prospects",     "email_status TEXT"),
+    ("v3_prospects",     "email_sent_at DATETIME"),
+    ("v3_prospects",     "email_opened_at DATETIME"),
+    ("v3_prospects",     "email_bounced_at DATETIME"),
+    ("v3_prospects",     "email_clicked_at DATETIME"),
+    ("v3_prospects",     "email_booked_at DATETIME"),
+    ("v3_prospects",     "city_reference VARCHAR"),
+    ("v3_prospects",     "is_test INTEGER DEFAULT 0"),
+    ("v3_prospects",     "status TEXT DEFAULT 'PROSPECT'"),
+    ("v3_prospects",     "paid INTEGER DEFAULT 0"),
+    ("v3_prospects",     "offer_selected TEXT"),
+    ("v3_prospects",     "acquisition_cost REAL"),
+    ("v3_prospects",     "campaign_id TEXT"),
+    ("v3_prospects",     "date_payment DATETIME"),
+    ("v3_prospects",     "sms_status TEXT"),
+    ("v3_prospects",     "sms_delivered_at DATETIME"),
+    ("scoring_config",   "outbound_refs_only INTEGER DEFAULT 1"),
+    ("outbox",           "batch_key TEXT"),
+]
+
+
+def upgrade(op):
+    op.create_tables()
+    for table, coldef in COLUMNS:
+        op.add_column(table, coldef)
+    op.create_index("ix_v3_prospects_followup", "v3_prospects", "followup_sent_at, sent_method, email_sent_at")
+    op.execute("UPDATE city_headers SET url = '/dist/headers/' || filename "
+               "WHERE url LIKE 'http://localhost%' OR url LIKE 'http://127.0.0.1%'")
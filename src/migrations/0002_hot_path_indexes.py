@@ -0,0 +1,20 @@
+"""
+Index des requêtes chaudes sur v3_prospects (audit : select_next_pair, check_saturation,
+_job_outbound, _job_followup, recount des compteurs, contacts, webhooks Brevo / IMAP).
+Plans vérifiés par tests/test_query_plans.py.
+"""
+
+INDEXES = [
+    # (nom, colonnes, WHERE partiel)
+    ("ix_v3_prospects_pair",        "city, profession", None),
+    ("ix_v3_prospects_pair_unsent", "city, profession", "sent_at IS NULL"),
+    ("ix_v3_prospects_email",       "email, email_sent_at", None),
+    ("ix_v3_prospects_sent_at",     "sent_at", "sent_at IS NOT NULL"),
+    ("ix_v3_prospects_created_at",  "created_at", None),
+]
+
+
+def upgrade(op):
+    for name, cols, where in INDEXES:
+        op.create_index(name, "v3_prospects", cols, where=where)
+    op.execute("ANALYZE v3_prospects")
@@ -0,0 +1,14 @@
+"""
+Table seed_state (seeds rejoués seulement si leur empreinte change, src.seeds) et
+backfill unique de v3_prospects.city_reference, jusqu'ici refait à chaque démarrage :
+les nouveaux prospects le reçoivent désormais à l'insertion (ref_cities_seed.city_reference_for).
+"""
+
+
+def upgrade(op):
+    op.execute("CREATE TABLE IF NOT EXISTS seed_state ("
+               "name VARCHAR NOT NULL PRIMARY KEY, hash VARCHAR NOT NULL, "
+               "applied_at DATETIME, duration_ms INTEGER)")
+    op.execute("UPDATE v3_prospects SET city_reference = city "
+               "WHERE city_reference IS NULL "
+               "AND upper(trim(city)) IN (SELECT city_name FROM ref_cities)")
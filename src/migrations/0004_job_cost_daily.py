@@ -0,0 +1,19 @@
+"""
+Rollup quotidien des coûts API (job_cost_daily, src.job_costs) : table, index
+(job_id, created_at) sur job_cost_log à la place de l'index job_id seul, et
+rollup initial calculé depuis les lignes brutes existantes.
+"""
+
+
+def upgrade(op):
+    op.execute("CREATE TABLE IF NOT EXISTS job_cost_daily ("
+               "day DATE NOT NULL, job_id VARCHAR NOT NULL, nb_runs INTEGER, "
+               "nb_appels_google INTEGER, nb_appels_gemini INTEGER, nb_leads_generes INTEGER, "
+               "cost_estimated FLOAT, PRIMARY KEY (day, job_id))")
+    op.create_index("ix_job_cost_log_job_created", "job_cost_log", "job_id, created_at")
+    op.execute("DROP INDEX IF EXISTS ix_job_cost_log_job_id")
+    op.execute("INSERT OR REPLACE INTO job_cost_daily "
+               "SELECT date(coalesce(created_at, started_at)), job_id, count(*), "
+               "coalesce(sum(nb_appels_google), 0), coalesce(sum(nb_appels_gemini), 0), "
+               "coalesce(sum(nb_leads_generes), 0), coalesce(sum(cost_estimated), 0.0) "
+               "FROM job_cost_log GROUP BY 1, 2")
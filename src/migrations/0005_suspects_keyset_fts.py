@@ -0,0 +1,42 @@
+"""
+Explorateur de suspects (db_suspects_list) : index de pagination par clé
+(ville, raison_sociale, id) — avec et sans profession_id en tête, ils remplacent les
+index ville et profession_id seuls — et table FTS5 sirene_suspects_fts sur
+raison_sociale + ville.
+
+FTS5 en contenu externe (content_rowid = rowid de sirene_suspects), tenue à jour par
+triggers. Un VACUUM peut renuméroter les rowid de sirene_suspects (clé primaire texte) :
+le faire suivre de INSERT INTO sirene_suspects_fts(sirene_suspects_fts) VALUES('rebuild').
+"""
+
+FTS = ("CREATE VIRTUAL TABLE IF NOT EXISTS sirene_suspects_fts USING fts5("
+       "raison_sociale, ville, content='sirene_suspects', content_rowid='rowid', "
+       "tokenize='unicode61 remove_diacritics 2')")
+
+TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS sirene_suspects_fts_ai AFTER INSERT ON sirene_suspects BEGIN "
+    "INSERT INTO sirene_suspects_fts(rowid, raison_sociale, ville) "
+    "VALUES (new.rowid, new.raison_sociale, new.ville); END",
+    "CREATE TRIGGER IF NOT EXISTS sirene_suspects_fts_ad AFTER DELETE ON sirene_suspects BEGIN "
+    "INSERT INTO sirene_suspects_fts(sirene_suspects_fts, rowid, raison_sociale, ville) "
+    "VALUES ('delete', old.rowid, old.raison_sociale, old.ville); END",
+    "CREATE TRIGGER IF NOT EXISTS sirene_suspects_fts_au AFTER UPDATE OF raison_sociale, ville "
+    "ON sirene_suspects BEGIN "
+    "INSERT INTO sirene_suspects_fts(sirene_suspects_fts, rowid, raison_sociale, ville) "
+    "VALUES ('delete', old.rowid, old.raison_sociale, old.ville); "
+    "INSERT INTO sirene_suspects_fts(rowid, raison_sociale, ville) "
+    "VALUES (new.rowid, new.raison_sociale, new.ville); END",
+]
+
+
+def upgrade(op):
+    op.create_index("ix_sirene_suspects_keyset", "sirene_suspects", "ville, raison_sociale, id")
+    op.create_index("ix_sirene_suspects_prof_keyset", "sirene_suspects",
+                    "profession_id, ville, raison_sociale, id")
+    op.execute("DROP INDEX IF EXISTS ix_sirene_suspects_ville")
+    op.execute("DROP INDEX IF EXISTS ix_sirene_suspects_profession_id")
+    op.execute(FTS)
+    for sql in TRIGGERS:
+        op.execute(sql)
+    op.execute("INSERT INTO sirene_suspects_fts(sirene_suspects_fts) VALUES ('rebuild')")
+    op.execute("ANALYZE sirene_suspects")
@@ -0,0 +1,10 @@
+"""
+Archives froides (src.archive) : tables v3_prospects_archive, ia_snapshots_archive et
+pipeline_history_log_archive — colonnes des tables chaudes + archived_at, avec leurs index
+de lecture (token / email, prospect_token, ts). prospect_deliveries_archive vit dans
+marketing.db (créée par marketing_module.database.init_db).
+"""
+
+
+def upgrade(op):
+    op.create_tables("v3_prospects_archive", "ia_snapshots_archive", "pipeline_history_log_archive")
@@ -0,0 +1,8 @@
+"""
+ref_cities.header_failed_at : date du dernier échec de mise en cache de l'image header
+(city_images) — le prefetch ne retente pas la ville avant CITY_HEADER_RETRY_HOURS.
+"""
+
+
+def upgrade(op):
+    op.add_column("ref_cities", "header_failed_at DATETIME")
@@ -0,0 +1,8 @@
+"""
+warming_plan.locked_at : date du passage en "sending" — src.warming.sweep remet en
+"planned" les éléments restés "sending" après un arrêt du process pendant l'envoi.
+"""
+
+
+def upgrade(op):
+    op.add_column("warming_plan", "locked_at DATETIME")
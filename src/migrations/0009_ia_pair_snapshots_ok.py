@@ -0,0 +1,8 @@
+"""
+ia_pair_snapshots.ok : une relance IA échouée enregistre aussi une ligne (ok = 0) pour que
+ses appels tentés soient déduits du budget du jour ; la volatilité ne lit que ok = 1.
+"""
+
+
+def upgrade(op):
+    op.add_column("ia_pair_snapshots", "ok BOOLEAN NOT NULL DEFAULT 1")
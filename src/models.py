@@ -3,7 +3,7 @@ Data models — Campaign, ProspectRecord, TestRun
 SQLAlchemy (SQLite) + Pydantic v2 + Enums + transitions statuts
 """
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 from typing import Dict, List, Optional
 
@@ -301,6 +301,17 @@ class CmsBlockDB(Base):
 class V3ProspectDB(Base):
     """Prospects V3 — générés via Google Places, landing Calendly."""
     __tablename__ = "v3_prospects"
+    __table_args__ = (
+        sa.Index("ix_v3_prospects_followup", "followup_sent_at", "sent_method", "email_sent_at"),
+        # Requêtes chaudes (migration 0002, plans vérifiés par tests/test_query_plans.py)
+        sa.Index("ix_v3_prospects_pair", "city", "profession"),                  # paire : test IA, refresh, recount
+        sa.Index("ix_v3_prospects_pair_unsent", "city", "profession",            # stock outbound / saturation
+                 sqlite_where=sa.text("sent_at IS NULL")),
+        sa.Index("ix_v3_prospects_email", "email", "email_sent_at"),             # webhooks Brevo, IMAP
+        sa.Index("ix_v3_prospects_sent_at", "sent_at",                           # compteurs envois du jour
+                 sqlite_where=sa.text("sent_at IS NOT NULL")),
+        sa.Index("ix_v3_prospects_created_at", "created_at"),                    # listes contacts, stats par jour
+    )
     token:         Mapped[str]           = mapped_column(sa.String, primary_key=True)
     name:          Mapped[str]           = mapped_column(sa.String, nullable=False)
     city:          Mapped[str]           = mapped_column(sa.String, nullable=False)
@@ -397,10 +408,15 @@ class MessageTemplateDB(Base):
 class SireneSuspectDB(Base):
     """Établissements bruts issus de SIRENE — vivier de prospection."""
     __tablename__ = "sirene_suspects"
+    __table_args__ = (
+        # pagination par clé (ville, raison_sociale, id), avec ou sans filtre métier
+        sa.Index("ix_sirene_suspects_keyset", "ville", "raison_sociale", "id"),
+        sa.Index("ix_sirene_suspects_prof_keyset", "profession_id", "ville", "raison_sociale", "id"),
+    )
     id               : Mapped[str]            = mapped_column(sa.String, primary_key=True)   # SIRET (14 chiffres)
     raison_sociale   : Mapped[str]            = mapped_column(sa.String, nullable=False)
-    profession_id    : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True, index=True)   # FK professions.id
-    ville            : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True, index=True)
+    profession_id    : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)   # FK professions.id
+    ville            : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)
     code_postal      : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)
     departement      : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)
     code_naf         : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)
@@ -532,6 +548,22 @@ class IaSnapshotDB(Base):
     report_html      : Mapped[Optional[str]]  = mapped_column(sa.Text, nullable=True)        # HTML complet
 
 
+class IaPairSnapshotDB(Base):
+    """Snapshot d'un refresh IA d'une paire métier×ville (src.refresh_planner) — historique de volatilité."""
+    __tablename__ = "ia_pair_snapshots"
+    __table_args__ = (sa.Index("ix_ia_pair_snapshots_pair", "city", "profession", "created_at"),
+                      sa.Index("ix_ia_pair_snapshots_created", "created_at"))
+    id          : Mapped[int]      = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
+    city        : Mapped[str]      = mapped_column(sa.String, nullable=False)
+    profession  : Mapped[str]      = mapped_column(sa.String, nullable=False)
+    created_at  : Mapped[datetime] = mapped_column(sa.DateTime, default=datetime.utcnow)
+    cited_json  : Mapped[str]      = mapped_column(sa.Text, default="[]")     # JSON list triée des noms cités normalisés
+    nb_cited    : Mapped[int]      = mapped_column(sa.Integer, default=0)
+    calls       : Mapped[int]      = mapped_column(sa.Integer, default=0)     # appels IA consommés
+    cost        : Mapped[float]    = mapped_column(sa.Float, default=0.0)     # $ estimés
+    ok          : Mapped[bool]     = mapped_column(sa.Boolean, default=True, server_default=sa.true())  # False : tentative échouée (budget seul)
+
+
 class IaCitedCompanyDB(Base):
     """Entreprises citées par les IA (ChatGPT/Claude/Gemini) pour une paire métier×ville.
     Alimente : exclusion du pipeline leads + réutilisable pour d'autres projets.
@@ -548,10 +580,11 @@ class IaCitedCompanyDB(Base):
 
 
 class JobCostLogDB(Base):
-    """Tracking des coûts API par exécution de job."""
+    """Tracking des coûts API par exécution de job (lignes brutes, purgées après JOB_COST_RETENTION_DAYS)."""
     __tablename__ = "job_cost_log"
+    __table_args__ = (sa.Index("ix_job_cost_log_job_created", "job_id", "created_at"),)
     id               : Mapped[str]            = mapped_column(sa.String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    job_id           : Mapped[str]            = mapped_column(sa.String, nullable=False, index=True)
+    job_id           : Mapped[str]            = mapped_column(sa.String, nullable=False)
     started_at       : Mapped[datetime]       = mapped_column(sa.DateTime, nullable=False)
     ended_at         : Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
     paire            : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)   # "Paris × couvreur" ou "auto"
@@ -562,6 +595,181 @@ class JobCostLogDB(Base):
     created_at       : Mapped[datetime]       = mapped_column(sa.DateTime, default=datetime.utcnow)
 
 
+class JobCostDailyDB(Base):
+    """Rollup quotidien de job_cost_log (src.job_costs) — tenu à jour à chaque insertion, conservé sans limite."""
+    __tablename__ = "job_cost_daily"
+    day              : Mapped[date]           = mapped_column(sa.Date, primary_key=True)     # date(created_at) UTC
+    job_id           : Mapped[str]            = mapped_column(sa.String, primary_key=True)
+    nb_runs          : Mapped[int]            = mapped_column(sa.Integer, default=0)
+    nb_appels_google : Mapped[int]            = mapped_column(sa.Integer, default=0)
+    nb_appels_gemini : Mapped[int]            = mapped_column(sa.Integer, default=0)
+    nb_leads_generes : Mapped[int]            = mapped_column(sa.Integer, default=0)
+    cost_estimated   : Mapped[float]          = mapped_column(sa.Float,   default=0.0)
+
+
+class CompanyInfoCacheDB(Base):
+    """Cache persistant des lookups Gemini (site web + téléphone) — évite de repayer un appel grounded."""
+    __tablename__ = "company_info_cache"
+    id          : Mapped[str]            = mapped_column(sa.String, primary_key=True)   # "{model}|siren:{siren}" ou "{model}|{name_norm}|{city_norm}"
+    model       : Mapped[str]            = mapped_column(sa.String, nullable=False)     # ex: "gemini-2.0-flash"
+    name_norm   : Mapped[str]            = mapped_column(sa.String, nullable=False)
+    city_norm   : Mapped[str]            = mapped_column(sa.String, nullable=False)
+    siren       : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True, index=True)
+    found       : Mapped[bool]           = mapped_column(sa.Boolean, default=True)      # False = cache négatif ("introuvable")
+    payload     : Mapped[str]            = mapped_column(sa.Text, default="{}")         # JSON retourné par fetch_company_info
+    hits        : Mapped[int]            = mapped_column(sa.Integer, default=0)         # lectures servies depuis le cache
+    fetches     : Mapped[int]            = mapped_column(sa.Integer, default=1)         # appels Gemini réellement payés
+    created_at  : Mapped[datetime]       = mapped_column(sa.DateTime, default=datetime.utcnow)
+    expires_at  : Mapped[datetime]       = mapped_column(sa.DateTime, nullable=False, index=True)
+
+
+class ImageAssetDB(Base):
+    """Image traitée par image_pipeline — variantes responsives WEBP/AVIF + statut du traitement."""
+    __tablename__ = "image_assets"
+    id           : Mapped[str]            = mapped_column(sa.String, primary_key=True)
+    kind         : Mapped[str]            = mapped_column(sa.String, nullable=False)     # header / city / proof
+    stem         : Mapped[str]            = mapped_column(sa.String, nullable=False)     # préfixe des noms de fichiers
+    content_hash : Mapped[str]            = mapped_column(sa.String, nullable=False, index=True)  # sha256 du fichier source
+    url_prefix   : Mapped[str]            = mapped_column(sa.String, nullable=False)     # ex: "/dist/headers"
+    crop_16_9    : Mapped[bool]           = mapped_column(sa.Boolean, default=False)
+    status       : Mapped[str]            = mapped_column(sa.String, default="pending")  # pending / ready / error
+    width        : Mapped[Optional[int]]  = mapped_column(sa.Integer, nullable=True)
+    height       : Mapped[Optional[int]]  = mapped_column(sa.Integer, nullable=True)
+    variants     : Mapped[Optional[str]]  = mapped_column(sa.Text, nullable=True)        # JSON [{width,height,format,file}]
+    main_url     : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True, index=True)  # plus grande variante WEBP
+    error        : Mapped[Optional[str]]  = mapped_column(sa.Text, nullable=True)
+    created_at   : Mapped[datetime]       = mapped_column(sa.DateTime, default=datetime.utcnow)
+    updated_at   : Mapped[datetime]       = mapped_column(sa.DateTime, default=datetime.utcnow)
+
+
+class OutboxDB(Base):
+    """Outbox transactionnelle des envois Brevo (email/SMS) — écrite avec la sélection, vidée par src.outbox."""
+    __tablename__ = "outbox"
+    __table_args__ = (sa.Index("ix_outbox_status_next", "status", "next_attempt_at"),)
+    id              : Mapped[int]            = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
+    message_key     : Mapped[str]            = mapped_column(sa.String, nullable=False, unique=True)  # idempotence, ex: "outbound:{token}"
+    kind            : Mapped[str]            = mapped_column(sa.String, nullable=False)     # outbound / followup / …
+    channel         : Mapped[str]            = mapped_column(sa.String, nullable=False)     # email / sms
+    token           : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True, index=True)  # V3ProspectDB.token
+    sender          : Mapped[str]            = mapped_column(sa.String, nullable=False)     # email expéditeur ou nom SMS
+    sender_name     : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)
+    recipient       : Mapped[str]            = mapped_column(sa.String, nullable=False)     # email ou E.164
+    recipient_name  : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)
+    subject         : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)
+    body            : Mapped[str]            = mapped_column(sa.Text, nullable=False)
+    status          : Mapped[str]            = mapped_column(sa.String, default="pending")  # pending / sending / sent / dead
+    attempts        : Mapped[int]            = mapped_column(sa.Integer, default=0)
+    last_error      : Mapped[Optional[str]]  = mapped_column(sa.Text, nullable=True)
+    provider_msg_id : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)    # messageId / reference Brevo
+    batch_key       : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True, index=True)  # lot messageVersions (idempotencyKey du lot)
+    next_attempt_at : Mapped[datetime]       = mapped_column(sa.DateTime, default=datetime.utcnow)
+    locked_at       : Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    created_at      : Mapped[datetime]       = mapped_column(sa.DateTime, default=datetime.utcnow)
+    sent_at         : Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+
+
+class OutboundCounterDB(Base):
+    """Compteurs du pilotage outbound (src.outbound_counters) — lus par compute_outbound_need."""
+    __tablename__ = "outbound_counters"
+    key        : Mapped[str]      = mapped_column(sa.String, primary_key=True)   # sent_total / pending:{city}|{profession} / booked:YYYY-MM-DD …
+    value      : Mapped[int]      = mapped_column(sa.Integer, default=0)
+    updated_at : Mapped[datetime] = mapped_column(sa.DateTime, default=datetime.utcnow)
+
+
+class SchedulerLeaseDB(Base):
+    """Bail d'élection du process leader (src.leader) — un seul process fait tourner le scheduler."""
+    __tablename__ = "scheduler_lease"
+    name         : Mapped[str]      = mapped_column(sa.String, primary_key=True)   # "scheduler"
+    holder       : Mapped[str]      = mapped_column(sa.String, nullable=False)     # host:pid:uuid
+    acquired_at  : Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    heartbeat_at : Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    expires_at   : Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+
+
+class JobQueueDB(Base):
+    """File de jobs persistante (src.jobqueue) — alimentée par l'API, vidée par `python -m src.worker`."""
+    __tablename__ = "job_queue"
+    __table_args__ = (sa.Index("ix_job_queue_status_id", "status", "id"),)
+    id           : Mapped[int]                = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
+    name         : Mapped[str]                = mapped_column(sa.String, nullable=False)      # clé de src.jobqueue.JOBS
+    kwargs       : Mapped[str]                = mapped_column(sa.Text, default="{}")          # JSON
+    status       : Mapped[str]                = mapped_column(sa.String, default="queued")    # queued / running / done / failed
+    attempts     : Mapped[int]                = mapped_column(sa.Integer, default=0)
+    worker       : Mapped[Optional[str]]      = mapped_column(sa.String, nullable=True)       # host:pid du worker
+    enqueued_at  : Mapped[datetime]           = mapped_column(sa.DateTime, default=datetime.utcnow)
+    started_at   : Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    heartbeat_at : Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    finished_at  : Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    error        : Mapped[Optional[str]]      = mapped_column(sa.Text, nullable=True)
+
+
+class JobRunDB(Base):
+    """Registre des exécutions des jobs du scheduler (src.jobruns) — durée, volumes, erreurs."""
+    __tablename__ = "job_runs"
+    __table_args__ = (sa.Index("ix_job_runs_job_started", "job", "started_at"),
+                      sa.Index("ix_job_runs_started", "started_at"))
+    id                : Mapped[int]                = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
+    job               : Mapped[str]                = mapped_column(sa.String, nullable=False)    # id APScheduler
+    host              : Mapped[Optional[str]]      = mapped_column(sa.String, nullable=True)     # host:pid
+    started_at        : Mapped[datetime]           = mapped_column(sa.DateTime, default=datetime.utcnow)
+    finished_at       : Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    duration_ms       : Mapped[Optional[int]]      = mapped_column(sa.Integer, nullable=True)
+    status            : Mapped[str]                = mapped_column(sa.String, default="running") # running / ok / error / skipped
+    items_in          : Mapped[int]                = mapped_column(sa.Integer, default=0)
+    items_out         : Mapped[int]                = mapped_column(sa.Integer, default=0)
+    errors            : Mapped[int]                = mapped_column(sa.Integer, default=0)
+    error             : Mapped[Optional[str]]      = mapped_column(sa.Text, nullable=True)       # 1re erreur / motif du skip
+    rss_peak_delta_kb : Mapped[Optional[int]]      = mapped_column(sa.Integer, nullable=True)    # hausse du pic RSS du process
+    overlapped        : Mapped[bool]               = mapped_column(sa.Boolean, default=False)    # précédente exécution encore en cours
+
+
+class SchemaMigrationDB(Base):
+    """Migrations de schéma appliquées (src.migrate) — une ligne par script de src/migrations."""
+    __tablename__ = "schema_migrations"
+    version     : Mapped[int]           = mapped_column(sa.Integer, primary_key=True)   # préfixe numérique du script
+    name        : Mapped[str]           = mapped_column(sa.String, nullable=False)
+    checksum    : Mapped[str]           = mapped_column(sa.String, nullable=False)      # sha256 du script appliqué
+    applied_at  : Mapped[datetime]      = mapped_column(sa.DateTime, default=datetime.utcnow)
+    duration_ms : Mapped[Optional[int]] = mapped_column(sa.Integer, nullable=True)
+
+
+class SeedStateDB(Base):
+    """Empreinte de chaque source de seed (src.seeds) — un seed inchangé n'est pas rejoué."""
+    __tablename__ = "seed_state"
+    name        : Mapped[str]           = mapped_column(sa.String, primary_key=True)   # ex. "ref_cities"
+    hash        : Mapped[str]           = mapped_column(sa.String, nullable=False)     # sha256 données + code du seed
+    applied_at  : Mapped[datetime]      = mapped_column(sa.DateTime, default=datetime.utcnow)
+    duration_ms : Mapped[Optional[int]] = mapped_column(sa.Integer, nullable=True)
+
+
+class ImapWatermarkDB(Base):
+    """Filigrane du poller de réponses IMAP (src.imap_replies) — UID déjà examinés par boîte."""
+    __tablename__ = "imap_watermark"
+    mailbox     : Mapped[str]      = mapped_column(sa.String, primary_key=True)   # user@host/dossier
+    uidvalidity : Mapped[int]      = mapped_column(sa.Integer, nullable=False)    # invalide last_uid s'il change
+    last_uid    : Mapped[int]      = mapped_column(sa.Integer, default=0)         # dernier UID examiné
+    updated_at  : Mapped[datetime] = mapped_column(sa.DateTime, default=datetime.utcnow)
+
+
+class WarmingPlanDB(Base):
+    """Plan d'envoi du warming email (src.warming) — une ligne par email prévu."""
+    __tablename__ = "warming_plan"
+    __table_args__ = (sa.Index("ix_warming_plan_status_due", "status", "due_at"),
+                      sa.Index("ix_warming_plan_day_sender", "day", "sender"))
+    id       : Mapped[int]                = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
+    day      : Mapped[str]                = mapped_column(sa.String, nullable=False)      # YYYY-MM-DD (UTC)
+    kind     : Mapped[str]                = mapped_column(sa.String, default="initial")   # initial / reply / followup
+    sender   : Mapped[str]                = mapped_column(sa.String, nullable=False)
+    receiver : Mapped[str]                = mapped_column(sa.String, nullable=False)
+    subject  : Mapped[str]                = mapped_column(sa.String, nullable=False)
+    body     : Mapped[str]                = mapped_column(sa.Text, nullable=False)
+    due_at   : Mapped[datetime]           = mapped_column(sa.DateTime, nullable=False)
+    status   : Mapped[str]                = mapped_column(sa.String, default="planned")   # planned / sending / sent / failed / skipped
+    sent_at  : Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)
+    locked_at: Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)     # passage en "sending"
+    error    : Mapped[Optional[str]]      = mapped_column(sa.Text, nullable=True)
+
+
 class PipelineHistoryLogDB(Base):
     """Journal des décisions de pilotage outbound (une ligne par run _job_outbound)."""
     __tablename__ = "pipeline_history_log"
@@ -605,6 +813,7 @@ class RefCityDB(Base):
     city_name        : Mapped[str]            = mapped_column(sa.String, primary_key=True)   # UPPERCASE normalisé
     city_type        : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)      # "prefecture" | "sous_prefecture" | null
     header_image_url : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)
+    header_failed_at : Mapped[Optional[datetime]] = mapped_column(sa.DateTime, nullable=True)  # dernier échec de mise en cache (city_images)
 
 
 class PipelineJobDB(Base):
@@ -646,3 +855,31 @@ class V3BookingDB(Base):
     gcal_event_url : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)   # lien GCal
     ics_uid        : Mapped[Optional[str]]  = mapped_column(sa.String, nullable=True)   # UID iCal
     created_at     : Mapped[datetime]       = mapped_column(sa.DateTime, default=datetime.utcnow)
+
+
+# ── Archives froides (src.archive) ─────────────────────────────────────────────
+
+def _archive_table(model, *indexes) -> sa.Table:
+    """Table <table>_archive : colonnes de la table chaude (sans index ni contraintes) + archived_at.
+    Une colonne ajoutée à la table chaude doit l'être aussi à son archive (même migration)."""
+    return sa.Table(
+        f"{model.__tablename__}_archive", Base.metadata,
+        *(sa.Column(c.name, c.type, primary_key=c.primary_key) for c in model.__table__.columns),
+        sa.Column("archived_at", sa.DateTime, nullable=False),
+        *indexes,
+    )
+
+
+V3ProspectArchive = _archive_table(
+    V3ProspectDB,
+    sa.Index("ix_v3_prospects_archive_key", "profession", "city", "name"),   # dédoublonnage provisioning
+    sa.Index("ix_v3_prospects_archive_email", "email"),
+)
+IaSnapshotArchive = _archive_table(
+    IaSnapshotDB,
+    sa.Index("ix_ia_snapshots_archive_token", "prospect_token", "created_at"),
+)
+PipelineHistoryLogArchive = _archive_table(
+    PipelineHistoryLogDB,
+    sa.Index("ix_pipeline_history_log_archive_ts", "ts"),
+)
@@ -0,0 +1,284 @@
+"""
+OUTBOUND COUNTERS — Compteurs du pilotage outbound (compute_outbound_need).
+
+compute_outbound_need lisait à chaque appel une dizaine de COUNT sur v3_prospects,
+v3_bookings (presence_ia.db) et slots / closers (marketing.db). Ces agrégats sont
+désormais tenus dans la table outbound_counters (une ligne par clé) :
+
+  sent_total                 prospects avec sent_at (archivés compris, src.archive)
+  sent_day:YYYY-MM-DD        envois du jour (UTC)
+  pending:{city}|{profession} leads en file (ia_results + email, pas envoyé, hors test)
+  booked:YYYY-MM-DD          RDV v3_bookings hors test, par jour de start_iso
+  slots:YYYY-MM-DD           créneaux "available" presence-ia, par jour (UTC)
+  closers                    closers actifs presence-ia
+  reconciled_at              epoch de la dernière réconciliation complète
+
+Mise à jour incrémentale par les chemins d'envoi (note_sent), de réservation
+(note_booking), de test IA / provisioning (recount_pending) et d'administration des
+créneaux (refresh_slots). reconcile() recalcule tout depuis les tables sources et
+corrige la dérive (chemins non instrumentés, UPDATE manuels) : job périodique
+_job_outbound_counters, et à la lecture si la dernière réconciliation date de plus de
+OUTBOUND_COUNTERS_TTL secondes (défaut 3600).
+
+Granularité : les fenêtres RDV / créneaux sont comptées au jour (aujourd'hui → J+14),
+là où l'ancien calcul partait de l'heure courante.
+"""
+import logging, os, time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_MKT_PREFIXES  = ("slots:", "closers")
+_PROJECT       = "presence-ia"
+_WINDOW_DAYS   = 14
+
+
+def pair_key(city: Optional[str], profession: Optional[str]) -> str:
+    return f"pending:{city or ''}|{profession or ''}"
+
+
+def _pending_filter():
+    from .models import V3ProspectDB
+    return (
+        V3ProspectDB.ia_results.isnot(None),
+        V3ProspectDB.sent_at.is_(None),
+        V3ProspectDB.email.isnot(None),
+        V3ProspectDB.is_test.is_(False),
+    )
+
+
+def _upsert(db, values: Dict[str, int], add: bool) -> None:
+    """add=True : value += delta ; add=False : value = valeur. Ne commit pas."""
+    from sqlalchemy.dialects.sqlite import insert
+    from .models import OutboundCounterDB
+
+    if not values:
+        return
+    now  = datetime.utcnow()
+    stmt = insert(OutboundCounterDB).values(
+        [{"key": k, "value": v, "updated_at": now} for k, v in values.items()])
+    new  = (OutboundCounterDB.value + stmt.excluded.value) if add else stmt.excluded.value
+    db.connection().execute(stmt.on_conflict_do_update(
+        index_elements=["key"], set_={"value": new, "updated_at": now}))
+
+
+def bump(db, deltas: Dict[str, int]) -> None:
+    """Ajoute des deltas aux compteurs dans la transaction de l'appelant."""
+    _upsert(db, {k: d for k, d in deltas.items() if d}, add=True)
+
+
+# ── Chemins instrumentés ──────────────────────────────────────────────────────
+
+def note_sent(db, tokens: Iterable[str]) -> None:
+    """
+    À appeler AVANT de poser sent_at sur ces prospects, dans la même transaction.
+    Seuls les prospects pas encore envoyés comptent (renvoi ou profil test déjà
+    marqué → rien) ; ceux qui étaient en file sortent de pending.
+    """
+    import sqlalchemy as sa
+    from .models import V3ProspectDB
+
+    tokens = [t for t in dict.fromkeys(tokens) if t]
+    day    = f"sent_day:{datetime.utcnow().date().isoformat()}"
+    deltas: Dict[str, int] = {}
+    pending = sa.and_(*_pending_filter())
+    for i in range(0, len(tokens), 500):
+        rows = db.execute(
+            sa.select(V3ProspectDB.city, V3ProspectDB.profession, sa.func.count(),
+                      sa.func.sum(sa.case((pending, 1), else_=0)))
+            .where(V3ProspectDB.token.in_(tokens[i:i + 500]), V3ProspectDB.sent_at.is_(None))
+            .group_by(V3ProspectDB.city, V3ProspectDB.profession)
+        ).all()
+        for city, profession, n, n_pending in rows:
+            deltas["sent_total"] = deltas.get("sent_total", 0) + n
+            deltas[day] = deltas.get(day, 0) + n
+            key = pair_key(city, profession)
+            deltas[key] = deltas.get(key, 0) - (n_pending or 0)
+    bump(db, deltas)
+
+
+def note_booking(db, prospect_token: str, start_iso: str) -> None:
+    """
+    RDV ajouté. Les prospects is_test ne comptent pas. Aucun chemin ne supprime de
+    v3_bookings : une suppression manuelle est rattrapée par reconcile().
+    """
+    from .models import V3ProspectDB
+
+    if not start_iso:
+        return
+    p = db.get(V3ProspectDB, prospect_token) if prospect_token else None
+    if p is not None and p.is_test:
+        return
+    bump(db, {f"booked:{start_iso[:10]}": 1})
+
+
+def recount_pending(db, pairs: Iterable[Tuple[str, str]]) -> None:
+    """
+    Recompte les leads en file des paires touchées (ia_results / email modifiés).
+    À appeler après flush/commit des modifications ; ne commit pas.
+    """
+    import sqlalchemy as sa
+    from .models import V3ProspectDB
+
+    values = {}
+    for city, profession in set(pairs):
+        values[pair_key(city, profession)] = db.execute(
+            sa.select(sa.func.count()).select_from(V3ProspectDB)
+            .where(V3ProspectDB.city == city, V3ProspectDB.profession == profession,
+                   *_pending_filter())
+        ).scalar()
+    _upsert(db, values, add=False)
+
+
+def refresh_slots() -> None:
+    """Recompte créneaux et closers (marketing.db) après une modification côté admin."""
+    from .database import SessionLocal
+    try:
+        fresh = _recount_mkt()
+    except Exception as e:
+        log.warning("[COUNTERS] marketing_module indisponible — %s", e)
+        return
+    with SessionLocal() as db:
+        _replace(db, fresh, _MKT_PREFIXES)
+        db.commit()
+
+
+# ── Recalcul complet ──────────────────────────────────────────────────────────
+
+def _recount_main(db) -> Dict[str, int]:
+    import sqlalchemy as sa
+    from .models import V3ProspectArchive as PA, V3ProspectDB, V3BookingDB
+
+    today  = datetime.utcnow().date()
+    counts = {"sent_total": db.query(V3ProspectDB).filter(V3ProspectDB.sent_at.isnot(None)).count()
+                            + db.query(PA).filter(PA.c.sent_at.isnot(None)).count()}
+
+    day = sa.func.date(V3ProspectDB.sent_at)
+    for d, n in (db.query(day, sa.func.count())
+                 .filter(V3ProspectDB.sent_at >= datetime.combine(today, datetime.min.time()))
+                 .group_by(day)):
+        counts[f"sent_day:{d}"] = n
+
+    for city, profession, n in (db.query(V3ProspectDB.city, V3ProspectDB.profession, sa.func.count())
+                                .filter(*_pending_filter())
+                                .group_by(V3ProspectDB.city, V3ProspectDB.profession)):
+        counts[pair_key(city, profession)] = n
+
+    bday = sa.func.substr(V3BookingDB.start_iso, 1, 10)
+    for d, n in (db.query(bday, sa.func.count())
+                 .join(V3ProspectDB, V3ProspectDB.token == V3BookingDB.prospect_token, isouter=True)
+                 .filter(V3BookingDB.start_iso >= today.isoformat(),
+                         V3ProspectDB.is_test.isnot(True))
+                 .group_by(bday)):
+        counts[f"booked:{d}"] = n
+    return counts
+
+
+def _recount_mkt() -> Dict[str, int]:
+    import sqlalchemy as sa
+    from marketing_module.database import SessionLocal as MktSession
+    from marketing_module.models import SlotDB, SlotStatus, CloserDB
+
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    with MktSession() as mdb:
+        counts = {"closers": mdb.query(CloserDB).filter(
+            CloserDB.project_id == _PROJECT, CloserDB.is_active == True,
+        ).count()}
+        day = sa.func.date(SlotDB.starts_at)
+        for d, n in (mdb.query(day, sa.func.count())
+                     .filter(SlotDB.project_id == _PROJECT,
+                             SlotDB.status == SlotStatus.available,
+                             SlotDB.starts_at >= today)
+                     .group_by(day)):
+            counts[f"slots:{d}"] = n
+    return counts
+
+
+def recompute() -> Dict[str, int]:
+    """Valeurs attendues de tous les compteurs, recalculées depuis les tables sources."""
+    from .database import SessionLocal
+    with SessionLocal() as db:
+        counts = _recount_main(db)
+    try:
+        counts.update(_recount_mkt())
+    except Exception as e:
+        log.warning("[COUNTERS] marketing_module indisponible — %s", e)
+    return counts
+
+
+def _replace(db, fresh: Dict[str, int], prefixes: Tuple[str, ...]) -> None:
+    """Remplace les compteurs dont la clé commence par un des préfixes."""
+    import sqlalchemy as sa
+    from .models import OutboundCounterDB
+
+    db.execute(sa.delete(OutboundCounterDB).where(
+        sa.or_(*[OutboundCounterDB.key.startswith(p) for p in prefixes])))
+    _upsert(db, {k: v for k, v in fresh.items() if k.startswith(prefixes)}, add=False)
+
+
+def reconcile() -> Dict[str, Tuple[int, int]]:
+    """
+    Recalcule tous les compteurs et remplace la table. Retourne la dérive corrigée
+    {clé: (valeur tenue, valeur réelle)}. Si marketing.db est indisponible, les
+    compteurs créneaux / closers existants sont conservés.
+    """
+    from .database import SessionLocal
+    from .models import OutboundCounterDB
+
+    main_prefixes = ("sent_total", "sent_day:", "pending:", "booked:")
+    with SessionLocal() as db:
+        fresh = _recount_main(db)
+        prefixes = main_prefixes
+        try:
+            fresh.update(_recount_mkt())
+            prefixes += _MKT_PREFIXES
+        except Exception as e:
+            log.warning("[COUNTERS] marketing_module indisponible — %s", e)
+
+        held  = {k: v for k, v in db.query(OutboundCounterDB.key, OutboundCounterDB.value)
+                 if k.startswith(prefixes)}
+        drift = {k: (held.get(k, 0), fresh.get(k, 0)) for k in set(held) | set(fresh)
+                 if held.get(k, 0) != fresh.get(k, 0)}
+        _replace(db, fresh, prefixes)
+        _upsert(db, {"reconciled_at": int(time.time())}, add=False)
+        db.commit()
+    if drift and held:
+        log.info("[COUNTERS] réconciliation : %d compteur(s) corrigé(s) — %s",
+                 len(drift), dict(list(drift.items())[:10]))
+    return drift
+
+
+def snapshot() -> Dict[str, int]:
+    """Tous les compteurs (une requête). Réconcilie d'abord s'ils sont absents ou périmés."""
+    from .database import SessionLocal
+    from .models import OutboundCounterDB
+
+    ttl = int(os.getenv("OUTBOUND_COUNTERS_TTL", "3600"))
+    with SessionLocal() as db:
+        counters = dict(db.query(OutboundCounterDB.key, OutboundCounterDB.value).all())
+    if time.time() - counters.get("reconciled_at", 0) > ttl:
+        reconcile()
+        with SessionLocal() as db:
+            counters = dict(db.query(OutboundCounterDB.key, OutboundCounterDB.value).all())
+    return counters
+
+
+def _window(counters: Dict[str, int], prefix: str, start: date, days: int) -> int:
+    return sum(counters.get(f"{prefix}{(start + timedelta(days=i)).isoformat()}", 0)
+               for i in range(days + 1))
+
+
+def need_inputs(next_monday: date) -> Dict[str, int]:
+    """Entrées de compute_outbound_need lues depuis les compteurs."""
+    c     = snapshot()
+    today = datetime.utcnow().date()
+    return {
+        "rdv_taken_week":   _window(c, "booked:", today, _WINDOW_DAYS),
+        "rdv_taken_monday": c.get(f"booked:{next_monday.isoformat()}", 0),
+        "leads_en_file":    sum(v for k, v in c.items() if k.startswith("pending:")),
+        "sent_total":       c.get("sent_total", 0),
+        "sent_today":       c.get(f"sent_day:{today.isoformat()}", 0),
+        "slots_open":       _window(c, "slots:", today, _WINDOW_DAYS),
+        "active_closers":   c.get("closers", 0) or 1,
+    }
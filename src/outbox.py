@@ -0,0 +1,362 @@
+"""
+OUTBOX — File d'envoi Brevo transactionnelle (email + SMS).
+
+Les jobs (ex: _job_outbound) écrivent leurs messages dans la table outbox DANS la même
+transaction que la sélection des prospects (enqueue ne commit pas). drain() les envoie :
+  - pool de OUTBOX_WORKERS threads (défaut 8), session HTTP keep-alive partagée
+  - OUTBOX_PER_SENDER envois simultanés max par expéditeur (défaut 2)
+  - emails en 1er essai : lots messageVersions par expéditeur (≤ BATCH_MAX_VERSIONS, une
+    requête et une idempotencyKey par lot — BrevoProvider.send_batch, OUTBOX_EMAIL_BATCH=true) ;
+    un lot en 5xx est renvoyé à l'identique, même idempotencyKey
+  - clé d'idempotence message_key (unique) : jamais insérée deux fois, une ligne "sent"
+    n'est jamais renvoyée ; les envois unitaires la passent en en-tête Brevo idempotencyKey
+  - 5xx / 429 / erreur réseau → nouvel essai après OUTBOX_BACKOFF_S × 2^(essai-1)
+    (défaut 60 s), "dead" après OUTBOX_MAX_ATTEMPTS essais (défaut 5) ; autre 4xx → "dead"
+  - résultats écrits en une transaction par lot de OUTBOX_CLAIM messages (défaut 200)
+    (outbox + V3ProspectDB : sent_at pour kind "outbound", followup_* pour kind "followup")
+
+Une ligne "sending" orpheline (process tué pendant l'envoi) repasse "pending" après
+OUTBOX_LEASE_S secondes (défaut 300).
+"""
+import logging, os, threading, uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import requests
+
+log = logging.getLogger(__name__)
+
+_BREVO_SMS_URL = "https://api.brevo.com/v3/transactionalSMS/sms"
+
+_OK_STATUSES = (200, 201, 202)
+
+_DRAIN_LOCK   = threading.Lock()     # un seul drain à la fois dans le process
+_SESSION: Optional[requests.Session] = None
+_PROVIDER = None                     # BrevoProvider partagé (emails)
+_SESSION_LOCK = threading.Lock()
+_SENDER_SEMS: Dict[str, threading.BoundedSemaphore] = {}
+_SEMS_LOCK    = threading.Lock()
+
+
+def _workers() -> int:
+    return max(1, int(os.getenv("OUTBOX_WORKERS", "8")))
+
+
+def _per_sender() -> int:
+    return max(1, int(os.getenv("OUTBOX_PER_SENDER", "2")))
+
+
+def _session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                from requests.adapters import HTTPAdapter
+                s = requests.Session()
+                s.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=_workers()))
+                s.mount("http://",  HTTPAdapter(pool_connections=2, pool_maxsize=_workers()))
+                _SESSION = s
+    return _SESSION
+
+
+def _sender_sem(sender: str) -> threading.BoundedSemaphore:
+    with _SEMS_LOCK:
+        sem = _SENDER_SEMS.get(sender)
+        if sem is None:
+            sem = _SENDER_SEMS[sender] = threading.BoundedSemaphore(_per_sender())
+        return sem
+
+
+# ── Écriture ──────────────────────────────────────────────────────────────────
+
+def enqueue(db, rows: List[Dict]) -> int:
+    """
+    Ajoute des messages à l'outbox dans la transaction de `db` (PAS de commit ici).
+    rows : dicts avec message_key, kind, channel, sender, recipient, body
+           (+ token, sender_name, recipient_name, subject optionnels).
+    Une clé déjà présente est ignorée. Retourne le nombre de lignes réellement insérées.
+    """
+    from sqlalchemy.dialects.sqlite import insert
+    from .models import OutboxDB
+
+    if not rows:
+        return 0
+    now  = datetime.utcnow()
+    cols = ("message_key", "kind", "channel", "token", "sender", "sender_name",
+            "recipient", "recipient_name", "subject", "body")
+    values = [{**{c: r.get(c) for c in cols},
+               "status": "pending", "attempts": 0,
+               "next_attempt_at": now, "created_at": now} for r in rows]
+    inserted = 0
+    conn = db.connection()   # même transaction que la session appelante
+    for i in range(0, len(values), 500):
+        res = conn.execute(insert(OutboxDB).values(values[i:i + 500])
+                           .on_conflict_do_nothing(index_elements=["message_key"]))
+        inserted += max(res.rowcount or 0, 0)
+    return inserted
+
+
+def queued_for(kind: str):
+    """Critère SQL « ce V3ProspectDB a déjà un message `kind` dans l'outbox » (anti-jointure)."""
+    from sqlalchemy import exists
+    from .models import OutboxDB, V3ProspectDB
+    return exists().where(OutboxDB.token == V3ProspectDB.token, OutboxDB.kind == kind)
+
+
+# ── Envoi ─────────────────────────────────────────────────────────────────────
+
+def _claim(db, limit: int) -> List[Dict]:
+    """Réserve jusqu'à `limit` messages dus (pending → sending) en une seule requête UPDATE … RETURNING."""
+    from sqlalchemy import select, update
+    from .models import OutboxDB
+
+    now   = datetime.utcnow()
+    lease = timedelta(seconds=float(os.getenv("OUTBOX_LEASE_S", "300")))
+    db.execute(
+        update(OutboxDB)
+        .where(OutboxDB.status == "sending", OutboxDB.locked_at < now - lease)
+        .values(status="pending", locked_at=None)
+    )
+    due = (select(OutboxDB.id)
+           .where(OutboxDB.status == "pending", OutboxDB.next_attempt_at <= now)
+           .order_by(OutboxDB.id)
+           .limit(limit))
+    # un lot messageVersions en attente de nouvel essai est toujours réservé en entier
+    due_batches = (select(OutboxDB.batch_key)
+                   .where(OutboxDB.id.in_(due), OutboxDB.batch_key.isnot(None)))
+    rows = db.execute(
+        update(OutboxDB)
+        .where(OutboxDB.id.in_(due) | OutboxDB.batch_key.in_(due_batches),
+               OutboxDB.status == "pending")
+        .values(status="sending", locked_at=now, attempts=OutboxDB.attempts + 1)
+        .returning(OutboxDB.id, OutboxDB.message_key, OutboxDB.kind, OutboxDB.channel, OutboxDB.token,
+                   OutboxDB.sender, OutboxDB.sender_name, OutboxDB.recipient,
+                   OutboxDB.recipient_name, OutboxDB.subject, OutboxDB.body,
+                   OutboxDB.attempts, OutboxDB.batch_key)
+    ).mappings().all()
+    db.commit()
+    return sorted((dict(r) for r in rows), key=lambda r: r["id"])
+
+
+def _provider(brevo_key: str):
+    """BrevoProvider (marketing_module) partagé : session keep-alive + envoi groupé messageVersions."""
+    global _PROVIDER
+    with _SESSION_LOCK:
+        if _PROVIDER is None or _PROVIDER.api_key != brevo_key:
+            from marketing_module.channels.email.providers.brevo import BrevoProvider
+            _PROVIDER = BrevoProvider(api_key=brevo_key)
+        return _PROVIDER
+
+
+def _email_version(msg: Dict) -> Dict:
+    return {"ref": msg["id"], "to_email": msg["recipient"], "to_name": msg["recipient_name"],
+            "subject": msg["subject"], "text": msg["body"],
+            "headers": {"idempotencyKey": msg["message_key"]}}
+
+
+def _from_provider(r: Dict) -> Dict:
+    out = {"id": r["ref"], "unbatch": bool(r.get("fallback"))}
+    if r["success"]:
+        return {**out, "ok": True, "retry": False, "provider_msg_id": r.get("message_id")}
+    return {**out, "ok": False, "retry": bool(r.get("retry")), "error": r.get("error")}
+
+
+def _post_email_group(msgs: List[Dict], brevo_key: str) -> List[Dict]:
+    """Lot d'un même expéditeur : une requête messageVersions, idempotencyKey = batch_key."""
+    first = msgs[0]
+    with _sender_sem(first["sender"]):
+        results = _provider(brevo_key).send_batch(
+            first["sender"], first["sender_name"], [_email_version(m) for m in msgs],
+            headers={"idempotencyKey": first["batch_key"]})
+    return [_from_provider(r) for r in results]
+
+
+def _post(msg: Dict, brevo_key: str) -> List[Dict]:
+    """Un appel Brevo unitaire (SMS, ou nouvel essai email avec sa clé d'idempotence)."""
+    if msg["channel"] == "email":
+        with _sender_sem(msg["sender"]):
+            r = _provider(brevo_key).send_api(msg["sender"], msg["sender_name"], _email_version(msg))
+        return [_from_provider({**r, "ref": msg["id"]})]
+
+    payload = {"sender": msg["sender"], "recipient": msg["recipient"],
+               "content": msg["body"], "type": "transactional", "tag": msg["message_key"]}
+    with _sender_sem(msg["sender"]):
+        try:
+            resp = _session().post(_BREVO_SMS_URL, json=payload, timeout=15,
+                                   headers={"api-key": brevo_key, "Content-Type": "application/json"})
+        except requests.RequestException as e:
+            return [{"id": msg["id"], "ok": False, "retry": True, "error": str(e)[:500]}]
+
+    if resp.status_code in _OK_STATUSES:
+        try:
+            data = resp.json()
+        except ValueError:
+            data = {}
+        return [{"id": msg["id"], "ok": True, "retry": False, "provider_msg_id": data.get("reference")}]
+    retry = resp.status_code == 429 or resp.status_code >= 500
+    return [{"id": msg["id"], "ok": False, "retry": retry,
+             "error": f"Brevo HTTP {resp.status_code} {resp.text[:300]}"}]
+
+
+def _tasks(db, batch: List[Dict], brevo_key: str) -> List:
+    """
+    Découpe un lot réservé en appels Brevo :
+      - emails en 1er essai : lots messageVersions par expéditeur (OUTBOX_EMAIL_BATCH) de
+        BATCH_MAX_VERSIONS au plus — une seule requête Brevo par batch_key, et plusieurs lots
+        d'un même expéditeur partent en parallèle (OUTBOX_PER_SENDER) ; batch_key enregistré
+        AVANT l'envoi → un nouvel essai renvoie le même lot avec la
+        même idempotencyKey (un lot en 5xx a pu être accepté)
+      - lots déjà constitués : renvoyés tels quels
+      - le reste (SMS, emails sortis d'un lot) : un appel par message
+    """
+    from sqlalchemy import update
+    from marketing_module.channels.email.providers.brevo import BATCH_MAX_VERSIONS
+    from .models import OutboxDB
+
+    grouped = os.getenv("OUTBOX_EMAIL_BATCH", "true").lower() == "true"
+    groups: Dict[str, List[Dict]] = {}
+    fresh:  Dict[tuple, List[Dict]] = {}
+    tasks = []
+    for m in batch:
+        if m["channel"] == "email" and m["batch_key"]:
+            groups.setdefault(m["batch_key"], []).append(m)
+        elif grouped and m["channel"] == "email" and m["attempts"] == 1:
+            fresh.setdefault((m["sender"], m["sender_name"]), []).append(m)
+        else:
+            tasks.append(lambda m=m: _post(m, brevo_key))
+    parts = [msgs[i:i + BATCH_MAX_VERSIONS] for msgs in fresh.values()
+             for i in range(0, len(msgs), BATCH_MAX_VERSIONS)]
+    for msgs in parts:
+        key = f"batch:{uuid.uuid4().hex}"
+        db.execute(update(OutboxDB).where(OutboxDB.id.in_([m["id"] for m in msgs]))
+                   .values(batch_key=key))
+        for m in msgs:
+            m["batch_key"] = key
+        groups[key] = msgs
+    db.commit()
+    for msgs in groups.values():
+        tasks.append(lambda msgs=msgs: _post_email_group(msgs, brevo_key))
+    return tasks
+
+
+def _unbatch(r: Dict) -> Dict:
+    """Lot refusé (4xx) puis envoyé message par message : les essais suivants restent unitaires."""
+    return {"batch_key": None} if r.get("unbatch") else {}
+
+
+def _write_back(db, batch: List[Dict], results: List[Dict]) -> Dict:
+    """Écrit les résultats d'un lot : outbox + V3ProspectDB, une seule transaction."""
+    from sqlalchemy import update
+    from .models import OutboxDB, V3ProspectDB
+
+    now          = datetime.utcnow()
+    max_attempts = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+    backoff      = float(os.getenv("OUTBOX_BACKOFF_S", "60"))
+    by_id        = {m["id"]: m for m in batch}
+    stats        = {"sent": 0, "retry": 0, "dead": 0}
+
+    outbox_rows, sent_email, sent_sms, followups = [], [], [], []
+    for r in results:
+        msg = by_id[r["id"]]
+        if r["ok"]:
+            stats["sent"] += 1
+            outbox_rows.append({"id": r["id"], "status": "sent", "sent_at": now, "locked_at": None,
+                                "last_error": None, "provider_msg_id": r.get("provider_msg_id"),
+                                **_unbatch(r)})
+            if msg["token"] and msg["kind"] == "followup":
+                followups.append({"token": msg["token"], "followup_sent_at": now,
+                                  "followup_status": "sent", "followup_skip_reason": None})
+            elif msg["token"]:
+                if msg["channel"] == "email":
+                    sent_email.append({"token": msg["token"], "sent_at": now, "sent_method": "email",
+                                       "email_status": "sent", "email_sent_at": now})
+                else:
+                    sent_sms.append({"token": msg["token"], "sent_at": now, "sent_method": "sms"})
+        elif r["retry"] and msg["attempts"] < max_attempts:
+            stats["retry"] += 1
+            delay = backoff * (2 ** (msg["attempts"] - 1))
+            outbox_rows.append({"id": r["id"], "status": "pending", "locked_at": None,
+                                "last_error": r["error"],
+                                "next_attempt_at": now + timedelta(seconds=delay), **_unbatch(r)})
+        else:
+            stats["dead"] += 1
+            outbox_rows.append({"id": r["id"], "status": "dead", "locked_at": None,
+                                "last_error": r["error"], **_unbatch(r)})
+            if msg["token"] and msg["kind"] == "followup":
+                followups.append({"token": msg["token"], "followup_sent_at": now,
+                                  "followup_status": "error", "followup_skip_reason": "brevo_error"})
+            log.warning("[OUTBOX] %s abandonné après %d essai(s) : %s",
+                        msg["message_key"], msg["attempts"], r["error"])
+
+    # executemany par groupe de colonnes identiques (UPDATE … WHERE pk = ?)
+    groups: Dict[tuple, List[Dict]] = {}
+    for row in outbox_rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    for rows in groups.values():
+        db.execute(update(OutboxDB), rows)
+    if sent_email or sent_sms:
+        from .outbound_counters import note_sent
+        note_sent(db, [row["token"] for row in sent_email + sent_sms])
+    if sent_email:
+        db.execute(update(V3ProspectDB), sent_email)
+    if sent_sms:
+        db.execute(update(V3ProspectDB), sent_sms)
+    if followups:
+        db.execute(update(V3ProspectDB), followups)
+    db.commit()
+    return stats
+
+
+def drain(batch_size: int = None) -> Dict:
+    """
+    Envoie tous les messages dus. Non bloquant : si un drain tourne déjà dans ce
+    process, retourne immédiatement {"busy": True}.
+    Retourne {"claimed", "sent", "retry", "dead"}.
+    """
+    from .database import SessionLocal
+
+    if not _DRAIN_LOCK.acquire(blocking=False):
+        return {"busy": True}
+    try:
+        totals = {"claimed": 0, "sent": 0, "retry": 0, "dead": 0}
+        brevo_key = os.getenv("BREVO_API_KEY", "")
+        if not brevo_key:
+            log.warning("[OUTBOX] BREVO_API_KEY absent — drain annulé")
+            return totals
+        batch_size = batch_size or int(os.getenv("OUTBOX_CLAIM", "200"))
+        with ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="outbox") as pool:
+            while True:
+                with SessionLocal() as db:
+                    batch = _claim(db, batch_size)
+                    if not batch:
+                        break
+                    tasks = _tasks(db, batch, brevo_key)
+                results = [r for rs in pool.map(lambda t: t(), tasks) for r in rs]
+                with SessionLocal() as db:
+                    stats = _write_back(db, batch, results)
+                totals["claimed"] += len(batch)
+                for k, v in stats.items():
+                    totals[k] += v
+        if totals["claimed"]:
+            log.info("[OUTBOX] drain — %s", totals)
+        return totals
+    finally:
+        _DRAIN_LOCK.release()
+
+
+def drain_async() -> threading.Thread:
+    """Lance drain() dans un thread daemon (retour immédiat pour le job appelant)."""
+    t = threading.Thread(target=drain, name="outbox-drain", daemon=True)
+    t.start()
+    return t
+
+
+def stats() -> Dict[str, int]:
+    """Nombre de messages par statut."""
+    from sqlalchemy import func
+    from .database import SessionLocal
+    from .models import OutboxDB
+    with SessionLocal() as db:
+        return dict(db.query(OutboxDB.status, func.count(OutboxDB.id))
+                    .group_by(OutboxDB.status).all())
@@ -1,6 +1,7 @@
 """
 ref_cities_seed.py — Villes de référence françaises (préfectures + sous-préfectures).
-Utilisé au démarrage pour peupler ref_cities et backfiller city_reference sur V3ProspectDB.
+Peuple ref_cities (seed "ref_cities" de src.seeds) ; city_reference_for() renseigne
+V3ProspectDB.city_reference à l'insertion des prospects.
 """
 from __future__ import annotations
 
@@ -93,24 +94,25 @@ def seed_ref_cities(db) -> int:
     return inserted
 
 
+_REF_NAMES = frozenset(name for name, _ in REF_CITIES)
+
+
+def city_reference_for(city: str | None) -> str | None:
+    """city si c'est une ville de référence (comparaison en majuscules), sinon None."""
+    return city if city and city.strip().upper() in _REF_NAMES else None
+
+
 def backfill_city_reference(db) -> int:
     """
-    Pour chaque prospect dont city (UPPERCASE) est dans ref_cities :
-    → city_reference = city
-    Sinon laisse NULL.
+    Pour chaque prospect sans city_reference dont city (UPPERCASE) est dans ref_cities :
+    → city_reference = city (un seul UPDATE).
     Retourne le nombre de prospects mis à jour.
     """
-    from .models import RefCityDB, V3ProspectDB
-
-    ref_names = {r.city_name for r in db.query(RefCityDB.city_name).all()}
-
-    updated = 0
-    prospects = db.query(V3ProspectDB).filter(V3ProspectDB.city_reference.is_(None)).all()
-    for p in prospects:
-        city_upper = (p.city or "").strip().upper()
-        if city_upper in ref_names:
-            p.city_reference = p.city
-            updated += 1
+    from sqlalchemy import text
+    updated = db.execute(text(
+        "UPDATE v3_prospects SET city_reference = city "
+        "WHERE city_reference IS NULL AND upper(trim(city)) IN (SELECT city_name FROM ref_cities)"
+    )).rowcount
     if updated:
         db.commit()
     return updated
@@ -0,0 +1,252 @@
+"""
+REFRESH PLANNER — Choix des paires (métier × ville) dont les résultats IA sont relancés.
+
+_job_refresh_ia relançait le test complet (3 prompts × 3 IA) de la seule paire active à
+chaque exécution, que ses résultats datent de la veille ou d'un mois, qu'ils bougent
+d'un test à l'autre ou non. Le planner classe toutes les paires candidates et retient
+celles qui tiennent dans le budget du jour :
+
+  candidates  : paire active + clés pending:{city}|{profession} de outbound_counters
+                (leads en file qui citeront ces résultats) + ciblages actifs
+                (prospection_targets) — jamais de scan de v3_prospects
+  staleness   : âge du dernier snapshot / REFRESH_IA_MAX_AGE_H (plafonné à 1 ; jamais
+                testée = 1). Sous REFRESH_IA_MIN_AGE_H la paire n'est pas relancée.
+  volatility  : distance de Jaccard moyenne entre les ensembles de noms cités de
+                snapshots consécutifs (ia_pair_snapshots) ; prior 0.5 sans historique
+  demand      : log(1 + leads en file) normalisé sur les candidates ; 1 pour la paire active
+
+  priorité = staleness × (0.2 + 0.4 × volatility + 0.4 × demand)
+
+Budget par jour UTC : REFRESH_IA_DAILY_CALLS appels (défaut 9 = une paire complète) et,
+si défini, REFRESH_IA_DAILY_COST ($, REFRESH_IA_COST_PER_CALL par appel). Les appels
+déjà consommés dans la journée (snapshots du jour) sont déduits : une relance compte
+pour tous ses appels tentés, qu'elle aboutisse ou non. Les paires retenues sont
+relancées en parallèle (REFRESH_IA_CONCURRENCY, défaut 3) ; chaque relance enregistre
+un snapshot qui alimente la volatilité des plans suivants (ok = False en cas d'échec :
+compté dans le budget, ignoré par la volatilité).
+"""
+import json, logging, math, os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_HISTORY = 5            # snapshots considérés pour la volatilité
+_PRIOR_VOLATILITY = 0.5
+
+
+def _jaccard_distance(a: set, b: set) -> float:
+    if not a and not b:
+        return 0.0
+    return 1.0 - len(a & b) / len(a | b)
+
+
+def volatility(history: List[set]) -> float:
+    """Distance de Jaccard moyenne entre snapshots consécutifs (du plus ancien au plus récent)."""
+    if len(history) < 2:
+        return _PRIOR_VOLATILITY
+    dists = [_jaccard_distance(a, b) for a, b in zip(history, history[1:])]
+    return sum(dists) / len(dists)
+
+
+def calls_per_pair() -> int:
+    """Appels d'un test complet : REFRESH_IA_CALLS_PER_PAIR, sinon 3 prompts × IA configurées."""
+    if os.getenv("REFRESH_IA_CALLS_PER_PAIR"):
+        return int(os.getenv("REFRESH_IA_CALLS_PER_PAIR"))
+    models = sum(1 for k in ("OPENAI_API_KEY", "GEMINI_API_KEY", "ANTHROPIC_API_KEY") if os.getenv(k))
+    return 3 * max(1, models)
+
+
+def budget() -> Dict:
+    cost = os.getenv("REFRESH_IA_DAILY_COST")
+    return {
+        "calls":         int(os.getenv("REFRESH_IA_DAILY_CALLS", "9")),
+        "cost":          float(cost) if cost else None,
+        "cost_per_call": float(os.getenv("REFRESH_IA_COST_PER_CALL", "0.01")),
+    }
+
+
+def _candidates(db) -> Dict[Tuple[str, str], Dict]:
+    """(city, profession) → {"pending", "active"} — compteurs, ciblages et paire active."""
+    from .active_pair import get_active_pair
+    from .models import OutboundCounterDB, ProspectionTargetDB
+
+    pairs: Dict[Tuple[str, str], Dict] = {}
+    for key, value in (db.query(OutboundCounterDB.key, OutboundCounterDB.value)
+                         .filter(OutboundCounterDB.key.like("pending:%"))):
+        city, _, profession = key[len("pending:"):].partition("|")
+        if city and profession and value > 0:
+            pairs[(city, profession)] = {"pending": value, "active": False}
+    for city, profession in (db.query(ProspectionTargetDB.city, ProspectionTargetDB.profession)
+                               .filter(ProspectionTargetDB.active == True)):
+        pairs.setdefault((city, profession), {"pending": 0, "active": False})
+    active = get_active_pair()
+    if active:
+        pairs.setdefault((active["city"], active["profession"]), {"pending": 0, "active": False})["active"] = True
+    return pairs
+
+
+def _history(db, pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], List]:
+    """(city, profession) → snapshots récents [(created_at, set(noms))], du plus ancien au plus récent."""
+    import sqlalchemy as sa
+    from .models import IaPairSnapshotDB
+
+    pairs = list(pairs)
+    if not pairs:
+        return {}
+    S = IaPairSnapshotDB
+    rn = sa.func.row_number().over(partition_by=(S.city, S.profession),
+                                   order_by=S.created_at.desc()).label("rn")
+    sub = (sa.select(S.city, S.profession, S.created_at, S.cited_json, rn)
+             .where(sa.tuple_(S.city, S.profession).in_(pairs), S.ok.is_(True))
+             .subquery())
+    rows = db.execute(sa.select(sub).where(sub.c.rn <= _HISTORY)
+                        .order_by(sub.c.city, sub.c.profession, sub.c.created_at)).all()
+    out: Dict[Tuple[str, str], List] = {}
+    for r in rows:
+        out.setdefault((r.city, r.profession), []).append((r.created_at, set(json.loads(r.cited_json or "[]"))))
+    return out
+
+
+def _spent_today(db, now: datetime) -> Tuple[int, float]:
+    import sqlalchemy as sa
+    from .models import IaPairSnapshotDB
+
+    day = datetime(now.year, now.month, now.day)
+    calls, cost = db.query(sa.func.coalesce(sa.func.sum(IaPairSnapshotDB.calls), 0),
+                           sa.func.coalesce(sa.func.sum(IaPairSnapshotDB.cost), 0.0)) \
+                    .filter(IaPairSnapshotDB.created_at >= day).one()
+    return int(calls), float(cost)
+
+
+def score(pairs: Dict[Tuple[str, str], Dict], history: Dict[Tuple[str, str], List],
+          now: datetime) -> List[Dict]:
+    """Priorité de chaque paire candidate, triée par priorité décroissante (ex aequo : ville, métier)."""
+    max_age  = float(os.getenv("REFRESH_IA_MAX_AGE_H", "168"))
+    min_age  = float(os.getenv("REFRESH_IA_MIN_AGE_H", "24"))
+    top      = max((math.log1p(p["pending"]) for p in pairs.values()), default=0.0) or 1.0
+    scored = []
+    for (city, profession), info in pairs.items():
+        snaps   = history.get((city, profession), [])
+        age_h   = (now - snaps[-1][0]).total_seconds() / 3600 if snaps else None
+        stale   = 1.0 if age_h is None else min(1.0, age_h / max_age)
+        vol     = volatility([s for _, s in snaps])
+        demand  = 1.0 if info["active"] else math.log1p(info["pending"]) / top
+        prio    = stale * (0.2 + 0.4 * vol + 0.4 * demand)
+        if age_h is not None and age_h < min_age:
+            prio = 0.0
+        elif not info["active"] and info["pending"] == 0 and snaps:
+            prio = 0.0                                  # déjà testée, personne à qui l'envoyer
+        scored.append({"city": city, "profession": profession, "age_h": age_h,
+                       "staleness": round(stale, 3), "volatility": round(vol, 3),
+                       "demand": round(demand, 3), "pending": info["pending"],
+                       "active": info["active"], "priority": round(prio, 4)})
+    scored.sort(key=lambda s: (-s["priority"], s["city"], s["profession"]))
+    return scored
+
+
+def select(scored: List[Dict], calls_left: int, cost_left: Optional[float],
+           per_pair: int, cost_per_call: float) -> List[Dict]:
+    """Paires retenues par priorité décroissante tant que le budget (appels, coût) le permet."""
+    chosen = []
+    for s in scored:
+        if s["priority"] <= 0:
+            break
+        cost = per_pair * cost_per_call
+        if per_pair > calls_left or (cost_left is not None and cost > cost_left + 1e-9):
+            break
+        chosen.append(s)
+        calls_left -= per_pair
+        if cost_left is not None:
+            cost_left -= cost
+    return chosen
+
+
+def plan(now: Optional[datetime] = None) -> Dict:
+    """Plan du jour : {"budget", "spent", "per_pair", "scored", "selected"} — aucun appel IA."""
+    from .database import SessionLocal
+
+    now = now or datetime.utcnow()
+    b, per_pair = budget(), calls_per_pair()
+    with SessionLocal() as db:
+        pairs   = _candidates(db)
+        scored  = score(pairs, _history(db, pairs), now)
+        calls, cost = _spent_today(db, now)
+    cost_left = None if b["cost"] is None else b["cost"] - cost
+    selected = select(scored, b["calls"] - calls, cost_left, per_pair, b["cost_per_call"])
+    return {"budget": b, "spent": {"calls": calls, "cost": round(cost, 4)}, "per_pair": per_pair,
+            "scored": scored, "selected": selected}
+
+
+def _record_failure(city: str, profession: str, calls: int, now: Optional[datetime]) -> None:
+    """Relance échouée : ses appels tentés sont quand même déduits du budget du jour."""
+    from .database import SessionLocal
+    from .models import IaPairSnapshotDB
+
+    with SessionLocal() as db:
+        db.add(IaPairSnapshotDB(city=city, profession=profession, created_at=now or datetime.utcnow(),
+                                ok=False, calls=calls, cost=round(calls * budget()["cost_per_call"], 4)))
+        db.commit()
+
+
+def refresh_pair(city: str, profession: str, now: Optional[datetime] = None) -> Dict:
+    """Test IA complet d'une paire : met à jour ses prospects, les cités et enregistre un snapshot."""
+    from .database import SessionLocal
+    from .api.routes.v3 import _run_ia_test
+    from .models import IaPairSnapshotDB, V3ProspectDB
+    from .outbound_counters import recount_pending
+    from .scheduler import _extract_cited_names, _norm_cited, _upsert_cited_companies
+
+    calls = calls_per_pair()                            # tentés, même si certaines IA échouent
+    try:
+        ia_data = _run_ia_test(profession, city)
+    except Exception:
+        _record_failure(city, profession, calls, now)
+        raise
+    if not ia_data or not ia_data.get("results"):
+        _record_failure(city, profession, calls, now)
+        return {"city": city, "profession": profession, "ok": False, "calls": calls}
+    results = ia_data["results"]
+    ia_results_json = json.dumps(results, ensure_ascii=False)
+    cited = _extract_cited_names(results)
+    names = sorted({n for n in (_norm_cited(c) for c in cited) if n})
+    with SessionLocal() as db:
+        db.query(V3ProspectDB).filter_by(city=city, profession=profession).update({
+            V3ProspectDB.ia_prompt:    ia_data.get("prompt"),
+            V3ProspectDB.ia_response:  ia_data.get("response"),
+            V3ProspectDB.ia_model:     ia_data.get("model"),
+            V3ProspectDB.ia_tested_at: ia_data.get("tested_at"),
+            V3ProspectDB.ia_results:   ia_results_json,
+        }, synchronize_session=False)
+        recount_pending(db, [(city, profession)])
+        db.add(IaPairSnapshotDB(city=city, profession=profession, created_at=now or datetime.utcnow(),
+                                cited_json=json.dumps(names, ensure_ascii=False),
+                                nb_cited=len(names), calls=calls,
+                                cost=round(calls * budget()["cost_per_call"], 4)))
+        db.commit()
+        _upsert_cited_companies(db, profession, city, cited)
+    log.info("refresh_ia OK: %s / %s — %d cités extraits", profession, city, len(cited))
+    return {"city": city, "profession": profession, "ok": True, "calls": calls, "cited": len(names)}
+
+
+def run(now: Optional[datetime] = None) -> Dict:
+    """Plan du jour puis relance concurrente des paires retenues."""
+    p = plan(now)
+    selected = p["selected"]
+    log.info("refresh_ia : %d candidate(s), %d retenue(s) — budget %d appels (%d déjà consommés), %d/paire",
+             len(p["scored"]), len(selected), p["budget"]["calls"], p["spent"]["calls"], p["per_pair"])
+    if not selected:
+        return {**p, "results": []}
+
+    def _one(s):
+        try:
+            return refresh_pair(s["city"], s["profession"], now)
+        except Exception as e:                          # loggé par le job (thread principal)
+            return {"city": s["city"], "profession": s["profession"], "ok": False,
+                    "calls": p["per_pair"], "error": str(e)}
+
+    workers = max(1, min(int(os.getenv("REFRESH_IA_CONCURRENCY", "3")), len(selected)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="refresh-ia") as pool:
+        results = list(pool.map(_one, selected))
+    return {**p, "results": results}
@@ -10,9 +10,26 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 
+from .jobruns import tracked
+
 log = logging.getLogger(__name__)
 
 _scheduler: BackgroundScheduler | None = None
+_elector = None   # src.leader.LeaderElector du process (mode multi-workers)
+
+
+def start_leader_scheduler():
+    """
+    Démarre l'élection du leader : seul le process détenteur du bail "scheduler"
+    exécute start_scheduler() ; les autres workers servent uniquement le HTTP et
+    reprennent la main si le leader meurt. Idempotent.
+    """
+    global _elector
+    if _elector is not None:
+        return
+    from .leader import LeaderElector
+    _elector = LeaderElector("scheduler", on_acquire=start_scheduler, on_release=_shutdown_jobs)
+    _elector.start()
 
 
 def start_scheduler():
@@ -21,7 +38,7 @@ def start_scheduler():
     if _scheduler and _scheduler.running:
         return
 
-    _scheduler = BackgroundScheduler(timezone="UTC")
+    _scheduler = BackgroundScheduler(timezone="UTC", job_defaults=_job_limits())
 
     # Job 1 : prospection automatique (toutes les heures)
     _scheduler.add_job(
@@ -41,7 +58,9 @@ def start_scheduler():
         misfire_grace_time=3600,
     )
 
-    # Job 4 : polling IMAP réponses — toutes les 5 min
+    # Job 4 : réponses IMAP — thread IDLE (push) + polling de repli toutes les 5 min
+    from .imap_replies import start_watcher
+    start_watcher()
     _scheduler.add_job(
         _job_imap_reply_poll,
         trigger=IntervalTrigger(minutes=5),
@@ -50,13 +69,22 @@ def start_scheduler():
         misfire_grace_time=60,
     )
 
-    # Job 5 : warming email — ~4h avec jitter ±45min (base 3h15 + jitter 5400s → entre 3h15 et 4h45)
+    # Job 5 : warming email — plan du jour + envois dus, toutes les 5 min
     _scheduler.add_job(
         _job_warming,
-        trigger=IntervalTrigger(hours=3, minutes=15, jitter=5400),
+        trigger=IntervalTrigger(minutes=5),
         id="email_warming",
         replace_existing=True,
-        misfire_grace_time=600,
+        misfire_grace_time=120,
+    )
+
+    # Job 5b : warming — réconciliation des boîtes réceptrices (réponses / relances), toutes les 30 min
+    _scheduler.add_job(
+        _job_warming_reconcile,
+        trigger=IntervalTrigger(minutes=30),
+        id="warming_reconcile",
+        replace_existing=True,
+        misfire_grace_time=300,
     )
 
     # Job 6 : qualification SIRENE automatique — Lun/Mer/Ven à 2h UTC
@@ -113,6 +141,15 @@ def start_scheduler():
         misfire_grace_time=600,
     )
 
+    # Job 11a : outbox Brevo — reprise des envois en échec / en attente (l'outbound lance aussi un drain)
+    _scheduler.add_job(
+        _job_outbox_drain,
+        trigger=IntervalTrigger(minutes=1),
+        id="outbox_drain",
+        replace_existing=True,
+        misfire_grace_time=60,
+    )
+
     # Job 11b : relance J+1 — toutes les heures, 15 min après l'outbound
     _scheduler.add_job(
         _job_followup,
@@ -122,6 +159,24 @@ def start_scheduler():
         misfire_grace_time=600,
     )
 
+    # Job 11c : prefetch images header villes — toutes les 6h, hors chemin des requêtes landing
+    _scheduler.add_job(
+        _job_prefetch_city_headers,
+        trigger=IntervalTrigger(hours=6),
+        id="prefetch_city_headers",
+        replace_existing=True,
+        misfire_grace_time=600,
+    )
+
+    # Job 11d : compteurs du pilotage outbound — réconciliation (corrige la dérive)
+    _scheduler.add_job(
+        _job_outbound_counters,
+        trigger=IntervalTrigger(minutes=15),
+        id="outbound_counters",
+        replace_existing=True,
+        misfire_grace_time=600,
+    )
+
     # Job 12 : sync Brevo — chaque nuit à 3h UTC (sécurité en complément du webhook)
     _scheduler.add_job(
         _job_sync_brevo,
@@ -131,10 +186,86 @@ def start_scheduler():
         misfire_grace_time=3600,
     )
 
+    # Job 13 : purge du registre des exécutions (job_runs) — chaque nuit à 3h30 UTC
+    _scheduler.add_job(
+        _job_runs_purge,
+        trigger=CronTrigger(hour=3, minute=30, timezone="UTC"),
+        id="job_runs_purge",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+
+    # Job 13b : compactage des coûts API bruts (job_cost_log → rollup job_cost_daily) — 3h40 UTC
+    _scheduler.add_job(
+        _job_cost_compact,
+        trigger=CronTrigger(hour=3, minute=40, timezone="UTC"),
+        id="job_cost_compact",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+
+    # Job 13c : archivage froid (prospects terminés, livraisons, snapshots supplantés) — 3h50 UTC
+    _scheduler.add_job(
+        _job_archive,
+        trigger=CronTrigger(hour=3, minute=50, timezone="UTC"),
+        id="archive",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+
+    # Job 14 : SQLite — checkpoint WAL + PRAGMA optimize des deux bases, toutes les 15 min
+    _scheduler.add_job(
+        _job_sqlite_maintenance,
+        trigger=IntervalTrigger(minutes=15),
+        id="sqlite_maintenance",
+        replace_existing=True,
+        misfire_grace_time=300,
+    )
+
+    # max_instances / coalesce : défauts SCHEDULER_MAX_INSTANCES / SCHEDULER_COALESCE,
+    # surchargeables par job (SCHEDULER_MAX_INSTANCES_OUTBOUND=2, SCHEDULER_COALESCE_FOLLOWUP=false…)
+    for job in _scheduler.get_jobs():
+        limits = _job_limits(job.id)
+        if limits != _job_limits():
+            job.modify(**limits)
+    from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+    _scheduler.add_listener(_on_job_not_run, EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
+
     _scheduler.start()
     log.info("Scheduler démarré — %d job(s)", len(_scheduler.get_jobs()))
 
 
+def _job_limits(job_id: str = None) -> dict:
+    """max_instances / coalesce d'un job : variable par job, sinon défaut global (1 / true)."""
+    import os
+    suffix = f"_{job_id.upper()}" if job_id else ""
+    max_inst = os.getenv(f"SCHEDULER_MAX_INSTANCES{suffix}") or os.getenv("SCHEDULER_MAX_INSTANCES", "1")
+    coalesce = os.getenv(f"SCHEDULER_COALESCE{suffix}") or os.getenv("SCHEDULER_COALESCE", "true")
+    return {"max_instances": max(1, int(max_inst)), "coalesce": coalesce.lower() != "false"}
+
+
+def _on_job_not_run(event):
+    """Listener APScheduler : exécution refusée (max_instances) ou ratée → ligne "skipped" dans job_runs."""
+    from apscheduler.events import EVENT_JOB_MAX_INSTANCES
+    from .jobruns import record_skipped
+    reason = "max_instances" if event.code == EVENT_JOB_MAX_INSTANCES else "missed"
+    log.warning("[SCHEDULER] %s non exécuté (%s)", event.job_id, reason)
+    record_skipped(event.job_id, reason)
+
+
+def job_intervals() -> dict:
+    """Secondes entre les deux prochains déclenchements de chaque job (pour le headroom des stats)."""
+    if not _scheduler or not _scheduler.running:
+        return {}
+    out = {}
+    for job in _scheduler.get_jobs():
+        nxt = job.next_run_time
+        after = job.trigger.get_next_fire_time(nxt, nxt) if nxt else None
+        if nxt and after:
+            out[job.id] = (after - nxt).total_seconds()
+    return out
+
+
 def get_jobs_status() -> list[dict]:
     """Retourne le statut des jobs principaux (next_run depuis APScheduler)."""
     JOB_LABELS = {
@@ -144,8 +275,16 @@ def get_jobs_status() -> list[dict]:
         "outbound":        ("Envoi emails outbound", "tous les jours à 9h UTC"),
         "refresh_ia":      ("Refresh IA (paires actives)", "Lun/Jeu/Dim 9h30 UTC"),
         "auto_qualify":    ("Qualification SIRENE", "Lun/Mer/Ven 2h UTC"),
-        "email_warming":   ("Email warming", "~toutes les 4h"),
+        "email_warming":   ("Email warming (plan du jour)", "toutes les 5 min"),
+        "warming_reconcile": ("Warming — boîtes réceptrices", "toutes les 30 min"),
         "check_api_keys":  ("Vérif. clés API", "toutes les 6h"),
+        "prefetch_city_headers": ("Images header villes", "toutes les 6h"),
+        "outbox_drain":    ("Outbox Brevo (envois)", "toutes les minutes"),
+        "outbound_counters": ("Compteurs pilotage outbound", "toutes les 15 min"),
+        "job_runs_purge":  ("Purge registre des exécutions", "chaque nuit 3h30 UTC"),
+        "job_cost_compact": ("Compactage coûts API bruts", "chaque nuit 3h40 UTC"),
+        "archive":         ("Archivage froid (prospects terminés)", "chaque nuit 3h50 UTC"),
+        "sqlite_maintenance": ("SQLite — checkpoint WAL + optimize", "toutes les 15 min"),
     }
     if not _scheduler or not _scheduler.running:
         return [{"id": k, "label": v[0], "freq": v[1], "next_run": None, "running": False}
@@ -163,6 +302,43 @@ def get_jobs_status() -> list[dict]:
     return result
 
 
+@tracked("prefetch_city_headers")
+def _job_prefetch_city_headers():
+    """
+    Télécharge en avance les images header (paires actives puis RefCityDB) dans le cache local,
+    CITY_HEADER_PREFETCH_LIMIT tentatives au plus par run (défaut 20).
+    """
+    import os
+    from .city_images import prefetch_city_headers
+    try:
+        prefetch_city_headers(limit=max(1, int(os.getenv("CITY_HEADER_PREFETCH_LIMIT", "20"))))
+    except Exception as e:
+        log.error("[HEADERS] prefetch échoué : %s", e)
+
+
+@tracked("outbox_drain")
+def _job_outbox_drain():
+    """Envoie les messages dus de l'outbox (nouveaux + nouvelles tentatives)."""
+    from .outbox import drain
+    from .jobruns import count
+    try:
+        res = drain()
+        count(items_in=res.get("claimed", 0), items_out=res.get("sent", 0))
+    except Exception as e:
+        log.error("[OUTBOX] drain échoué : %s", e)
+
+
+@tracked("outbound_counters")
+def _job_outbound_counters():
+    """Recalcule les compteurs de compute_outbound_need depuis les tables sources."""
+    from .outbound_counters import reconcile
+    try:
+        reconcile()
+    except Exception as e:
+        log.error("[COUNTERS] réconciliation échouée : %s", e)
+
+
+@tracked("check_api_keys")
 def _job_check_api_keys():
     """Vérifie que les clés OpenAI, Gemini et Anthropic sont valides.
     Envoie une alerte email via Brevo si l'une d'elles retourne 401/403.
@@ -265,6 +441,56 @@ def _job_check_api_keys():
         log.warning("check_api_keys: échec envoi alerte — %s", e)
 
 
+@tracked("job_runs_purge")
+def _job_runs_purge():
+    """Supprime les exécutions de job_runs au-delà de JOB_RUNS_RETENTION_DAYS (défaut 30)."""
+    try:
+        from .jobruns import purge, count
+        count(items_out=purge())
+    except Exception as e:
+        log.error("[JOBRUNS] purge échouée : %s", e)
+
+
+@tracked("job_cost_compact")
+def _job_cost_compact():
+    """Supprime les coûts API bruts au-delà de JOB_COST_RETENTION_DAYS (défaut 90), déjà dans le rollup."""
+    try:
+        from .job_costs import compact
+        from .jobruns import count
+        count(items_out=compact())
+    except Exception as e:
+        log.error("[JOBCOST] compactage échoué : %s", e)
+
+
+@tracked("archive")
+def _job_archive():
+    """Déplace vers les tables *_archive les lignes terminées de plus de ARCHIVE_AFTER_DAYS (défaut 180)."""
+    try:
+        from .archive import run
+        from .jobruns import count
+        count(items_out=sum(run().values()))
+    except Exception as e:
+        log.error("[ARCHIVE] archivage échoué : %s", e)
+
+
+@tracked("sqlite_maintenance")
+def _job_sqlite_maintenance():
+    """Checkpoint WAL (PASSIVE, TRUNCATE si le -wal dépasse SQLITE_WAL_TRUNCATE_MB) + PRAGMA optimize."""
+    from marketing_module.sqlite_engine import maintenance
+    from .jobruns import count
+    from .database import ENGINE
+    from marketing_module import database as mkt_db
+    for name, engine in (("presence_ia", ENGINE), ("marketing", mkt_db._engine)):
+        try:
+            res = maintenance(engine)
+            count(items_in=res["log"], items_out=res["checkpointed"])
+            if res["busy"] or res["mode"] == "TRUNCATE":
+                log.info("[SQLITE] %s — %s", name, res)
+        except Exception as e:
+            log.error("[SQLITE] maintenance %s : %s", name, e)
+
+
+@tracked("sync_brevo")
 def _job_sync_brevo():
     """Synchronise les événements Brevo (email + SMS) vers v3_prospects — nuit à 3h UTC."""
     try:
@@ -275,12 +501,34 @@ def _job_sync_brevo():
         log.error("sync_brevo: erreur — %s", e)
 
 
-def stop_scheduler():
-    """Arrête proprement le scheduler (appelé au shutdown)."""
-    global _scheduler
+def _shutdown_jobs():
+    """
+    Arrête le scheduler en attendant les jobs en cours, au plus LEADER_DRAIN_S secondes :
+    le bail leader n'est rendu qu'ensuite, le nouveau leader ne les chevauche pas.
+    """
+    import threading
+    from .imap_replies import stop_watcher
+    from .leader import _drain
+    stop_watcher()
     if _scheduler and _scheduler.running:
-        _scheduler.shutdown(wait=False)
-        log.info("Scheduler arrêté")
+        drain = _elector.drain if _elector is not None else _drain()
+        t = threading.Thread(target=_scheduler.shutdown, kwargs={"wait": True},
+                             name="scheduler-drain", daemon=True)
+        t.start()
+        t.join(drain)
+        if t.is_alive():
+            log.warning("Scheduler arrêté — jobs encore en cours après %.0fs", drain)
+        else:
+            log.info("Scheduler arrêté")
+
+
+def stop_scheduler():
+    """Arrête proprement le scheduler et rend le bail leader (appelé au shutdown)."""
+    global _elector
+    if _elector is not None:
+        _elector.stop()
+        _elector = None
+    _shutdown_jobs()
 
 
 def scheduler_status() -> list[dict]:
@@ -296,6 +544,7 @@ def scheduler_status() -> list[dict]:
 
 # ── Implémentation des jobs ────────────────────────────────────────────────
 
+@tracked("monthly_retest")
 def _job_monthly_retest():
     """Lance les retests mensuels pour tous les prospects sous contrat (paid=True)."""
     try:
@@ -394,47 +643,22 @@ def _upsert_cited_companies(db, profession: str, city: str, cited: dict):
     db.commit()
 
 
+@tracked("refresh_ia")
 def _job_refresh_ia():
-    """Relance les tests IA (ChatGPT + Gemini + Claude) pour la paire active UNIQUEMENT.
-    lun/jeu/dim à 7h30 UTC. 1 run (9 requêtes max) par exécution.
-    Alimente ia_cited_companies + ia_results sur tous les prospects de la paire.
+    """Relance les tests IA (ChatGPT + Gemini + Claude) des paires choisies par src.refresh_planner.
+    lun/jeu/dim à 7h30 UTC. Paires classées par ancienneté, volatilité des résultats et leads
+    en file ; relancées en parallèle dans la limite du budget du jour (REFRESH_IA_DAILY_CALLS,
+    défaut 9 = une paire complète, comme l'ancien refresh de la seule paire active).
+    Alimente ia_cited_companies + ia_results sur tous les prospects des paires relancées.
     """
     try:
-        import time as _time, json as _json
-        from .database import SessionLocal
-        from .api.routes.v3 import _run_ia_test, V3ProspectDB
-        from .active_pair import get_active_pair
-
-        # PAIRE ACTIVE UNIQUEMENT — jamais toutes les paires
-        active = get_active_pair()
-        if not active:
-            log.info("refresh_ia : aucune paire active — skip")
-            return
-
-        # RÈGLE ABSOLUE : uniquement les paires issues de get_active_pair()
-        # Jamais de requête DB sur v3_prospects pour construire cette liste
-        active_pairs = [(active["city"], active["profession"])]
-        log.info("refresh_ia : paire active = %s / %s", active["city"], active["profession"])
-        for city, profession in active_pairs:
-            try:
-                ia_data = _run_ia_test(profession, city)
-                if not ia_data or not ia_data.get("results"):
-                    continue
-                ia_results_json = _json.dumps(ia_data["results"], ensure_ascii=False)
-                cited = _extract_cited_names(ia_data["results"])
-                with SessionLocal() as db:
-                    for p in db.query(V3ProspectDB).filter_by(city=city, profession=profession).all():
-                        p.ia_prompt    = ia_data.get("prompt")
-                        p.ia_response  = ia_data.get("response")
-                        p.ia_model     = ia_data.get("model")
-                        p.ia_tested_at = ia_data.get("tested_at")
-                        p.ia_results   = ia_results_json
-                    db.commit()
-                    _upsert_cited_companies(db, profession, city, cited)
-                log.info("refresh_ia OK: %s / %s — %d cités extraits", profession, city, len(cited))
-            except Exception as e:
-                log.error("refresh_ia %s/%s: %s", profession, city, e)
-            _time.sleep(3)
+        from .refresh_planner import run
+        from .jobruns import count
+        res = run()
+        count(items_in=len(res["scored"]), items_out=sum(1 for r in res["results"] if r.get("ok")))
+        for r in res["results"]:
+            if r.get("error"):
+                log.error("refresh_ia %s/%s: %s", r["profession"], r["city"], r["error"])
     except Exception as e:
         log.error("_job_refresh_ia: %s", e)
 
@@ -482,9 +706,11 @@ def _send_reply_alert(prospect_name: str, prospect_email: str, snippet: str, cha
         log.warning("_send_reply_alert : %s", e)
 
 
+@tracked("imap_reply_poll")
 def _job_imap_reply_poll():
     """
-    Polling IMAP toutes les 5 min — détecte les réponses des prospects.
+    Polling IMAP toutes les 5 min — détecte les réponses des prospects (src.imap_replies).
+    Chemin de repli : si le thread IDLE tourne, il est déjà à jour et ce job ne fait rien.
 
     Variables d'env requises :
       IMAP_HOST     ex: imap.gmail.com
@@ -492,149 +718,17 @@ def _job_imap_reply_poll():
       IMAP_USER     ex: contact@presence-ia.com
       IMAP_PASSWORD mot de passe ou app password
       IMAP_FOLDER   dossier à surveiller (défaut: INBOX)
-
-    Logique :
-      1. Cherche les emails UNSEEN dans INBOX
-      2. Pour chaque email, extrait l'adresse "From"
-      3. Cherche le prospect dans V3ProspectDB par email
-      4. Si trouvé : marque reply_status=positive dans ProspectDeliveryDB
-      5. Envoie alerte email à l'admin
-      6. Marque l'email comme SEEN pour ne pas le retraiter
     """
-    import os, imaplib, email as _email
-    from email.header import decode_header
-
-    host  = os.getenv("IMAP_HOST", "")
-    port  = int(os.getenv("IMAP_PORT", "993"))
-    user  = os.getenv("IMAP_USER", "")
-    pwd   = os.getenv("IMAP_PASSWORD", "")
-    folder = os.getenv("IMAP_FOLDER", "INBOX")
-
-    if not (host and user and pwd):
-        return  # non configuré → silencieux
-
     try:
-        conn = imaplib.IMAP4_SSL(host, port)
-        conn.login(user, pwd)
-        conn.select(folder)
-
-        # Chercher emails non lus
-        _, data = conn.search(None, "UNSEEN")
-        if not data or not data[0]:
-            conn.logout()
-            return
-
-        uids = data[0].split()
-        if not uids:
-            conn.logout()
-            return
-
-        log.info("IMAP poll : %d email(s) non lus", len(uids))
-
-        from .database import SessionLocal
-        from .models import V3ProspectDB
-
-        try:
-            from marketing_module.database import SessionLocal as MktSession, db_update_delivery
-            from marketing_module.models import ProspectDeliveryDB, ReplyStatus
-            _mkt_available = True
-        except Exception:
-            _mkt_available = False
-
-        for uid in uids:
-            try:
-                _, msg_data = conn.fetch(uid, "(RFC822)")
-                raw = msg_data[0][1]
-                msg = _email.message_from_bytes(raw)
-
-                # Extraire l'adresse From
-                from_raw = msg.get("From", "")
-                # Décoder si encodé
-                parts = decode_header(from_raw)
-                from_decoded = ""
-                for part, enc in parts:
-                    if isinstance(part, bytes):
-                        from_decoded += part.decode(enc or "utf-8", errors="replace")
-                    else:
-                        from_decoded += part
-                # Extraire email entre < >
-                import re
-                m = re.search(r"<([^>]+)>", from_decoded)
-                from_email = m.group(1).lower() if m else from_decoded.strip().lower()
-
-                if not from_email or "@" not in from_email:
-                    # Marquer comme lu quand même pour éviter boucle
-                    conn.store(uid, "+FLAGS", "\\Seen")
-                    continue
-
-                # Chercher prospect par email
-                with SessionLocal() as db:
-                    prospect = db.query(V3ProspectDB).filter(
-                        V3ProspectDB.email == from_email
-                    ).first()
-
-                if not prospect:
-                    # Pas un prospect connu — laisser non lu, ne pas alerter
-                    log.debug("IMAP : email de %s — pas un prospect connu", from_email)
-                    continue
-
-                # Extraire snippet du corps
-                snippet = ""
-                if msg.is_multipart():
-                    for part in msg.walk():
-                        if part.get_content_type() == "text/plain":
-                            try:
-                                snippet = part.get_payload(decode=True).decode("utf-8", errors="replace")[:300]
-                            except Exception:
-                                pass
-                            break
-                else:
-                    try:
-                        snippet = msg.get_payload(decode=True).decode("utf-8", errors="replace")[:300]
-                    except Exception:
-                        pass
-
-                log.info("IMAP : réponse détectée de %s (%s)", prospect.name, from_email)
-
-                # Mise à jour CRM
-                if _mkt_available:
-                    try:
-                        with MktSession() as mdb:
-                            delivery = (
-                                mdb.query(ProspectDeliveryDB)
-                                .filter_by(project_id="presence-ia", prospect_id=prospect.token)
-                                .order_by(ProspectDeliveryDB.created_at.desc())
-                                .first()
-                            )
-                            if delivery and delivery.reply_status == ReplyStatus.none:
-                                db_update_delivery(mdb, delivery.id, {
-                                    "reply_status": ReplyStatus.positive
-                                })
-                    except Exception as e:
-                        log.warning("IMAP CRM update : %s", e)
-
-                # Alerte admin
-                _send_reply_alert(
-                    prospect_name=prospect.name or from_email,
-                    prospect_email=from_email,
-                    snippet=snippet,
-                    channel="email",
-                )
-
-                # Marquer comme lu pour ne pas retraiter
-                conn.store(uid, "+FLAGS", "\\Seen")
-
-            except Exception as e:
-                log.error("IMAP traitement email uid=%s : %s", uid, e)
-
-        conn.logout()
-
-    except imaplib.IMAP4.error as e:
-        log.error("IMAP connexion : %s", e)
+        from .imap_replies import poll_once
+        from .jobruns import count
+        res = poll_once() or {}
+        count(items_in=res.get("examined", 0), items_out=res.get("replies", 0))
     except Exception as e:
         log.error("_job_imap_reply_poll : %s", e)
 
 
+@tracked("run_due_targets")
 def _job_run_due_targets():
     """
     Chantier C — Exécute la prospection pour la paire active uniquement.
@@ -752,7 +846,8 @@ def _imap_ensure_folder(conn, folder: str) -> bool:
     try:
         ok, _ = conn.select(folder)
         conn.select("INBOX")
-        return ok == "OK"
+        if ok == "OK":
+            return True
     except Exception:
         pass
     try:
@@ -764,22 +859,9 @@ def _imap_ensure_folder(conn, folder: str) -> bool:
         return False
 
 
-def _imap_move(conn, uids: list, dest: str):
-    """Copie les UIDs vers dest puis les supprime de l'inbox."""
-    if not uids:
-        return
-    uid_str = ",".join(u.decode() if isinstance(u, bytes) else str(u) for u in uids)
-    try:
-        conn.copy(uid_str, dest)
-        conn.store(uid_str, "+FLAGS", "\\Deleted")
-        conn.expunge()
-    except Exception as e:
-        log.debug("imap_move → %s: %s", dest, e)
-
-
-def _warming_day_cap() -> int:
-    """Nombre d'emails par session selon le jour de warming (ramp-up progressif)."""
-    day = (_dt.datetime.utcnow().date() - _WARMING_START).days + 1
+def _warming_day_cap(on: "_dt.date" = None) -> int:
+    """Nombre d'emails par expéditeur et par jour selon le jour de warming (ramp-up progressif)."""
+    day = ((on or _dt.datetime.utcnow().date()) - _WARMING_START).days + 1
     if day <= 3:   return 2
     if day <= 7:   return 4
     if day <= 14:  return 6
@@ -787,216 +869,35 @@ def _warming_day_cap() -> int:
     return 10  # plateau
 
 
+@tracked("email_warming")
 def _job_warming():
     """
-    Warming email — toutes les 4h.
-    Envoie des emails depuis les 25 adresses Brevo vers les boîtes IMAP réelles,
-    puis marque les emails reçus comme lus.
+    Warming email — toutes les 5 min : crée le plan du jour si besoin (src.warming),
+    puis envoie les éléments dus (envois initiaux, réponses et relances planifiées).
     Ramp-up progressif sur 21 jours.
     """
-    import os, random, imaplib, smtplib, ssl
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
-    from datetime import datetime
-
     try:
-        brevo_key = os.getenv("BREVO_API_KEY", "")
-        if not brevo_key:
-            log.warning("warming: BREVO_API_KEY absent")
-            return
-
-        cap = _warming_day_cap()
-        log.info("warming: session démarrée — cap=%d emails/sender", cap)
-
-        # Sélectionner un sous-ensemble aléatoire de senders pour cette session
-        senders = random.sample(_WARMING_SENDERS, min(cap * 2, len(_WARMING_SENDERS)))
-        sent_total = 0
-
-        for sender in senders:
-            receiver = random.choice(_WARMING_RECEIVERS)
-            subject = random.choice(_WARMING_SUBJECTS)
-            body = random.choice(_WARMING_BODIES)
-
-            # Nom d'affichage depuis l'adresse
-            display = sender.split("@")[0].capitalize().replace("-", " ")
-            domain = sender.split("@")[1]
-
-            try:
-                import requests as _req
-                resp = _req.post(
-                    "https://api.brevo.com/v3/smtp/email",
-                    headers={"api-key": brevo_key, "Content-Type": "application/json"},
-                    json={
-                        "sender":      {"name": display, "email": sender},
-                        "to":          [{"email": receiver}],
-                        "subject":     subject,
-                        "textContent": body,
-                        "headers":     {"X-Warming": "1"},
-                    },
-                    timeout=10,
-                )
-                if resp.status_code in (200, 201, 202):
-                    sent_total += 1
-                    log.debug("warming: %s → %s ✓", sender, receiver)
-                else:
-                    log.warning("warming: %s → %s HTTP %s", sender, receiver, resp.status_code)
-            except Exception as e:
-                log.warning("warming send %s: %s", sender, e)
-
-        log.info("warming: %d emails envoyés", sent_total)
-
-        # Marquer les emails reçus comme lus dans les 2 boîtes IMAP
-        imap_host = os.getenv("WARMING_IMAP_HOST", "imap.ionos.fr")
-        imap_port = int(os.getenv("WARMING_IMAP_PORT", "993"))
-        mailboxes = [
-            (os.getenv("WARMING_MAILBOX_1", ""), os.getenv("WARMING_MAILBOX_1_PWD", "")),
-            (os.getenv("WARMING_MAILBOX_2", ""), os.getenv("WARMING_MAILBOX_2_PWD", "")),
-        ]
-
-        # Réponse 1 — bot répond au sender (ton formel, parfois emoji)
-        _WARMING_REPLIES = [
-            "Bonjour,\n\nMerci pour votre message, je l'ai bien reçu.\n\nJe vous recontacte dès que possible.\n\nCordialement",
-            "Bonjour,\n\nBien reçu, merci. 👍\n\nJe reviendrai vers vous prochainement.\n\nBonne journée",
-            "Bonjour,\n\nMerci de votre retour. Je prends note et vous réponds dans les meilleurs délais.\n\nCordialement",
-            "Bonjour,\n\nMessage bien reçu ! Je vous confirme que je traiterai votre demande très prochainement.\n\nBien à vous",
-            "Bonjour,\n\nMerci pour ces informations. Je reviens vers vous rapidement. 🙂\n\nCordialement",
-            "Bonjour,\n\nBien noté, merci de votre message. Je vous tiens informé.\n\nBonne journée ☀️",
-            "Bonjour,\n\nReçu 5/5. Je transfère votre message aux bonnes personnes.\n\nCordialement",
-            "Bonjour,\n\nMerci, c'est noté ! On se recontacte très prochainement.\n\nBien à vous 👋",
-            "Bonjour,\n\nMerci pour votre message. Je m'en occupe dès que possible.\n\nBonne journée",
-            "Bonjour,\n\nBien reçu ! Je vous réponds dans les meilleurs délais. ✅\n\nCordialement",
-        ]
-
-        # Réponse 2 — sender relance (ton plus court, ~40% des cas)
-        _WARMING_FOLLOWUPS = [
-            "Merci pour votre réponse rapide.\n\nJe reste disponible si vous avez des questions.\n\nBonne journée",
-            "Parfait, merci ! 👍\n\nN'hésitez pas à me contacter si besoin.\n\nCordialement",
-            "Très bien, j'attends de vos nouvelles.\n\nBonne continuation 🙂",
-            "Merci ! À bientôt.",
-            "Super, on fait comme ça.\n\nBonne journée à vous ☀️",
-            "D'accord, merci pour le retour.\n\nCordialement",
-            "OK, noté. Merci ! 👋",
-            "Bien reçu, à très vite.",
-            "Parfait ! Bonne journée.",
-            "Merci pour ce retour rapide. 🙏\n\nÀ bientôt",
-        ]
-
-        import re as _re
-        import email as _email_lib
-        import requests as _req2
-
-        def _extract_reply_addr(from_field: str) -> str:
-            m = _re.search(r"<([^>]+)>", from_field)
-            return m.group(1) if m else from_field.strip()
-
-        def _send_warming_via_brevo(sender_email: str, to_email: str, subject: str,
-                                    body: str, extra_headers: dict) -> bool:
-            display = sender_email.split("@")[0].capitalize().replace("-", " ")
-            try:
-                r = _req2.post(
-                    "https://api.brevo.com/v3/smtp/email",
-                    headers={"api-key": brevo_key, "Content-Type": "application/json"},
-                    json={
-                        "sender":      {"name": display, "email": sender_email},
-                        "to":          [{"email": to_email}],
-                        "subject":     subject,
-                        "textContent": body,
-                        "headers":     extra_headers,
-                    },
-                    timeout=8,
-                )
-                return r.status_code in (200, 201, 202)
-            except Exception:
-                return False
+        from .warming import ensure_plan, deliver_due
+        from .jobruns import count
+        ensure_plan()
+        res = deliver_due()
+        count(items_in=res["sent"] + res["failed"], items_out=res["sent"])
+    except Exception as e:
+        log.error("_job_warming: %s", e)
 
-        replied_total = 0
-        followup_total = 0
-
-        for email_addr, pwd in mailboxes:
-            if not email_addr or not pwd:
-                continue
-            try:
-                conn = imaplib.IMAP4_SSL(imap_host, imap_port)
-                conn.login(email_addr, pwd)
-                conn.select("INBOX")
-                _imap_ensure_folder(conn, _WARMING_FOLDER)
-
-                # ── Passe 1 : bot répond aux emails X-Warming (envois initiaux) ──
-                _, data = conn.search(None, '(UNSEEN HEADER X-Warming 1)')
-                if data and data[0]:
-                    uids = data[0].split()
-                    for uid in uids:
-                        try:
-                            _, msg_data = conn.fetch(uid, "(RFC822)")
-                            msg = _email_lib.message_from_bytes(msg_data[0][1])
-                            reply_to = _extract_reply_addr(msg.get("From", ""))
-                            orig_subj = msg.get("Subject", "message")
-                            subject   = orig_subj if orig_subj.startswith("Re:") else f"Re: {orig_subj}"
-                            if reply_to and "@" in reply_to:
-                                # Délai humain : entre 2 et 18 min avant de répondre
-                                import time as _time
-                                _time.sleep(random.randint(120, 1080))
-                                ok = _send_warming_via_brevo(
-                                    email_addr, reply_to, subject,
-                                    random.choice(_WARMING_REPLIES),
-                                    {"X-Warming-Reply": "1"},
-                                )
-                                if ok:
-                                    replied_total += 1
-                        except Exception as e:
-                            log.debug("warming reply uid=%s: %s", uid, e)
-                    conn.store(",".join(u.decode() for u in uids), "+FLAGS", "\\Seen")
-                    _imap_move(conn, uids, _WARMING_FOLDER)
-
-                # ── Passe 2 : sender relance (40% des échanges, 2e aller-retour) ──
-                _, data2 = conn.search(None, '(UNSEEN HEADER X-Warming-Reply 1)')
-                if data2 and data2[0]:
-                    uids2 = data2[0].split()
-                    for uid in uids2:
-                        try:
-                            _, msg_data = conn.fetch(uid, "(RFC822)")
-                            msg = _email_lib.message_from_bytes(msg_data[0][1])
-                            reply_to = _extract_reply_addr(msg.get("From", ""))
-                            orig_subj = msg.get("Subject", "Re: message")
-                            subject   = orig_subj if orig_subj.startswith("Re:") else f"Re: {orig_subj}"
-                            # 40% de chance de relancer (3e message de la chaîne)
-                            if reply_to and "@" in reply_to and random.random() < 0.40:
-                                # Délai humain : entre 5 et 35 min avant la relance
-                                import time as _time
-                                _time.sleep(random.randint(300, 2100))
-                                sender_followup = random.choice(_WARMING_SENDERS)
-                                ok = _send_warming_via_brevo(
-                                    sender_followup, reply_to, subject,
-                                    random.choice(_WARMING_FOLLOWUPS),
-                                    {"X-Warming-Followup": "1"},
-                                )
-                                if ok:
-                                    followup_total += 1
-                        except Exception as e:
-                            log.debug("warming followup uid=%s: %s", uid, e)
-                    conn.store(",".join(u.decode() for u in uids2), "+FLAGS", "\\Seen")
-                    _imap_move(conn, uids2, _WARMING_FOLDER)
-
-                # ── Passe 3 : archiver les X-Warming-Followup reçus ──
-                _, data3 = conn.search(None, '(HEADER X-Warming-Followup 1)')
-                if data3 and data3[0]:
-                    uids3 = data3[0].split()
-                    conn.store(",".join(u.decode() for u in uids3), "+FLAGS", "\\Seen")
-                    _imap_move(conn, uids3, _WARMING_FOLDER)
-
-                conn.logout()
-                log.info("warming IMAP %s — réponses: %d, relances: %d",
-                         email_addr, replied_total, followup_total)
-            except Exception as e:
-                log.warning("warming IMAP %s: %s", email_addr, e)
-
-        if replied_total or followup_total:
-            log.info("warming: %d réponses + %d relances envoyées", replied_total, followup_total)
 
+@tracked("warming_reconcile")
+def _job_warming_reconcile():
+    """Warming — toutes les 30 min : une session IMAP par boîte réceptrice (src.warming)."""
+    try:
+        from .warming import reconcile
+        from .jobruns import count
+        count(items_out=reconcile())
     except Exception as e:
-        log.error("_job_warming: %s", e)
+        log.error("_job_warming_reconcile: %s", e)
 
 
+@tracked("auto_qualify")
 def _job_auto_qualify():
     """Qualification SIRENE automatique — Lun/Mer/Ven à 2h UTC."""
     try:
@@ -1008,6 +909,7 @@ def _job_auto_qualify():
         log.error("_job_auto_qualify : %s", e)
 
 
+@tracked("auto_enrich")
 def _job_auto_enrich(force: bool = False):
     """
     Enrichissement automatique (Google Places) : traite N suspects non encore enrichis,
@@ -1124,13 +1026,14 @@ def _job_auto_enrich(force: bool = False):
 
         # ── Tracking coûts ────────────────────────────────────────────────
         try:
-            from .cost_tracker import tracker as _tracker
-            from .models import JobCostLogDB
+            from .cost_tracker import tracker as _tracker, PRICE_GOOGLE
+            from .job_costs import record as record_cost
             counts = _tracker.get_and_reset()
-            cost = round(counts["google"] * 0.017, 4)
+            cost = round(counts["google"] * PRICE_GOOGLE, 4)
             db4 = SessionLocal()
             try:
-                db4.add(JobCostLogDB(
+                record_cost(
+                    db4,
                     job_id="auto_enrich",
                     started_at=now,
                     ended_at=datetime.utcnow(),
@@ -1139,7 +1042,7 @@ def _job_auto_enrich(force: bool = False):
                     nb_appels_gemini=counts["gemini"],
                     nb_leads_generes=total_enriched,
                     cost_estimated=cost,
-                ))
+                )
                 db4.commit()
             finally:
                 db4.close()
@@ -1152,43 +1055,59 @@ def _job_auto_enrich(force: bool = False):
         log.error("_job_auto_enrich: %s", e)
 
 
+def _cited_index(db, professions) -> dict:
+    """Charge en une requête les noms cités par les IA pour plusieurs métiers.
+    Retourne {profession_norm: (set exact, liste ≥5 chars pour le matching sous-chaîne)}.
+    """
+    from .models import IaCitedCompanyDB
+
+    profs = {p.lower().strip() for p in professions if p}
+    index: dict = {p: (set(), []) for p in profs}
+    if not profs:
+        return index
+    rows = (
+        db.query(IaCitedCompanyDB.profession, IaCitedCompanyDB.name_norm)
+        .filter(IaCitedCompanyDB.profession.in_(profs))
+        .all()
+    )
+    for prof, name_norm in rows:
+        exact, longs = index[prof]
+        if name_norm and name_norm not in exact:
+            exact.add(name_norm)
+            if len(name_norm) >= 5:
+                longs.append(name_norm)
+    return index
+
+
+def _is_cited_norm(n: str, cited: tuple) -> bool:
+    """True si le nom normalisé matche un cité — exact ou sous-chaîne (min 5 chars)."""
+    exact, longs = cited
+    if not n or len(n) < 5:
+        return False
+    if n in exact:
+        return True
+    # sous-chaîne : le nom IA est contenu dans le nom SIRENE ou l'inverse
+    return any(c in n or n in c for c in longs)
+
+
+@tracked("provision_leads")
 def _job_provision_leads(force: bool = False):
     """
     Fourniture automatique de X leads en file V3ProspectDB.
     Vérifie toutes les heures si la config (jour + heure UTC) correspond.
     Si force=True : ignore active/jour/heure (pour test manuel).
     Ordre : segments SireneSegmentDB par score DESC, suspects non encore provisionnés.
+
+    Nombre de requêtes indépendant du nombre de suspects : noms cités et
+    prospects existants préchargés une fois par run, filtrage en mémoire,
+    puis insertion + marquage provisioned_at en bulk dans une seule transaction.
     """
     try:
-        from datetime import datetime, timedelta
+        import secrets as _sec
+        import sqlalchemy as sa
         from .database import SessionLocal
-        from .models import LeadProvisioningConfigDB, SireneSuspectDB, SireneSegmentDB, IaCitedCompanyDB, V3ProspectDB
-        import unicodedata, re as _re
-
-        _LEGAL_SUFFIXES = _re.compile(
-            r'\b(sarl|sas|sasu|sa|sci|snc|eurl|scp|scop|scic|gie|ei|ei|auto[- ]entrepreneur|'
-            r'and co|et (cie|fils|freres?|associes?)|groupe|holding)\b'
-        )
-        def _norm_name(s):
-            s = s.lower().strip()
-            s = unicodedata.normalize("NFD", s)
-            s = "".join(c for c in s if unicodedata.category(c) != "Mn")
-            s = _re.sub(r"[^a-z0-9 ]", " ", s)
-            s = _LEGAL_SUFFIXES.sub(" ", s)
-            return _re.sub(r"\s+", " ", s).strip()
-
-        def _is_cited(name: str, cited_norms: set) -> bool:
-            """True si le nom matche un cité — exact ou sous-chaîne (min 5 chars)."""
-            n = _norm_name(name)
-            if not n or len(n) < 5:
-                return False
-            if n in cited_norms:
-                return True
-            # sous-chaîne : le nom IA est contenu dans le nom SIRENE ou l'inverse
-            for cited in cited_norms:
-                if len(cited) >= 5 and (cited in n or n in cited):
-                    return True
-            return False
+        from .models import LeadProvisioningConfigDB, SireneSuspectDB, SireneSegmentDB, V3ProspectDB
+        from .ref_cities_seed import city_reference_for
 
         db = SessionLocal()
         try:
@@ -1225,24 +1144,34 @@ def _job_provision_leads(force: bool = False):
                 .order_by(SireneSegmentDB.score.desc())
                 .all()
             )
+            seg_profs = {seg.profession_id for seg in segments}
+
+            # Préchargement (1 requête chacun) : noms cités par IA par métier
+            # (tous départements — on filtre sur nom) + clés des prospects existants,
+            # archivés compris (une entreprise archivée n'est jamais recontactée)
+            from .archive import archived_keys
+            cited_by_prof = _cited_index(db, seg_profs)
+            existing_keys = {
+                (_norm_cited(name or ""), city, prof)
+                for name, city, prof in [
+                    *db.query(V3ProspectDB.name, V3ProspectDB.city, V3ProspectDB.profession)
+                    .filter(V3ProspectDB.profession.in_(seg_profs)),
+                    *archived_keys(db, seg_profs)]
+            } if seg_profs else set()
 
             remaining = cfg.leads_per_run
-            provisioned = 0
+            new_rows: list = []
+            marked_ids: list = []
 
             for seg in segments:
                 if remaining <= 0:
                     break
-
-                # Noms cités par IA pour ce métier (tous départements — on filtre sur nom)
-                cited_norms = set(
-                    row.name_norm for row in
-                    db.query(IaCitedCompanyDB.name_norm)
-                    .filter(IaCitedCompanyDB.profession == seg.profession_id.lower().strip())
-                    .all()
-                )
+                cited = cited_by_prof.get(seg.profession_id.lower().strip(), (set(), []))
 
                 suspects = (
-                    db.query(SireneSuspectDB)
+                    db.query(SireneSuspectDB.id, SireneSuspectDB.raison_sociale,
+                             SireneSuspectDB.ville, SireneSuspectDB.departement,
+                             SireneSuspectDB.code_naf)
                     .filter(
                         SireneSuspectDB.profession_id == seg.profession_id,
                         SireneSuspectDB.departement == seg.departement,
@@ -1260,36 +1189,41 @@ def _job_provision_leads(force: bool = False):
                 for s in suspects:
                     if remaining <= 0:
                         break
+                    name_norm = _norm_cited(s.raison_sociale or "")
                     # Exclure les entreprises déjà citées par les IA
-                    if cited_norms and _is_cited(s.raison_sociale, cited_norms):
+                    if cited[0] and _is_cited_norm(name_norm, cited):
                         log.debug("provision_leads : exclu (cité IA) — %s", s.raison_sociale)
                         continue
                     # Éviter les doublons v3_prospects sur même nom+ville+métier
-                    existing_v3 = db.query(V3ProspectDB).filter_by(
-                        name=s.raison_sociale, city=s.ville, profession=seg.profession_id
-                    ).first()
-                    if existing_v3:
-                        s.provisioned_at = now  # marquer quand même pour ne pas retraiter
+                    key = (name_norm, s.ville, seg.profession_id)
+                    marked_ids.append(s.id)  # marqué dans tous les cas pour ne pas retraiter
+                    if key in existing_keys:
                         continue
-                    import secrets as _sec
+                    existing_keys.add(key)
                     _tok = _sec.token_hex(16)
-                    v3 = V3ProspectDB(
-                        token=_tok,
-                        name=s.raison_sociale,
-                        city=s.ville,
-                        profession=seg.profession_id,
-                        phone=getattr(s, "telephone", None) or getattr(s, "phone", None),
-                        email=getattr(s, "email", None),
-                        website=getattr(s, "site_web", None) or getattr(s, "website", None),
-                        landing_url=f"/ia-reports/{_tok}",
-                        contacted=False,
-                        notes=f"SIRENE auto — dept:{s.departement or ''} NAF:{s.code_naf or ''}",
-                    )
-                    db.add(v3)
-                    s.provisioned_at = now
-                    provisioned += 1
+                    new_rows.append({
+                        "token":       _tok,
+                        "name":        s.raison_sociale,
+                        "city":        s.ville,
+                        "city_reference": city_reference_for(s.ville),
+                        "profession":  seg.profession_id,
+                        "landing_url": f"/ia-reports/{_tok}",
+                        "contacted":   False,
+                        "notes":       f"SIRENE auto — dept:{s.departement or ''} NAF:{s.code_naf or ''}",
+                    })
                     remaining -= 1
 
+            if new_rows:
+                from .outbound_counters import recount_pending
+                db.execute(sa.insert(V3ProspectDB), new_rows)
+                recount_pending(db, {(r["city"], r["profession"]) for r in new_rows})
+            for i in range(0, len(marked_ids), 500):
+                db.execute(
+                    sa.update(SireneSuspectDB)
+                    .where(SireneSuspectDB.id.in_(marked_ids[i:i + 500]))
+                    .values(provisioned_at=now, updated_at=now)
+                )
+            provisioned = len(new_rows)
             cfg.last_run = now
             cfg.last_count = provisioned
             db.commit()
@@ -1404,31 +1338,19 @@ Présence IA
 _FOLLOWUP_SENDER = ("contact@presence-ia.online", "Nathalie — Présence IA")
 
 
-def _outbound_send_prospect(p, dry_run: bool = False,
-                            brevo_key: str = None, sent_idx: int = 0) -> dict:
+def _outbound_render(p, dry_run: bool = False, sent_idx: int = 0) -> dict:
     """
-    Pipeline outbound complet pour UN V3ProspectDB.
-    Utilisé par _job_outbound (boucle) ET par les boutons test admin.
-
-    Étapes :
-      1. Lit ia_results (garantis au niveau paire par _job_outbound avant la boucle)
-      2. Image ville absente → fetch Unsplash (fallback 3 niveaux) et stocke
-      3. Formate le message (_OUTBOUND_BODY / _OUTBOUND_SMS)
-      4. Envoie via Brevo — sauf si dry_run=True
-      5. Marque sent_at/email_status — SAUF si p.is_test (profil réutilisable)
+    Prépare le message outbound d'UN V3ProspectDB (étapes 1-3 de _outbound_send_prospect).
 
-    Retourne dict : ok, ia_ok, ia_total, has_image, img_source, terme, channel, body, error
+    Retourne dict : ia_ok, ia_total, has_image, img_source, terme, channel, body,
+    subject, sender, sender_name, recipient — ou error si l'envoi est impossible.
     """
-    import os, json, requests as _req, random
-    from datetime import datetime
+    import os, json, random
     from .api.routes.v3 import _resolve_termes
     from .city_images import fetch_city_header_image
-    from .models import RefCityDB, V3ProspectDB
+    from .models import RefCityDB
     from .database import SessionLocal
 
-    if brevo_key is None:
-        brevo_key = os.getenv("BREVO_API_KEY", "")
-
     # ── 1. Lecture ia_results (garantis au niveau paire avant la boucle d'envoi) ─
     ia_results_list = []
     if p.ia_results:
@@ -1453,7 +1375,7 @@ def _outbound_send_prospect(p, dry_run: bool = False,
         img_source = "unsplash" if has_image else None
 
     if not has_image and not dry_run:
-        return {"ok": False, "ia_ok": ia_ok, "ia_total": ia_total,
+        return {"ia_ok": ia_ok, "ia_total": ia_total,
                 "has_image": False, "img_source": None,
                 "error": f"Aucune image pour {p.city} — envoi bloqué"}
 
@@ -1473,44 +1395,82 @@ def _outbound_send_prospect(p, dry_run: bool = False,
     idx = sent_idx % len(_OUTBOUND_SENDERS)
     sender, sender_name = _OUTBOUND_SENDERS[idx]
 
-    base = {"ia_ok": ia_ok, "ia_total": ia_total, "has_image": has_image,
-            "img_source": img_source, "terme": terme, "channel": channel, "body": body}
+    out = {"ia_ok": ia_ok, "ia_total": ia_total, "has_image": has_image,
+           "img_source": img_source, "terme": terme, "channel": channel, "body": body,
+           "subject": subject, "sender": sender, "sender_name": sender_name,
+           "recipient": p.email, "error": None}
+    if channel == "sms":
+        out["sender"], out["sender_name"] = "PresenceIA", None
+        out["recipient"] = _outbound_normalize_phone(p.phone) if p.phone else None
+        if p.phone and not out["recipient"]:
+            out["error"] = f"Numéro invalide : {p.phone}"
+        elif not p.phone:
+            out["error"] = "Ni email ni téléphone"
+    return out
+
+
+def _outbound_send_prospect(p, dry_run: bool = False,
+                            brevo_key: str = None, sent_idx: int = 0) -> dict:
+    """
+    Pipeline outbound complet pour UN V3ProspectDB — envoi direct, hors outbox.
+    Utilisé par les boutons test admin (_job_outbound passe par src.outbox en LIVE).
+
+    Étapes :
+      1-3. _outbound_render : ia_results, image ville, formatage du message
+      4. Envoie via Brevo — sauf si dry_run=True
+      5. Marque sent_at/email_status — SAUF si p.is_test (profil réutilisable)
+
+    Retourne dict : ok, ia_ok, ia_total, has_image, img_source, terme, channel, body, error
+    """
+    import os, requests as _req
+    from datetime import datetime
+    from .models import V3ProspectDB
+    from .database import SessionLocal
+
+    if brevo_key is None:
+        brevo_key = os.getenv("BREVO_API_KEY", "")
+
+    msg = _outbound_render(p, dry_run=dry_run, sent_idx=sent_idx)
+    if not msg["has_image"] and not dry_run:
+        return {**msg, "ok": False}
+
+    base = {k: msg[k] for k in ("ia_ok", "ia_total", "has_image", "img_source",
+                                "terme", "channel", "body")}
+    channel = msg["channel"]
 
     if dry_run:
         log.info("[OUTBOUND][DRY_RUN] %s — %s/%s — ia=%d/%d — img=%s",
-                 channel.upper(), p.profession, p.city, ia_ok, ia_total, has_image)
+                 channel.upper(), p.profession, p.city,
+                 msg["ia_ok"], msg["ia_total"], msg["has_image"])
         return {**base, "ok": True, "dry_run": True, "error": None}
 
     # ── 4. Envoi Brevo ────────────────────────────────────────────────────────
     if not brevo_key:
         return {**base, "ok": False, "error": "BREVO_API_KEY manquant"}
+    if msg["error"]:
+        return {**base, "ok": False, "error": msg["error"]}
 
     try:
-        if channel == "email" and p.email:
+        if channel == "email":
             resp = _req.post(
                 "https://api.brevo.com/v3/smtp/email",
                 headers={"api-key": brevo_key, "Content-Type": "application/json"},
                 json={
-                    "sender":      {"name": sender_name, "email": sender},
+                    "sender":      {"name": msg["sender_name"], "email": msg["sender"]},
                     "to":          [{"email": p.email, "name": p.name}],
-                    "subject":     subject,
-                    "textContent": body,
+                    "subject":     msg["subject"],
+                    "textContent": msg["body"],
                 },
                 timeout=15,
             )
-        elif channel == "sms" and p.phone:
-            phone_e164 = _outbound_normalize_phone(p.phone)
-            if not phone_e164:
-                return {**base, "ok": False, "error": f"Numéro invalide : {p.phone}"}
+        else:
             resp = _req.post(
                 "https://api.brevo.com/v3/transactionalSMS/sms",
                 headers={"api-key": brevo_key, "Content-Type": "application/json"},
-                json={"sender": "PresenceIA", "recipient": phone_e164,
-                      "content": body, "type": "transactional"},
+                json={"sender": "PresenceIA", "recipient": msg["recipient"],
+                      "content": msg["body"], "type": "transactional"},
                 timeout=15,
             )
-        else:
-            return {**base, "ok": False, "error": "Ni email ni téléphone"}
 
         ok = resp.status_code in (200, 201, 202)
 
@@ -1519,6 +1479,8 @@ def _outbound_send_prospect(p, dry_run: bool = False,
             with SessionLocal() as _db:
                 _p2 = _db.query(V3ProspectDB).filter_by(token=p.token).first()
                 if _p2:
+                    from .outbound_counters import note_sent
+                    note_sent(_db, [_p2.token])
                     _p2.sent_at     = datetime.utcnow()
                     _p2.sent_method = channel
                     if channel == "email":
@@ -1642,8 +1604,8 @@ def compute_outbound_need() -> dict:
     """
     Calcule le besoin outbound depuis v3_bookings (RDV réels) et SlotDB (capacité).
 
-    Sources :
-      v3_bookings      → RDV déjà pris (source de vérité)
+    Sources (lues via les compteurs src.outbound_counters, pas de COUNT par appel) :
+      v3_bookings      → RDV déjà pris (source de vérité), fenêtre aujourd'hui → J+14
       SlotDB.available → créneaux encore ouverts
 
     Env vars configurables :
@@ -1664,22 +1626,28 @@ def compute_outbound_need() -> dict:
       urgence_lundi        → bool (lundi < 50% de la cible)
     """
     import os
-    from datetime import datetime, timezone, timedelta, date
-    from .database import SessionLocal
-    from .models import V3ProspectDB, V3BookingDB
+    from datetime import datetime, timedelta, date
+    from . import outbound_counters
 
     # ── Verrou de lancement ───────────────────────────────────────────────────
     LAUNCH_DATE = date(2026, 4, 16)
     today_local = datetime.now().date()
+
+    # Prochain lundi (1→7 jours, jamais 0)
+    days_to_monday = (7 - today_local.weekday()) % 7 or 7
+    next_monday    = today_local + timedelta(days=days_to_monday)
+
+    # ── Compteurs (outbound_counters, réconciliés périodiquement) ─────────────
+    counters         = outbound_counters.need_inputs(next_monday)
+    rdv_taken_week   = counters["rdv_taken_week"]
+    rdv_taken_monday = counters["rdv_taken_monday"]
+    leads_en_file    = counters["leads_en_file"]
+    sent_total       = counters["sent_total"]
+    slots_open       = counters["slots_open"]
+    active_closers   = counters["active_closers"]
+
     if today_local < LAUNCH_DATE:
         log.info("compute_outbound_need: avant LAUNCH_DATE (%s) — pipeline en pause", LAUNCH_DATE)
-        with SessionLocal() as db:
-            leads_en_file = db.query(V3ProspectDB).filter(
-                V3ProspectDB.ia_results.isnot(None),
-                V3ProspectDB.sent_at.is_(None),
-                V3ProspectDB.email.isnot(None),
-                V3ProspectDB.is_test.is_(False),
-            ).count()
         _z = {"total": 0, "reserves": 0, "disponibles": 0}
         return {
             "proche": _z, "moyen": _z, "lointain": _z,
@@ -1701,73 +1669,6 @@ def compute_outbound_need() -> dict:
     max_sms           = int(os.getenv("OUTBOUND_MAX_SMS",    "10"))
     launch_mode       = os.getenv("LAUNCH_MODE", "false").lower() == "true"
 
-    now     = datetime.now(timezone.utc)
-    now_iso = now.strftime("%Y-%m-%dT%H:%M:%S")
-    end_iso = (now + timedelta(days=14)).strftime("%Y-%m-%dT%H:%M:%S")
-
-    # Prochain lundi (1→7 jours, jamais 0)
-    days_to_monday    = (7 - today_local.weekday()) % 7 or 7
-    next_monday       = today_local + timedelta(days=days_to_monday)
-    monday_start_iso  = next_monday.strftime("%Y-%m-%dT00:00:00")
-    monday_end_iso    = next_monday.strftime("%Y-%m-%dT23:59:59")
-
-    # ── Lecture v3_bookings — RDV réels ───────────────────────────────────────
-    rdv_taken_week   = 0
-    rdv_taken_monday = 0
-    leads_en_file    = 0
-    sent_total       = 0
-
-    with SessionLocal() as db:
-        rdv_taken_week = (
-            db.query(V3BookingDB)
-            .join(V3ProspectDB, V3ProspectDB.token == V3BookingDB.prospect_token, isouter=True)
-            .filter(
-                V3BookingDB.start_iso >= now_iso,
-                V3BookingDB.start_iso <= end_iso,
-                V3ProspectDB.is_test.isnot(True),
-            )
-            .count()
-        )
-        rdv_taken_monday = (
-            db.query(V3BookingDB)
-            .join(V3ProspectDB, V3ProspectDB.token == V3BookingDB.prospect_token, isouter=True)
-            .filter(
-                V3BookingDB.start_iso >= monday_start_iso,
-                V3BookingDB.start_iso <= monday_end_iso,
-                V3ProspectDB.is_test.isnot(True),
-            )
-            .count()
-        )
-        leads_en_file = db.query(V3ProspectDB).filter(
-            V3ProspectDB.ia_results.isnot(None),
-            V3ProspectDB.sent_at.is_(None),
-            V3ProspectDB.email.isnot(None),
-            V3ProspectDB.is_test.is_(False),
-        ).count()
-        sent_total = db.query(V3ProspectDB).filter(
-            V3ProspectDB.sent_at.isnot(None)
-        ).count()
-
-    # ── Lecture SlotDB — capacité disponible ──────────────────────────────────
-    active_closers = 1
-    slots_open     = 0
-    try:
-        from marketing_module.database import SessionLocal as MktSession
-        from marketing_module.models import SlotDB, SlotStatus, CloserDB
-        with MktSession() as mdb:
-            active_closers = mdb.query(CloserDB).filter(
-                CloserDB.project_id == "presence-ia",
-                CloserDB.is_active  == True,
-            ).count() or 1
-            slots_open = mdb.query(SlotDB).filter(
-                SlotDB.project_id == "presence-ia",
-                SlotDB.status     == SlotStatus.available,
-                SlotDB.starts_at  >= now,
-                SlotDB.starts_at  <= now + timedelta(days=14),
-            ).count()
-    except Exception as e:
-        log.warning("compute_outbound_need: marketing_module indisponible — %s", e)
-
     # ── Calcul du besoin ──────────────────────────────────────────────────────
     #  fill_need : 1.0 = agenda vide, 0.0 = agenda plein
     fill_rate_week   = min(1.0, rdv_taken_week   / target_rdv_week)   if target_rdv_week   > 0 else 1.0
@@ -1841,9 +1742,41 @@ def compute_outbound_need() -> dict:
         "fill_need":         fill_need,
         "urgence_lundi":     urgence_lundi,
         "launch_mode":       launch_mode,
+        "sent_today":        counters["sent_today"],
     }
 
 
+def _followup_base(cutoff):
+    """Prédicats de candidature à la relance (couverts par ix_v3_prospects_followup)."""
+    from .models import V3ProspectDB as P
+    return (
+        P.followup_sent_at.is_(None),
+        P.sent_method == "email",
+        P.email_sent_at.isnot(None),
+        P.email_sent_at <= cutoff,
+        P.email.isnot(None),
+        P.is_test == False,  # noqa: E712
+    )
+
+
+def _followup_reason():
+    """Règle de blocage en SQL (NULL = éligible) ; booking = anti-jointure sur v3_bookings."""
+    import sqlalchemy as sa
+    from .models import V3ProspectDB as P, V3BookingDB as B
+
+    booked = sa.exists().where(B.prospect_token == P.token)
+    return sa.case(
+        (P.email_status == "bounced", "bounced_or_unsubscribed"),
+        (P.email_status == "replied", "replied"),
+        (sa.or_(P.email_booked_at.isnot(None), booked), "rdv_booked"),
+        (P.email_clicked_at.isnot(None), "landing_visited"),
+        (sa.func.trim(sa.func.coalesce(P.profession, "")) == "", "no_metier"),
+        (sa.func.trim(sa.func.coalesce(P.city, "")) == "", "no_ville"),
+        else_=None,
+    )
+
+
+@tracked("followup")
 def _job_followup():
     """
     Relance J+1 — envoie le mail de suivi 24h après J0.
@@ -1855,13 +1788,21 @@ def _job_followup():
       - email_clicked_at IS NOT NULL (a visité la landing — signal fiable)
       - profession ou city vide
       - followup_sent_at déjà renseigné (anti-doublon)
+
+    Tout le filtrage est en SQL : les bloqués sont marqués "skipped" par un seul UPDATE,
+    les éligibles sont lus par tranches de FOLLOWUP_CHUNK (défaut 2000, colonnes utiles
+    seulement). En LIVE, chaque tranche est écrite dans l'outbox (message_key
+    "followup:{token}") ET marquée followup_status="queued" dans la même transaction, puis
+    drain() envoie : lots messageVersions avec idempotencyKey, nouvel essai du même lot après
+    un crash, statut "sent" / "error" posé par l'outbox. Un crash ne perd ni ne renvoie
+    aucune relance.
     """
     import os
-    import requests as _req
-    import random as _random
+    import sqlalchemy as sa
     from datetime import datetime, timedelta
+    from . import outbox as _outbox
     from .database import SessionLocal
-    from .models import V3ProspectDB, V3BookingDB
+    from .models import V3ProspectDB
 
     dry_run   = os.getenv("OUTBOUND_DRY_RUN", "true").lower() == "true"
     brevo_key = os.getenv("BREVO_API_KEY", "")
@@ -1869,111 +1810,134 @@ def _job_followup():
         log.warning("[FOLLOWUP] BREVO_API_KEY absent — job annulé")
         return
 
-    cutoff = datetime.utcnow() - timedelta(hours=24)
+    chunk  = max(1, int(os.getenv("FOLLOWUP_CHUNK", "2000")))
+    base   = _followup_base(datetime.utcnow() - timedelta(hours=24))
+    reason = _followup_reason()
 
+    # ── Règles de blocage : un UPDATE ensembliste ─────────────────────────────
     with SessionLocal() as db:
-        candidates = db.query(V3ProspectDB).filter(
-            V3ProspectDB.email_sent_at.isnot(None),
-            V3ProspectDB.email_sent_at <= cutoff,
-            V3ProspectDB.followup_sent_at.is_(None),
-            V3ProspectDB.sent_method == "email",
-            V3ProspectDB.email.isnot(None),
-            V3ProspectDB.is_test == False,  # noqa: E712
-        ).all()
-
-        if not candidates:
-            log.info("[FOLLOWUP] Aucun prospect éligible")
-            return
-
-        log.info("[FOLLOWUP] %d prospects à traiter", len(candidates))
-
-        # Index bookings par prospect_token pour éviter N requêtes
-        booked_tokens = {
-            r.prospect_token
-            for r in db.query(V3BookingDB.prospect_token).all()
-        }
-
-        sent = skipped = 0
-        skip_reasons: dict = {}
-
-        for p in candidates:
-            # ── Règles de blocage ─────────────────────────────────────────────
-            reason = None
-            if p.email_status == "bounced":
-                reason = "bounced_or_unsubscribed"
-            elif p.email_status == "replied":
-                reason = "replied"
-            elif p.email_booked_at or p.token in booked_tokens:
-                reason = "rdv_booked"
-            elif p.email_clicked_at:
-                reason = "landing_visited"
-            elif not (p.profession or "").strip():
-                reason = "no_metier"
-            elif not (p.city or "").strip():
-                reason = "no_ville"
-
-            if reason:
-                p.followup_sent_at   = datetime.utcnow()
-                p.followup_status    = "skipped"
-                p.followup_skip_reason = reason
-                skip_reasons[reason] = skip_reasons.get(reason, 0) + 1
-                skipped += 1
-                continue
+        skip_reasons = dict(db.query(reason, sa.func.count())
+                            .filter(*base, reason.isnot(None)).group_by(reason).all())
+        if skip_reasons:
+            db.execute(sa.update(V3ProspectDB).where(*base, reason.isnot(None))
+                       .values(followup_sent_at=datetime.utcnow(), followup_status="skipped",
+                               followup_skip_reason=reason)
+                       .execution_options(synchronize_session=False))
+            db.commit()
+    skipped = sum(skip_reasons.values())
 
-            # ── Formatage ─────────────────────────────────────────────────────
-            from .api.routes.v3 import _resolve_termes
-            termes   = _resolve_termes(p.profession)
-            metier   = termes[0] if termes else (p.profession or "").lower()
-            ville    = (p.city_reference or p.city or "").title()
-            base_url = os.getenv("BASE_URL", "https://presence-ia.com").rstrip("/")
-            landing  = base_url + (p.landing_url or "")
-            body     = _FOLLOWUP_BODY.format(metier=metier.lower(), ville=ville, lien_agenda=landing)
+    # ── Éligibles : tranches (keyset sur token) → outbox + "queued", un commit par tranche
+    from .api.routes.v3 import _resolve_termes
+    base_url = os.getenv("BASE_URL", "https://presence-ia.com").rstrip("/")
+    termes: dict = {}
+    cols = (V3ProspectDB.token, V3ProspectDB.email, V3ProspectDB.name, V3ProspectDB.profession,
+            V3ProspectDB.city, V3ProspectDB.city_reference, V3ProspectDB.landing_url)
+    sender_email, sender_name = _FOLLOWUP_SENDER
+
+    queued = chunks = 0
+    last = ""
+    while True:
+        with SessionLocal() as db:
+            rows = db.execute(sa.select(*cols).where(*base, reason.is_(None), V3ProspectDB.token > last)
+                              .order_by(V3ProspectDB.token).limit(chunk)).all()
+            if not rows:
+                break
+            last = rows[-1].token
+            chunks += 1
+            now = datetime.utcnow()
 
             if dry_run:
-                log.info("[FOLLOWUP][DRY_RUN] %s — %s/%s", p.email, p.profession, p.city)
-                p.followup_sent_at    = datetime.utcnow()
-                p.followup_status     = "dry_run"
-                p.followup_skip_reason = None
-                sent += 1
-                continue
-
-            # ── Envoi Brevo ───────────────────────────────────────────────────
-            try:
-                sender_email, sender_name = _FOLLOWUP_SENDER
-                resp = _req.post(
-                    "https://api.brevo.com/v3/smtp/email",
-                    headers={"api-key": brevo_key, "Content-Type": "application/json"},
-                    json={
-                        "sender":      {"name": sender_name, "email": sender_email},
-                        "to":          [{"email": p.email, "name": p.name}],
-                        "subject":     _FOLLOWUP_SUBJECT,
-                        "textContent": body,
-                    },
-                    timeout=15,
-                )
-                ok = resp.status_code in (200, 201, 202)
-            except Exception as exc:
-                log.error("[FOLLOWUP] erreur Brevo pour %s : %s", p.email, exc)
-                ok = False
-
-            p.followup_sent_at    = datetime.utcnow()
-            p.followup_status     = "sent" if ok else "error"
-            p.followup_skip_reason = None if ok else "brevo_error"
-            if ok:
-                sent += 1
-                log.info("[FOLLOWUP] ✓ %s — %s/%s", p.email, p.profession, p.city)
+                for p in rows:
+                    log.debug("[FOLLOWUP][DRY_RUN] %s — %s/%s", p.email, p.profession, p.city)
+                status = "dry_run"
             else:
-                skipped += 1
+                messages = []
+                for p in rows:
+                    if p.profession not in termes:
+                        t = _resolve_termes(p.profession)
+                        termes[p.profession] = t[0] if t else (p.profession or "").lower()
+                    ville = (p.city_reference or p.city or "").title()
+                    body  = _FOLLOWUP_BODY.format(metier=termes[p.profession].lower(), ville=ville,
+                                                  lien_agenda=base_url + (p.landing_url or ""))
+                    messages.append({"message_key": f"followup:{p.token}", "kind": "followup",
+                                     "channel": "email", "token": p.token,
+                                     "sender": sender_email, "sender_name": sender_name,
+                                     "recipient": p.email, "recipient_name": p.name,
+                                     "subject": _FOLLOWUP_SUBJECT, "body": body})
+                _outbox.enqueue(db, messages)
+                status = "queued"
+            db.execute(sa.update(V3ProspectDB), [
+                {"token": p.token, "followup_sent_at": now, "followup_status": status,
+                 "followup_skip_reason": None} for p in rows])
+            db.commit()
+        queued += len(rows)
+        log.info("[FOLLOWUP] tranche %d : %d prospect(s) %s", chunks, len(rows),
+                 "traités" if dry_run else "en file")
+
+    from .jobruns import count
+    count(items_in=queued + skipped, items_out=queued)
+    if not (queued or skipped):
+        log.info("[FOLLOWUP] Aucun prospect éligible")
+        return
+    log.info("[FOLLOWUP] %s — en file=%d  ignorés=%d  raisons=%s",
+             "DRY_RUN" if dry_run else "LIVE", queued, skipped, skip_reasons)
+    if queued and not dry_run:
+        try:
+            log.info("[FOLLOWUP] envoi — %s", _outbox.drain(batch_size=chunk))
+        except Exception as e:          # messages déjà en file : repris par _job_outbox_drain
+            log.error("[FOLLOWUP] drain échoué : %s", e)
 
-        db.commit()
 
-    log.info("[FOLLOWUP] %s — envoyés=%d  ignorés=%d  raisons=%s",
-             "DRY_RUN" if dry_run else "LIVE", sent, skipped, skip_reasons)
+def _outbound_enqueue(db, valid_email: list, valid_sms: list, rem_e: int, rem_s: int,
+                      total_email: int, total_sms: int) -> tuple:
+    """
+    Écrit dans l'outbox (session `db`, sans commit) les messages d'une paire, caps respectés.
+    Retourne (n_email, skip_email, n_sms, skip_sms).
+    """
+    from . import outbox as _outbox
+
+    rows = []
+    counts = {"email": 0, "sms": 0}
+    skips  = {"email": 0, "sms": 0}
+    for channel, prospects, cap in (("email", valid_email, rem_e), ("sms", valid_sms, rem_s)):
+        for prospect in prospects:
+            if counts[channel] >= cap: break
+            if _outbound_is_cited(prospect.name, prospect.ia_results or "[]"):
+                skips[channel] += 1; continue
+            msg = _outbound_render(
+                prospect,
+                sent_idx=total_email + counts["email"]
+                         + (total_sms + counts["sms"] if channel == "sms" else 0),
+            )
+            if msg["error"]:
+                log.warning("[OUTBOUND] %s erreur — %s : %s",
+                            channel.upper(), prospect.name, msg["error"])
+                continue
+            rows.append({
+                "message_key":    f"outbound:{prospect.token}",
+                "kind":           "outbound",
+                "channel":        msg["channel"],
+                "token":          prospect.token,
+                "sender":         msg["sender"],
+                "sender_name":    msg["sender_name"],
+                "recipient":      msg["recipient"],
+                "recipient_name": prospect.name,
+                "subject":        msg["subject"] if msg["channel"] == "email" else None,
+                "body":           msg["body"],
+            })
+            counts[channel] += 1
+            log.info("[OUTBOUND] %s en file — %s (%s / %s)",
+                     channel.upper(), prospect.name, prospect.profession, prospect.city)
+    _outbox.enqueue(db, rows)
+    return counts["email"], skips["email"], counts["sms"], skips["sms"]
 
 
+@tracked("outbound")
 def _job_outbound(force: bool = False):
     """
     Outbound v3_prospects — mode autonome multi-paires.
+    En LIVE, les messages sont écrits dans l'outbox (même transaction que la sélection)
+    puis envoyés par le pool de src.outbox — le job ne bloque jamais sur Brevo.
 
     Variables d'env (pilotage) :
       OUTBOUND_DRY_RUN          bool    true          logs only, 0 envoi, 0 DB
@@ -2149,6 +2113,9 @@ def _job_outbound(force: bool = False):
                         ).all():
                             _p.ia_results   = _ia_json
                             _p.ia_tested_at = _ia_data.get("tested_at")
+                        _db_ia2.flush()
+                        from .outbound_counters import recount_pending
+                        recount_pending(_db_ia2, [(_active["city"], _active["profession"])])
                         _db_ia2.commit()
                         _upsert_cited_companies(_db_ia2, _active["profession"],
                                                 _active["city"], _ia_cited)
@@ -2184,7 +2151,11 @@ def _job_outbound(force: bool = False):
         ]
         if refs_only:
             _bf.append(V3ProspectDB.city_reference.isnot(None))
+        if not dry_run:
+            from . import outbox as _outbox
+            _bf.append(~_outbox.queued_for("outbound"))  # déjà en file / envoyé via l'outbox
 
+        pair_e = pair_e_skip = pair_s = pair_s_skip = 0
         with SessionLocal() as db:
             has_email = (
                 db.query(V3ProspectDB)
@@ -2209,8 +2180,15 @@ def _job_outbound(force: bool = False):
                 .all()
             )
 
-        valid_email = [p for p in has_email if _outbound_is_valid_email(p.email)]
-        valid_sms   = [p for p in has_sms   if _outbound_normalize_phone(p.phone)]
+            valid_email = [p for p in has_email if _outbound_is_valid_email(p.email)]
+            valid_sms   = [p for p in has_sms   if _outbound_normalize_phone(p.phone)]
+
+            # LIVE : messages écrits dans l'outbox dans la transaction de la sélection,
+            # envoyés ensuite par le pool de src.outbox (drain)
+            if not dry_run and (valid_email or valid_sms):
+                pair_e, pair_e_skip, pair_s, pair_s_skip = _outbound_enqueue(
+                    db, valid_email, valid_sms, rem_e, rem_s, total_email, total_sms)
+                db.commit()
 
         if not valid_email and not valid_sms:
             log.info("[OUTBOUND] %s/%s — 0 prospects prêts → paire suivante",
@@ -2223,49 +2201,30 @@ def _job_outbound(force: bool = False):
                  _active["profession"], _active["city"],
                  len(valid_email), len(valid_sms))
 
-        # Envois email
-        pair_e = pair_e_skip = 0
-        for prospect in valid_email:
+        # DRY_RUN : rendu + log, aucun envoi (en LIVE, messages déjà en file dans l'outbox)
+        for prospect in (valid_email if dry_run else []):
             if pair_e >= rem_e: break
             if _outbound_is_cited(prospect.name, prospect.ia_results or "[]"):
                 pair_e_skip += 1; continue
             result = _outbound_send_prospect(
-                prospect, dry_run=dry_run, brevo_key=brevo_key,
+                prospect, dry_run=True, brevo_key=brevo_key,
                 sent_idx=total_email + pair_e,
             )
-            if dry_run:
-                pair_e += 1
-                log.info("[OUTBOUND][DRY_RUN] EMAIL #%d — %s <%s>  Body: %s",
-                         total_email+pair_e, prospect.name, prospect.email,
-                         result.get("body", "")[:80])
-            elif result.get("ok"):
-                pair_e += 1
-                log.info("[OUTBOUND] EMAIL — %s (%s / %s)",
-                         prospect.name, prospect.profession, prospect.city)
-            else:
-                log.warning("[OUTBOUND] EMAIL erreur — %s : %s",
-                            prospect.name, result.get("error"))
+            pair_e += 1
+            log.info("[OUTBOUND][DRY_RUN] EMAIL #%d — %s <%s>  Body: %s",
+                     total_email+pair_e, prospect.name, prospect.email,
+                     result.get("body", "")[:80])
 
-        # Envois SMS
-        pair_s = pair_s_skip = 0
-        for prospect in valid_sms:
+        for prospect in (valid_sms if dry_run else []):
             if pair_s >= rem_s: break
             if _outbound_is_cited(prospect.name, prospect.ia_results or "[]"):
                 pair_s_skip += 1; continue
-            result = _outbound_send_prospect(
-                prospect, dry_run=dry_run, brevo_key=brevo_key,
+            _outbound_send_prospect(
+                prospect, dry_run=True, brevo_key=brevo_key,
                 sent_idx=total_email + pair_e + total_sms + pair_s,
             )
-            if dry_run:
-                pair_s += 1
-                log.info("[OUTBOUND][DRY_RUN] SMS #%d — %s", total_sms+pair_s, prospect.name)
-            elif result.get("ok"):
-                pair_s += 1
-                log.info("[OUTBOUND] SMS — %s (%s / %s)",
-                         prospect.name, prospect.profession, prospect.city)
-            else:
-                log.warning("[OUTBOUND] SMS erreur — %s : %s",
-                            prospect.name, result.get("error"))
+            pair_s += 1
+            log.info("[OUTBOUND][DRY_RUN] SMS #%d — %s", total_sms+pair_s, prospect.name)
 
         total_email += pair_e
         total_sms   += pair_s
@@ -2291,11 +2250,17 @@ def _job_outbound(force: bool = False):
     else:
         stop_reason = "max_paires_atteint"
 
+    if not dry_run and (total_email or total_sms):
+        from . import outbox as _outbox
+        _outbox.drain_async()
+
     # ── Résumé ────────────────────────────────────────────────────────────────
+    from .jobruns import count
+    count(items_out=total_email + total_sms)
     summary = " | ".join(pairs_log) if pairs_log else "—"
     if dry_run:
         log.info("[OUTBOUND][DRY_RUN] terminé — email=%d/%d sms=%d/%d · %s",
                  total_email, cap_email, total_sms, cap_sms, summary)
     else:
-        log.info("[OUTBOUND] terminé — email=%d/%d sms=%d/%d · arrêt=%s · %s",
+        log.info("[OUTBOUND] terminé — en file email=%d/%d sms=%d/%d · arrêt=%s · %s",
                  total_email, cap_email, total_sms, cap_sms, stop_reason, summary)
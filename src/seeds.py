@@ -0,0 +1,142 @@
+"""
+SEEDS — Données par défaut de presence_ia.db, rejouées seulement quand leur source change.
+
+init_db rejouait tous les seeds à chaque démarrage (plusieurs centaines de requêtes avant
+de servir le trafic). Chaque seed a maintenant une empreinte : sha256 de ses données
+(constante du code), du source de sa fonction et de celui des fonctions du projet qu'elle
+appelle, transitivement (globales du module et imports locaux "from .x import y").
+L'empreinte appliquée est enregistrée dans seed_state ; au démarrage une seule requête lit
+seed_state et seuls les seeds dont l'empreinte diffère (ou absents de la table) sont rejoués.
+
+  SEED_FORCE=1 / all   rejoue tous les seeds
+  SEED_FORCE=a,b       rejoue les seeds nommés (ex. "cms_blocks,ref_cities")
+
+Un seed en erreur est loggé et son empreinte n'est pas enregistrée : il est retenté au
+démarrage suivant. Les seeds restent idempotents (insertion de ce qui manque).
+CLI : python -m src.migrate seed (équivaut à SEED_FORCE=1).
+"""
+import dis, hashlib, importlib, inspect, json, logging, os, sys, time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+def _seed_ref_cities(db) -> None:
+    """Villes de référence, puis city_reference des prospects de villes nouvellement référencées."""
+    from .ref_cities_seed import backfill_city_reference, seed_ref_cities
+    n_cities = seed_ref_cities(db)
+    n_refs   = backfill_city_reference(db)
+    if n_cities or n_refs:
+        log.info("ref_cities: %d villes insérées, %d prospects backfillés", n_cities, n_refs)
+
+
+def registry() -> List[Tuple[str, object, Callable]]:
+    """(nom, données, fonction(db)) de chaque seed, dans l'ordre d'exécution."""
+    from . import database as d
+    from .ref_cities_seed import REF_CITIES
+
+    seeds = [
+        ("ia_query_templates", d._DEFAULT_IA_QUERIES,   d._seed_ia_query_templates),
+        ("content_blocks",     d._CONTENT_SEED,         d._seed_content_blocks),
+        ("theme",              d._DEFAULT_THEME_PRESET, d._seed_theme),
+    ]
+    try:
+        from .api.routes.cms import _SEED as _CMS_SEED, seed_cms_blocks
+        seeds.append(("cms_blocks", _CMS_SEED, seed_cms_blocks))
+    except Exception as e:                              # routes CMS non importables (dépendance absente)
+        log.warning("seed cms_blocks indisponible : %s", e)
+    seeds += [
+        ("message_templates",  d._DEFAULT_TEMPLATES,    d._seed_message_templates),
+        ("scoring_config",     None,                    d._seed_scoring_config),
+        ("ref_cities",         REF_CITIES,              _seed_ref_cities),
+        ("test_contacts",      d._TEST_CONTACTS,        d._seed_test_contacts),
+    ]
+    return seeds
+
+
+def _callees(fn: Callable) -> List[Callable]:
+    """Fonctions du même paquet (src.*) appelées par fn : globales et imports locaux."""
+    code = getattr(fn, "__code__", None)
+    if code is None:
+        return []
+    root    = fn.__module__.split(".")[0]
+    package = getattr(sys.modules.get(fn.__module__), "__package__", None)
+    found, consts, module = [], [], None
+    for co in [code] + [c for c in code.co_consts if inspect.iscode(c)]:
+        for ins in dis.get_instructions(co):
+            obj = None
+            if ins.opname == "LOAD_CONST":
+                consts = (consts + [ins.argval])[-2:]
+            elif ins.opname == "IMPORT_NAME":           # précédé de LOAD_CONST level, LOAD_CONST fromlist
+                level = consts[0] if len(consts) == 2 and isinstance(consts[0], int) else 0
+                try:
+                    module = importlib.import_module("." * level + ins.argval if level else ins.argval,
+                                                     package)
+                except Exception:
+                    module = None
+            elif ins.opname == "IMPORT_FROM" and module is not None:
+                obj = getattr(module, ins.argval, None)
+            elif ins.opname == "LOAD_GLOBAL":
+                obj = fn.__globals__.get(ins.argval)
+            if inspect.isfunction(obj) and obj.__module__.split(".")[0] == root and obj not in found:
+                found.append(obj)
+    return found
+
+
+def fingerprint(data, fn: Callable) -> str:
+    """sha256 des données du seed, du source de sa fonction et des fonctions du projet qu'elle appelle."""
+    h = hashlib.sha256(json.dumps(data, sort_keys=True, default=str, ensure_ascii=False).encode())
+    todo, seen = [fn], set()
+    while todo:
+        f = todo.pop(0)
+        if f in seen:
+            continue
+        seen.add(f)
+        try:
+            h.update(inspect.getsource(f).encode())
+        except (OSError, TypeError):
+            h.update(getattr(f, "__qualname__", repr(f)).encode())
+        todo += _callees(f)
+    return h.hexdigest()
+
+
+def _forced(force: Optional[str]) -> set:
+    raw = (os.getenv("SEED_FORCE", "") if force is None else force).strip().lower()
+    if raw in ("1", "true", "yes", "all", "*"):
+        return {"*"}
+    return {s.strip() for s in raw.split(",") if s.strip() and s.strip() not in ("0", "false", "no")}
+
+
+def run(force: Optional[str] = None) -> Dict:
+    """
+    Rejoue les seeds dont l'empreinte a changé. force : comme SEED_FORCE (défaut : la variable).
+    Renvoie {"ran": [noms], "skipped": [noms], "failed": [noms]}.
+    """
+    import sqlalchemy as sa
+    from .database import SessionLocal
+    from .models import SeedStateDB
+
+    forced = _forced(force)
+    with SessionLocal() as db:
+        state = dict(db.execute(sa.select(SeedStateDB.name, SeedStateDB.hash)).all())
+    out = {"ran": [], "skipped": [], "failed": []}
+    for name, data, fn in registry():
+        digest = fingerprint(data, fn)
+        if state.get(name) == digest and "*" not in forced and name not in forced:
+            out["skipped"].append(name)
+            continue
+        t0 = time.perf_counter()
+        try:
+            with SessionLocal() as db:
+                fn(db)
+                ms = int((time.perf_counter() - t0) * 1000)
+                db.merge(SeedStateDB(name=name, hash=digest, applied_at=datetime.utcnow(), duration_ms=ms))
+                db.commit()
+        except Exception as e:
+            log.warning("seed %s : %s", name, e)
+            out["failed"].append(name)
+            continue
+        log.info("seed %s appliqué (%d ms)", name, ms)
+        out["ran"].append(name)
+    return out
@@ -0,0 +1,323 @@
+"""
+WARMING — Plan quotidien du warming email, livraison concurrente, réconciliation IMAP.
+
+L'ancien _job_warming tirait expéditeurs, destinataires et textes au hasard à chaque
+session (~4 h), envoyait lot par lot en série, puis relisait les boîtes réceptrices
+message par message (RFC822) en dormant 2 à 35 min avant chaque réponse : le thread du
+scheduler restait bloqué des heures.
+
+  - plan du jour (table warming_plan), généré une fois par jour : _warming_day_cap(jour)
+    envois par expéditeur, heures étalées sur WARMING_WINDOW (défaut "7-21", UTC) — une
+    tranche par envoi, instant tiré au hasard dans la tranche
+  - livraison (job 5 min) : éléments dus réservés, regroupés par (expéditeur, type) en
+    lots Brevo envoyés par WARMING_SEND_CONCURRENCY threads (défaut 4). Un expéditeur ne
+    dépasse jamais son plafond du jour, même si le plan a été modifié à la main. Un
+    élément resté "sending" plus de WARMING_STALE_MIN minutes (défaut 30, process arrêté
+    pendant l'envoi) repasse "planned" au passage suivant
+  - réconciliation (job 30 min) : une session IMAP par boîte réceptrice — UID SEARCH,
+    en-têtes seulement, réponses / relances ajoutées au plan avec leur délai "humain"
+    (plus de sleep), puis \\Seen et déplacement vers Warming sur des plages d'UID
+"""
+import logging, os, random
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_HEADERS = {"initial": "X-Warming", "reply": "X-Warming-Reply", "followup": "X-Warming-Followup"}
+
+# Réponse 1 — bot répond au sender (ton formel, parfois emoji)
+_WARMING_REPLIES = [
+    "Bonjour,\n\nMerci pour votre message, je l'ai bien reçu.\n\nJe vous recontacte dès que possible.\n\nCordialement",
+    "Bonjour,\n\nBien reçu, merci. 👍\n\nJe reviendrai vers vous prochainement.\n\nBonne journée",
+    "Bonjour,\n\nMerci de votre retour. Je prends note et vous réponds dans les meilleurs délais.\n\nCordialement",
+    "Bonjour,\n\nMessage bien reçu ! Je vous confirme que je traiterai votre demande très prochainement.\n\nBien à vous",
+    "Bonjour,\n\nMerci pour ces informations. Je reviens vers vous rapidement. 🙂\n\nCordialement",
+    "Bonjour,\n\nBien noté, merci de votre message. Je vous tiens informé.\n\nBonne journée ☀️",
+    "Bonjour,\n\nReçu 5/5. Je transfère votre message aux bonnes personnes.\n\nCordialement",
+    "Bonjour,\n\nMerci, c'est noté ! On se recontacte très prochainement.\n\nBien à vous 👋",
+    "Bonjour,\n\nMerci pour votre message. Je m'en occupe dès que possible.\n\nBonne journée",
+    "Bonjour,\n\nBien reçu ! Je vous réponds dans les meilleurs délais. ✅\n\nCordialement",
+]
+
+# Réponse 2 — sender relance (ton plus court, ~40% des cas)
+_WARMING_FOLLOWUPS = [
+    "Merci pour votre réponse rapide.\n\nJe reste disponible si vous avez des questions.\n\nBonne journée",
+    "Parfait, merci ! 👍\n\nN'hésitez pas à me contacter si besoin.\n\nCordialement",
+    "Très bien, j'attends de vos nouvelles.\n\nBonne continuation 🙂",
+    "Merci ! À bientôt.",
+    "Super, on fait comme ça.\n\nBonne journée à vous ☀️",
+    "D'accord, merci pour le retour.\n\nCordialement",
+    "OK, noté. Merci ! 👋",
+    "Bien reçu, à très vite.",
+    "Parfait ! Bonne journée.",
+    "Merci pour ce retour rapide. 🙏\n\nÀ bientôt",
+]
+
+
+def _window() -> Tuple[int, int]:
+    lo, hi = os.getenv("WARMING_WINDOW", "7-21").split("-")
+    return int(lo), int(hi)
+
+
+def _display(sender: str) -> str:
+    return sender.split("@")[0].capitalize().replace("-", " ")
+
+
+# ── Plan du jour ──────────────────────────────────────────────────────────────
+
+def build_plan(day: date, rng: Optional[random.Random] = None) -> List[Dict]:
+    """Envois "initial" du jour : _warming_day_cap(day) par expéditeur, étalés sur la fenêtre."""
+    from .scheduler import _WARMING_SENDERS, _WARMING_RECEIVERS, _WARMING_SUBJECTS, _WARMING_BODIES, \
+        _warming_day_cap
+
+    rng   = rng or random.Random()
+    cap   = _warming_day_cap(day)
+    lo, hi = _window()
+    start = datetime(day.year, day.month, day.day, lo)
+    slot  = (hi - lo) * 3600 / cap
+    items = []
+    for sender in _WARMING_SENDERS:
+        for i in range(cap):
+            items.append({
+                "day":      day.isoformat(),
+                "kind":     "initial",
+                "sender":   sender,
+                "receiver": rng.choice(_WARMING_RECEIVERS),
+                "subject":  rng.choice(_WARMING_SUBJECTS),
+                "body":     rng.choice(_WARMING_BODIES),
+                "due_at":   start + timedelta(seconds=slot * i + rng.uniform(0, slot * 0.8)),
+            })
+    return sorted(items, key=lambda x: x["due_at"])
+
+
+def ensure_plan(day: Optional[date] = None) -> int:
+    """Crée le plan du jour s'il n'existe pas. Retourne le nombre de lignes insérées."""
+    import sqlalchemy as sa
+    from .database import SessionLocal
+    from .models import WarmingPlanDB
+
+    day = day or datetime.utcnow().date()
+    with SessionLocal() as db:
+        exists = db.query(WarmingPlanDB.id).filter(WarmingPlanDB.day == day.isoformat(),
+                                                   WarmingPlanDB.kind == "initial").first()
+        if exists:
+            return 0
+        items = build_plan(day)
+        db.execute(sa.insert(WarmingPlanDB), items)
+        db.commit()
+    log.info("warming: plan du %s — %d envois", day.isoformat(), len(items))
+    return len(items)
+
+
+# ── Livraison ─────────────────────────────────────────────────────────────────
+
+def _reserve(now: datetime, limit: int) -> List[Dict]:
+    """planned → sending pour les éléments dus, plafond du jour appliqué aux envois initiaux."""
+    import sqlalchemy as sa
+    from .database import SessionLocal
+    from .models import WarmingPlanDB
+    from .scheduler import _warming_day_cap
+
+    with SessionLocal() as db:
+        rows = (db.query(WarmingPlanDB)
+                .filter(WarmingPlanDB.status == "planned", WarmingPlanDB.due_at <= now)
+                .order_by(WarmingPlanDB.due_at).limit(limit).all())
+        if not rows:
+            return []
+        days  = {r.day for r in rows if r.kind == "initial"}
+        count = {(d, s): n for d, s, n in db.query(WarmingPlanDB.day, WarmingPlanDB.sender, sa.func.count())
+                 .filter(WarmingPlanDB.day.in_(days), WarmingPlanDB.kind == "initial",
+                         WarmingPlanDB.status.in_(("sending", "sent")))
+                 .group_by(WarmingPlanDB.day, WarmingPlanDB.sender)}
+        out = []
+        for r in rows:
+            if r.kind == "initial":
+                key = (r.day, r.sender)
+                if count.get(key, 0) >= _warming_day_cap(date.fromisoformat(r.day)):
+                    r.status, r.error = "skipped", "plafond du jour atteint"
+                    continue
+                count[key] = count.get(key, 0) + 1
+            r.status, r.locked_at = "sending", datetime.utcnow()
+            out.append({"id": r.id, "kind": r.kind, "sender": r.sender, "receiver": r.receiver,
+                        "subject": r.subject, "body": r.body})
+        db.commit()
+    return out
+
+
+def sweep(stale_minutes: Optional[float] = None) -> int:
+    """
+    "sending" depuis plus de stale_minutes (WARMING_STALE_MIN) : le process a été arrêté
+    entre la réservation et l'écriture du résultat → "planned". Retourne le nombre remis.
+    """
+    import sqlalchemy as sa
+    from .database import SessionLocal
+    from .models import WarmingPlanDB
+
+    if stale_minutes is None:
+        stale_minutes = float(os.getenv("WARMING_STALE_MIN", "30"))
+    cutoff = datetime.utcnow() - timedelta(minutes=stale_minutes)
+    with SessionLocal() as db:
+        n = db.execute(sa.update(WarmingPlanDB)
+                       .where(WarmingPlanDB.status == "sending",
+                              WarmingPlanDB.locked_at.is_(None) | (WarmingPlanDB.locked_at < cutoff))
+                       .values(status="planned", locked_at=None)).rowcount
+        db.commit()
+    if n:
+        log.warning("warming: %d envoi(s) interrompu(s) remis en file", n)
+    return n
+
+
+def deliver_due(now: Optional[datetime] = None) -> Dict:
+    """Envoie les éléments dus du plan. Retourne {"sent", "failed", "skipped_cap"}."""
+    import sqlalchemy as sa
+    from concurrent.futures import ThreadPoolExecutor
+    from .database import SessionLocal
+    from .models import WarmingPlanDB
+
+    brevo_key = os.getenv("BREVO_API_KEY", "")
+    if not brevo_key:
+        log.warning("warming: BREVO_API_KEY absent")
+        return {"sent": 0, "failed": 0}
+
+    sweep()
+    items = _reserve(now or datetime.utcnow(), int(os.getenv("WARMING_BATCH", "500")))
+    if not items:
+        return {"sent": 0, "failed": 0}
+
+    from marketing_module.channels.email.providers.brevo import BrevoProvider
+    provider = BrevoProvider(api_key=brevo_key)
+    groups: Dict[Tuple[str, str], List[Dict]] = {}
+    for it in items:
+        groups.setdefault((it["sender"], it["kind"]), []).append(it)
+
+    def _send(key):
+        sender, kind = key
+        msgs = [{"ref": it["id"], "to_email": it["receiver"], "subject": it["subject"], "text": it["body"]}
+                for it in groups[key]]
+        return provider.send_batch(sender, _display(sender), msgs, headers={_HEADERS[kind]: "1"})
+
+    concurrency = max(1, int(os.getenv("WARMING_SEND_CONCURRENCY", "4")))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="warming") as pool:
+        futs = {key: pool.submit(_send, key) for key in groups}
+    now_ = datetime.utcnow()
+    updates, sent = [], 0
+    for key, fut in futs.items():
+        try:
+            results = fut.result()
+        except Exception as e:
+            results = [{"ref": it["id"], "success": False, "error": str(e)} for it in groups[key]]
+        for r in results:
+            ok = r["success"]
+            sent += ok
+            if not ok:
+                log.warning("warming: %s → #%s %s", key[0], r["ref"], r.get("error"))
+            updates.append({"id": r["ref"], "status": "sent" if ok else "failed",
+                            "sent_at": now_ if ok else None, "error": None if ok else r.get("error")})
+    with SessionLocal() as db:
+        db.execute(sa.update(WarmingPlanDB), updates)
+        db.commit()
+    log.info("warming: %d email(s) envoyé(s), %d échec(s)", sent, len(updates) - sent)
+    return {"sent": sent, "failed": len(updates) - sent}
+
+
+# ── Réconciliation des boîtes réceptrices ─────────────────────────────────────
+
+def _mailboxes() -> List[Tuple[str, str]]:
+    return [(os.getenv(f"WARMING_MAILBOX_{i}", ""), os.getenv(f"WARMING_MAILBOX_{i}_PWD", ""))
+            for i in (1, 2)]
+
+
+def _reply_addr(from_field: str) -> str:
+    import re
+    m = re.search(r"<([^>]+)>", from_field or "")
+    return (m.group(1) if m else (from_field or "")).strip()
+
+
+def _reconcile_mailbox(address: str, password: str, now: datetime) -> List[Dict]:
+    """Une session IMAP : planifie réponses / relances, marque lu et archive. Retourne les éléments planifiés."""
+    import imaplib
+    from email.parser import BytesHeaderParser
+    from .imap_replies import _parse_fetch, _uid_set
+    from .scheduler import _WARMING_FOLDER, _WARMING_SENDERS, _imap_ensure_folder
+
+    host = os.getenv("WARMING_IMAP_HOST", "imap.ionos.fr")
+    port = int(os.getenv("WARMING_IMAP_PORT", "993"))
+    cls  = imaplib.IMAP4 if os.getenv("WARMING_IMAP_SSL", "true").lower() == "false" else imaplib.IMAP4_SSL
+    conn = cls(host, port)
+    planned: List[Dict] = []
+    try:
+        conn.login(address, password)
+        conn.select("INBOX")
+        _imap_ensure_folder(conn, _WARMING_FOLDER)
+
+        done: List[int] = []
+        parser = BytesHeaderParser()
+        for header, unseen, nxt in (("X-Warming", True, "reply"), ("X-Warming-Reply", True, "followup"),
+                                    ("X-Warming-Followup", False, None)):
+            crit = f"(UNSEEN HEADER {header} 1)" if unseen else f"(HEADER {header} 1)"
+            _, data = conn.uid("SEARCH", None, crit)
+            uids = sorted(int(u) for u in (data[0] or b"").split())
+            if not uids:
+                continue
+            done += uids
+            if nxt is None:
+                continue
+            _, fetched = conn.uid("FETCH", _uid_set(uids), "(UID BODY.PEEK[HEADER.FIELDS (FROM SUBJECT)])")
+            for _, _, raw in _parse_fetch(fetched):
+                h = parser.parsebytes(raw)
+                to = _reply_addr(h.get("From", ""))
+                if not to or "@" not in to:
+                    continue
+                subj = h.get("Subject", "message")
+                subj = subj if subj.startswith("Re:") else f"Re: {subj}"
+                if nxt == "reply":                       # délai humain : 2 à 18 min
+                    planned.append({"kind": "reply", "sender": address, "receiver": to, "subject": subj,
+                                    "body": random.choice(_WARMING_REPLIES),
+                                    "due_at": now + timedelta(seconds=random.randint(120, 1080))})
+                elif random.random() < 0.40:             # relance dans 40% des cas, 5 à 35 min
+                    planned.append({"kind": "followup", "sender": random.choice(_WARMING_SENDERS),
+                                    "receiver": to, "subject": subj,
+                                    "body": random.choice(_WARMING_FOLLOWUPS),
+                                    "due_at": now + timedelta(seconds=random.randint(300, 2100))})
+
+        if done:
+            uid_set = _uid_set(sorted(set(done)))
+            conn.uid("STORE", uid_set, "+FLAGS", "(\\Seen)")
+            if "MOVE" in conn.capabilities:
+                conn.uid("MOVE", uid_set, _WARMING_FOLDER)
+            else:
+                conn.uid("COPY", uid_set, _WARMING_FOLDER)
+                conn.uid("STORE", uid_set, "+FLAGS", "(\\Deleted)")
+                conn.expunge()
+        log.info("warming IMAP %s — %d message(s) archivés, %d envoi(s) planifiés",
+                 address, len(done), len(planned))
+    finally:
+        try:
+            conn.logout()
+        except Exception:
+            pass
+    return planned
+
+
+def reconcile(now: Optional[datetime] = None) -> int:
+    """Passe sur les boîtes réceptrices ; les réponses / relances entrent dans le plan. Retourne leur nombre."""
+    import sqlalchemy as sa
+    from .database import SessionLocal
+    from .models import WarmingPlanDB
+
+    now, planned = now or datetime.utcnow(), []
+    for address, password in _mailboxes():
+        if not (address and password):
+            continue
+        try:
+            planned += _reconcile_mailbox(address, password, now)
+        except Exception as e:
+            log.warning("warming IMAP %s: %s", address, e)
+    if planned:
+        for p in planned:
+            p["day"] = p["due_at"].date().isoformat()
+        with SessionLocal() as db:
+            db.execute(sa.insert(WarmingPlanDB), planned)
+            db.commit()
+    return len(planned)
@@ -0,0 +1,97 @@
+"""
+PRESENCE_IA — process worker (scheduler + file de jobs), hors du process API.
+Démarrer : SCHEDULER_MODE=worker python -m src.worker
+(l'API doit tourner avec le même SCHEDULER_MODE=worker pour ne plus lancer de jobs elle-même)
+
+  - BackgroundScheduler via l'élection leader (src.leader) : plusieurs workers possibles,
+    un seul exécute les jobs planifiés
+  - file job_queue (src.jobqueue) : jobs demandés depuis l'admin, WORKER_THREADS jobs
+    en parallèle (défaut 2), interrogée toutes les WORKER_POLL_S secondes (défaut 1)
+  - priorité CPU abaissée de WORKER_NICE (défaut 10) : sur une machine chargée, l'OS
+    sert d'abord le process API (impossible entre threads d'un même process)
+  - SIGTERM / SIGINT : plus aucune réservation, attente des jobs en cours, bail rendu
+"""
+import logging, os, signal, socket, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+log = logging.getLogger("src.worker")
+
+
+class Worker:
+    def __init__(self, threads: int = None, poll: float = None):
+        self.name    = f"{socket.gethostname()}:{os.getpid()}"
+        self.threads = threads or max(1, int(os.getenv("WORKER_THREADS", "2")))
+        self.poll    = poll or float(os.getenv("WORKER_POLL_S", "1"))
+        self.stop    = threading.Event()
+        self._running: dict = {}            # job id → Future
+        self._lock   = threading.Lock()
+
+    def _done(self, job_id: int, _fut) -> None:
+        with self._lock:
+            self._running.pop(job_id, None)
+
+    def loop(self) -> None:
+        """Boucle principale : réserve et exécute les jobs jusqu'à stop."""
+        from . import jobqueue
+
+        pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="job")
+        lease = float(os.getenv("JOB_QUEUE_LEASE_S", "300"))
+        beat  = 0.0
+        try:
+            while not self.stop.is_set():
+                if time.monotonic() - beat > lease / 3:
+                    beat = time.monotonic()
+                    with self._lock:
+                        ids = list(self._running)
+                    jobqueue.heartbeat(ids)
+                    jobqueue.requeue_stale()
+                job = None
+                with self._lock:
+                    free = len(self._running) < self.threads
+                if free:
+                    job = jobqueue.claim(self.name)
+                if job is None:
+                    self.stop.wait(self.poll)
+                    continue
+                log.info("[WORKER] %s (#%d) démarré", job["name"], job["id"])
+                fut = pool.submit(jobqueue.run, job)
+                with self._lock:
+                    self._running[job["id"]] = fut
+                fut.add_done_callback(lambda f, i=job["id"]: self._done(i, f))
+        finally:
+            pool.shutdown(wait=True)
+
+
+def lower_priority() -> None:
+    try:
+        os.nice(int(os.getenv("WORKER_NICE", "10")))
+    except (AttributeError, OSError) as e:
+        log.warning("[WORKER] nice impossible : %s", e)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s — %(message)s")
+    os.environ.setdefault("MKT_DB_PATH",
+                          str(Path(__file__).parent.parent / "data" / "marketing.db"))
+
+    from .database import init_db
+    from .scheduler import start_leader_scheduler, stop_scheduler
+    init_db()
+    lower_priority()
+
+    worker = Worker()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *a: worker.stop.set())
+
+    start_leader_scheduler()
+    log.info("[WORKER] %s démarré — %d thread(s) jobs", worker.name, worker.threads)
+    try:
+        worker.loop()
+    finally:
+        stop_scheduler()
+        log.info("[WORKER] %s arrêté", worker.name)
+
+
+if __name__ == "__main__":
+    main()
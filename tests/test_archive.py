@@ -0,0 +1,199 @@
+"""
+Tests — archivage froid (src.archive, migration 0006, job _job_archive).
+
+Scénarios :
+  T01  run()                        → seuls les prospects terminés et anciens partent (bounced,
+                                      unsubscribed, perdus) avec leurs livraisons presence-ia ;
+                                      snapshots supplantés ou orphelins, vieux journal ; par lots,
+                                      idempotent
+  T02  Lecture à travers            → get_prospect / snapshots / deliveries, fiche CRM d'un
+                                      prospect archivé (badge, livraisons archivées)
+  T03  restore()                    → prospects + snapshots + livraisons remis en table chaude,
+                                      id de snapshot repris réattribué, token recréé laissé en
+                                      archive, journal depuis une date ; CLI
+  T04  Dédoublonnage / compteurs    → clés archivées vues par le provisioning, sent_total
+                                      les compte ; migration 0006 sur une base en version 5
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.orm import sessionmaker
+
+from marketing_module.sqlite_engine import make_engine
+from src.models import (IaSnapshotArchive, IaSnapshotDB, PipelineHistoryLogArchive, PipelineHistoryLogDB,
+                        V3BookingDB, V3ProspectArchive, V3ProspectDB)
+from src import archive, database, migrate
+
+NOW = datetime.utcnow()
+OLD = NOW - timedelta(days=400)
+RECENT = NOW - timedelta(days=10)
+
+# token → (colonnes, archivé ?)
+PROSPECTS = {
+    "bounced":   ({"email_status": "bounced", "sent_at": OLD, "email_bounced_at": OLD}, True),
+    "unsub":     ({"email_status": "unsubscribed", "sent_at": OLD}, True),
+    "lost":      ({"email_status": "opened", "sent_at": OLD, "email_opened_at": OLD}, True),
+    "recent":    ({"email_status": "sent", "sent_at": RECENT}, False),
+    "reopened":  ({"email_status": "opened", "sent_at": OLD, "email_opened_at": RECENT}, False),
+    "clicked":   ({"email_status": "clicked", "sent_at": OLD, "email_clicked_at": OLD}, False),
+    "replied":   ({"email_status": "replied", "sent_at": OLD}, False),
+    "client":    ({"email_status": "bounced", "sent_at": OLD, "status": "CLIENT"}, False),
+    "paid":      ({"email_status": "sent", "sent_at": OLD, "paid": True}, False),
+    "booked":    ({"email_status": "sent", "sent_at": OLD}, False),
+    "unsent":    ({}, False),
+    **{f"lost{i:02d}": ({"email_status": "sent", "sent_at": OLD}, True) for i in range(20)},
+}
+_COLS = {k for cols, _ in PROSPECTS.values() for k in cols}
+
+
+@pytest.fixture
+def dbs(tmp_path, monkeypatch):
+    from marketing_module import database as mkt_db
+    from marketing_module.models import Base as MktBase, ProspectDeliveryDB
+
+    e = make_engine(str(tmp_path / "p.db"))
+    migrate.upgrade(e)
+    me = create_engine(f"sqlite:///{tmp_path / 'mkt.db'}")
+    MktBase.metadata.create_all(me)
+    monkeypatch.setattr(database, "ENGINE", e)
+    monkeypatch.setattr(mkt_db, "_engine", me)
+    monkeypatch.setattr(mkt_db, "SessionLocal", sessionmaker(bind=me))
+    monkeypatch.delenv("ARCHIVE_AFTER_DAYS", raising=False)
+
+    with e.begin() as c:
+        c.execute(V3ProspectDB.__table__.insert(), [
+            {**dict.fromkeys(_COLS), "token": tok, "name": f"Société {tok}", "city": "Lyon",
+             "profession": "plombier", "landing_url": f"/l/{tok}", "email": f"{tok}@x.fr",
+             "created_at": OLD, "is_test": False, "paid": False, "status": "PROSPECT", **cols}
+            for tok, (cols, _) in PROSPECTS.items()])
+        c.execute(V3BookingDB.__table__.insert(), [
+            {"id": "b1", "prospect_token": "booked", "name": "x", "email": "x@x.fr",
+             "start_iso": "2025-01-01T10:00:00", "end_iso": "2025-01-01T10:20:00"}])
+        c.execute(IaSnapshotDB.__table__.insert(), [
+            {"id": 1, "prospect_token": "clicked", "report_type": "audit", "score": 1, "created_at": OLD},
+            {"id": 2, "prospect_token": "clicked", "report_type": "audit", "score": 2, "created_at": OLD + timedelta(days=1)},
+            {"id": 3, "prospect_token": "clicked", "report_type": "audit", "score": 3, "created_at": RECENT},
+            {"id": 4, "prospect_token": "clicked", "report_type": "monthly", "score": 4, "created_at": OLD},
+            {"id": 5, "prospect_token": "recent", "report_type": "audit", "score": 5, "created_at": RECENT - timedelta(days=1)},
+            {"id": 6, "prospect_token": "recent", "report_type": "audit", "score": 6, "created_at": RECENT},
+            {"id": 7, "prospect_token": "lost", "report_type": "audit", "score": 7, "created_at": RECENT},
+        ])
+        c.execute(PipelineHistoryLogDB.__table__.insert(), [
+            {"id": i, "ts": OLD if i < 5 else RECENT, "mode": "AUTO"} for i in range(8)])
+    with me.begin() as c:
+        c.execute(ProspectDeliveryDB.__table__.insert(), [
+            {"id": f"d{i}", "project_id": project, "campaign_id": "c1", "prospect_id": tok,
+             "delivery_status": "sent", "meta": {"n": i}, "created_at": OLD + timedelta(hours=i)}
+            for i, (tok, project) in enumerate([("lost", "presence-ia"), ("lost", "presence-ia"),
+                                                ("bounced", "presence-ia"), ("clicked", "presence-ia"),
+                                                ("lost", "autre")])])
+    yield e, me
+    e.dispose()
+    me.dispose()
+
+
+def _keys(engine, table, col):
+    with engine.connect() as c:
+        return set(c.execute(select(table.c[col])).scalars())
+
+
+def test_t01_run(dbs):
+    from marketing_module.models import ProspectDeliveryArchive, ProspectDeliveryDB
+    e, me = dbs
+    seen = []
+    event.listen(e, "before_cursor_execute",
+                 lambda conn, cur, sql, *a: seen.append(sql) if sql.startswith("DELETE FROM v3_prospects") else None)
+    out = archive.run(batch=7)
+    archived = {t for t, (_, a) in PROSPECTS.items() if a}
+    assert _keys(e, V3ProspectArchive, "token") == archived and len(seen) == 4       # 23 prospects, lots de 7
+    assert _keys(e, V3ProspectDB.__table__, "token") == set(PROSPECTS) - archived
+    assert _keys(e, IaSnapshotArchive, "id") == {1, 2, 7}                  # supplantés anciens + orphelin
+    assert _keys(e, PipelineHistoryLogArchive, "id") == {0, 1, 2, 3, 4}
+    assert _keys(me, ProspectDeliveryArchive, "id") == {"d0", "d1", "d2"}
+    assert _keys(me, ProspectDeliveryDB.__table__, "id") == {"d3", "d4"}    # autre projet : intact
+    assert out == {"v3_prospects": 23, "prospect_deliveries": 3, "ia_snapshots": 3, "pipeline_history_log": 5}
+    with e.connect() as c:
+        row = c.execute(select(V3ProspectArchive).where(V3ProspectArchive.c.token == "lost")).mappings().one()
+    assert row["email_opened_at"] == OLD and row["archived_at"] >= NOW
+
+    assert sum(archive.run().values()) == 0
+    assert archive.run(days=5)["v3_prospects"] == 2                         # envoi / ouverture à 10 jours
+
+
+def test_t02_lecture(dbs, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from marketing_module import database as mkt_db
+    from src.api.routes import crm_admin
+
+    e, me = dbs
+    archive.run()
+    S = sessionmaker(bind=e)
+    with S() as db:
+        hot, cold = archive.get_prospect(db, "clicked"), archive.get_prospect(db, "lost")
+        assert getattr(hot, "archived_at", None) is None and cold.archived_at and cold.email == "lost@x.fr"
+        assert cold not in db and archive.get_prospect(db, "absent") is None
+        assert [s.id for s in archive.snapshots(db, "clicked")] == [1, 4, 2, 3]
+        assert [s.score for s in archive.snapshots(db, "clicked", "audit")] == [1, 2, 3]
+    with mkt_db.SessionLocal() as mdb:
+        assert [d.id for d in archive.deliveries(mdb, "lost")] == ["d1", "d0"]
+        assert archive.deliveries(mdb, "lost")[0].meta == {"n": 1}
+
+    monkeypatch.setenv("ADMIN_TOKEN", "tok")
+    monkeypatch.setattr(crm_admin, "SessionLocal", S)
+    app = FastAPI()
+    app.include_router(crm_admin.router)
+    r = TestClient(app).get("/admin/crm/prospect/lost?token=tok")
+    assert r.status_code == 200 and "Société lost" in r.text and "Archivé le" in r.text
+    assert r.text.count("Ouvert") + r.text.count("Envoy") >= 2 and "Aucune livraison" not in r.text
+    r = TestClient(app).get("/admin/crm/prospect/clicked?token=tok")
+    assert r.status_code == 200 and "Archivé le" not in r.text
+
+
+def test_t03_restore(dbs):
+    from marketing_module.models import ProspectDeliveryArchive, ProspectDeliveryDB
+    e, me = dbs
+    archive.run()
+    with e.begin() as c:                                   # id 7 repris par un nouveau snapshot
+        c.execute(IaSnapshotDB.__table__.insert(), [{"id": 7, "prospect_token": "recent", "report_type": "monthly",
+                                                     "score": 8, "created_at": NOW}])
+        c.execute(V3ProspectDB.__table__.insert(), [{"token": "bounced", "name": "Recréé", "city": "Lyon",
+                                                     "profession": "plombier", "landing_url": "/l/x"}])
+    out = archive.restore(["lost", "bounced", "lost"], history_since=OLD)
+    assert out == {"v3_prospects": 1, "prospect_deliveries": 3, "ia_snapshots": 1, "pipeline_history_log": 5}
+    assert {"lost", "bounced"} <= _keys(e, V3ProspectDB.__table__, "token")
+    assert "bounced" in _keys(e, V3ProspectArchive, "token") and "lost" not in _keys(e, V3ProspectArchive, "token")
+    with e.connect() as c:
+        snaps = c.execute(select(IaSnapshotDB.id, IaSnapshotDB.prospect_token, IaSnapshotDB.score)).all()
+        assert c.execute(select(V3ProspectDB.email_opened_at).where(V3ProspectDB.token == "lost")).scalar() == OLD
+    assert (7, "recent", 8) in snaps and any(t == "lost" and s == 7 and i != 7 for i, t, s in snaps)
+    assert _keys(e, PipelineHistoryLogDB.__table__, "id") == set(range(8))
+    assert _keys(me, ProspectDeliveryDB.__table__, "id") == {f"d{i}" for i in range(5)}
+    assert _keys(me, ProspectDeliveryArchive, "id") == set()
+
+    assert archive.main(["restore", "unsub"]) == 0 and "unsub" in _keys(e, V3ProspectDB.__table__, "token")
+    assert archive.main(["status"]) == 0
+
+
+def test_t04_dedup_compteurs(dbs, tmp_path):
+    from src.outbound_counters import _recount_main
+    e, _ = dbs
+    S = sessionmaker(bind=e)
+    with S() as db:
+        before = _recount_main(db)["sent_total"]
+    archive.run()
+    with S() as db:
+        assert _recount_main(db)["sent_total"] == before == len(PROSPECTS) - 1
+        assert ("Société lost", "Lyon", "plombier") in archive.archived_keys(db, ["plombier"])
+        assert archive.archived_keys(db, ["couvreur"]) == archive.archived_keys(db, []) == set()
+
+    m = make_engine(str(tmp_path / "m.db"))
+    migrate.upgrade(m, target=5)
+    assert [r["version"] for r in migrate.upgrade(m, target=6)] == [6]
+    tables = set(inspect(m).get_table_names())
+    assert {"v3_prospects_archive", "ia_snapshots_archive", "pipeline_history_log_archive"} <= tables
+    assert "ix_v3_prospects_archive_key" in {i["name"] for i in inspect(m).get_indexes("v3_prospects_archive")}
+    m.dispose()
@@ -12,6 +12,16 @@ from fastapi.testclient import TestClient
 
 # ── Fixtures ──────────────────────────────────────────────────────────────
 
+@pytest.fixture(autouse=True)
+def _places_sequentiel(monkeypatch):
+    """Mocks ordonnés (side_effect) → 1 worker Place Details, cache vidé entre tests."""
+    import src.google_places as gp
+    monkeypatch.setattr(gp, "_DETAILS_WORKERS", 1)
+    gp.clear_details_cache()
+    yield
+    gp.clear_details_cache()
+
+
 @pytest.fixture
 def client(tmp_path):
     os.environ["DB_PATH"] = str(tmp_path / "test.db")
@@ -61,7 +71,7 @@ class TestSearchProspects:
         places = [{"place_id": "p1", "name": "Sans Site", "user_ratings_total": 5}]
         detail_resp = _mock_details(website=None)  # pas de site
 
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.side_effect = [
                 _mock_text_search(places),
                 detail_resp,
@@ -78,7 +88,7 @@ class TestSearchProspects:
         detail_resp = _mock_details(website="https://www.couverture-rennaise.fr",
                                     phone="0299000001", ratings=42)
 
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.side_effect = [_mock_text_search(places), detail_resp]
             prospects, reasons = search_prospects("couvreur", "Rennes", "fake-key", max_results=5)
 
@@ -99,7 +109,7 @@ class TestSearchProspects:
         d1 = _mock_details(website=same_url, ratings=10)
         d2 = _mock_details(website="https://www.martin-toiture.fr", ratings=5)  # même domaine
 
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.side_effect = [_mock_text_search(places), d1, d2]
             prospects, reasons = search_prospects("couvreur", "Rennes", "fake-key", max_results=5)
 
@@ -114,7 +124,7 @@ class TestSearchProspects:
         details = [_mock_details(website=f"https://artisan{i}.fr", ratings=i)
                    for i in range(10)]
 
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.side_effect = [_mock_text_search(places)] + details
             prospects, _ = search_prospects("couvreur", "Rennes", "fake-key", max_results=3)
 
@@ -127,7 +137,7 @@ class TestSearchProspects:
         resp.raise_for_status = MagicMock()
         resp.json.return_value = {"status": "ZERO_RESULTS", "results": []}
 
-        with patch("requests.get", return_value=resp):
+        with patch("requests.Session.get", return_value=resp):
             prospects, reasons = search_prospects("couvreur", "Rennes", "fake-key")
 
         assert prospects == []
@@ -139,7 +149,7 @@ class TestSearchProspects:
         resp.raise_for_status = MagicMock()
         resp.json.return_value = {"status": "REQUEST_DENIED", "error_message": "Invalid key"}
 
-        with patch("requests.get", return_value=resp):
+        with patch("requests.Session.get", return_value=resp):
             with pytest.raises(ValueError, match="REQUEST_DENIED"):
                 search_prospects("couvreur", "Rennes", "bad-key")
 
@@ -154,7 +164,7 @@ class TestSearchProspects:
         err_detail = MagicMock()
         err_detail.raise_for_status.side_effect = Exception("timeout")
 
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.side_effect = [_mock_text_search(places), ok_detail, err_detail]
             prospects, reasons = search_prospects("couvreur", "Rennes", "fake-key", max_results=5)
 
@@ -178,7 +188,7 @@ class TestAutoScanEndpoint:
         mock_get.side_effect = [_mock_text_search(places)] + details
 
     def test_retourne_200_et_created(self, client):
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             self._places_setup(mock_get, [
                 ("Couverture Rennaise", "https://couverture-rennaise.fr"),
                 ("Martin Toiture",      "https://martin-toiture.fr"),
@@ -192,7 +202,7 @@ class TestAutoScanEndpoint:
         assert "campaign_id" in data
 
     def test_prospects_ont_website(self, client):
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             self._places_setup(mock_get, [
                 ("Couverture Rennaise", "https://couverture-rennaise.fr"),
             ])
@@ -218,7 +228,7 @@ class TestAutoScanEndpoint:
         d1 = _mock_details(website="https://avec-site.fr", ratings=10)
         d2 = _mock_details(website=None)
 
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.side_effect = [_mock_text_search(places), d1, d2]
             r = client.post("/api/prospect-scan/auto",
                             json={"city": "Rennes", "profession": "couvreur"})
@@ -235,7 +245,7 @@ class TestAutoScanEndpoint:
                          json={"city": "Rennes", "profession": "couvreur"})
         cid = cr.json()["campaign_id"]
 
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             self._places_setup(mock_get, [
                 ("Couverture Rennaise", "https://couverture-rennaise.fr"),
             ])
@@ -246,7 +256,7 @@ class TestAutoScanEndpoint:
         assert r.json()["campaign_id"] == cid
 
     def test_campaign_id_invalide_404(self, client):
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             self._places_setup(mock_get, [
                 ("Couverture Rennaise", "https://couverture-rennaise.fr"),
             ])
@@ -264,7 +274,7 @@ class TestAutoScanEndpoint:
         d1 = _mock_details(website="https://martin-toiture.fr",     ratings=10)
         d2 = _mock_details(website="https://www.martin-toiture.fr", ratings=5)
 
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.side_effect = [_mock_text_search(places), d1, d2]
             r = client.post("/api/prospect-scan/auto",
                             json={"city": "Rennes", "profession": "couvreur"})
@@ -278,7 +288,7 @@ class TestAutoScanEndpoint:
         resp = MagicMock()
         resp.raise_for_status = MagicMock()
         resp.json.return_value = {"status": "REQUEST_DENIED", "error_message": "Invalid key"}
-        with patch("requests.get", return_value=resp):
+        with patch("requests.Session.get", return_value=resp):
             r = client.post("/api/prospect-scan/auto",
                             json={"city": "Rennes", "profession": "couvreur"})
         assert r.status_code == 502
@@ -0,0 +1,126 @@
+"""
+Tests — envois groupés Brevo (messageVersions) des chemins bulk : relance J+1 et bulk-send v3.
+
+Scénarios :
+  T01  _job_followup               → 1 seule requête Brevo pour tous les éligibles, statut sent
+  T02  _job_followup, 1 adresse KO → lot refusé, repli unitaire, seule l'adresse KO en error
+  T03  bulk-send email             → lots de batch_size, prospects marqués, payload valide
+"""
+import sys, os, json, time, asyncio, threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from marketing_module.channels.email.providers import brevo as brevo_provider
+from src.models import Base, V3ProspectDB
+
+
+class _StubBrevo(BaseHTTPRequestHandler):
+    requests: list = []
+    invalid: list = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append(body)
+        versions = body.get("messageVersions")
+        if versions is not None and ("to" in body or not body.get("subject")
+                                     or any("textContent" in v and "textContent" not in body
+                                            for v in versions)):
+            self.invalid.append(body)
+        rcpts = [v["to"][0]["email"] for v in versions] if versions else [body["to"][0]["email"]]
+        if any(r.startswith("ko") for r in rcpts):
+            code, payload = 400, {"code": "invalid_parameter"}
+        elif versions:
+            code, payload = 201, {"messageIds": [f"<{r}>" for r in rcpts]}
+        else:
+            code, payload = 201, {"messageId": f"<{rcpts[0]}>"}
+        raw = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *a):
+        pass
+
+
+@pytest.fixture
+def env(monkeypatch):
+    e = create_engine("sqlite:///:memory:",
+                      connect_args={"check_same_thread": False},
+                      poolclass=StaticPool)
+    Base.metadata.create_all(e)
+    Session = sessionmaker(bind=e, autocommit=False, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", Session)
+    monkeypatch.setattr("src.api.routes.v3.SessionLocal", Session)
+    monkeypatch.setenv("BREVO_API_KEY", "k")
+    monkeypatch.setenv("OUTBOUND_DRY_RUN", "false")
+    _StubBrevo.requests, _StubBrevo.invalid = [], []
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StubBrevo)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(brevo_provider, "BREVO_API_BASE", f"http://127.0.0.1:{srv.server_address[1]}/v3")
+    yield Session, _StubBrevo
+    assert _StubBrevo.invalid == []
+    srv.shutdown()
+    srv.server_close()
+
+
+def _prospects(Session, emails, **kw):
+    with Session() as db:
+        for i, email in enumerate(emails):
+            db.add(V3ProspectDB(token=f"t{i}", name=f"Artisan {i}", city="Lyon",
+                                profession="plombier", landing_url=f"/l/t{i}",
+                                email=email, is_test=False, **kw))
+        db.commit()
+
+
+def test_t01_followup_un_seul_lot(env):
+    Session, stub = env
+    sent = datetime.utcnow() - timedelta(hours=30)
+    _prospects(Session, [f"p{i}@plombier.fr" for i in range(6)],
+               sent_method="email", email_sent_at=sent)
+    from src.scheduler import _job_followup
+    _job_followup()
+    assert len(stub.requests) == 1
+    assert len(stub.requests[0]["messageVersions"]) == 6
+    with Session() as db:
+        assert {p.followup_status for p in db.query(V3ProspectDB)} == {"sent"}
+
+
+def test_t02_followup_repli_unitaire(env):
+    Session, stub = env
+    sent = datetime.utcnow() - timedelta(hours=30)
+    _prospects(Session, ["p0@plombier.fr", "ko1@plombier.fr", "p2@plombier.fr"],
+               sent_method="email", email_sent_at=sent)
+    from src.scheduler import _job_followup
+    _job_followup()
+    assert len(stub.requests) == 1 + 3
+    with Session() as db:
+        status = {p.token: p.followup_status for p in db.query(V3ProspectDB)}
+    assert status == {"t0": "sent", "t1": "error", "t2": "sent"}
+
+
+def test_t03_bulk_send_par_lots(env, monkeypatch):
+    Session, stub = env
+    from src.api.routes import v3
+    monkeypatch.setattr(v3, "_require_admin", lambda *a, **k: None)
+    monkeypatch.setattr(v3._mkt, "_mkt_db", lambda: None)   # bridge en mode dégradé
+    _prospects(Session, [f"p{i}@plombier.fr" for i in range(5)])
+    req = v3.BulkSendRequest(method="email", delay_seconds=0, batch_size=2,
+                             prospect_tokens=[f"t{i}" for i in range(5)])
+    asyncio.run(v3.bulk_send(req, token="t"))
+    for _ in range(100):
+        if not v3._bulk_status["running"]:
+            break
+        time.sleep(0.05)
+    assert [len(r["messageVersions"]) for r in stub.requests] == [2, 2, 1]
+    assert all("htmlContent" in v for r in stub.requests for v in r["messageVersions"])
+    assert v3._bulk_status["done"] == 5 and v3._bulk_status["errors"] == []
+    with Session() as db:
+        assert all(p.sent_at and p.sent_method == "email" for p in db.query(V3ProspectDB))
@@ -0,0 +1,186 @@
+"""
+Tests — prefetch des images header villes (city_images) contre un faux serveur Unsplash local.
+
+Scénarios :
+  T01  prefetch_city_headers        → image téléchargée, variantes WEBP 16:9, URL locale en base
+  T02  2e prefetch                  → 0 requête HTTP (déjà en cache)
+  T03  Ancienne URL Unsplash en base → rapatriée en local sans nouvelle recherche
+  T04  Landing avec cache           → URL locale + srcset, 0 appel HTTP sortant
+  T05  Landing sans cache           → image par défaut, 0 appel HTTP sortant
+  T06  Téléchargement en échec      → échec daté, ville ignorée pendant CITY_HEADER_RETRY_HOURS
+                                      (URL restée distante comprise), retentée ensuite
+  T07  CITY_HEADER_PREFETCH_LIMIT   → le job borne le nombre de villes tentées par run
+"""
+import sys, os, io, json, threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.models import Base, RefCityDB, V3ProspectDB
+from src import city_images, image_pipeline
+
+
+def _jpeg() -> bytes:
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (800, 600), (40, 90, 160)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+class _StubUnsplash(BaseHTTPRequestHandler):
+    log: list = []
+    base = ""
+    broken = False
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        self.log.append(path)
+        if self.broken and path != "/search/photos":
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if path == "/search/photos":
+            body = json.dumps({"results": [{
+                "description": "Nantes city skyline", "alt_description": "architecture",
+                "tags": [], "likes": 50,
+                "urls": {"regular": f"{self.base}/photo.jpg?w=1080"},
+            }]}).encode()
+            ctype = "application/json"
+        else:
+            body, ctype = _jpeg(), "image/jpeg"
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *a):
+        pass
+
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    e = create_engine("sqlite:///:memory:",
+                      connect_args={"check_same_thread": False},
+                      poolclass=StaticPool)
+    Base.metadata.create_all(e)
+    Session = sessionmaker(bind=e, autocommit=False, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", Session)
+    monkeypatch.setattr("src.api.routes.v3.SessionLocal", Session)
+    monkeypatch.setattr("src.active_pair.get_active_pair", lambda: None)
+    monkeypatch.setenv("UPLOADS_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setenv("UNSPLASH_ACCESS_KEY", "k")
+    monkeypatch.setenv("BASE_URL", "https://presence-ia.test")
+
+    _StubUnsplash.log, _StubUnsplash.broken = [], False
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StubUnsplash)
+    _StubUnsplash.base = f"http://127.0.0.1:{srv.server_address[1]}"
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(city_images, "_UNSPLASH_SEARCH_URL", f"{_StubUnsplash.base}/search/photos")
+
+    with Session() as db:
+        db.add(RefCityDB(city_name="NANTES", city_type="prefecture"))
+        db.add(V3ProspectDB(token="tok1", name="Toitures Dupont", city="Nantes",
+                            profession="couvreur", landing_url="/l/tok1"))
+        db.commit()
+    yield Session, tmp_path
+    image_pipeline.shutdown()
+    srv.shutdown()
+    srv.server_close()
+
+
+def _landing(token: str) -> str:
+    from src.api.routes import v3
+    with patch.object(v3._mkt, "record_landing_visit", lambda t: None), \
+         patch("requests.sessions.Session.request",
+               side_effect=AssertionError("appel HTTP sortant")) as req:
+        html = v3.landing_v3(token).body.decode()
+    assert req.call_count == 0
+    return html
+
+
+def test_t01_prefetch(env):
+    Session, tmp = env
+    stats = city_images.prefetch_city_headers()
+    assert stats["fetched"] == 1 and stats["failed"] == 0
+    assert _StubUnsplash.log == ["/search/photos", "/photo.jpg"]
+    with Session() as db:
+        url = db.get(RefCityDB, "NANTES").header_image_url
+    assert url.startswith("/dist/headers/ref-nantes-") and url.endswith("-800.webp")
+    from PIL import Image
+    img = Image.open(tmp / "dist" / "headers" / url.rsplit("/", 1)[1])
+    assert img.format == "WEBP" and img.size == (800, 450)
+
+
+def test_t02_deja_en_cache(env):
+    city_images.prefetch_city_headers()
+    _StubUnsplash.log.clear()
+    stats = city_images.prefetch_city_headers()
+    assert stats["cached"] == 1 and stats["fetched"] == 0
+    assert _StubUnsplash.log == []
+
+
+def test_t03_url_distante_rapatriee(env):
+    Session, _ = env
+    with Session() as db:
+        db.get(RefCityDB, "NANTES").header_image_url = f"{_StubUnsplash.base}/photo.jpg"
+        db.commit()
+    city_images.prefetch_city_headers()
+    assert _StubUnsplash.log == ["/photo.jpg"]
+    with Session() as db:
+        assert db.get(RefCityDB, "NANTES").header_image_url.startswith("/dist/headers/ref-nantes-")
+
+
+def test_t04_landing_lit_le_cache(env):
+    city_images.prefetch_city_headers()
+    html = _landing("tok1")
+    assert 'src="https://presence-ia.test/dist/headers/ref-nantes-' in html
+    assert "480w" in html and "800w" in html
+
+
+def test_t05_landing_image_par_defaut(env):
+    html = _landing("tok1")
+    assert "https://presence-ia.test" + city_images.DEFAULT_HEADER_URL in html
+    assert _StubUnsplash.log == []
+
+
+def test_t06_echec_cooldown(env, monkeypatch):
+    Session, _ = env
+    _StubUnsplash.broken = True
+    assert city_images.prefetch_city_headers()["failed"] == 1
+    with Session() as db:
+        ref = db.get(RefCityDB, "NANTES")
+        assert ref.header_image_url.startswith(_StubUnsplash.base) and ref.header_failed_at
+
+    _StubUnsplash.log.clear()
+    stats = city_images.prefetch_city_headers()                # URL distante, mais en pause
+    assert stats["cooldown"] == 1 and stats["failed"] == 0 and _StubUnsplash.log == []
+
+    _StubUnsplash.broken = False
+    monkeypatch.setenv("CITY_HEADER_RETRY_HOURS", "0")
+    assert city_images.prefetch_city_headers()["fetched"] == 1
+    assert _StubUnsplash.log == ["/photo.jpg"]
+    with Session() as db:
+        assert db.get(RefCityDB, "NANTES").header_failed_at is None
+
+
+def test_t07_limite_par_run(env, monkeypatch):
+    Session, _ = env
+    with Session() as db:
+        db.add_all([RefCityDB(city_name=c) for c in ("LYON", "LILLE", "BREST")])
+        db.commit()
+    monkeypatch.setenv("CITY_HEADER_PREFETCH_LIMIT", "2")
+    from src.scheduler import _job_prefetch_city_headers
+    _job_prefetch_city_headers()
+    with Session() as db:
+        assert db.query(RefCityDB).filter(RefCityDB.header_image_url.isnot(None)).count() == 2
+    _job_prefetch_city_headers()
+    with Session() as db:
+        assert db.query(RefCityDB).filter(RefCityDB.header_image_url.isnot(None)).count() == 4
@@ -0,0 +1,116 @@
+"""
+Tests — cache persistant de gemini_places.fetch_company_info().
+
+Scénarios :
+  T01  2e appel même entreprise     → 0 appel Gemini, même résultat
+  T02  "Introuvable"                → {} frais comme en cache négatif, pas de nouvel appel
+  T03  Erreur HTTP                  → jamais mise en cache
+  T04  TTL expiré                   → nouvel appel
+  T05  SIREN connu                  → clé SIREN (nom différent = hit)
+  T06  Changement de modèle         → clé différente (miss)
+  T07  cache_stats                  → hit rate + dépense évitée au prix cost_tracker
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.models import Base, CompanyInfoCacheDB
+from src import gemini_places
+from src.cost_tracker import PRICE_GEMINI
+
+
+def _resp(text: str = None, status: int = 200):
+    r = MagicMock()
+    r.status_code = status
+    if status >= 400:
+        r.raise_for_status.side_effect = Exception(f"HTTP {status}")
+    else:
+        r.raise_for_status.return_value = None
+    parts = [{"text": text}] if text is not None else []
+    r.json.return_value = {"candidates": [{"content": {"parts": parts}}]}
+    return r
+
+
+_FOUND     = '{"website": "plomberie-dupont.fr", "phone": "06 12 34 56 78"}'
+_NOT_FOUND = '{"website": null, "phone": null}'
+
+
+@pytest.fixture
+def Session(monkeypatch):
+    e = create_engine("sqlite:///:memory:",
+                      connect_args={"check_same_thread": False},
+                      poolclass=StaticPool)
+    Base.metadata.create_all(e)
+    S = sessionmaker(bind=e, autocommit=False, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", S)
+    return S
+
+
+def test_t01_hit_sans_appel(Session):
+    with patch("src.gemini_places.requests.post", return_value=_resp(_FOUND)) as post:
+        a = gemini_places.fetch_company_info("Plomberie Dupont", "Nantes", "k")
+        b = gemini_places.fetch_company_info("PLOMBERIE  DUPONT", "nantes", "k")
+    assert post.call_count == 1
+    assert a == b
+    assert a["website"] == "https://plomberie-dupont.fr"
+
+
+def test_t02_cache_negatif(Session):
+    with patch("src.gemini_places.requests.post", return_value=_resp(_NOT_FOUND)) as post:
+        fresh  = gemini_places.fetch_company_info("Inconnu SARL", "Mende", "k")
+        cached = gemini_places.fetch_company_info("Inconnu SARL", "Mende", "k")
+    assert fresh == cached == {}
+    assert post.call_count == 1
+    with Session() as db:
+        assert db.query(CompanyInfoCacheDB).one().found is False
+
+
+def test_t03_erreur_non_cachee(Session):
+    with patch("src.gemini_places.requests.post", return_value=_resp(status=503)) as post:
+        gemini_places.fetch_company_info("Plomberie Dupont", "Nantes", "k")
+        gemini_places.fetch_company_info("Plomberie Dupont", "Nantes", "k")
+    assert post.call_count == 2
+    with Session() as db:
+        assert db.query(CompanyInfoCacheDB).count() == 0
+
+
+def test_t04_ttl_expire(Session):
+    with patch("src.gemini_places.requests.post", return_value=_resp(_FOUND)) as post:
+        gemini_places.fetch_company_info("Plomberie Dupont", "Nantes", "k")
+        with Session() as db:
+            row = db.query(CompanyInfoCacheDB).one()
+            row.expires_at = datetime.utcnow() - timedelta(seconds=1)
+            db.commit()
+        gemini_places.fetch_company_info("Plomberie Dupont", "Nantes", "k")
+    assert post.call_count == 2
+
+
+def test_t05_cle_siren(Session):
+    with patch("src.gemini_places.requests.post", return_value=_resp(_FOUND)) as post:
+        gemini_places.fetch_company_info("Plomberie Dupont", "Nantes", "k", siren="123456789")
+        gemini_places.fetch_company_info("DUPONT PLOMBERIE SARL", "NANTES", "k", siren="123456789")
+    assert post.call_count == 1
+
+
+def test_t06_modele_dans_la_cle(Session, monkeypatch):
+    with patch("src.gemini_places.requests.post", return_value=_resp(_FOUND)) as post:
+        gemini_places.fetch_company_info("Plomberie Dupont", "Nantes", "k")
+        monkeypatch.setattr(gemini_places, "_GEMINI_MODEL", "gemini-2.5-flash")
+        gemini_places.fetch_company_info("Plomberie Dupont", "Nantes", "k")
+    assert post.call_count == 2
+
+
+def test_t07_stats(Session):
+    with patch("src.gemini_places.requests.post", return_value=_resp(_FOUND)):
+        for _ in range(4):
+            gemini_places.fetch_company_info("Plomberie Dupont", "Nantes", "k")
+    st = gemini_places.cache_stats()
+    assert st["fetches"] == 1 and st["hits"] == 3
+    assert st["hit_rate"] == 0.75
+    assert st["saved"] == round(3 * PRICE_GEMINI, 4)
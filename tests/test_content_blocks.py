@@ -0,0 +1,130 @@
+"""
+Tests — index en mémoire des blocs de contenu (database.get_block, set_block, seed).
+
+Scénarios :
+  T01  Fallback en mémoire          → profession+ville, profession, générique, valeur vide
+                                      ignorée, défaut : identique aux requêtes (TTL 0)
+  T02  Rendu de page                → cache chaud : 0 requête content_blocks (render_home,
+                                      build_manifest_from_db) ; cache froid : 1
+  T03  Invalidation                 → set_block (édition admin) et seed : nouvelle valeur
+                                      lue immédiatement
+  T04  TTL / plusieurs bases        → écriture d'un autre process visible après
+                                      CONTENT_BLOCKS_TTL_S ; un index par base
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, ContentBlockDB
+from src import database
+from src.database import get_block, set_block
+
+
+def _session(path):
+    e = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(e)
+    return e, sessionmaker(bind=e)
+
+
+@pytest.fixture
+def S(tmp_path, monkeypatch):
+    e, S = _session(tmp_path / "blocks.db")
+    monkeypatch.setattr(database, "_BLOCKS_CACHE", {})
+    monkeypatch.setattr(database, "_BLOCKS_TTL_S", 300.0)
+    with S() as db:
+        for pt, sk, fk, prof, city, value in [
+            ("landing", "hero", "title", None, None, "Générique"),
+            ("landing", "hero", "title", "plombier", None, "Plombier"),
+            ("landing", "hero", "title", "plombier", "Lyon", "Plombier à Lyon"),
+            ("landing", "hero", "subtitle", None, None, "Sous-titre"),
+            ("landing", "hero", "subtitle", "plombier", None, ""),
+            ("home", "hero", "title", None, None, "Accueil"),
+        ]:
+            db.add(ContentBlockDB(page_type=pt, section_key=sk, field_key=fk, profession=prof, city=city, value=value))
+        db.commit()
+    yield e, S
+    e.dispose()
+
+
+def _blocks_queries(engine):
+    seen = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cur, sql, *a: seen.append(sql) if "content_blocks" in sql else None)
+    return seen
+
+
+CASES = [
+    ("landing", "hero", "title", "plombier", "Lyon"), ("landing", "hero", "title", "plombier", "Nice"),
+    ("landing", "hero", "title", "couvreur", "Lyon"), ("landing", "hero", "title", None, "Lyon"),
+    ("landing", "hero", "subtitle", "plombier", "Lyon"), ("landing", "faq", "q1", "plombier", None),
+    ("home", "hero", "title", None, None),
+]
+
+
+def test_t01_fallback(S, monkeypatch):
+    _, S = S
+    with S() as db:
+        cached = [get_block(db, *c, default="déf") for c in CASES]
+        monkeypatch.setattr(database, "_BLOCKS_TTL_S", 0.0)
+        direct = [get_block(db, *c, default="déf") for c in CASES]
+    assert cached == direct == ["Plombier à Lyon", "Plombier", "Générique", "Générique",
+                                "Sous-titre", "déf", "Accueil"]
+
+
+def test_t02_rendu_sans_requete(S):
+    e, S = S
+    from src.api.routes import page_builder_route as pbr
+    seen = _blocks_queries(e)
+    with S() as db:
+        pbr.render_home(db)
+        assert len(seen) == 1                                  # cache froid : une seule lecture
+        seen.clear()
+        pbr.render_home(db)
+        if pbr._PAGE_BUILDER_OK:
+            pbr.build_manifest_from_db(db, "landing", city="Lyon", profession="plombier")
+    with S() as db:                                            # autre session, même base
+        pbr.render_home(db)
+    assert seen == []
+
+
+def test_t03_invalidation(S):
+    e, S = S
+    seen = _blocks_queries(e)
+    with S() as db:
+        assert get_block(db, "landing", "hero", "title", "plombier", "Nice") == "Plombier"
+        set_block(db, "landing", "hero", "title", "Plombier à Nice", profession="plombier", city="Nice")
+        n = len(seen)
+        assert get_block(db, "landing", "hero", "title", "plombier", "Nice") == "Plombier à Nice"
+        assert get_block(db, "landing", "hero", "title", "plombier", "Lyon") == "Plombier à Lyon"
+        assert len(seen) == n + 1
+
+        db.query(ContentBlockDB).filter_by(page_type="home").delete()
+        db.commit()
+        assert get_block(db, "home", "hero", "title") == "Accueil"        # écriture hors set_block
+        database._seed_content_blocks(db)
+        seeded = next(v for pt, sk, fk, p, c, v in database._CONTENT_SEED if (pt, sk, fk) == ("home", "hero", "title"))
+        assert get_block(db, "home", "hero", "title") == seeded != "Accueil"
+
+
+def test_t04_ttl_et_bases(S, tmp_path, monkeypatch):
+    import time
+    e, S = S
+    clock = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    with S() as db:
+        assert get_block(db, "home", "hero", "title") == "Accueil"
+        with S() as other:                                     # autre process : pas d'invalidation
+            other.query(ContentBlockDB).filter_by(page_type="home").update({"value": "Modifié"})
+            other.commit()
+        assert get_block(db, "home", "hero", "title") == "Accueil"
+        clock[0] += 301
+        assert get_block(db, "home", "hero", "title") == "Modifié"
+
+    e2, S2 = _session(tmp_path / "autre.db")
+    with S2() as db:
+        assert get_block(db, "home", "hero", "title", default="vide") == "vide"
+    assert len(database._BLOCKS_CACHE) == 2
+    e2.dispose()
@@ -0,0 +1,170 @@
+"""
+Tests — lectures croisées presence_ia.db × marketing.db (src.crossdb), vues CRM et Contacts.
+
+Scénarios :
+  T01  CRM (_load_crm_data)         → dernière livraison / dernier RDV de chaque prospect
+                                      (référence Python), identiques en mode attach et separate
+  T02  Mode attach                  → une seule requête, index prospect des deux tables mkt,
+                                      aucun parcours complet de marketing.db
+  T03  Mode separate                → choisi si volumes différents ou CROSSDB_ATTACH=0 ;
+                                      lots IN (CROSSDB_BATCH) ; marketing.db illisible = sans suivi
+  T04  Page Contacts                → filtres + page en SQL, suivi joint, compteurs agrégés
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, V3ProspectDB
+from src import crossdb
+
+NOW = datetime(2026, 6, 15, 12)
+
+
+@pytest.fixture
+def dbs(tmp_path, monkeypatch):
+    from marketing_module import database as mkt_db
+    from marketing_module.models import Base as MktBase, MeetingDB, ProspectDeliveryDB
+
+    main, mkt = str(tmp_path / "p.db"), str(tmp_path / "mkt.db")
+    e, me = create_engine(f"sqlite:///{main}"), create_engine(f"sqlite:///{mkt}")
+    Base.metadata.create_all(e)
+    MktBase.metadata.create_all(me)
+    monkeypatch.setattr("src.database.DB_PATH", main)
+    monkeypatch.setattr(mkt_db, "_DB_PATH", mkt)
+    monkeypatch.delenv("CROSSDB_ATTACH", raising=False)
+    with e.begin() as c:
+        c.execute(V3ProspectDB.__table__.insert(), [
+            {"token": f"t{i:03d}", "name": f"Plomberie {i}", "city": ("Lyon", "Nice")[i % 2],
+             "profession": ("plombier", "couvreur")[i % 3 == 0], "landing_url": f"/l/t{i:03d}",
+             "email": f"e{i}@x.fr", "status": ("SUSPECT", "PROSPECT", "CLIENT")[i % 3],
+             "is_test": i % 50 == 0, "contacted": i % 2 == 0,
+             "sent_at": NOW - timedelta(hours=i) if i % 2 == 0 else None,
+             "created_at": NOW - timedelta(minutes=i)} for i in range(400)])
+    with me.begin() as c:
+        c.execute(ProspectDeliveryDB.__table__.insert(), [
+            {"id": f"d{i}", "project_id": ("presence-ia", "autre")[i % 11 == 0], "campaign_id": "c1",
+             "prospect_id": f"t{i % 300:03d}", "delivery_status": ("sent", "bounced")[i % 5 == 0],
+             "opened_at": NOW if i % 2 else None, "landing_visited_at": NOW if i % 3 == 0 else None,
+             "calendly_clicked_at": NOW if i % 7 == 0 else None, "reply_status": "none",
+             "created_at": NOW - timedelta(minutes=i)} for i in range(900)])
+        c.execute(MeetingDB.__table__.insert(), [
+            {"id": f"m{i}", "project_id": "presence-ia", "prospect_id": f"t{(i * 4) % 120:03d}",
+             "status": ("completed", "scheduled")[i % 2], "deal_value": 490.0 if i % 2 == 0 else None,
+             "scheduled_at": NOW + timedelta(days=i), "created_at": NOW - timedelta(hours=i)}
+            for i in range(60)])
+    yield e, me
+    crossdb.dispose()
+    e.dispose()
+    me.dispose()
+
+
+def _reference(e, me):
+    """Ancienne jointure Python : prospects contactés, puis dernière livraison / dernier RDV."""
+    from marketing_module.models import MeetingDB, ProspectDeliveryDB
+    with sessionmaker(bind=e)() as db:
+        tokens = [t for t, in db.query(V3ProspectDB.token).filter(V3ProspectDB.contacted == True)
+                  .order_by(V3ProspectDB.sent_at.desc()).limit(300)]
+    with sessionmaker(bind=me)() as mdb:
+        dl, ms = {}, {}
+        for d in mdb.query(ProspectDeliveryDB).filter_by(project_id="presence-ia").order_by(
+                ProspectDeliveryDB.created_at):
+            dl[d.prospect_id] = (d.delivery_status, d.opened_at, d.landing_visited_at, d.calendly_clicked_at)
+        for m in mdb.query(MeetingDB).filter_by(project_id="presence-ia").order_by(MeetingDB.created_at):
+            ms[m.prospect_id] = m.id
+    return [(t, dl.get(t), ms.get(t)) for t in tokens]
+
+
+def _crm():
+    from src.api.routes.crm_admin import _load_crm_data
+    out = _load_crm_data()
+    keys = ("delivery_status", "opened_at", "landing_visited_at", "calendly_clicked_at")
+    return out, [(r["token"], r["delivery"] and tuple(r["delivery"][k] for k in keys),
+                  r["meeting"] and r["meeting"]["id"]) for r in out]
+
+
+def test_t01_crm(dbs, monkeypatch):
+    ref = _reference(*dbs)
+    assert crossdb.mode() == "attach"
+    attached, got = _crm()
+    assert got == ref and sum(1 for _, d, _ in ref if d) > 100 and sum(1 for *_, m in ref if m) > 20
+    monkeypatch.setenv("CROSSDB_ATTACH", "0")
+    separate, got = _crm()
+    assert got == ref and separate == attached
+    r = next(r for r in attached if r["meeting"])
+    assert r["meeting"]["scheduled_at"].count("/") == 2 and r["sent_at"] != "—"
+
+
+def _listen(key):
+    seen = []
+    event.listen(crossdb._ENGINES[key], "before_cursor_execute",
+                 lambda conn, cur, sql, params, *a: seen.append((sql, params)))
+    return seen
+
+
+def test_t02_une_requete(dbs):
+    from sqlalchemy import select
+    rows = crossdb.rows(select(V3ProspectDB.token, V3ProspectDB.created_at)
+                        .order_by(V3ProspectDB.created_at.desc()).limit(50), meetings=True)
+    assert next(rows).token == "t000" and len(list(rows)) == 49
+    seen = _listen(crossdb._paths())                               # (presence_ia.db, mkt attachée)
+    _crm()
+    assert len(seen) == 1 and "mkt.prospect_deliveries" in seen[0][0] and "mkt.meetings" in seen[0][0]
+    with crossdb._ENGINES[crossdb._paths()].connect() as c:
+        plan = [r[3] for r in c.exec_driver_sql("EXPLAIN QUERY PLAN " + seen[0][0], seen[0][1])]
+    assert any("ix_prospect_deliveries_prospect" in p for p in plan)
+    assert any("ix_meetings_prospect" in p for p in plan)
+    assert not [p for p in plan if p.startswith("SCAN") and ("deliveries" in p or "meetings" in p)]
+
+
+def test_t03_separate(dbs, monkeypatch):
+    ref = _reference(*dbs)
+    monkeypatch.setattr(crossdb, "_same_volume", lambda a, b: False)
+    assert crossdb.mode() == "separate"                             # volumes différents
+    monkeypatch.setenv("CROSSDB_ATTACH", "1")
+    assert crossdb.mode() == "attach"
+    monkeypatch.setenv("CROSSDB_ATTACH", "auto")
+
+    monkeypatch.setenv("CROSSDB_BATCH", "7")
+    assert _crm()[1] == ref
+    seen = _listen((crossdb._paths()[1], None))
+    _crm()
+    assert len(seen) == 2 * -(-len(ref) // 7) and all(" IN (" in s for s, _ in seen)
+
+    monkeypatch.setattr("marketing_module.database._DB_PATH", crossdb._paths()[1] + ".absent")
+    out, got = _crm()
+    assert [t for t, *_ in got] == [t for t, *_ in ref]
+    assert all(r["delivery"] is None and r["meeting"] is None for r in out)
+
+
+def test_t04_page_contacts(dbs, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from src.api.routes import contacts
+    from src.database import get_db
+
+    e, _ = dbs
+    S = sessionmaker(bind=e)
+    monkeypatch.setenv("ADMIN_TOKEN", "tok")
+    monkeypatch.setenv("CONTACTS_PAGE_SIZE", "40")
+
+    def _db():
+        with S() as db:
+            yield db
+    app = FastAPI()
+    app.include_router(contacts.router)
+    app.dependency_overrides[get_db] = _db
+    client = TestClient(app)
+
+    r = client.get("/admin/contacts?token=tok")
+    assert r.status_code == 200 and r.text.count('class="row-cb"') == 40
+    assert "Page 1 / 10" in r.text and "392 total" in r.text and "130 clients" in r.text
+    assert 'id="row-t000"' in r.text and 'title="Email ouvert 15/06 12:00"' in r.text
+    r = client.get("/admin/contacts?token=tok&page=10")
+    assert r.text.count('class="row-cb"') == 40 and 'id="row-t399"' in r.text and "Suivant" not in r.text
+    r = client.get("/admin/contacts?token=tok&status_filter=CLIENT&show_test=0&search=PLOMBERIE%2012")
+    assert r.text.count('class="row-cb"') == 3 and "Page 1" not in r.text
+    assert all(f'id="row-t{i}"' in r.text for i in (122, 125, 128))
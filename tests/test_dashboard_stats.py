@@ -0,0 +1,192 @@
+"""
+Tests — KPIs du hub admin (database.db_dashboard_stats, analytics._mkt_delivery_stats).
+
+Scénarios :
+  T01  Jeu synthétique              → mêmes valeurs que le calcul ligne à ligne (référence
+                                      Python) : suspects, V3, livraisons, RDV, top closers, CA
+  T02  Nombre de requêtes           → constant : 3 sur presence_ia.db, 3 sur marketing.db
+  T03  Mémoire                      → pic tracemalloc identique à 3k et 43k livraisons
+  T04  Mémo TTL                     → 2e appel de la période sans requête ; TTL 0 = désactivé
+  T05  Mémo borné                   → expirées purgées à l'insertion, au plus DASHBOARD_STATS_MAX périodes
+"""
+import sys, os, tracemalloc
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, SireneSuspectDB, V3ProspectDB
+from src import database
+
+NOW   = datetime(2026, 6, 15, 12)
+FROM  = NOW - timedelta(days=30)
+TO    = NOW
+
+
+def _count(engine):
+    seen = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **k: seen.append(a[2]))
+    return seen
+
+
+def _deliveries(n, offset=0):
+    return [{"id": f"d{offset + i}", "project_id": ("presence-ia", "autre")[i % 7 == 0],
+             "campaign_id": "c1", "prospect_id": f"p{i}",
+             "delivery_status": ("sent", "bounced", "pending", "sent")[i % 4],
+             "reply_status": ("none", "positive", "negative")[i % 3],
+             "opened_at": NOW if i % 2 else None, "clicked_at": NOW if i % 5 == 0 else None,
+             "landing_visited_at": NOW if i % 6 == 0 else None,
+             "calendly_clicked_at": NOW if i % 9 == 0 else None,
+             "created_at": NOW - timedelta(days=i % 60)} for i in range(n)]
+
+
+@pytest.fixture
+def dbs(tmp_path, monkeypatch):
+    from marketing_module import database as mkt_db
+    from marketing_module.models import Base as MktBase, CloserDB, MeetingDB
+
+    e = create_engine(f"sqlite:///{tmp_path / 'p.db'}")
+    Base.metadata.create_all(e)
+    me = create_engine(f"sqlite:///{tmp_path / 'mkt.db'}")
+    MktBase.metadata.create_all(me)
+    monkeypatch.setattr(mkt_db, "SessionLocal", sessionmaker(bind=me))
+    monkeypatch.setattr(mkt_db, "ReadSessionLocal", sessionmaker(bind=me))
+    monkeypatch.setattr(database, "_DASH_CACHE", {})
+    monkeypatch.setattr(database, "_DASH_TTL_S", 0.0)
+
+    with e.begin() as c:
+        c.execute(SireneSuspectDB.__table__.insert(), [
+            {"id": f"{i:014d}", "raison_sociale": f"S{i}", "created_at": NOW - timedelta(days=i % 90),
+             "enrichi_at": NOW - timedelta(days=i % 45) if i % 3 else None} for i in range(900)])
+        c.execute(V3ProspectDB.__table__.insert(), [
+            {"token": f"t{i}", "name": f"P{i}", "city": ("Lyon", "Nice")[i % 2],
+             "profession": ("plombier", "couvreur", "peintre")[i % 3], "landing_url": f"/l/t{i}",
+             "email": f"e{i}@x.fr" if i % 4 else None, "phone": "06" if i % 5 == 0 else None,
+             "ia_results": "[]" if i % 3 else None, "contacted": i % 2 == 0,
+             "sent_at": NOW - timedelta(days=i % 50) if i % 2 == 0 else None,
+             "created_at": NOW - timedelta(days=i % 70)} for i in range(1200)])
+    with me.begin() as c:
+        from marketing_module.models import ProspectDeliveryDB
+        c.execute(ProspectDeliveryDB.__table__.insert(), _deliveries(3000))
+        c.execute(CloserDB.__table__.insert(), [
+            {"id": f"k{i}", "project_id": "presence-ia", "name": f"Closer {i}", "is_active": i != 4}
+            for i in range(5)])
+        c.execute(MeetingDB.__table__.insert(), [
+            {"id": f"m{i}", "project_id": "presence-ia", "prospect_id": f"p{i}",
+             "closer_id": f"k{i % 6}" if i % 6 != 5 else None,
+             "status": ("completed", "scheduled", "no_show")[i % 3],
+             "deal_value": (0.0, 490.0, None, 1200.0)[i % 4],
+             "scheduled_at": NOW - timedelta(days=i % 40)} for i in range(200)])
+    yield e, me
+    e.dispose()
+    me.dispose()
+
+
+def _reference(e, me):
+    """Calcul ligne à ligne (ancienne implémentation) sur les mêmes données."""
+    from marketing_module.models import CloserDB, MeetingDB, ProspectDeliveryDB
+    inp = lambda d: d is not None and FROM <= d <= TO
+    with sessionmaker(bind=e)() as db:
+        sus = db.query(SireneSuspectDB).all()
+        v3 = db.query(V3ProspectDB).all()
+    with sessionmaker(bind=me)() as mdb:
+        dl = [d for d in mdb.query(ProspectDeliveryDB).filter_by(project_id="presence-ia") if inp(d.created_at)]
+        ms = [m for m in mdb.query(MeetingDB).filter_by(project_id="presence-ia") if inp(m.scheduled_at)]
+        closers = mdb.query(CloserDB).filter_by(project_id="presence-ia", is_active=True).all()
+    done = [m for m in ms if m.status == "completed"]
+    top = sorted(({"name": c.name, "deals": sum(1 for m in done if m.closer_id == c.id)} for c in closers),
+                 key=lambda x: -x["deals"])
+    ca_pos = sum(m.deal_value for m in done if (m.deal_value or 0) > 0)
+    reach = lambda p: p.email or p.phone
+    return {
+        "suspects": sum(inp(s.created_at) for s in sus), "suspects_total": len(sus),
+        "enrichis": sum(inp(s.enrichi_at) for s in sus),
+        "contactables": sum(1 for p in v3 if inp(p.created_at) and reach(p)),
+        "contactables_total": sum(1 for p in v3 if reach(p)),
+        "ia_scored": sum(1 for p in v3 if p.ia_results and p.email and not p.sent_at),
+        "sans_scoring_ia": sum(1 for p in v3 if not p.ia_results and p.email and not p.sent_at),
+        "contactes": sum(1 for p in v3 if inp(p.sent_at) and p.contacted),
+        "envoyes": sum(d.delivery_status == "sent" for d in dl), "ouvertures": sum(bool(d.opened_at) for d in dl),
+        "clics": sum(bool(d.clicked_at) for d in dl), "bounces": sum(d.delivery_status == "bounced" for d in dl),
+        "reponses": sum(d.reply_status == "positive" for d in dl), "rdv": len(ms), "deals": len(done),
+        "ca_total": sum(m.deal_value or 0.0 for m in done), "ca_par_offre": {"—": ca_pos} if ca_pos else {},
+        "closers_actifs": len(closers), "top_closers": top[:3],
+    }
+
+
+def test_t01_valeurs(dbs):
+    e, me = dbs
+    with sessionmaker(bind=e)() as db:
+        s = database.db_dashboard_stats(db, FROM, TO)
+    ref = _reference(e, me)
+    assert {k: s[k] for k in ref} == ref
+    assert ref["envoyes"] > 0 and ref["deals"] > 0 and ref["ca_total"] > 0 and ref["top_closers"][0]["deals"] > 0
+    assert sum(b["contactables"] for b in s["breakdown"]) == ref["contactables"]
+
+    from src.api.routes.analytics import _mkt_delivery_stats
+    mkt = _mkt_delivery_stats()
+    assert mkt["sent"] > ref["envoyes"] and mkt["landing"] > 0 and mkt["calendly"] > 0
+    assert mkt["rdv"] == 200 and mkt["rdv_done"] == 67 and mkt["sales"] == 100 and mkt["revenue"] == 50 * 1690.0
+
+
+def test_t02_nombre_de_requetes(dbs):
+    e, me = dbs
+    seen, seen_mkt = _count(e), _count(me)
+    with sessionmaker(bind=e)() as db:
+        database.db_dashboard_stats(db, FROM, TO)
+    assert len([s for s in seen if s.lstrip().upper().startswith("SELECT")]) == 3
+    assert len([s for s in seen_mkt if s.lstrip().upper().startswith("SELECT")]) == 3
+
+
+def test_t03_memoire_constante(dbs):
+    from marketing_module.models import ProspectDeliveryDB
+    from src.api.routes.analytics import _mkt_delivery_stats
+    _, me = dbs
+
+    def peak():
+        database._db_mkt_stats_period(FROM, TO)                 # préchauffage (compilation SQL)
+        tracemalloc.start()
+        database._db_mkt_stats_period(FROM, TO)
+        _mkt_delivery_stats()
+        p = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return p
+
+    small = peak()
+    with me.begin() as c:
+        c.execute(ProspectDeliveryDB.__table__.insert(), _deliveries(40000, offset=10**6))
+    assert database._db_mkt_stats_period(FROM, TO)["sent"] > 5000
+    assert peak() < small * 1.5 + 64 * 1024
+
+
+def test_t04_memo(dbs, monkeypatch):
+    e, _ = dbs
+    monkeypatch.setattr(database, "_DASH_TTL_S", 60.0)
+    seen = _count(e)
+    with sessionmaker(bind=e)() as db:
+        first = database.db_dashboard_stats(db, FROM, TO)
+        n = len(seen)
+        assert database.db_dashboard_stats(db, FROM, TO) is first and len(seen) == n
+        database.db_dashboard_stats(db, FROM - timedelta(days=30), FROM)      # autre période
+        assert len(seen) > n
+        monkeypatch.setattr(database, "_DASH_TTL_S", 0.0)
+        database._DASH_CACHE.clear()
+        n = len(seen)
+        database.db_dashboard_stats(db, FROM, TO)
+        database.db_dashboard_stats(db, FROM, TO)
+        assert len(seen) == n + 2 * 3
+
+
+def test_t05_memo_borne(dbs, monkeypatch):
+    e, _ = dbs
+    monkeypatch.setattr(database, "_DASH_TTL_S", 60.0)
+    monkeypatch.setattr(database, "_DASH_MAX", 3)
+    database._DASH_CACHE[("expirée", None, None)] = (0.0, {})
+    with sessionmaker(bind=e)() as db:
+        for i in range(5):
+            database.db_dashboard_stats(db, FROM - timedelta(days=i + 1), TO)
+    assert len(database._DASH_CACHE) == 3
+    assert [k[1] for k in database._DASH_CACHE] == [FROM - timedelta(days=i) for i in (3, 4, 5)]
+
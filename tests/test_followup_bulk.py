@@ -0,0 +1,233 @@
+"""
+Tests — relance J+1 (_job_followup) : filtrage SQL, tranches, envoi via l'outbox.
+
+Scénarios :
+  T01  100 000 prospects synthétiques → bloqués / éligibles identiques aux règles, chaque
+                                         éligible reçoit 1 relance, lots ≤ 1000, concurrence bornée
+                                         (OUTBOX_PER_SENDER)
+  T02  Plan de requête                → ix_v3_prospects_followup + index v3_bookings (anti-jointure)
+  T03  Crash pendant l'envoi          → tout est en file ("queued"), le drain suivant renvoie les
+                                         lots non confirmés avec la même idempotencyKey, relancer le
+                                         job n'ajoute rien : aucune relance perdue ni doublée
+  T04  Priorité des règles            → bounced > replied > rdv (colonne ou booking) > landing > métier > ville
+"""
+import sys, os, json, threading, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from marketing_module.channels.email.providers import brevo as brevo_provider
+from src.models import Base, V3BookingDB, V3ProspectDB
+
+N = 100_000
+
+
+class _StubBrevo(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    recipients: list = []
+    sizes: list = []
+    keys: list = []
+    inflight = peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = type(self)
+        with cls.lock:
+            cls.inflight += 1
+            cls.peak = max(cls.peak, cls.inflight)
+        time.sleep(0.01)
+        rcpts = [v["to"][0]["email"] for v in body["messageVersions"]]
+        with cls.lock:
+            cls.inflight -= 1
+            cls.recipients += rcpts
+            cls.sizes.append(len(rcpts))
+            cls.keys.append(((body.get("headers") or {}).get("idempotencyKey"), tuple(rcpts)))
+        raw = json.dumps({"messageIds": [f"<{r}>" for r in rcpts]}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *a):
+        pass
+
+
+@pytest.fixture
+def env(monkeypatch):
+    e = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False},
+                      poolclass=StaticPool)
+    Base.metadata.create_all(e)
+    Session = sessionmaker(bind=e, autocommit=False, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", Session)
+    monkeypatch.setattr("src.api.routes.v3.SessionLocal", Session)
+    monkeypatch.setenv("BREVO_API_KEY", "k")
+    monkeypatch.setenv("OUTBOUND_DRY_RUN", "false")
+    monkeypatch.setenv("FOLLOWUP_CHUNK", "5000")
+    monkeypatch.setenv("OUTBOX_PER_SENDER", "3")
+    monkeypatch.setattr("src.outbox._SENDER_SEMS", {})
+    _StubBrevo.recipients, _StubBrevo.sizes, _StubBrevo.keys, _StubBrevo.peak = [], [], [], 0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StubBrevo)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(brevo_provider, "BREVO_API_BASE", f"http://127.0.0.1:{srv.server_address[1]}/v3")
+    yield Session, e, _StubBrevo
+    srv.shutdown()
+    srv.server_close()
+
+
+def _expected(i: int):
+    """Règle attendue du prospect synthétique i (None = éligible, "-" = hors candidature)."""
+    if i % 50 == 0:
+        return "-"                      # envoyé il y a 2 h
+    if i % 97 == 0:
+        return "-"                      # relance déjà faite
+    if i % 11 == 0:
+        return "bounced_or_unsubscribed"
+    if i % 13 == 0:
+        return "replied"
+    if i % 7 == 0 or i % 17 == 0:
+        return "rdv_booked"
+    if i % 19 == 0:
+        return "landing_visited"
+    if i % 23 == 0:
+        return "no_metier"
+    if i % 29 == 0:
+        return "no_ville"
+    return None
+
+
+def _seed(engine, n=N):
+    old, recent = datetime.utcnow() - timedelta(hours=30), datetime.utcnow() - timedelta(hours=2)
+    rows, bookings = [], []
+    for i in range(n):
+        tok = f"{i:08d}"
+        rows.append({
+            "token": tok, "name": f"Artisan {i}", "landing_url": f"/l/{tok}",
+            "email": f"p{i}@artisan.fr", "sent_method": "email", "is_test": False,
+            "email_sent_at": recent if i % 50 == 0 else old,
+            "followup_sent_at": old if i % 97 == 0 else None,
+            "email_status": "bounced" if i % 11 == 0 else "replied" if i % 13 == 0 else "sent",
+            "email_booked_at": old if i % 7 == 0 else None,
+            "email_clicked_at": old if i % 19 == 0 else None,
+            "profession": "  " if i % 23 == 0 else "plombier",
+            "city": "" if i % 29 == 0 else "Lyon",
+        })
+        if i % 17 == 0:
+            bookings.append({"id": f"b{i}", "prospect_token": tok, "name": "x", "email": "x@x.fr",
+                             "start_iso": "2026-10-20T10:00:00", "end_iso": "2026-10-20T10:20:00"})
+    with engine.begin() as c:
+        c.execute(insert(V3ProspectDB.__table__), rows)
+        c.execute(insert(V3BookingDB.__table__), bookings)
+
+
+def test_t01_100k(env):
+    Session, engine, stub = env
+    _seed(engine)
+    from src.scheduler import _job_followup
+    t = time.perf_counter()
+    _job_followup()
+    elapsed = time.perf_counter() - t
+
+    exp = {f"{i:08d}": _expected(i) for i in range(N)}
+    eligible = {f"p{int(t)}@artisan.fr" for t, r in exp.items() if r is None}
+    assert len(stub.recipients) == len(set(stub.recipients)) == len(eligible)
+    assert set(stub.recipients) == eligible
+    assert max(stub.sizes) <= 1000
+    assert 1 < stub.peak <= 3
+
+    with Session() as db:
+        got = {t: (s, r) for t, s, r in db.query(V3ProspectDB.token, V3ProspectDB.followup_status,
+                                                  V3ProspectDB.followup_skip_reason)}
+    for tok, rule in exp.items():
+        if rule is None:
+            assert got[tok] == ("sent", None), tok
+        elif rule != "-":
+            assert got[tok] == ("skipped", rule), tok
+    assert Counter(r for r in exp.values() if r not in (None, "-")) == \
+        Counter(r for s, r in got.values() if s == "skipped")
+    assert elapsed < 60
+
+
+def test_t02_plan(env):
+    Session, engine, _ = env
+    _seed(engine, 200)
+    import sqlalchemy as sa
+    from src.scheduler import _followup_base, _followup_reason
+    reason = _followup_reason()
+    stmt = sa.select(V3ProspectDB.token).where(*_followup_base(datetime.utcnow()), reason.is_(None))
+    with engine.connect() as c:
+        sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+        plan = " | ".join(r[-1] for r in c.execute(text("EXPLAIN QUERY PLAN " + sql)))
+    assert "ix_v3_prospects_followup" in plan, plan
+    assert "SCAN v3_bookings" not in plan and "ix_v3_bookings_prospect_token" in plan, plan
+
+
+def test_t03_crash_reprise(env, monkeypatch):
+    Session, engine, stub = env
+    _seed(engine, 20_000)
+    from src import outbox
+    from src.models import OutboxDB
+    real, calls = brevo_provider.BrevoProvider.send_batch, []
+
+    def flaky(self, *a, **kw):
+        calls.append(1)
+        if len(calls) == 3:                            # un lot de la 1re tranche
+            raise RuntimeError("panne")
+        return real(self, *a, **kw)
+
+    monkeypatch.setattr(brevo_provider.BrevoProvider, "send_batch", flaky)
+    from src.scheduler import _job_followup
+    _job_followup()                                    # drain interrompu, job terminé
+    eligible = sum(1 for i in range(20_000) if _expected(i) is None)
+    with Session() as db:
+        assert db.query(V3ProspectDB).filter(V3ProspectDB.followup_status == "queued").count() == eligible
+        assert db.query(OutboxDB).filter(OutboxDB.kind == "followup").count() == eligible
+    first = dict(stub.keys)
+
+    monkeypatch.setattr(brevo_provider.BrevoProvider, "send_batch", real)
+    _job_followup()                                    # rien de nouveau à mettre en file
+    monkeypatch.setenv("OUTBOX_LEASE_S", "0")          # lots "sending" orphelins repris
+    outbox.drain()
+    with Session() as db:
+        assert db.query(V3ProspectDB).filter(V3ProspectDB.followup_status == "sent").count() == eligible
+        assert db.query(OutboxDB).count() == eligible
+    again = [(k, r) for k, r in stub.keys if k in first]
+    assert again and all(first[k] == r for k, r in again)     # même lot, même idempotencyKey
+    delivered = [r for k, rs in dict(stub.keys).items() for r in rs]   # Brevo dédoublonne par clé
+    assert len(delivered) == len(set(delivered)) == eligible
+
+
+def test_t04_priorite(env):
+    Session, engine, stub = env
+    old = datetime.utcnow() - timedelta(hours=30)
+    cases = {
+        "a": ({"email_status": "bounced", "email_booked_at": old}, "bounced_or_unsubscribed"),
+        "b": ({"email_status": "replied", "email_clicked_at": old}, "replied"),
+        "c": ({"email_clicked_at": old}, "rdv_booked"),            # + booking en base
+        "d": ({"email_clicked_at": old, "profession": " "}, "landing_visited"),
+        "e": ({"profession": "", "city": ""}, "no_metier"),
+        "f": ({"city": "  "}, "no_ville"),
+        "g": ({}, None),
+    }
+    with Session() as db:
+        for tok, (kw, _) in cases.items():
+            db.add(V3ProspectDB(**{"token": tok, "name": tok, "landing_url": f"/l/{tok}",
+                                   "email": f"{tok}@x.fr", "sent_method": "email",
+                                   "email_sent_at": old, "profession": "plombier", "city": "Lyon", **kw}))
+        db.add(V3BookingDB(prospect_token="c", name="x", email="c@x.fr",
+                           start_iso="2026-10-20T10:00:00", end_iso="2026-10-20T10:20:00"))
+        db.commit()
+    from src.scheduler import _job_followup
+    _job_followup()
+    with Session() as db:
+        got = {p.token: p.followup_skip_reason if p.followup_status == "skipped" else None
+               for p in db.query(V3ProspectDB)}
+    assert got == {tok: r for tok, (_, r) in cases.items()}
+    assert stub.recipients == ["g@x.fr"]
@@ -0,0 +1,138 @@
+"""
+Tests — google_places : Place Details en parallèle contre un faux serveur Places local.
+
+Scénarios :
+  T01  N places, latence 100 ms   → 1 Text Search + N Details, durée ≪ N × latence
+  T02  Masque de champs           → pas de "name", uniquement les champs lus
+  T03  2e recherche identique     → Details servis depuis le cache (0 requête Details)
+  T04  Ordre conservé             → dédoublonnage identique à la version séquentielle
+  T05  Enrichissement chevauché   → search_prospects_enriched ≈ max(details, enrich), pas la somme
+  T06  Fenêtre de soumission       → Details demandés = rejets + retenus, jamais au-delà de max_results
+"""
+import sys, os, json, time, threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import src.google_places as gp
+
+_LATENCY = 0.1
+_N       = 12
+
+
+class _StubPlaces(BaseHTTPRequestHandler):
+    places: list = []
+    websites: dict = {}
+    log: list = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        u = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(u.query).items()}
+        with self.lock:
+            self.log.append((u.path, q))
+        time.sleep(_LATENCY)
+        if u.path.endswith("/textsearch/json"):
+            body = {"status": "OK", "results": self.places}
+        else:
+            pid  = q.get("place_id", "")
+            body = {"status": "OK", "result": {"website": self.websites.get(pid),
+                                               "formatted_phone_number": "0240000000",
+                                               "user_ratings_total": 7}}
+        raw = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *a):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    _StubPlaces.places   = [{"place_id": f"pid{i}", "name": f"Artisan {i}"} for i in range(_N)]
+    _StubPlaces.websites = {f"pid{i}": f"https://artisan{i}.fr" for i in range(_N)}
+    _StubPlaces.log      = []
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StubPlaces)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    monkeypatch.setattr(gp, "_TEXT_SEARCH_URL", f"{base}/place/textsearch/json")
+    monkeypatch.setattr(gp, "_DETAILS_URL",     f"{base}/place/details/json")
+    monkeypatch.setattr(gp, "_DETAILS_WORKERS", 8)
+    gp.clear_details_cache()
+    yield _StubPlaces
+    gp.clear_details_cache()
+    srv.shutdown()
+    srv.server_close()
+
+
+def _details(log):
+    return [q for path, q in log if path.endswith("/details/json")]
+
+
+def test_t01_parallele(stub):
+    t0 = time.perf_counter()
+    prospects, reasons = gp.search_prospects("couvreur", "Nantes", "k", max_results=_N)
+    elapsed = time.perf_counter() - t0
+    assert len(prospects) == _N and reasons == []
+    assert len(stub.log) == 1 + _N
+    assert elapsed < (1 + _N) * _LATENCY / 2
+
+
+def test_t02_masque_de_champs(stub):
+    gp.search_prospects("couvreur", "Nantes", "k", max_results=2)
+    fields = set(_details(stub.log)[0]["fields"].split(","))
+    assert "name" not in fields
+    assert fields == {"website", "formatted_phone_number", "international_phone_number",
+                      "user_ratings_total", "rating"}
+
+
+def test_t03_cache_details(stub):
+    a, _ = gp.search_prospects("couvreur", "Nantes", "k", max_results=_N)
+    stub.log.clear()
+    b, _ = gp.search_prospects("couvreur", "Nantes", "k", max_results=_N)
+    assert a == b
+    assert len(stub.log) == 1
+    assert _details(stub.log) == []
+
+
+def test_t04_ordre_et_doublons(stub):
+    stub.websites["pid1"] = "https://www.artisan0.fr/contact"
+    prospects, reasons = gp.search_prospects("couvreur", "Nantes", "k", max_results=_N)
+    assert [p["name"] for p in prospects] == [f"Artisan {i}" for i in range(_N) if i != 1]
+    assert reasons == ["Artisan 1: doublon (artisan0.fr)"]
+
+
+def test_t05_enrichissement_chevauche(stub, monkeypatch):
+    import src.enrich, src.cms_detector
+
+    def _slow_enrich(url, *a, **k):
+        time.sleep(_LATENCY)
+        return {"email": "contact@" + gp._domain(url), "mobile": None}
+
+    monkeypatch.setattr(src.enrich, "enrich_website", _slow_enrich)
+    monkeypatch.setattr(src.cms_detector, "detect_cms", lambda url: "wordpress")
+    monkeypatch.setattr(gp, "_ENRICH_WORKERS", 8)
+    t0 = time.perf_counter()
+    prospects, _ = gp.search_prospects_enriched("couvreur", "Nantes", "k", max_results=_N)
+    elapsed = time.perf_counter() - t0
+    assert all(p["email"] == f"contact@artisan{i}.fr" for i, p in enumerate(prospects))
+    assert all(p["cms"] == "wordpress" for p in prospects)
+    assert elapsed < (1 + 2 * _N) * _LATENCY / 2
+
+
+def test_t06_fenetre_bornee(stub):
+    prospects, _ = gp.search_prospects("couvreur", "Nantes", "k", max_results=2)
+    assert len(prospects) == 2 and len(_details(stub.log)) == 2
+
+    gp.clear_details_cache()
+    stub.log.clear()
+    stub.websites["pid0"] = stub.websites["pid1"] = None
+    prospects, reasons = gp.search_prospects("couvreur", "Nantes", "k", max_results=3)
+    assert [p["name"] for p in prospects] == ["Artisan 2", "Artisan 3", "Artisan 4"]
+    assert len(reasons) == 2
+    assert sorted(q["place_id"] for q in _details(stub.log)) == [f"pid{i}" for i in range(5)]
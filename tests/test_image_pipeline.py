@@ -0,0 +1,216 @@
+"""
+Tests — image_pipeline : variantes responsives dans un ProcessPoolExecutor.
+
+Scénarios :
+  T01  Source 3000 px              → WEBP 480/960/1600/2400 (+ AVIF si dispo), noms par hash
+  T02  Source 700 px               → pas d'agrandissement (480 + 700)
+  T03  Header 16:9                 → toutes les variantes en 16:9
+  T04  Même contenu resoumis       → réutilisé, statut ready immédiat
+  T05  Fichier invalide            → statut error
+  T06  Upload city image           → 202 + status_url, prospect pointe sur la variante une fois prête
+  T07  8 uploads concurrents       → chaque requête répond vite (traitement hors thread requête)
+  T08  srcset_for_url              → srcset WEBP trié par largeur
+  T09  Upload header illisible     → 202 puis repli : original tel quel + CityHeaderDB écrit
+  T10  sweep() au démarrage        → pending figés en error, sources _src-* orphelines supprimées,
+                                     traitement récent d'un autre worker laissé intact
+"""
+import sys, os, io, time, hashlib
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, ProspectDB
+from src import image_pipeline
+
+
+def _jpeg(w: int, h: int, color=(40, 90, 160)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (w, h), color).save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _pool():
+    yield
+    image_pipeline.shutdown()
+
+
+@pytest.fixture
+def Session(monkeypatch, tmp_path):
+    # fichier (1 connexion par thread) : requêtes HTTP et callbacks du pool écrivent en parallèle
+    e = create_engine(f"sqlite:///{tmp_path / 't.db'}",
+                      connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(e)
+    S = sessionmaker(bind=e, autocommit=False, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", S)
+    return S
+
+
+def test_t01_variantes(Session, tmp_path):
+    raw = _jpeg(3000, 2000)
+    a = image_pipeline.process(raw, tmp_path, "/dist/x", stem="photo", kind="city")
+    assert a["status"] == "ready"
+    digest = hashlib.sha256(raw).hexdigest()[:12]
+    webp = sorted(v["width"] for v in a["variants"] if v["format"] == "webp")
+    assert webp == [480, 960, 1600, 2400]
+    for v in a["variants"]:
+        assert v["file"] == f"photo-{digest}-{v['width']}.{v['format']}"
+        with Image.open(tmp_path / v["file"]) as im:
+            assert im.format == v["format"].upper()
+            assert im.size == (v["width"], v["height"])
+    avif = [v for v in a["variants"] if v["format"] == "avif"]
+    assert bool(avif) == image_pipeline.avif_supported()
+    assert a["url"] == f"/dist/x/photo-{digest}-2400.webp"
+    assert not list(tmp_path.glob("_src-*"))
+
+
+def test_t02_pas_d_agrandissement(Session, tmp_path):
+    a = image_pipeline.process(_jpeg(700, 400), tmp_path, "/dist/x", stem="p", kind="proof")
+    assert sorted({v["width"] for v in a["variants"]}) == [480, 700]
+
+
+def test_t03_header_16_9(Session, tmp_path):
+    a = image_pipeline.process(_jpeg(2600, 2600), tmp_path, "/dist/headers",
+                               stem="nantes", kind="header", crop_16_9=True)
+    for v in a["variants"]:
+        assert abs(v["width"] / v["height"] - 16 / 9) < 0.01
+
+
+def test_t04_contenu_deja_traite(Session, tmp_path):
+    raw = _jpeg(1000, 800)
+    a = image_pipeline.process(raw, tmp_path, "/dist/x", stem="p", kind="proof")
+    b = image_pipeline.submit(raw, tmp_path, "/dist/x", stem="p", kind="proof")
+    assert b["status"] == "ready" and b["id"] == a["id"]
+
+
+def test_t05_fichier_invalide(Session, tmp_path):
+    a = image_pipeline.process(b"pas une image", tmp_path, "/dist/x", stem="p", kind="proof")
+    assert a["status"] == "error" and a["error"]
+
+
+@pytest.fixture
+def client(Session, monkeypatch, tmp_path):
+    from src.api.routes import upload
+    from src.database import get_db
+    monkeypatch.setenv("UPLOADS_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setenv("ADMIN_TOKEN", "t")
+    monkeypatch.setenv("BASE_URL", "https://presence-ia.test")
+
+    def _db():
+        with Session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(upload.router)
+    app.dependency_overrides[get_db] = _db
+    with Session() as db:
+        for i in range(8):
+            db.add(ProspectDB(prospect_id=f"p{i}", campaign_id="c", name=f"Artisan {i}",
+                              city="Nantes", profession="couvreur"))
+        db.commit()
+    return TestClient(app)
+
+
+def test_t06_upload_202_puis_ready(client, Session):
+    r = client.post("/admin/prospect/p0/upload-city-image?token=t",
+                    files={"file": ("c.jpg", io.BytesIO(_jpeg(2000, 1200)), "image/jpeg")})
+    assert r.status_code == 202
+    d = r.json()
+    assert d["status"] == "pending" and d["url"].endswith("/dist/uploads/p0/city.jpg")
+    image_pipeline.wait(d["image_id"], timeout=60)
+    st = client.get(d["status_url"]).json()
+    assert st["status"] == "ready"
+    assert "480w" in st["srcset"] and "1600w" in st["srcset"]
+    with Session() as db:
+        assert db.get(ProspectDB, "p0").city_image_url == st["url"]
+    assert st["url"].startswith("https://presence-ia.test/dist/uploads/p0/city-")
+
+
+def test_t07_uploads_concurrents(client, tmp_path):
+    image_pipeline.process(_jpeg(64, 64), tmp_path, "/x", stem="warm", kind="proof")  # pool démarré
+    payloads = [_jpeg(3000, 2000, (i * 30, 80, 120)) for i in range(8)]
+
+    def _up(i):
+        t0 = time.perf_counter()
+        r = client.post(f"/admin/prospect/p{i}/upload-proof-image?token=t",
+                        files={"file": ("p.jpg", io.BytesIO(payloads[i]), "image/jpeg")})
+        return r, time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(8) as ex:
+        results = list(ex.map(_up, range(8)))
+    accepted_in = time.perf_counter() - t0
+    assert all(r.status_code == 202 for r, _ in results)
+    assert max(dt for _, dt in results) < 1.0
+
+    ids = [r.json()["image_id"] for r, _ in results]
+    for i in ids:
+        assert image_pipeline.wait(i, timeout=120)["status"] == "ready"
+    processed_in = time.perf_counter() - t0
+    assert accepted_in < processed_in
+
+
+def test_t08_srcset_for_url(Session, tmp_path):
+    a = image_pipeline.process(_jpeg(1800, 1000), tmp_path, "/dist/headers", stem="lyon", kind="header")
+    with Session() as db:
+        s = image_pipeline.srcset_for_url(db, "https://b.test" + a["url"], "https://b.test")
+        assert image_pipeline.srcset_for_url(db, "/dist/headers/inconnu.webp") == ""
+    widths = [int(part.rsplit(" ", 1)[1][:-1]) for part in s.split(", ")]
+    assert widths == [480, 960, 1600, 1800]
+    assert s.startswith("https://b.test/dist/headers/lyon-")
+
+
+def test_t09_header_repli_original(Session, monkeypatch, tmp_path):
+    from src.api.routes import headers
+    from src.database import get_db
+    from src.models import CityHeaderDB
+    monkeypatch.setenv("UPLOADS_DIR", str(tmp_path / "dist" / "uploads"))
+    monkeypatch.setenv("ADMIN_TOKEN", "t")
+
+    def _db():
+        with Session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(headers.router)
+    app.dependency_overrides[get_db] = _db
+    r = TestClient(app).post("/api/headers/upload?city=Saint Malo&token=t",
+                             files={"file": ("h.jpg", io.BytesIO(b"pas une image"), "image/jpeg")})
+    assert r.status_code == 202
+    assert image_pipeline.wait(r.json()["image_id"], timeout=60)["status"] == "error"
+    with Session() as db:
+        row = db.query(CityHeaderDB).filter_by(city="saint-malo").first()
+    assert row and row.url == "/dist/headers/saint-malo.webp"
+    assert (headers._headers_dir() / "saint-malo.webp").read_bytes() == b"pas une image"
+
+
+def test_t10_sweep(Session, tmp_path):
+    from datetime import datetime, timedelta
+    from src.models import ImageAssetDB
+    old = datetime.utcnow() - timedelta(hours=2)
+    with Session() as db:
+        db.add_all([
+            ImageAssetDB(id="perdu", kind="header", stem="x", content_hash="h", url_prefix="/x",
+                         status="pending", created_at=old),
+            ImageAssetDB(id="encours", kind="header", stem="x", content_hash="h", url_prefix="/x",
+                         status="pending"),
+            ImageAssetDB(id="fini", kind="header", stem="x", content_hash="h", url_prefix="/x",
+                         status="ready", created_at=old),
+        ])
+        db.commit()
+    d = tmp_path / "dist"
+    (d / "p1").mkdir(parents=True)
+    for name in ("_src-perdu", "_src-encours", "p1/_src-inconnu", "p1/city.jpg"):
+        (d / name).write_bytes(b"x")
+
+    assert image_pipeline.sweep([d, tmp_path / "absent"]) == {"failed": 1, "removed": 2}
+    assert sorted(p.name for p in d.rglob("*") if p.is_file()) == ["_src-encours", "city.jpg"]
+    assert image_pipeline.get_status("perdu")["status"] == "error"
+    assert image_pipeline.get_status("encours")["status"] == "pending"
+    assert image_pipeline.sweep([d]) == {"failed": 0, "removed": 0}
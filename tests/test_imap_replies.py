@@ -0,0 +1,378 @@
+"""
+Tests — poller de réponses IMAP (src.imap_replies) contre un serveur IMAP local (stub).
+
+Scénarios :
+  T01  1er passage, 3000 messages  → en-têtes seulement, réponses reconnues (From / In-Reply-To),
+                                     une requête prospects par lot, octets << RFC822 complets
+  T02  2e passage sans nouveau     → aucun FETCH, aucune requête prospects, même connexion
+  T03  Nouveaux messages           → seuls les UID au-delà du filigrane sont lus
+  T04  UIDVALIDITY change          → filigrane réinitialisé, UNSEEN ré-examinés
+  T05  IDLE                        → réponse traitée sur EXISTS sans attendre le job, arrêt propre
+  T06  Connexion coupée            → reconnexion transparente au passage suivant
+"""
+import sys, os, re, select, socketserver, threading, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "libs"))
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.models import Base, ImapWatermarkDB, V3ProspectDB
+from marketing_module.models import Base as MktBase, CampaignDB, ProspectDeliveryDB
+from src import imap_replies
+
+N_PROSPECTS = 40
+
+
+# ── Serveur IMAP minimal ──────────────────────────────────────────────────────
+
+class Mailbox:
+    def __init__(self):
+        self.uidvalidity = 1000
+        self.next_uid    = 1
+        self.msgs        = {}            # uid → [flags:set, raw:bytes]
+        self.sent_bytes  = 0
+        self.commands    = []
+        self.connections = 0
+        self.handlers    = []
+        self.lock        = threading.Lock()
+
+    def add(self, raw: bytes, seen=False) -> int:
+        with self.lock:
+            uid = self.next_uid
+            self.next_uid += 1
+            self.msgs[uid] = [{"\\Seen"} if seen else set(), raw]
+        for h in list(self.handlers):
+            h.notify.set()
+        return uid
+
+
+def _uids(spec: str, box: Mailbox):
+    have, out = sorted(box.msgs), []
+    for part in spec.split(","):
+        if ":" in part:
+            lo, hi = part.split(":")
+            lo = int(lo)
+            hi = max(have, default=0) if hi == "*" else int(hi)
+            out += [u for u in have if min(lo, hi) <= u <= max(lo, hi)]
+        elif int(part) in box.msgs:
+            out.append(int(part))
+    return sorted(set(out))
+
+
+def _header_fields(raw: bytes, names) -> bytes:
+    head = raw.split(b"\r\n\r\n", 1)[0]
+    out, keep = [], False
+    for line in head.split(b"\r\n"):
+        if line[:1] in (b" ", b"\t"):
+            if keep:
+                out.append(line)
+            continue
+        keep = line.split(b":", 1)[0].strip().upper() in names
+        if keep:
+            out.append(line)
+    return b"\r\n".join(out) + b"\r\n\r\n"
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def send(self, data: bytes):
+        self.box.sent_bytes += len(data)
+        self.wfile.write(data)
+        self.wfile.flush()
+
+    def handle(self):
+        self.box = self.server.box
+        self.box.connections += 1
+        self.notify = threading.Event()
+        self.send(b"* OK stub IMAP ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, _, rest = line.strip().partition(b" ")
+            cmd, _, args = rest.partition(b" ")
+            cmd = cmd.upper().decode()
+            if cmd == "UID":
+                sub, _, args = args.partition(b" ")
+                cmd = "UID " + sub.upper().decode()
+            self.box.commands.append((cmd, args.decode()))
+            if self.server.drop_next:
+                self.server.drop_next = False
+                return
+            if cmd == "CAPABILITY":
+                caps = b"IMAP4rev1 IDLE" if self.server.idle else b"IMAP4rev1"
+                self.send(b"* CAPABILITY " + caps + b"\r\n" + tag + b" OK done\r\n")
+            elif cmd == "LOGIN":
+                self.send(tag + b" OK logged in\r\n")
+            elif cmd == "SELECT":
+                with self.box.lock:
+                    n = len(self.box.msgs)
+                self.send(b"* %d EXISTS\r\n* OK [UIDVALIDITY %d]\r\n* OK [UIDNEXT %d]\r\n"
+                          b"%s OK [READ-WRITE] SELECT\r\n" % (n, self.box.uidvalidity, self.box.next_uid, tag))
+            elif cmd == "UID SEARCH":
+                crit = args.decode().upper()
+                hits = [u for u, (f, _) in sorted(self.box.msgs.items())
+                        if crit != "UNSEEN" or "\\Seen" not in f]
+                self.send(b"* SEARCH " + " ".join(map(str, hits)).encode() + b"\r\n" + tag + b" OK done\r\n")
+            elif cmd == "UID FETCH":
+                self._fetch(tag, args.decode())
+            elif cmd == "UID STORE":
+                spec, _, _ = args.decode().partition(" ")
+                for u in _uids(spec, self.box):
+                    self.box.msgs[u][0].add("\\Seen")
+                self.send(tag + b" OK done\r\n")
+            elif cmd == "IDLE":
+                self._idle(tag)
+            elif cmd == "LOGOUT":
+                self.send(b"* BYE\r\n" + tag + b" OK done\r\n")
+                return
+            else:
+                self.send(tag + b" OK done\r\n")
+
+    def _fetch(self, tag, args):
+        spec, _, items = args.partition(" ")
+        seq = {u: i + 1 for i, u in enumerate(sorted(self.box.msgs))}
+        m = re.search(r"HEADER\.FIELDS \(([^)]*)\)", items)
+        part = re.search(r"BODY\.PEEK\[\]<0\.(\d+)>", items)
+        out = []
+        for u in _uids(spec, self.box):
+            flags, raw = self.box.msgs[u]
+            if m:
+                names = {n.encode() for n in m.group(1).upper().split()}
+                data, label = _header_fields(raw, names), "BODY[HEADER.FIELDS (%s)]" % m.group(1)
+            elif part:
+                data, label = raw[: int(part.group(1))], "BODY[]<0>"
+            else:
+                data, label = raw, "RFC822"
+            out.append(b"* %d FETCH (UID %d FLAGS (%s) %s {%d}\r\n" % (
+                seq[u], u, " ".join(sorted(flags)).encode(), label.encode(), len(data)) + data + b")\r\n")
+        self.send(b"".join(out) + tag + b" OK FETCH\r\n")
+
+    def _idle(self, tag):
+        self.box.handlers.append(self)
+        known = len(self.box.msgs)
+        self.send(b"+ idling\r\n")
+        try:
+            while True:
+                if self.notify.wait(0.02):
+                    self.notify.clear()
+                    if len(self.box.msgs) != known:
+                        known = len(self.box.msgs)
+                        self.send(b"* %d EXISTS\r\n" % known)
+                if select.select([self.connection], [], [], 0)[0]:
+                    if self.rfile.readline().strip().upper() == b"DONE":
+                        self.send(tag + b" OK IDLE terminated\r\n")
+                        return
+        finally:
+            self.box.handlers.remove(self)
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = allow_reuse_address = True
+
+
+@pytest.fixture
+def imap(monkeypatch):
+    srv = Server(("127.0.0.1", 0), Handler)
+    srv.box, srv.idle, srv.drop_next = Mailbox(), True, False
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setenv("IMAP_HOST", "127.0.0.1")
+    monkeypatch.setenv("IMAP_PORT", str(srv.server_address[1]))
+    monkeypatch.setenv("IMAP_USER", "contact@presence-ia.com")
+    monkeypatch.setenv("IMAP_PASSWORD", "secret")
+    monkeypatch.setenv("IMAP_SSL", "false")
+    monkeypatch.setenv("IMAP_FETCH_BATCH", "500")
+    monkeypatch.setattr(imap_replies, "_pollers", {})
+    monkeypatch.setattr(imap_replies, "_watcher", None)
+    yield srv
+    imap_replies.stop_watcher()
+    srv.shutdown()
+    srv.server_close()
+
+
+# ── Bases ─────────────────────────────────────────────────────────────────────
+
+def _engine(base):
+    e = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False},
+                      poolclass=StaticPool)
+    base.metadata.create_all(e)
+    return e
+
+
+@pytest.fixture
+def dbs(monkeypatch):
+    main, mkt = _engine(Base), _engine(MktBase)
+    Main = sessionmaker(bind=main, autoflush=False)
+    Mkt  = sessionmaker(bind=mkt, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", Main)
+    monkeypatch.setattr("marketing_module.database.SessionLocal", Mkt)
+    with Main() as db, Mkt() as mdb:
+        mdb.add(CampaignDB(id="c1", project_id="presence-ia", name="v3"))
+        for i in range(N_PROSPECTS):
+            tok = f"tok{i:03d}"
+            db.add(V3ProspectDB(token=tok, name=f"Artisan {i}", city="Lyon", profession="plombier",
+                                landing_url=f"/l/{tok}", email=f"artisan{i}@exemple.fr"))
+            mdb.add(ProspectDeliveryDB(project_id="presence-ia", campaign_id="c1", prospect_id=tok,
+                                       provider_message_id=f"<brevo-{i}@smtp-relay.test>"))
+        db.commit()
+        mdb.commit()
+
+    queries = []
+
+    @event.listens_for(main, "before_cursor_execute")
+    def _count(conn, cursor, statement, params, context, executemany):
+        if "FROM v3_prospects" in statement:
+            queries.append(statement)
+
+    alerts = []
+    monkeypatch.setattr("src.scheduler._send_reply_alert", lambda **kw: alerts.append(kw))
+    return Main, Mkt, queries, alerts
+
+
+def _mail(frm: str, subject="Re: votre visibilité IA", in_reply_to=None, body_kb=20) -> bytes:
+    head = f"From: {frm}\r\nTo: contact@presence-ia.com\r\nSubject: {subject}\r\n" \
+           f"Message-ID: <{time.time_ns()}@mail.test>\r\nDate: Mon, 19 Oct 2026 09:00:00 +0000\r\n" \
+           "Received: from mx.test by imap.test; Mon, 19 Oct 2026 09:00:00 +0000\r\n" \
+           "Content-Type: text/plain; charset=utf-8\r\n"
+    if in_reply_to:
+        head += f"In-Reply-To: {in_reply_to}\r\n"
+    body = "Bonjour, je suis intéressé, rappelez-moi.\r\n" + "x" * (body_kb * 1024)
+    return (head + "\r\n" + body).encode()
+
+
+def _fill(box: Mailbox, n=3000):
+    """n messages : newsletters, quelques réponses (From connu ou In-Reply-To), 1/6 déjà lus."""
+    expected = {}
+    for i in range(n):
+        if i % 100 == 7:
+            k = i // 100 % N_PROSPECTS
+            uid = box.add(_mail(f"Artisan {k} <ARTISAN{k}@exemple.fr>"))
+            expected[uid] = f"tok{k:03d}"
+        elif i % 100 == 42:
+            k = (i // 100 + 5) % N_PROSPECTS
+            uid = box.add(_mail(f"Secrétariat <secretariat{i}@autre.fr>",
+                                in_reply_to=f"<brevo-{k}@smtp-relay.test>"))
+            expected[uid] = f"tok{k:03d}"
+        else:
+            box.add(_mail(f"news{i % 13}@newsletter.test", subject="Promo"), seen=(i % 6 == 0))
+    return expected
+
+
+def _fetches(box):
+    return [a for c, a in box.commands if c == "UID FETCH"]
+
+
+# ── Tests ─────────────────────────────────────────────────────────────────────
+
+def test_t01_premier_passage(imap, dbs):
+    Main, Mkt, queries, alerts = dbs
+    box = imap.box
+    expected = _fill(box, 3000)
+    unseen = {u for u, (f, _) in box.msgs.items() if "\\Seen" not in f}
+    full = sum(len(box.msgs[u][1]) for u in unseen)
+
+    stats = imap_replies.get_poller().poll()
+
+    assert stats["replies"] == len(expected) == 60
+    assert stats["batches"] == -(-len(unseen) // 500) == 6
+    assert len(queries) == stats["batches"]         # une requête v3_prospects par lot
+    assert len(alerts) == 60
+    assert all(a["snippet"].startswith("Bonjour") for a in alerts)
+    assert {u for u, (f, _) in box.msgs.items() if "\\Seen" in f} >= set(expected)
+    assert not any("RFC822" in a for a in _fetches(box))
+    assert box.sent_bytes < full * 0.05, (box.sent_bytes, full)
+    with Mkt() as mdb:
+        replied = {d.prospect_id for d in mdb.query(ProspectDeliveryDB)
+                   .filter(ProspectDeliveryDB.reply_status == "positive")}
+    assert replied == set(expected.values())
+    with Main() as db:
+        wm = db.get(ImapWatermarkDB, imap_replies.get_poller().key)
+        assert (wm.uidvalidity, wm.last_uid) == (1000, 3000)
+    still_unseen = {u for u, (f, _) in box.msgs.items() if "\\Seen" not in f}
+    assert still_unseen == unseen - set(expected)  # boîte humaine : non-prospects laissés non lus
+
+
+def test_t02_rien_de_nouveau(imap, dbs):
+    Main, Mkt, queries, alerts = dbs
+    _fill(imap.box, 1000)
+    poller = imap_replies.get_poller()
+    poller.poll()
+    n_fetch, n_queries, sent = len(_fetches(imap.box)), len(queries), imap.box.sent_bytes
+
+    for _ in range(3):
+        assert poller.poll()["examined"] == 0
+    assert len(_fetches(imap.box)) == n_fetch
+    assert len(queries) == n_queries
+    assert imap.box.sent_bytes - sent < 1000
+    assert imap.box.connections == 1
+
+
+def test_t03_nouveaux_messages(imap, dbs):
+    Main, Mkt, queries, alerts = dbs
+    _fill(imap.box, 1200)
+    poller = imap_replies.get_poller()
+    poller.poll()
+    n_fetch = len(_fetches(imap.box))
+    new = [imap.box.add(_mail("prospect <artisan3@exemple.fr>")),
+           imap.box.add(_mail("spam@ailleurs.test"))]
+
+    stats = poller.poll()
+    assert stats == {"examined": 2, "replies": 1, "batches": 1}
+    assert _fetches(imap.box)[n_fetch].startswith(f"{new[0]}:{new[1]} ")
+    assert alerts[-1]["prospect_email"] == "artisan3@exemple.fr"
+
+
+def test_t04_uidvalidity(imap, dbs):
+    Main, Mkt, queries, alerts = dbs
+    _fill(imap.box, 300)
+    poller = imap_replies.get_poller()
+    poller.poll()
+    n_alerts = len(alerts)
+    for f, _ in imap.box.msgs.values():
+        f.discard("\\Seen")
+    imap.box.uidvalidity = 2000
+
+    stats = poller.poll()
+    assert stats["examined"] == 300 and len(alerts) == 2 * n_alerts
+    with Main() as db:
+        assert db.get(ImapWatermarkDB, poller.key).uidvalidity == 2000
+
+
+def test_t05_idle(imap, dbs, monkeypatch):
+    Main, Mkt, queries, alerts = dbs
+    monkeypatch.setenv("IMAP_IDLE_S", "60")
+    _fill(imap.box, 200)
+    imap_replies.start_watcher()
+    deadline = time.time() + 5
+    while not imap.box.handlers and time.time() < deadline:
+        time.sleep(0.02)
+    assert imap.box.handlers, "pas d'IDLE"
+    assert imap_replies.poll_once() is None        # job 5 min inactif pendant l'IDLE
+
+    n = len(alerts)
+    t = time.time()
+    imap.box.add(_mail("Artisan 9 <artisan9@exemple.fr>"))
+    while len(alerts) == n and time.time() - t < 5:
+        time.sleep(0.02)
+    assert len(alerts) == n + 1 and time.time() - t < 2
+    assert imap.box.connections == 1
+
+    imap_replies.stop_watcher()
+    cmds = [c for c, _ in imap.box.commands]
+    assert cmds[-1] == "LOGOUT"
+    assert imap_replies._watcher is None
+
+
+def test_t06_reconnexion(imap, dbs):
+    Main, Mkt, queries, alerts = dbs
+    _fill(imap.box, 100)
+    poller = imap_replies.get_poller()
+    poller.poll()
+    imap.drop_next = True                          # le serveur coupe au prochain ordre
+    imap.box.add(_mail("artisan1@exemple.fr"))
+    n = len(alerts)
+    assert poller.poll()["replies"] == 1
+    assert len(alerts) == n + 1
+    assert imap.box.connections == 2
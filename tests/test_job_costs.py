@@ -0,0 +1,164 @@
+"""
+Tests — coûts API : rollup quotidien job_cost_daily (src.job_costs) et db_cost_stats.
+
+Scénarios :
+  T01  record()                     → ligne brute + rollup du jour dans la même transaction
+                                      (rollback : ni l'un ni l'autre)
+  T02  Migration 0004               → rollup initial = GROUP BY des lignes brutes existantes,
+                                      index (job_id, created_at)
+  T03  compact()                    → lignes brutes > N jours supprimées, totaux inchangés
+  T04  db_cost_stats                → lit le rollup : nombre de requêtes indépendant du volume,
+                                      série par jour (jours vides à 0), par job
+  T05  Pages finances / pipeline-health → rendues depuis le rollup
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, JobCostDailyDB, JobCostLogDB
+from src import job_costs
+
+NOW = datetime.utcnow()
+
+
+@pytest.fixture
+def S(tmp_path, monkeypatch):
+    e = create_engine(f"sqlite:///{tmp_path / 'costs.db'}")
+    Base.metadata.create_all(e)
+    S = sessionmaker(bind=e, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", S)
+    yield S
+    e.dispose()
+
+
+def _raw(db, n, age_days=0, job="auto_enrich"):
+    """Lignes brutes + rollup, datées de age_days jours."""
+    for i in range(n):
+        job_costs.record(db, job, started_at=NOW, nb_appels_google=10, nb_appels_gemini=1,
+                         nb_leads_generes=2, cost_estimated=0.17)
+    db.flush()
+    if age_days:
+        past = NOW - timedelta(days=age_days)
+        db.query(JobCostLogDB).filter(JobCostLogDB.created_at >= NOW - timedelta(seconds=5)).update(
+            {"created_at": past}, synchronize_session=False)
+        db.query(JobCostDailyDB).filter_by(day=datetime.utcnow().date()).update(
+            {"day": past.date()}, synchronize_session=False)
+
+
+def test_t01_record(S):
+    with S() as db:
+        _raw(db, 2)
+        job_costs.record(db, "run_due_targets", started_at=NOW, nb_appels_google=3, cost_estimated=0.051)
+        db.commit()
+        rows = {r.job_id: r for r in db.query(JobCostDailyDB)}
+        assert rows["auto_enrich"].nb_runs == 2 and rows["auto_enrich"].nb_appels_google == 20
+        assert rows["auto_enrich"].cost_estimated == pytest.approx(0.34)
+        assert rows["run_due_targets"].nb_runs == 1 and rows["run_due_targets"].nb_leads_generes == 0
+        assert db.query(JobCostLogDB).count() == 3
+
+        _raw(db, 1)
+        db.rollback()
+        assert db.query(JobCostLogDB).count() == 3
+        assert db.get(JobCostDailyDB, (datetime.utcnow().date(), "auto_enrich")).nb_runs == 2
+
+
+def test_t02_migration(tmp_path):
+    from marketing_module.sqlite_engine import make_engine
+    from src import migrate
+    e = make_engine(str(tmp_path / "m.db"))
+    migrate.upgrade(e, target=3)
+    with e.begin() as c:
+        c.exec_driver_sql("DROP TABLE job_cost_daily")                 # base d'avant le rollup
+        c.exec_driver_sql("DROP INDEX ix_job_cost_log_job_created")
+        c.exec_driver_sql("CREATE INDEX ix_job_cost_log_job_id ON job_cost_log (job_id)")
+    with sessionmaker(bind=e)() as db:
+        for i in range(9):
+            db.add(JobCostLogDB(job_id=("a", "b")[i % 2], started_at=NOW, nb_appels_google=i,
+                                cost_estimated=i / 10, created_at=NOW - timedelta(days=i % 3)))
+        db.commit()
+    migrate.upgrade(e)
+    with sessionmaker(bind=e)() as db:
+        assert db.query(JobCostDailyDB).count() == 6
+        assert job_costs.totals(db) == {"nb_runs": 9, "nb_appels_google": 36, "nb_appels_gemini": 0,
+                                        "nb_leads_generes": 0, "cost_estimated": pytest.approx(3.6)}
+        plan = " ".join(r[3] for r in db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM job_cost_log WHERE job_id = 'a' AND created_at > '2026-01-01'")))
+    assert "ix_job_cost_log_job_created" in plan
+    assert "ix_job_cost_log_job_id" not in {i["name"] for i in inspect(e).get_indexes("job_cost_log")}
+    e.dispose()
+
+
+def test_t03_compact(S, monkeypatch):
+    with S() as db:
+        _raw(db, 3, age_days=120)
+        _raw(db, 2, age_days=10)
+        db.commit()
+        before = job_costs.totals(db)
+    monkeypatch.setenv("JOB_COST_RETENTION_DAYS", "90")
+    assert job_costs.compact() == 3
+    with S() as db:
+        assert db.query(JobCostLogDB).count() == 2
+        assert job_costs.totals(db) == before and before["nb_runs"] == 5
+        assert job_costs.totals(db, since=(NOW - timedelta(days=30)).date())["nb_runs"] == 2
+
+
+def test_t04_db_cost_stats(S):
+    from src.database import db_cost_stats
+    with S() as db:
+        assert db_cost_stats(db)["cost_per_lead"] is None
+        _raw(db, 5, age_days=3)
+        _raw(db, 25)
+        job_costs.record(db, "refresh_ia", started_at=NOW, nb_appels_gemini=4, cost_estimated=0.14)
+        db.commit()
+        seen = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *a, **k: seen.append(a[2]))
+        s = db_cost_stats(db)
+        n = len(seen)
+        _raw(db, 200)
+        db.commit()
+        seen.clear()
+        db_cost_stats(db)
+        assert len(seen) == n == 4
+    assert s["total_google"] == 300 and s["total_leads"] == 60 and s["total_gemini"] == 34
+    assert s["total_cost"] == pytest.approx(30 * 0.17 + 0.14) and s["cost_per_lead"] == round(s["total_cost"] / 60, 4)
+    assert len(s["recent_jobs"]) == 20 and s["recent_jobs"][0]["google"] in (0, 10)
+    assert [j["job_id"] for j in s["by_job"]] == ["auto_enrich", "refresh_ia"]
+    days = s["daily"]
+    assert len(days) == 14 and days[-1]["nb_runs"] == 26 and days[-4]["nb_runs"] == 5
+    assert sum(d["nb_runs"] for d in days) == 31 and days[0]["cost_estimated"] == 0
+
+
+def test_t05_pages(S, monkeypatch, tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from marketing_module import database as mkt_db
+    from marketing_module.models import Base as MktBase
+    from src.api.routes import admin_hub
+    from src.database import get_read_db
+
+    me = create_engine(f"sqlite:///{tmp_path / 'mkt.db'}")
+    MktBase.metadata.create_all(me)
+    monkeypatch.setattr(mkt_db, "ReadSessionLocal", sessionmaker(bind=me))
+    monkeypatch.setattr(admin_hub, "ReadSessionLocal", S)
+    monkeypatch.setattr(admin_hub, "_COSTS_FILE", tmp_path / "admin_costs.json")
+    monkeypatch.setenv("ADMIN_TOKEN", "tok")
+    with S() as db:
+        _raw(db, 4)
+        db.commit()
+
+    def _db():
+        with S() as db:
+            yield db
+    app = FastAPI()
+    app.include_router(admin_hub.router)
+    app.dependency_overrides[get_read_db] = _db
+    client = TestClient(app)
+    r = client.get("/admin/finances?token=tok")
+    assert r.status_code == 200 and "Coût API mesuré" in r.text and "$0.68" in r.text
+    r = client.get("/admin/pipeline-health?token=tok")
+    assert r.status_code == 200 and "Coûts API / 7 jours" in r.text and "$0.68" in r.text
+    me.dispose()
@@ -0,0 +1,157 @@
+"""
+Tests — registre des exécutions des jobs (src.jobruns) et limites APScheduler.
+
+Scénarios :
+  T01  @tracked, exécution normale     → ligne ok : durée, items in/out, pic RSS, host
+  T02  Exception / log.error avalé     → status error + message, exception propagée
+  T03  Deux exécutions simultanées     → la seconde est marquée overlapped
+  T04  stats()                         → p50 / p95 / max, tendance par jour, headroom, purge
+  T05  max_instances (APScheduler)     → déclenchement refusé enregistré "skipped",
+                                         surcharges SCHEDULER_MAX_INSTANCES_<JOB>
+"""
+import sys, os, logging, threading, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, JobRunDB
+from src import jobruns
+
+log = logging.getLogger("src.tests.jobruns")
+
+
+@pytest.fixture
+def S(monkeypatch, tmp_path):
+    # fichier : les jobs tournent dans plusieurs threads, chacun avec sa connexion
+    e = create_engine(f"sqlite:///{tmp_path / 'runs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(e)
+    S = sessionmaker(bind=e, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", S)
+    return S
+
+
+def _rows(S, job=None):
+    with S() as db:
+        q = db.query(JobRunDB).order_by(JobRunDB.id)
+        return q.filter(JobRunDB.job == job).all() if job else q.all()
+
+
+def test_t01_execution_ok(S):
+    @jobruns.tracked("probe")
+    def job(n):
+        jobruns.count(items_in=n)
+        buf = bytearray(30 * 1024 * 1024)             # fait monter le pic RSS
+        time.sleep(0.05)
+        jobruns.count(items_out=n // 2)
+        return len(buf)
+
+    assert job(10) == 30 * 1024 * 1024
+    [r] = _rows(S)
+    assert (r.job, r.status, r.items_in, r.items_out, r.errors, r.overlapped) == ("probe", "ok", 10, 5, 0, False)
+    assert r.duration_ms >= 50 and r.finished_at >= r.started_at
+    assert r.rss_peak_delta_kb is not None and r.rss_peak_delta_kb >= 0
+    assert r.host.endswith(f":{os.getpid()}")
+    jobruns.count(items_in=1)                          # hors job : sans effet
+
+
+def test_t02_erreurs(S):
+    @jobruns.tracked("boom")
+    def boom():
+        raise RuntimeError("panne")
+
+    @jobruns.tracked("swallow")
+    def swallow():
+        try:
+            raise ValueError("clé invalide")
+        except Exception as e:
+            log.error("swallow : %s", e)
+
+    with pytest.raises(RuntimeError):
+        boom()
+    swallow()
+    log.error("hors job")                             # pas de job en cours : ignoré
+    b, s = _rows(S, "boom")[0], _rows(S, "swallow")[0]
+    assert (b.status, b.errors, b.error) == ("error", 1, "RuntimeError: panne")
+    assert (s.status, s.errors, s.error) == ("error", 1, "swallow : clé invalide")
+
+
+def test_t03_chevauchement(S):
+    started, release = threading.Event(), threading.Event()
+
+    @jobruns.tracked("slow")
+    def slow(first):
+        if first:
+            started.set()
+            release.wait(5)
+
+    t = threading.Thread(target=slow, args=(True,))
+    t.start()
+    assert started.wait(5)
+    slow(False)
+    release.set()
+    t.join(5)
+    first, second = _rows(S, "slow")
+    assert first.overlapped is False and second.overlapped is True
+    assert {first.status, second.status} == {"ok"}
+    slow(False)
+    assert _rows(S, "slow")[-1].overlapped is False
+
+
+def test_t04_stats_purge(S):
+    now = datetime.utcnow()
+    with S() as db:
+        for d in range(3):                              # 3 jours, 20 runs/jour, durée qui grimpe
+            day = now - timedelta(days=2 - d, minutes=30)
+            for i in range(20):
+                db.add(JobRunDB(job="hourly", started_at=day + timedelta(seconds=i), status="ok",
+                                duration_ms=(d + 1) * 1000 + i * 10, items_in=10, items_out=4,
+                                rss_peak_delta_kb=i))
+        db.add(JobRunDB(job="hourly", started_at=now, status="error", duration_ms=5000, error="x"))
+        db.add(JobRunDB(job="hourly", started_at=now, status="skipped", overlapped=True, error="max_instances"))
+        db.add(JobRunDB(job="hourly", started_at=now - timedelta(days=40), status="ok", duration_ms=1))
+        db.commit()
+
+    [st] = jobruns.stats(days=7, intervals={"hourly": 3600})
+    assert (st["runs"], st["errors"], st["skipped"], st["overlapped"]) == (61, 1, 1, 1)
+    assert st["p50_ms"] == 2100 and st["p95_ms"] == 3170 and st["max_ms"] == 5000
+    assert [d["p50_ms"] for d in st["trend"]][:2] == [1090, 2090]
+    assert sum(d["runs"] for d in st["trend"]) == 61 and st["trend"][-1]["p95_ms"] >= 3170
+    assert st["headroom"] == round(3.17 / 3600, 3) and st["last_error"] == "x"
+    assert st["items_out_avg"] == round(60 * 4 / 61, 1) and st["rss_peak_delta_kb_max"] == 19
+    assert jobruns.purge(30) == 1
+
+
+def test_t05_max_instances(S, monkeypatch):
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.interval import IntervalTrigger
+    from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+    from src.scheduler import _job_limits, _on_job_not_run
+
+    monkeypatch.setenv("SCHEDULER_MAX_INSTANCES", "1")
+    monkeypatch.setenv("SCHEDULER_MAX_INSTANCES_OUTBOUND", "3")
+    monkeypatch.setenv("SCHEDULER_COALESCE_FOLLOWUP", "false")
+    assert _job_limits() == {"max_instances": 1, "coalesce": True}
+    assert _job_limits("outbound") == {"max_instances": 3, "coalesce": True}
+    assert _job_limits("followup") == {"max_instances": 1, "coalesce": False}
+
+    @jobruns.tracked("lent")
+    def lent():
+        time.sleep(1.6)
+
+    sched = BackgroundScheduler(timezone="UTC", job_defaults=_job_limits())
+    sched.add_job(lent, trigger=IntervalTrigger(seconds=1), id="lent",
+                  next_run_time=datetime.now().astimezone())
+    sched.add_listener(_on_job_not_run, EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
+    sched.start()
+    try:
+        deadline = time.time() + 10
+        while time.time() < deadline and not any(r.status == "skipped" for r in _rows(S, "lent")):
+            time.sleep(0.1)
+    finally:
+        sched.shutdown(wait=True)
+    rows = _rows(S, "lent")
+    assert any(r.status == "skipped" and r.error == "max_instances" for r in rows)
+    assert not any(r.overlapped for r in rows if r.status != "skipped")
@@ -0,0 +1,142 @@
+"""
+Tests — migrations de schéma versionnées (src.migrate, scripts src/migrations).
+
+Scénarios :
+  T01  Base vide                    → toutes les tables des modèles + colonnes historiques,
+                                      0001 enregistrée avec son checksum
+  T02  Base au schéma de l'ancien   → colonnes / index manquants ajoutés, données conservées,
+       init_db                        URLs localhost des headers corrigées
+  T03  Base déjà à jour             → ensure_current = 1 requête quel que soit le volume ou le
+                                      nombre de scripts
+  T04  Script en échec              → DDL + backfill annulés, version non enregistrée,
+                                      MigrationError ; script modifié après application détecté
+  T05  CLI                          → status / up --to / verify ; seed force tous les seeds
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from marketing_module.sqlite_engine import make_engine
+from src.models import Base, CityHeaderDB
+from src import migrate
+
+
+@pytest.fixture
+def engine(tmp_path):
+    e = make_engine(str(tmp_path / "m.db"))
+    yield e
+    e.dispose()
+
+
+def _count_statements(engine):
+    seen = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **k: seen.append(a[2]))
+    return seen
+
+
+def _scripts(tmp_path, *bodies):
+    d = tmp_path / "migrations"
+    d.mkdir(exist_ok=True)
+    for i, body in enumerate(bodies, 1):
+        (d / f"{i:04d}_step{i}.py").write_text(f"def upgrade(op):\n    {body}\n")
+    return d
+
+
+def test_t01_base_vide(engine):
+    res = migrate.ensure_current(engine)
+    latest = migrate.latest_version()
+    assert [a["version"] for a in res["applied"]] == list(range(1, latest + 1)) and res["version"] == latest
+    tables = set(inspect(engine).get_table_names())
+    assert set(Base.metadata.tables) <= tables
+    cols = {c["name"] for c in inspect(engine).get_columns("v3_prospects")}
+    assert {"email_status", "sms_delivered_at", "city_reference", "is_test"} <= cols
+    with engine.connect() as c:
+        row = c.execute(text("SELECT name, checksum FROM schema_migrations WHERE version = 1")).one()
+    assert row.name == "baseline" and row.checksum == migrate.discover()[0]["checksum"]
+    assert migrate.upgrade(engine) == []
+
+
+def test_t02_schema_historique(engine):
+    Base.metadata.create_all(engine)
+    with engine.begin() as c:                                   # état d'une base pré-colonnes
+        c.exec_driver_sql("DROP INDEX IF EXISTS ix_v3_prospects_followup")
+        c.exec_driver_sql("DROP INDEX IF EXISTS ix_v3_prospects_pair_unsent")
+        c.exec_driver_sql("ALTER TABLE v3_landing_texts DROP COLUMN sms_template")
+        c.exec_driver_sql("DROP INDEX ix_outbox_batch_key")
+        c.exec_driver_sql("ALTER TABLE outbox DROP COLUMN batch_key")
+        c.exec_driver_sql("DROP TABLE job_runs")
+    with sessionmaker(bind=engine)() as db:
+        db.add_all([CityHeaderDB(city="lyon", filename="lyon.webp", url="http://localhost:8000/dist/headers/lyon.webp"),
+                    CityHeaderDB(city="nice", filename="nice.webp", url="https://cdn.example/nice.webp")])
+        db.commit()
+    migrate.ensure_current(engine)
+    insp = inspect(engine)
+    assert "sms_template" in {c["name"] for c in insp.get_columns("v3_landing_texts")}
+    assert "batch_key" in {c["name"] for c in insp.get_columns("outbox")}
+    assert "job_runs" in insp.get_table_names()
+    assert {"ix_v3_prospects_followup", "ix_v3_prospects_pair_unsent"} <= {i["name"] for i in insp.get_indexes("v3_prospects")}
+    with engine.connect() as c:
+        urls = dict(c.execute(text("SELECT city, url FROM city_headers")).all())
+    assert urls == {"lyon": "/dist/headers/lyon.webp", "nice": "https://cdn.example/nice.webp"}
+
+
+def test_t03_demarrage_o1(engine, tmp_path):
+    migrate.ensure_current(engine)
+    with engine.begin() as c:
+        c.execute(text("INSERT INTO outbound_counters (key, value, updated_at) VALUES (:k, 1, '2026-01-01')"),
+                  [{"k": f"pending:c{i}|p"} for i in range(5000)])
+    seen = _count_statements(engine)
+    assert migrate.ensure_current(engine) == {"version": migrate.latest_version(), "applied": []}
+    assert len(seen) == 1 and "max(version)" in seen[0]
+
+    d = _scripts(tmp_path, "op.execute('CREATE TABLE a (id INTEGER)')", "op.create_index('ix_a', 'a', 'id')",
+                 "op.execute('INSERT INTO a VALUES (1)')")
+    other = make_engine(str(tmp_path / "other.db"))
+    assert len(migrate.ensure_current(other, d)["applied"]) == 3
+    seen = _count_statements(other)
+    assert migrate.ensure_current(other, d)["applied"] == [] and len(seen) == 1
+    other.dispose()
+
+
+def test_t04_echec_et_checksum(engine, tmp_path):
+    d = _scripts(tmp_path, "op.execute('CREATE TABLE a (id INTEGER)')",
+                 "op.execute('CREATE TABLE b (id INTEGER)'); op.add_column('a', 'v TEXT'); "
+                 "op.execute('INSERT INTO a (id) VALUES (1)'); raise ValueError('boom')")
+    with pytest.raises(migrate.MigrationError, match="0002_step2.py : boom"):
+        migrate.upgrade(engine, directory=d)
+    insp = inspect(engine)
+    assert "a" in insp.get_table_names() and "b" not in insp.get_table_names()
+    assert {c["name"] for c in insp.get_columns("a")} == {"id"}
+    with engine.connect() as c:
+        assert c.execute(text("SELECT count(*) FROM a")).scalar() == 0
+        assert [r[0] for r in c.execute(text("SELECT version FROM schema_migrations"))] == [1]
+
+    (d / "0002_step2.py").write_text("def upgrade(op):\n    op.execute('CREATE TABLE b (id INTEGER)')\n")
+    assert [a["version"] for a in migrate.upgrade(engine, directory=d)] == [2]
+    (d / "0001_step1.py").write_text("def upgrade(op):\n    op.execute('CREATE TABLE a (id INTEGER, x TEXT)')\n")
+    with pytest.raises(migrate.MigrationError, match="0001_step1.py modifié"):
+        migrate.upgrade(engine, directory=d)
+    assert [r["checksum_ok"] for r in migrate.status(engine, d)] == [False, True]
+
+
+def test_t05_cli(tmp_path, monkeypatch, capsys):
+    from src import database
+    path = tmp_path / "cli.db"
+    e = make_engine(str(path))
+    monkeypatch.setattr(database, "ENGINE", e)
+    monkeypatch.setattr(database, "DB_PATH", str(path))
+    seeded = []
+    monkeypatch.setattr("src.seeds.run", lambda force=None: seeded.append(force) or
+                        {"ran": [], "skipped": [], "failed": []})
+
+    assert migrate.main(["verify"]) == 1                        # tout en attente
+    assert "en attente" in capsys.readouterr().out
+    assert migrate.main(["up", "--to", "0"]) == 0 and seeded == []
+    assert migrate.main(["up"]) == 0 and seeded == [None]
+    assert "0001_baseline" in capsys.readouterr().out
+    assert migrate.main(["verify"]) == 0
+    assert migrate.main(["seed"]) == 0 and seeded[-1] == "*"
+    e.dispose()
@@ -0,0 +1,179 @@
+"""
+Tests — compteurs du pilotage outbound (src.outbound_counters) vs recalcul complet.
+
+Scénarios :
+  T01  1er compute_outbound_need    → réconciliation, compteurs == recalcul complet
+  T02  Envoi outbox + RDV + test IA + créneau admin → compteurs tenus == recalcul, sans réconciliation
+  T03  compute_outbound_need à chaud → aucune requête sur v3_prospects / v3_bookings / slots
+  T04  Écriture non instrumentée     → dérive corrigée par reconcile(), valeurs retournées
+  T05  Résultat identique            → compteurs incrémentaux vs table réconciliée
+"""
+import sys, os, uuid
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "libs"))
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.models import Base, OutboundCounterDB, V3ProspectDB, V3BookingDB
+from marketing_module.models import Base as MktBase, SlotDB, SlotStatus
+from src import outbound_counters as counters, outbox
+from src.scheduler import compute_outbound_need
+
+
+def _engine(base):
+    e = create_engine("sqlite:///:memory:",
+                      connect_args={"check_same_thread": False},
+                      poolclass=StaticPool)
+    base.metadata.create_all(e)
+    return e
+
+
+@pytest.fixture
+def dbs(monkeypatch):
+    main, mkt = _engine(Base), _engine(MktBase)
+    Main = sessionmaker(bind=main, autocommit=False, autoflush=False)
+    Mkt  = sessionmaker(bind=mkt, autocommit=False, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", Main)
+    monkeypatch.setattr("marketing_module.database.SessionLocal", Mkt)
+    monkeypatch.setenv("OUTBOUND_COUNTERS_TTL", "3600")
+    return Main, Mkt, main, mkt
+
+
+def _prospect(Session, city="Lyon", profession="plombier", ia=True, sent=False, is_test=False) -> str:
+    tok = uuid.uuid4().hex
+    with Session() as db:
+        db.add(V3ProspectDB(token=tok, name="Société", city=city, profession=profession,
+                            landing_url=f"/l/{tok}", email=f"{tok[:8]}@test.fr",
+                            ia_results="[]" if ia else None, is_test=is_test,
+                            sent_at=datetime.utcnow() if sent else None))
+        db.commit()
+    return tok
+
+
+def _slot(Mkt, days: int):
+    dt = datetime.utcnow() + timedelta(days=days)
+    with Mkt() as mdb:
+        mdb.add(SlotDB(project_id="presence-ia", status=SlotStatus.available,
+                       starts_at=dt, ends_at=dt + timedelta(minutes=20)))
+        mdb.commit()
+
+
+def _held(Session) -> dict:
+    with Session() as db:
+        return {k: v for k, v in db.query(OutboundCounterDB.key, OutboundCounterDB.value)
+                if k != "reconciled_at" and v}
+
+
+def _expected() -> dict:
+    return {k: v for k, v in counters.recompute().items() if v}
+
+
+def _seed(Main, Mkt):
+    for _ in range(4):
+        _prospect(Main)
+    for _ in range(3):
+        _prospect(Main, sent=True)
+    _prospect(Main, city="Nantes", profession="couvreur")
+    _prospect(Main, is_test=True)
+    _slot(Mkt, 2)
+
+
+def test_t01_premier_appel_reconcilie(dbs):
+    Main, Mkt, *_ = dbs
+    _seed(Main, Mkt)
+    r = compute_outbound_need()
+    assert r["leads_en_file"] == 5 and r["slots_open"] == 1
+    assert _held(Main) == _expected()
+
+
+def test_t02_chemins_instrumentes(dbs):
+    Main, Mkt, *_ = dbs
+    _seed(Main, Mkt)
+    compute_outbound_need()
+    with Main() as db:
+        before = db.get(OutboundCounterDB, "reconciled_at").value
+
+    # envoi via l'outbox (write-back d'un lot)
+    toks = [_prospect(Main), _prospect(Main)]
+    with Main() as db:
+        counters.recount_pending(db, [("Lyon", "plombier")])
+        db.commit()
+    with Main() as db:
+        outbox.enqueue(db, [{"message_key": f"outbound:{t}", "kind": "outbound", "channel": "email",
+                             "token": t, "sender": "s@x.fr", "recipient": "r@x.fr", "body": "b"}
+                            for t in toks])
+        db.commit()
+        batch = outbox._claim(db, 10)
+        outbox._write_back(db, batch, [{"id": m["id"], "ok": True} for m in batch])
+
+    # RDV (route /l/{token}/book) : le prospect test ne compte pas
+    start = (datetime.utcnow() + timedelta(days=3)).strftime("%Y-%m-%dT10:00:00")
+    with Main() as db:
+        for tok in (toks[0], _prospect(Main, is_test=True)):
+            db.add(V3BookingDB(prospect_token=tok, name="C", email="c@x.fr",
+                               start_iso=start, end_iso=start))
+            counters.note_booking(db, tok, start)
+        db.commit()
+
+    # test IA d'une nouvelle paire, créneau ajouté côté admin
+    tok = _prospect(Main, city="Brest", profession="maçon", ia=False)
+    with Main() as db:
+        db.get(V3ProspectDB, tok).ia_results = "[]"
+        db.flush()
+        counters.recount_pending(db, [("Brest", "maçon")])
+        db.commit()
+    _slot(Mkt, 4)
+    counters.refresh_slots()
+
+    assert _held(Main) == _expected()
+    with Main() as db:
+        assert db.get(OutboundCounterDB, "reconciled_at").value == before
+    r = compute_outbound_need()
+    assert r["rdv_taken_week"] == 1 and r["slots_open"] == 2 and r["sent_today"] == 5
+
+
+def test_t03_lecture_sans_count(dbs):
+    Main, Mkt, main, mkt = dbs
+    _seed(Main, Mkt)
+    compute_outbound_need()
+    seen = []
+    for e in (main, mkt):
+        event.listen(e, "before_cursor_execute", lambda c, cur, stmt, *a: seen.append(stmt))
+    compute_outbound_need()
+    assert seen and not any(t in s for s in seen for t in ("v3_prospects", "v3_bookings", "slots"))
+
+
+def test_t04_derive_corrigee(dbs):
+    Main, Mkt, *_ = dbs
+    _seed(Main, Mkt)
+    compute_outbound_need()
+    tok = _prospect(Main)   # insertion directe, aucun compteur touché
+    with Main() as db:
+        start = (datetime.utcnow() + timedelta(days=2)).strftime("%Y-%m-%dT09:00:00")
+        db.add(V3BookingDB(prospect_token=tok, name="C", email="c@x.fr",
+                           start_iso=start, end_iso=start))
+        db.commit()
+    assert _held(Main) != _expected()
+    drift = counters.reconcile()
+    assert drift == {"pending:Lyon|plombier": (4, 5), f"booked:{start[:10]}": (0, 1)}
+    assert _held(Main) == _expected()
+
+
+def test_t05_meme_resultat_que_recalcul(dbs):
+    Main, Mkt, *_ = dbs
+    _seed(Main, Mkt)
+    compute_outbound_need()
+    toks = [_prospect(Main) for _ in range(3)]
+    with Main() as db:
+        counters.recount_pending(db, [("Lyon", "plombier")])
+        for t in toks[:2]:
+            counters.note_sent(db, [t])
+            db.get(V3ProspectDB, t).sent_at = datetime.utcnow()
+        db.commit()
+    incremental = compute_outbound_need()
+    counters.reconcile()
+    assert compute_outbound_need() == incremental
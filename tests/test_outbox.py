@@ -0,0 +1,330 @@
+"""
+Tests — outbox Brevo : pool d'envoi contre un faux Brevo local (latence + 5xx injectés).
+
+Scénarios :
+  T01  45 messages, 503 et « accepté puis 503 » injectés → chaque destinataire livré une fois, rien perdu
+  T02  Plafond par expéditeur      → jamais plus de OUTBOX_PER_SENDER requêtes simultanées / sender
+  T03  Ré-enqueue des mêmes clés   → 0 insertion, 2e drain = 0 requête
+  T04  400 sur un envoi unitaire   → dead dès le 1er essai, prospect non marqué
+  T05  503 permanent               → dead après OUTBOX_MAX_ATTEMPTS essais
+  T06  Ligne "sending" orpheline   → reprise après le bail OUTBOX_LEASE_S
+  T07  _job_outbound LIVE          → mise en file dans la transaction de sélection, drain, 2e run = 0
+  T08  Emails groupés              → 1 requête messageVersions par expéditeur, messageId par ligne
+  T09  Lot accepté puis 503        → renvoyé à l'identique (même idempotencyKey), aucune double livraison
+  T10  Lot refusé (400)            → repli unitaire, seule l'adresse invalide finit dead
+"""
+import sys, os, json, time, threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from marketing_module.channels.email.providers import brevo as brevo_provider
+from src.models import Base, OutboxDB, V3ProspectDB
+from src import outbox
+
+_LATENCY = 0.05
+
+
+class _StubBrevo(BaseHTTPRequestHandler):
+    delivered: dict = {}     # destinataire → nb de livraisons effectives
+    posts: dict = {}         # destinataire → nb de requêtes le contenant
+    batches: list = []       # nb de versions par requête messageVersions
+    plan: dict = {}          # destinataire ou ("batch", sender) → réponses à jouer
+    accepted: dict = {}      # idempotencyKey → réponse déjà servie
+    invalid: list = []       # payloads refusés par la validation de forme
+    inflight: dict = {}
+    max_inflight: dict = {}
+    lock = threading.Lock()
+
+    @staticmethod
+    def _shape_error(body: dict):
+        versions = body["messageVersions"]
+        if not body.get("sender", {}).get("email") or not body.get("subject"):
+            return "sender/subject"
+        if "to" in body or not 1 <= len(versions) <= 1000:
+            return "versions"
+        for v in versions:
+            if not v.get("to") or not all("email" in t for t in v["to"]):
+                return "version.to"
+            if "textContent" in v and "textContent" not in body:
+                return "textContent global absent"
+        return None
+
+    def _reply(self, code: int, payload: dict):
+        raw = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        versions = None
+        if self.path.endswith("/smtp/email"):
+            sender, versions = body["sender"]["email"], body.get("messageVersions")
+            key = (body.get("headers") or {}).get("idempotencyKey")
+            if versions is not None:
+                err = self._shape_error(body)
+                if err:
+                    self.invalid.append(err)
+                    return self._reply(400, {"code": "invalid_parameter", "message": err})
+                rcpts, plan_key = [v["to"][0]["email"] for v in versions], ("batch", sender)
+            else:
+                rcpts = [body["to"][0]["email"]]
+                plan_key = rcpts[0]
+        else:
+            sender, key = body["sender"], None
+            rcpts, plan_key = [body["recipient"]], body["recipient"]
+
+        with self.lock:
+            if versions is not None:
+                self.batches.append(len(versions))
+            for r in rcpts:
+                self.posts[r] = self.posts.get(r, 0) + 1
+            self.inflight[sender] = self.inflight.get(sender, 0) + 1
+            self.max_inflight[sender] = max(self.max_inflight.get(sender, 0), self.inflight[sender])
+            steps = self.plan.get(plan_key) or []
+            action = steps.pop(0) if steps else "ok"
+        time.sleep(_LATENCY)
+
+        ids = [f"<{r}@brevo>" for r in rcpts]
+        ok_body = {"messageIds": ids} if versions is not None else {"messageId": ids[0], "reference": ids[0]}
+        with self.lock:
+            self.inflight[sender] -= 1
+            if key and key in self.accepted:           # idempotencyKey déjà acceptée : pas de 2e envoi
+                return self._reply(201, self.accepted[key])
+            if action in ("ok", "accept_503"):
+                for r in rcpts:
+                    self.delivered[r] = self.delivered.get(r, 0) + 1
+                if key:
+                    self.accepted[key] = ok_body
+        if action == "ok":
+            return self._reply(201, ok_body)
+        self._reply(400 if action == "400" else 503, {"code": action})
+
+    def log_message(self, *a):
+        pass
+
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    # fichier (pas :memory: + StaticPool) : drain_async, le pool d'envoi et le registre
+    # job_runs écrivent en parallèle, chacun avec sa connexion
+    e = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}",
+                      connect_args={"check_same_thread": False})
+    Base.metadata.create_all(e)
+    Session = sessionmaker(bind=e, autocommit=False, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", Session)
+    monkeypatch.setenv("BREVO_API_KEY", "k")
+    monkeypatch.setenv("OUTBOX_WORKERS", "8")
+    monkeypatch.setenv("OUTBOX_PER_SENDER", "2")
+    monkeypatch.setenv("OUTBOX_BACKOFF_S", "0")
+    monkeypatch.setenv("OUTBOX_MAX_ATTEMPTS", "3")
+
+    for attr in ("delivered", "posts", "plan", "accepted", "inflight", "max_inflight"):
+        setattr(_StubBrevo, attr, {})
+    _StubBrevo.batches, _StubBrevo.invalid = [], []
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StubBrevo)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    monkeypatch.setattr(brevo_provider, "BREVO_API_BASE", f"{base}/v3")
+    monkeypatch.setattr(outbox, "_BREVO_SMS_URL", f"{base}/v3/transactionalSMS/sms")
+    monkeypatch.setattr(outbox, "_SENDER_SEMS", {})
+    monkeypatch.setattr(outbox, "_PROVIDER", None)
+    yield Session, _StubBrevo
+    assert _StubBrevo.invalid == []
+    srv.shutdown()
+    srv.server_close()
+
+
+_SENDERS = ("a@presence-ia.online", "b@presence-ia.online")
+
+
+def _seed(Session, n_email: int, n_sms: int = 0, senders=_SENDERS):
+    rows = []
+    with Session() as db:
+        for i in range(n_email):
+            tok = f"e{i}"
+            db.add(V3ProspectDB(token=tok, name=f"Artisan {i}", city="Lyon",
+                                profession="plombier", email=f"{tok}@test.fr",
+                                landing_url=f"/l/{tok}"))
+            rows.append({"message_key": f"outbound:{tok}", "kind": "outbound", "channel": "email",
+                         "token": tok, "sender": senders[i % len(senders)], "sender_name": "PIA",
+                         "recipient": f"{tok}@test.fr", "recipient_name": f"Artisan {i}",
+                         "subject": "Sujet", "body": "Bonjour"})
+        for i in range(n_sms):
+            tok = f"s{i}"
+            db.add(V3ProspectDB(token=tok, name=f"Sms {i}", city="Lyon",
+                                profession="plombier", phone=f"06123456{i:02d}",
+                                landing_url=f"/l/{tok}"))
+            rows.append({"message_key": f"outbound:{tok}", "kind": "outbound", "channel": "sms",
+                         "token": tok, "sender": "PresenceIA", "recipient": f"+336123456{i:02d}",
+                         "body": "Bonjour"})
+        db.flush()
+        assert outbox.enqueue(db, rows) == len(rows)
+        db.commit()
+    return rows
+
+
+def test_t01_rien_perdu_rien_en_double(env, monkeypatch):
+    Session, stub = env
+    monkeypatch.setenv("OUTBOX_EMAIL_BATCH", "false")
+    rows = _seed(Session, 40, 5)
+    for i, r in enumerate(rows):
+        if i % 4 == 0:
+            stub.plan[r["recipient"]] = ["503"]
+        elif i % 4 == 1 and r["channel"] == "email":
+            stub.plan[r["recipient"]] = ["accept_503", "503"]
+    stats = outbox.drain()
+    assert stats["sent"] == 45 and stats["dead"] == 0
+    assert stub.delivered == {r["recipient"]: 1 for r in rows}
+    with Session() as db:
+        assert {o.status for o in db.query(OutboxDB)} == {"sent"}
+        assert all(o.provider_msg_id for o in db.query(OutboxDB))
+        e0 = db.get(V3ProspectDB, "e0")
+        assert e0.sent_at and e0.sent_method == "email" and e0.email_status == "sent"
+        s0 = db.get(V3ProspectDB, "s0")
+        assert s0.sent_at and s0.sent_method == "sms" and s0.email_status is None
+
+
+def test_t02_plafond_par_expediteur(env, monkeypatch):
+    Session, stub = env
+    monkeypatch.setenv("OUTBOX_EMAIL_BATCH", "false")
+    _seed(Session, 24)
+    t0 = time.perf_counter()
+    outbox.drain()
+    elapsed = time.perf_counter() - t0
+    assert max(stub.max_inflight.values()) <= 2
+    assert elapsed < 24 * _LATENCY / 2
+
+
+def test_t03_reenqueue_idempotent(env):
+    Session, stub = env
+    rows = _seed(Session, 6)
+    outbox.drain()
+    stub.posts.clear()
+    with Session() as db:
+        assert outbox.enqueue(db, rows) == 0
+        db.commit()
+    assert outbox.drain()["claimed"] == 0
+    assert stub.posts == {}
+    with Session() as db:
+        assert db.query(OutboxDB).count() == 6
+
+
+def test_t04_400_dead(env, monkeypatch):
+    Session, stub = env
+    monkeypatch.setenv("OUTBOX_EMAIL_BATCH", "false")
+    _seed(Session, 2)
+    stub.plan["e0@test.fr"] = ["400"]
+    stats = outbox.drain()
+    assert stats == {"claimed": 2, "sent": 1, "retry": 0, "dead": 1}
+    assert stub.posts["e0@test.fr"] == 1
+    with Session() as db:
+        row = db.query(OutboxDB).filter_by(message_key="outbound:e0").one()
+        assert row.status == "dead" and "400" in row.last_error
+        assert db.get(V3ProspectDB, "e0").sent_at is None
+
+
+def test_t05_503_permanent(env):
+    Session, stub = env
+    _seed(Session, 1)
+    stub.plan[("batch", _SENDERS[0])] = ["503"] * 10
+    outbox.drain()
+    assert stub.posts["e0@test.fr"] == 3
+    with Session() as db:
+        row = db.query(OutboxDB).one()
+        assert row.status == "dead" and row.attempts == 3
+
+
+def test_t06_bail_expire(env, monkeypatch):
+    Session, stub = env
+    _seed(Session, 1)
+    with Session() as db:
+        row = db.query(OutboxDB).one()
+        row.status, row.locked_at = "sending", datetime.utcnow() - timedelta(minutes=1)
+        db.commit()
+    monkeypatch.setenv("OUTBOX_LEASE_S", "300")
+    assert outbox.drain()["claimed"] == 0
+    monkeypatch.setenv("OUTBOX_LEASE_S", "30")
+    assert outbox.drain()["sent"] == 1
+    assert stub.delivered == {"e0@test.fr": 1}
+
+
+def test_t07_job_outbound_live(env, monkeypatch):
+    Session, stub = env
+    monkeypatch.setenv("OUTBOUND_DRY_RUN", "false")
+    monkeypatch.setenv("OUTBOUND_MAX_EMAIL", "3")
+    monkeypatch.setenv("OUTBOUND_MAX_SMS", "0")
+    monkeypatch.setenv("MAX_PAIRS_PER_RUN", "1")
+    ia = json.dumps([{"model": "ChatGPT", "response": "Piron et Leroux sont cités.", "ok": True}])
+    with Session() as db:
+        for i in range(5):
+            db.add(V3ProspectDB(token=f"t{i}", name=f"Prospect {i}", city="Lyon",
+                                profession="plombier", city_reference="LYON",
+                                email=f"prospect{i}@plomberie-lyon.fr", ia_results=ia,
+                                landing_url=f"/l/t{i}"))
+        db.commit()
+
+    threads = []
+    real_async = outbox.drain_async
+    monkeypatch.setattr(outbox, "drain_async", lambda: threads.append(real_async()))
+    fake_pair = {"city": "Lyon", "profession": "plombier", "score": 80.0}
+    from src.scheduler import _job_outbound
+    with patch("src.active_pair.check_saturation", return_value=fake_pair), \
+         patch("src.city_images.fetch_city_header_image", return_value="https://img/x.jpg"), \
+         patch("src.api.routes.v3._run_ia_test", return_value=None):
+        _job_outbound(force=True)
+        for t in threads:
+            t.join(10)
+        assert len(stub.delivered) == 3
+        with Session() as db:
+            assert db.query(OutboxDB).filter_by(status="sent").count() == 3
+            assert db.query(V3ProspectDB).filter(V3ProspectDB.sent_at.isnot(None)).count() == 3
+
+        _job_outbound(force=True)
+        for t in threads:
+            t.join(10)
+    assert len(stub.delivered) == 5
+    assert all(v == 1 for v in stub.posts.values())
+
+
+def test_t08_emails_groupes(env):
+    Session, stub = env
+    _seed(Session, 30, 2)
+    stats = outbox.drain()
+    assert stats["sent"] == 32
+    assert sorted(stub.batches) == [15, 15]
+    with Session() as db:
+        for o in db.query(OutboxDB).filter_by(channel="email"):
+            assert o.provider_msg_id == f"<{o.recipient}@brevo>"
+            assert o.batch_key
+
+
+def test_t09_lot_accepte_puis_503(env):
+    Session, stub = env
+    _seed(Session, 10)
+    stub.plan[("batch", _SENDERS[0])] = ["accept_503"]
+    stats = outbox.drain()
+    assert stats["sent"] == 10 and stats["retry"] == 5
+    assert sorted(stub.batches) == [5, 5, 5]          # même lot renvoyé, pas éclaté
+    assert stub.delivered == {f"e{i}@test.fr": 1 for i in range(10)}
+
+
+def test_t10_lot_refuse_repli_unitaire(env):
+    Session, stub = env
+    _seed(Session, 6)
+    stub.plan[("batch", _SENDERS[0])] = ["400"]
+    stub.plan["e2@test.fr"] = ["400"]
+    stats = outbox.drain()
+    assert stats == {"claimed": 6, "sent": 5, "retry": 0, "dead": 1}
+    with Session() as db:
+        dead = db.query(OutboxDB).filter_by(status="dead").one()
+        assert dead.recipient == "e2@test.fr" and dead.batch_key is None
+    assert stub.delivered == {f"e{i}@test.fr": 1 for i in range(6) if i != 2}
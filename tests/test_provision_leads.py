@@ -0,0 +1,129 @@
+"""
+Tests — _job_provision_leads() : provisioning SIRENE → V3ProspectDB.
+
+Scénarios :
+  T01  Suspects neufs        → prospects créés + provisioned_at renseigné
+  T02  Cité par une IA       → exclu, suspect non marqué
+  T03  Doublon v3_prospects  → pas de nouveau prospect, suspect marqué quand même
+  T04  Nombre de requêtes constant quand le nombre de suspects augmente
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.models import (Base, V3ProspectDB, SireneSuspectDB, SireneSegmentDB,
+                        IaCitedCompanyDB, LeadProvisioningConfigDB)
+from src.scheduler import _job_provision_leads
+
+
+# ── Helpers DB ────────────────────────────────────────────────────────────────
+
+def _make_engine():
+    e = create_engine("sqlite:///:memory:",
+                      connect_args={"check_same_thread": False},
+                      poolclass=StaticPool)
+    Base.metadata.create_all(e)
+    return e
+
+
+def _seed(Session, n_suspects: int, leads_per_run: int = 1000):
+    base = datetime.utcnow() - timedelta(days=1)
+    with Session() as db:
+        db.add(LeadProvisioningConfigDB(id="default", leads_per_run=leads_per_run))
+        db.add(SireneSegmentDB(id="couvreur|4391A|44", profession_id="couvreur",
+                               code_naf="4391A", departement="44", status="done", score=5.0))
+        for i in range(n_suspects):
+            db.add(SireneSuspectDB(
+                id=f"{i:014d}", raison_sociale=f"Toitures Artisan {i:05d}",
+                profession_id="couvreur", ville="NANTES", departement="44",
+                code_naf="4391A", actif=True, created_at=base + timedelta(seconds=i),
+            ))
+        db.commit()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine  = _make_engine()
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", Session)
+    return engine, Session
+
+
+def _count_queries(engine, fn) -> int:
+    n = {"q": 0}
+
+    def _before(conn, cursor, statement, params, context, executemany):
+        n["q"] += 1
+
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+    return n["q"]
+
+
+# ── Tests ─────────────────────────────────────────────────────────────────────
+
+def test_t01_suspects_neufs_provisionnes(db):
+    _, Session = db
+    _seed(Session, 5)
+    _job_provision_leads(force=True)
+    with Session() as s:
+        assert s.query(V3ProspectDB).count() == 5
+        assert s.query(SireneSuspectDB).filter(SireneSuspectDB.provisioned_at.is_(None)).count() == 0
+        cfg = s.get(LeadProvisioningConfigDB, "default")
+        assert cfg.last_count == 5
+
+
+def test_t02_cite_ia_exclu(db):
+    _, Session = db
+    _seed(Session, 3)
+    with Session() as s:
+        s.add(IaCitedCompanyDB(id="couvreur|nantes|toitures artisan 00001",
+                               profession="couvreur", city="nantes",
+                               name_raw="Toitures Artisan 00001",
+                               name_norm="toitures artisan 00001"))
+        s.commit()
+    _job_provision_leads(force=True)
+    with Session() as s:
+        names = {p.name for p in s.query(V3ProspectDB).all()}
+        assert "Toitures Artisan 00001" not in names
+        assert len(names) == 2
+        assert s.get(SireneSuspectDB, f"{1:014d}").provisioned_at is None
+
+
+def test_t03_doublon_marque_sans_insertion(db):
+    _, Session = db
+    _seed(Session, 2)
+    with Session() as s:
+        s.add(V3ProspectDB(token="existing", name="TOITURES ARTISAN 00000",
+                           city="NANTES", profession="couvreur", landing_url="/l/existing"))
+        s.commit()
+    _job_provision_leads(force=True)
+    with Session() as s:
+        assert s.query(V3ProspectDB).count() == 2   # existant + 1 nouveau
+        assert s.get(SireneSuspectDB, f"{0:014d}").provisioned_at is not None
+
+
+def test_t04_requetes_constantes(monkeypatch):
+    counts = []
+    for n in (10, 200):
+        engine  = _make_engine()
+        Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        monkeypatch.setattr("src.database.SessionLocal", Session)
+        _seed(Session, n)
+        with Session() as s:
+            for i in range(0, n, 4):   # un quart déjà en v3_prospects
+                s.add(V3ProspectDB(token=f"t{i}", name=f"Toitures Artisan {i:05d}",
+                                   city="NANTES", profession="couvreur", landing_url=f"/l/t{i}"))
+            s.commit()
+        counts.append(_count_queries(engine, lambda: _job_provision_leads(force=True)))
+        with Session() as s:
+            assert s.query(V3ProspectDB).count() == n
+    assert counts[0] == counts[1]
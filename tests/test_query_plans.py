@@ -0,0 +1,197 @@
+"""
+Tests — plans d'exécution des requêtes chaudes (EXPLAIN QUERY PLAN) sur un jeu synthétique.
+
+Les requêtes sont capturées pendant l'exécution du vrai code (listener before_cursor_execute)
+puis rejouées en EXPLAIN QUERY PLAN : un "SCAN v3_prospects" / "SCAN prospect_deliveries"
+sans index (parcours complet de la table) fait échouer le test.
+
+Scénarios :
+  T01  select_next_pair / check_saturation  → stock par paire via ix_v3_prospects_pair_unsent
+  T02  _job_outbound (LIVE, outbox)          → test IA existant, sélection des prospects de la paire
+  T03  _job_followup (dry run)               → candidats via ix_v3_prospects_followup
+  T04  compteurs (recount_pending, recount   → paire, envois du jour ; leads sans test IA
+       complet), alerte "bloqués IA"            (ia_results IS NULL) via ix_v3_prospects_email
+  T05  contacts._prospects_query             → ordre created_at DESC sans tri temporaire
+  T06  webhooks Brevo, réponses IMAP         → v3_prospects par email ; prospect_deliveries par
+                                               prospect / message id / (campagne, prospect)
+"""
+import sys, os, re
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, OutboxDB, RefCityDB, ScoringConfigDB, V3ProspectDB
+
+NOW = datetime.utcnow()
+CITIES = ["Lyon", "Nantes", "Rennes", "Lille", "Brest", "Dijon", "Metz", "Pau", "Caen", "Nice"]
+PROFS  = ["plombier", "couvreur", "electricien", "peintre", "macon"]
+_FULL_SCAN = re.compile(r"^SCAN (v3_prospects|prospect_deliveries)$")
+
+
+def _full_scans(conn, captured):
+    """(sql, détail) des requêtes capturées dont le plan parcourt toute la table."""
+    out = []
+    for sql, params in captured:
+        for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).all():
+            if _FULL_SCAN.match(row[3]):
+                out.append((sql, row[3]))
+    return out
+
+
+def _capture(engine, tables=("v3_prospects", "prospect_deliveries")):
+    seen = []
+
+    def _on(conn, cursor, statement, parameters, context, executemany):
+        head = statement.lstrip().split(None, 1)[0].upper()
+        if not executemany and head in ("SELECT", "UPDATE", "DELETE") and any(t in statement for t in tables):
+            seen.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", _on)
+    return seen
+
+
+@pytest.fixture
+def E(tmp_path, monkeypatch):
+    e = create_engine(f"sqlite:///{tmp_path / 'plans.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(e)
+    S = sessionmaker(bind=e, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", S)
+    monkeypatch.setattr("src.active_pair._STATE_FILE", tmp_path / "active_pair.json")
+    rows = []
+    for i in range(6000):
+        city, prof = CITIES[i % 10], PROFS[(i // 10) % 5]
+        sent = i % 3 != 0                                           # 2/3 déjà contactés
+        rows.append({
+            "token": f"t{i:05d}", "name": f"Entreprise {i}", "city": city, "profession": prof,
+            "landing_url": f"/l/t{i:05d}", "email": f"c{i}@ex{i % 7}.fr" if i % 4 else None,
+            "phone": "0612345678" if i % 5 == 0 else None, "city_reference": city.upper(),
+            "ia_results": "[]" if i % 6 else None, "is_test": False,
+            "sent_at": NOW - timedelta(hours=i % 200) if sent else None,
+            "sent_method": "email" if sent else None,
+            "email_sent_at": NOW - timedelta(hours=30 + i % 50) if sent else None,
+            "email_status": ("delivered", "opened", "bounced", None)[i % 4] if sent else None,
+            "created_at": NOW - timedelta(minutes=i),
+        })
+    with e.begin() as c:
+        c.execute(V3ProspectDB.__table__.insert(), rows)
+        c.execute(RefCityDB.__table__.insert(), [{"city_name": c_.upper(), "header_image_url": "/h.webp"}
+                                                 for c_ in CITIES])
+        c.execute(ScoringConfigDB.__table__.insert(), [{"id": "default", "outbound_refs_only": True}])
+        c.exec_driver_sql("ANALYZE")
+    yield e, S
+    e.dispose()
+
+
+def test_t01_selection_paire(E):
+    e, S = E
+    from src import active_pair
+    seen = _capture(e)
+    with S() as db:
+        best = active_pair.select_next_pair(db)
+        assert best and active_pair.check_saturation(db) == best
+        assert active_pair._available_count(db, best["city"], best["profession"]) > 0
+    assert len(seen) >= 4
+    with e.connect() as c:
+        assert _full_scans(c, seen) == []
+
+
+def test_t02_outbound(E, monkeypatch):
+    e, S = E
+    monkeypatch.setenv("OUTBOUND_DRY_RUN", "false")
+    monkeypatch.setenv("BREVO_API_KEY", "test")
+    monkeypatch.setenv("MAX_PAIRS_PER_RUN", "2")
+    monkeypatch.setattr("src.api.routes.v3._run_ia_test", lambda *a, **k: None)
+    from src import scheduler
+    seen = _capture(e)
+    scheduler._job_outbound(force=True)
+    with S() as db:
+        assert db.query(OutboxDB).count() > 0
+    assert any("ia_results IS NOT NULL" in s for s, _ in seen)
+    with e.connect() as c:
+        assert _full_scans(c, seen) == []
+
+
+def test_t03_followup(E, monkeypatch):
+    e, S = E
+    monkeypatch.setenv("OUTBOUND_DRY_RUN", "true")
+    monkeypatch.setenv("FOLLOWUP_CHUNK", "500")
+    from src import scheduler
+    seen = _capture(e)
+    scheduler._job_followup()
+    with S() as db:
+        assert db.query(V3ProspectDB).filter(V3ProspectDB.followup_sent_at.isnot(None)).count() > 0
+    with e.connect() as c:
+        assert _full_scans(c, seen) == []
+
+
+def test_t04_compteurs(E):
+    e, S = E
+    from src import outbound_counters as oc
+    seen = _capture(e)
+    with S() as db:
+        oc.recount_pending(db, [("Lyon", "plombier"), ("Nice", "macon")])
+        counts = oc._recount_main(db)
+        assert counts["sent_total"] == 4000
+        n = db.query(V3ProspectDB).filter(V3ProspectDB.email.isnot(None), V3ProspectDB.ia_results.is_(None),
+                                          V3ProspectDB.sent_at.is_(None)).count()
+        assert n > 0
+    with e.connect() as c:
+        assert _full_scans(c, seen) == []
+
+
+def test_t05_contacts(E):
+    e, S = E
+    from src.api.routes.contacts import _prospects_query
+    seen = _capture(e)
+    with S() as db:
+        rows = db.execute(_prospects_query()).all()
+    assert len(rows) == 6000 and rows[0].token == "t00000"
+    with e.connect() as c:
+        plan = [r[3] for r in c.exec_driver_sql("EXPLAIN QUERY PLAN " + seen[0][0], seen[0][1])]
+    assert plan == ["SCAN v3_prospects USING INDEX ix_v3_prospects_created_at"]
+
+
+def test_t06_webhooks(E, tmp_path, monkeypatch):
+    e, S = E
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from marketing_module import database as mkt_db
+    from marketing_module.models import Base as MktBase, ProspectDeliveryDB
+    from src import imap_replies
+    from src.api.routes import brevo_webhook
+
+    me = create_engine(f"sqlite:///{tmp_path / 'mkt.db'}", connect_args={"check_same_thread": False})
+    MktBase.metadata.create_all(me)
+    MS = sessionmaker(bind=me, autoflush=False)
+    monkeypatch.setattr(mkt_db, "SessionLocal", MS)
+    with me.begin() as c:
+        c.execute(ProspectDeliveryDB.__table__.insert(), [
+            {"id": f"d{i}", "project_id": ("presence_ia", "presence-ia")[i % 2], "campaign_id": f"c{i % 20}",
+             "prospect_id": f"t{i % 6000:05d}", "provider_message_id": f"<m{i}@brevo>" if i % 3 else None,
+             "reply_status": "none", "created_at": NOW - timedelta(minutes=i)} for i in range(12000)])
+        c.exec_driver_sql("ANALYZE")
+
+    seen_v3 = _capture(e)
+    seen_mkt = _capture(me)
+    app = FastAPI()
+    app.include_router(brevo_webhook.router)
+    r = TestClient(app).post("/webhooks/brevo", json=[{"event": "opened", "email": "c1@ex1.fr", "ts": 1760000000}])
+    assert r.status_code == 200
+
+    items = [{"uid": 1, "from_email": "inconnu@ex.fr", "in_reply_to": "<m1@brevo>"}]
+    assert imap_replies._resolve(items)[1].token == "t00001"
+    imap_replies._mark_replied(["t00001"])
+    with MS() as mdb:
+        assert mkt_db.db_prospect_already_contacted(mdb, "c1", "t00001", "s1") is False
+        assert mkt_db.db_prospect_replied(mdb, "c1", "t00001") is True
+        mdb.query(ProspectDeliveryDB).filter_by(provider_message_id="<m4@brevo>").first()
+        (mdb.query(ProspectDeliveryDB).filter_by(project_id="presence-ia", prospect_id="t00001")
+            .order_by(ProspectDeliveryDB.created_at.desc()).first())
+    assert seen_v3 and len(seen_mkt) >= 5
+    with e.connect() as c:
+        assert _full_scans(c, seen_v3) == []
+    with me.connect() as c:
+        assert _full_scans(c, seen_mkt) == []
+    me.dispose()
@@ -0,0 +1,159 @@
+"""
+Tests — planner du refresh IA (src.refresh_planner) : priorités, budget, exécution concurrente.
+
+Scénarios :
+  T01  Historique synthétique        → ordre : ancienne + volatile > jamais testée > active récente
+                                       > stable > sans leads ; < REFRESH_IA_MIN_AGE_H exclue
+  T02  Budget appels / coût          → jamais dépassé, appels déjà consommés du jour déduits,
+                                       ordre de priorité respecté (pas de saut)
+  T03  run()                         → paires retenues relancées en parallèle, prospects mis à jour,
+                                       snapshots enregistrés, 2e plan du jour = budget épuisé
+  T04  Relances en échec             → appels tentés déduits du budget (exception ou réponse vide),
+                                       historique de volatilité inchangé
+"""
+import sys, os, json, threading, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, IaPairSnapshotDB, OutboundCounterDB, ProspectionTargetDB, V3ProspectDB
+from src import refresh_planner as rp
+
+NOW = datetime(2026, 5, 4, 7, 30)
+
+
+@pytest.fixture
+def S(monkeypatch, tmp_path):
+    # fichier : les relances concurrentes écrivent depuis plusieurs threads
+    e = create_engine(f"sqlite:///{tmp_path / 'refresh.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(e)
+    S = sessionmaker(bind=e, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", S)
+    monkeypatch.setattr("src.active_pair.get_active_pair", lambda: {"city": "Lyon", "profession": "plombier"})
+    monkeypatch.setenv("REFRESH_IA_CALLS_PER_PAIR", "9")
+    monkeypatch.delenv("REFRESH_IA_DAILY_COST", raising=False)
+    return S
+
+
+def _snap(db, city, prof, days_ago, names, calls=9):
+    db.add(IaPairSnapshotDB(city=city, profession=prof, created_at=NOW - timedelta(days=days_ago),
+                            cited_json=json.dumps(sorted(names)), nb_cited=len(names), calls=calls,
+                            cost=calls * 0.01))
+
+
+def _seed(S):
+    with S() as db:
+        db.add_all([OutboundCounterDB(key=f"pending:{c}|{p}", value=n) for c, p, n in (
+            ("Lyon", "plombier", 3), ("Nice", "couvreur", 40), ("Lille", "peintre", 40),
+            ("Brest", "macon", 40), ("Rouen", "electricien", 40), ("Metz", "vitrier", 0))])
+        db.add(ProspectionTargetDB(name="t", city="Dijon", profession="serrurier", active=True))
+        db.add(ProspectionTargetDB(name="t", city="Pau", profession="couvreur", active=False))
+        _snap(db, "Lyon", "plombier", 6, {"a", "b"})
+        for d, names in ((30, {"a", "b"}), (20, {"c", "d"}), (10, {"e", "f"})):       # résultats qui changent
+            _snap(db, "Nice", "couvreur", d, names)
+        for d in (30, 20, 10):                                                       # résultats stables
+            _snap(db, "Lille", "peintre", d, {"x", "y", "z"})
+        _snap(db, "Brest", "macon", 0.5, {"m"})                                      # testée il y a 12 h
+        db.commit()
+
+
+def test_t01_ordre(S):
+    _seed(S)
+    p = rp.plan(NOW)
+    order = [(s["city"], s["priority"] > 0) for s in p["scored"]]
+    assert order == [("Nice", True), ("Rouen", True), ("Lyon", True), ("Lille", True),
+                     ("Dijon", True), ("Brest", False)]
+    by_city = {s["city"]: s for s in p["scored"]}
+    assert by_city["Nice"]["volatility"] == 1.0 and by_city["Lille"]["volatility"] == 0.0
+    assert by_city["Rouen"]["staleness"] == 1.0 and by_city["Rouen"]["volatility"] == 0.5
+    assert by_city["Lyon"]["active"] and by_city["Lyon"]["demand"] == 1.0
+    assert "Metz" not in by_city and "Pau" not in by_city          # pas de leads / ciblage inactif
+    assert rp.volatility([{"a", "b"}, {"a", "c"}]) == pytest.approx(2 / 3)
+
+
+def test_t02_budget(S, monkeypatch):
+    _seed(S)
+    monkeypatch.setenv("REFRESH_IA_DAILY_CALLS", "30")
+    p = rp.plan(NOW)
+    assert [s["city"] for s in p["selected"]] == ["Nice", "Rouen", "Lyon"]
+    assert len(p["selected"]) * p["per_pair"] <= 30
+
+    with S() as db:                                                 # 18 appels déjà consommés aujourd'hui
+        db.add(IaPairSnapshotDB(city="Caen", profession="x", created_at=NOW - timedelta(hours=2), calls=18, cost=0.18))
+        db.commit()
+    p = rp.plan(NOW)
+    assert p["spent"] == {"calls": 18, "cost": 0.18}
+    assert [s["city"] for s in p["selected"]] == ["Nice"]
+
+    monkeypatch.setenv("REFRESH_IA_DAILY_CALLS", "1000")
+    monkeypatch.setenv("REFRESH_IA_DAILY_COST", "0.40")
+    monkeypatch.setenv("REFRESH_IA_COST_PER_CALL", "0.02")
+    p = rp.plan(NOW)                                                # (0.40 - 0.18) / 0.18 → 1 paire
+    assert [s["city"] for s in p["selected"]] == ["Nice"]
+    monkeypatch.setenv("REFRESH_IA_DAILY_COST", "0.90")
+    p = rp.plan(NOW)                                                # 0.72 restants → 4 paires
+    assert [s["city"] for s in p["selected"]] == ["Nice", "Rouen", "Lyon", "Lille"]
+    assert all(s["priority"] > 0 for s in p["selected"])
+
+
+def test_t03_run(S, monkeypatch):
+    _seed(S)
+    with S() as db:
+        for c, pr in (("Lyon", "plombier"), ("Rouen", "electricien"), ("Nice", "couvreur"), ("Lille", "peintre")):
+            db.add(V3ProspectDB(token=f"t-{c}", name=c, city=c, profession=pr, landing_url=f"/l/{c}",
+                                email=f"{c}@x.fr"))
+        db.commit()
+    monkeypatch.setenv("REFRESH_IA_DAILY_CALLS", "27")
+    monkeypatch.setenv("REFRESH_IA_CONCURRENCY", "3")
+    state = {"inflight": 0, "peak": 0, "calls": []}
+    lock = threading.Lock()
+
+    def fake_ia(profession, city):
+        with lock:
+            state["inflight"] += 1
+            state["peak"] = max(state["peak"], state["inflight"])
+            state["calls"].append(city)
+        time.sleep(0.2)
+        with lock:
+            state["inflight"] -= 1
+        resp = f"1. **Entreprise {city} Un**\n2. **Entreprise {city} Deux**"
+        return {"results": [{"model": m, "prompt": "q", "response": resp, "tested_at": "t"} for m in ("A", "B", "C")] * 3,
+                "prompt": "q", "response": resp, "model": "A", "tested_at": NOW}
+
+    monkeypatch.setattr("src.api.routes.v3._run_ia_test", fake_ia)
+    res = rp.run(NOW)
+    assert sorted(state["calls"]) == ["Lyon", "Nice", "Rouen"] and state["peak"] == 3
+    assert all(r["ok"] and r["calls"] == 9 for r in res["results"])
+    with S() as db:
+        prospects = {p.city: p.ia_results for p in db.query(V3ProspectDB)}
+        snaps = db.query(IaPairSnapshotDB).filter(IaPairSnapshotDB.created_at >= NOW.replace(hour=0)).all()
+    assert prospects["Lille"] is None and all(prospects[c] for c in ("Lyon", "Nice", "Rouen"))
+    assert len(snaps) == 3 and all(json.loads(s.cited_json) for s in snaps)
+    assert rp.plan(NOW + timedelta(minutes=5))["selected"] == []
+
+
+def test_t04_echecs_comptes(S, monkeypatch):
+    _seed(S)
+    monkeypatch.setenv("REFRESH_IA_DAILY_CALLS", "27")
+    with S() as db:
+        before = rp._history(db, [("Nice", "couvreur")])
+    attempts = []
+
+    def failing_ia(profession, city):
+        attempts.append(city)
+        if city == "Nice":
+            raise RuntimeError("quota IA")
+        return {"results": []}
+
+    monkeypatch.setattr("src.api.routes.v3._run_ia_test", failing_ia)
+    res = rp.run(NOW)
+    assert len(attempts) == 3
+    assert all(not r["ok"] and r["calls"] == 9 for r in res["results"])
+    p = rp.plan(NOW + timedelta(minutes=5))
+    assert p["spent"]["calls"] == 27 and p["selected"] == []
+    with S() as db:
+        assert rp._history(db, [("Nice", "couvreur")]) == before
+
@@ -0,0 +1,128 @@
+"""
+Tests — seeds conditionnés par empreinte (src.seeds, table seed_state).
+
+Scénarios :
+  T01  Base neuve                   → tous les seeds joués, empreintes enregistrées ; prospects
+                                      de test avec city_reference dès l'insertion
+  T02  Redémarrage sans changement  → init_db = 2 requêtes (max(version), seed_state), aucun seed
+  T03  Données d'un seed modifiées  → seul ce seed est rejoué (ref_cities : ville ajoutée +
+                                      backfill city_reference des prospects existants)
+  T04  SEED_FORCE                   → liste de seeds ou tous ; seed en échec non enregistré,
+                                      retenté au démarrage suivant
+  T05  Migration 0003               → backfill unique de city_reference sur une base existante
+  T06  Helper d'un seed modifié      → empreinte changée : le source des fonctions appelées compte
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+
+from marketing_module.sqlite_engine import make_engine
+from src.models import RefCityDB, SeedStateDB, V3ProspectDB
+from src import migrate, seeds
+
+
+@pytest.fixture
+def S(tmp_path, monkeypatch):
+    e = make_engine(str(tmp_path / "seeds.db"))
+    S = sessionmaker(bind=e, autoflush=False)
+    monkeypatch.setattr("src.database.ENGINE", e)
+    monkeypatch.setattr("src.database.SessionLocal", S)
+    monkeypatch.delenv("SEED_FORCE", raising=False)
+    migrate.ensure_current(e)
+    yield S
+    e.dispose()
+
+
+def _names():
+    return [name for name, _, _ in seeds.registry()]
+
+
+def _prospect(db, token, city):
+    db.add(V3ProspectDB(token=token, name=token, city=city, profession="plombier", landing_url=f"/l/{token}"))
+
+
+def test_t01_base_neuve(S):
+    from src.database import init_db
+    init_db()
+    with S() as db:
+        state = {r.name: r.hash for r in db.query(SeedStateDB)}
+        assert set(state) == set(_names()) >= {"ref_cities", "test_contacts", "content_blocks"}
+        assert all(state[n] == seeds.fingerprint(d, f) for n, d, f in seeds.registry())
+        assert db.query(RefCityDB).count() > 100
+        refs = dict(db.query(V3ProspectDB.city, V3ProspectDB.city_reference).filter(V3ProspectDB.is_test))
+    assert refs == {c: c for c in ("PARIS", "BORDEAUX", "ANTIBES", "MENDE")}
+
+
+def test_t02_redemarrage(S, monkeypatch):
+    from src import database
+    database.init_db()
+    seen = []
+    event.listen(database.ENGINE, "before_cursor_execute", lambda *a, **k: seen.append(a[2]))
+    database.init_db()
+    assert len(seen) == 2 and "max(version)" in seen[0] and "seed_state" in seen[1]
+    assert seeds.run() == {"ran": [], "skipped": _names(), "failed": []}
+
+
+def test_t03_donnees_modifiees(S, monkeypatch):
+    from src import ref_cities_seed
+    seeds.run()
+    with S() as db:
+        _prospect(db, "p1", "Villeneuve-Test")
+        db.commit()
+    monkeypatch.setattr(ref_cities_seed, "REF_CITIES", ref_cities_seed.REF_CITIES + [("VILLENEUVE-TEST", "sous_prefecture")])
+    res = seeds.run()
+    assert res["ran"] == ["ref_cities"] and len(res["skipped"]) == len(_names()) - 1
+    with S() as db:
+        assert db.query(V3ProspectDB.city_reference).filter_by(token="p1").scalar() == "Villeneuve-Test"
+    assert seeds.run()["ran"] == []
+
+
+def test_t04_force_et_echec(S, monkeypatch):
+    seeds.run()
+    monkeypatch.setenv("SEED_FORCE", "theme, scoring_config")
+    assert seeds.run()["ran"] == ["theme", "scoring_config"]
+    monkeypatch.setenv("SEED_FORCE", "1")
+    assert seeds.run()["ran"] == _names()
+    monkeypatch.delenv("SEED_FORCE")
+
+    from src import database
+    calls = []
+
+    def boom(db):
+        calls.append(1)
+        raise RuntimeError("boom")
+    monkeypatch.setattr(database, "_seed_theme", boom)        # source modifié → empreinte changée
+    assert seeds.run() == {"ran": [], "skipped": [n for n in _names() if n != "theme"], "failed": ["theme"]}
+    assert seeds.run()["failed"] == ["theme"] and calls == [1, 1]
+
+
+def test_t05_migration_backfill(tmp_path):
+    from src.ref_cities_seed import seed_ref_cities
+    e = make_engine(str(tmp_path / "m.db"))
+    migrate.upgrade(e, target=2)
+    with sessionmaker(bind=e)() as db:
+        seed_ref_cities(db)
+        for tok, city in (("a", "Lyon"), ("b", " nantes "), ("c", "Trifouillis")):
+            _prospect(db, tok, city)
+        db.commit()
+    assert [m["version"] for m in migrate.upgrade(e, target=3)] == [3]
+    with e.connect() as c:
+        refs = dict(c.execute(text("SELECT token, city_reference FROM v3_prospects")).all())
+        assert c.execute(text("SELECT count(*) FROM seed_state")).scalar() == 0
+    assert refs == {"a": "Lyon", "b": " nantes ", "c": None}
+    e.dispose()
+
+
+def test_t06_helper_modifie(monkeypatch):
+    from src import ref_cities_seed
+    assert {f.__name__ for f in seeds._callees(seeds._seed_ref_cities)} == {
+        "seed_ref_cities", "backfill_city_reference"}
+    before = seeds.fingerprint(ref_cities_seed.REF_CITIES, seeds._seed_ref_cities)
+    assert before == seeds.fingerprint(ref_cities_seed.REF_CITIES, seeds._seed_ref_cities)
+    # même wrapper, même données : seul le helper appelé change
+    monkeypatch.setattr(ref_cities_seed, "backfill_city_reference", ref_cities_seed.city_reference_for)
+    assert seeds.fingerprint(ref_cities_seed.REF_CITIES, seeds._seed_ref_cities) != before
+
@@ -142,7 +142,7 @@ class TestUpload:
             f"/admin/prospect/{prospect_id}/upload-proof-image?token=test-token",
             files={"file": ("proof.jpg", io.BytesIO(content), "image/jpeg")},
         )
-        assert r.status_code == 200
+        assert r.status_code == 202
         assert "url" in r.json()
         assert "proof.jpg" in r.json()["url"]
 
@@ -151,7 +151,7 @@ class TestUpload:
             f"/admin/prospect/{prospect_id}/upload-city-image?token=test-token",
             files={"file": ("city.jpg", io.BytesIO(b"city-img"), "image/jpeg")},
         )
-        assert r.status_code == 200
+        assert r.status_code == 202
         assert "city.jpg" in r.json()["url"]
 
     def test_upload_video_url(self, client, prospect_id):
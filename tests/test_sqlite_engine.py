@@ -0,0 +1,131 @@
+"""
+Tests — fabrique de moteurs SQLite (marketing_module.sqlite_engine) utilisée par les deux bases.
+
+Scénarios :
+  T01  make_engines(fichier)        → WAL, synchronous NORMAL, busy_timeout, cache, mmap, temp_store
+                                      sur chaque connexion ; pool borné ; lecture en query_only
+  T02  Écrivain en transaction      → les lecteurs lisent l'état commité sans attendre le verrou
+  T03  maintenance()                → checkpoint PASSIVE, TRUNCATE au-delà du seuil, PRAGMA optimize
+  T04  Base :memory:                → pas de WAL, un seul moteur
+  T05  Lectures lourdes             → get_read_db sur READ_ENGINE (écriture refusée), crossdb
+                                      réutilise les pools lecture des deux bases sans ATTACH
+"""
+import sys, os, threading, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import text
+
+from marketing_module.sqlite_engine import make_engines, maintenance
+
+
+@pytest.fixture
+def engines(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "2500")
+    monkeypatch.setenv("SQLITE_WRITE_POOL", "2")
+    monkeypatch.setenv("SQLITE_POOL_OVERFLOW", "1")
+    w, r = make_engines(str(tmp_path / "t.db"))
+    with w.begin() as c:
+        c.exec_driver_sql("CREATE TABLE t (id INTEGER PRIMARY KEY, v INTEGER)")
+        c.exec_driver_sql("INSERT INTO t (v) VALUES (1), (2), (3)")
+    yield w, r
+    w.dispose()
+    r.dispose()
+
+
+def _pragma(conn, name):
+    return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_t01_pragmas(engines):
+    w, r = engines
+    for eng in (w, r):
+        with eng.connect() as c:
+            assert _pragma(c, "journal_mode") == "wal"
+            assert _pragma(c, "synchronous") == 1                   # NORMAL
+            assert _pragma(c, "busy_timeout") == 2500
+            assert _pragma(c, "cache_size") == -20000
+            assert _pragma(c, "mmap_size") == 256 * 1024 * 1024
+            assert _pragma(c, "temp_store") == 2                    # MEMORY
+    assert w.pool.size() == 2 and w.pool._max_overflow == 1
+    assert r.pool.size() == 10
+    with r.connect() as c:
+        assert _pragma(c, "query_only") == 1
+        with pytest.raises(Exception, match="readonly|read-only|query_only"):
+            c.exec_driver_sql("UPDATE t SET v = 0")
+
+
+def test_t02_lecteurs_non_bloques(engines):
+    w, r = engines
+    held, release = threading.Event(), threading.Event()
+
+    def writer():
+        with w.begin() as c:
+            c.exec_driver_sql("UPDATE t SET v = v + 10")
+            held.set()
+            release.wait(5)
+
+    t = threading.Thread(target=writer)
+    t.start()
+    assert held.wait(5)
+    try:
+        t0 = time.perf_counter()
+        with r.connect() as c:
+            assert c.execute(text("SELECT sum(v) FROM t")).scalar() == 6     # état commité
+        assert time.perf_counter() - t0 < 0.5
+    finally:
+        release.set()
+        t.join(5)
+    with r.connect() as c:
+        assert c.execute(text("SELECT sum(v) FROM t")).scalar() == 36
+
+
+def test_t03_maintenance(engines, monkeypatch):
+    w, _ = engines
+    with w.begin() as c:
+        c.execute(text("INSERT INTO t (v) VALUES (:v)"), [{"v": i} for i in range(2000)])
+    res = maintenance(w)
+    assert res["mode"] == "PASSIVE" and res["busy"] == 0 and res["checkpointed"] == res["log"] > 0
+    monkeypatch.setenv("SQLITE_WAL_TRUNCATE_MB", "0")
+    res = maintenance(w, optimize=False)
+    assert res["mode"] == "TRUNCATE" and res["wal_bytes"] > 0
+    assert os.path.getsize(w.url.database + "-wal") == 0
+
+
+def test_t04_memoire():
+    w, r = make_engines(":memory:")
+    assert w is r
+    with w.connect() as c:
+        assert _pragma(c, "journal_mode") == "memory" and _pragma(c, "temp_store") == 2
+
+
+def test_t05_lectures_sur_pool_lecture(tmp_path, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import sessionmaker
+    from marketing_module import database as mkt_db
+    from src import crossdb, database
+
+    main, mkt = str(tmp_path / "p.db"), str(tmp_path / "m.db")
+    (w, r), (mw, mr) = make_engines(main), make_engines(mkt)
+    for eng in (w, mw):
+        with eng.begin() as c:
+            c.exec_driver_sql("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+    monkeypatch.setattr(database, "DB_PATH", main)
+    monkeypatch.setattr(database, "READ_ENGINE", r)
+    monkeypatch.setattr(database, "ReadSessionLocal", sessionmaker(bind=r))
+    monkeypatch.setattr(mkt_db, "_DB_PATH", mkt)
+    monkeypatch.setattr(mkt_db, "_read_engine", mr)
+
+    gen = database.get_read_db()
+    db = next(gen)
+    try:
+        assert db.get_bind() is r and db.execute(text("SELECT count(*) FROM t")).scalar() == 0
+        with pytest.raises(OperationalError):
+            db.execute(text("INSERT INTO t (id) VALUES (1)"))
+    finally:
+        gen.close()
+    assert crossdb._engine(main) is r and crossdb._engine(mkt) is mr
+    assert crossdb._engine(main, attach=mkt) not in (r, mr)
+    crossdb.dispose()
+    for eng in (w, r, mw, mr):
+        eng.dispose()
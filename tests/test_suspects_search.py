@@ -0,0 +1,188 @@
+"""
+Tests — explorateur de suspects : pagination par clé et recherche FTS5 (database.db_suspects_list,
+migration 0005, page /admin/suspects).
+
+Scénarios :
+  T01  Pagination par clé           → parcours complet identique à l'ancien OFFSET (villes NULL,
+                                      raisons sociales en double, filtre métier / département),
+                                      à l'endroit (after) comme à rebours (before)
+  T02  FTS5 + triggers              → insert / update / delete synchronisés ; préfixes, accents,
+                                      plusieurs mots
+  T03  Plans                        → page profonde sans parcours complet ni tri ; recherche
+                                      par l'index FTS (tri des seules lignes trouvées)
+  T04  Migration 0005               → index remplacés, FTS construite sur les lignes existantes
+  T05  Page /admin/suspects         → liens « › » / « ‹ » porteurs de la clé, pages voisines sans saut
+                                      (OFFSET 0)
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import sessionmaker
+
+from marketing_module.sqlite_engine import make_engine
+from src.models import SireneSuspectDB
+from src import database, migrate
+from src.database import db_suspects_list
+
+VILLES = [None, "Lyon", "Nîmes", "Saint-Étienne", "Brest", "Pau"]
+NOMS   = ["Plomberie Martin", "Électricité Durand", "Couverture du Sud", "Plomberie Martin", "Peintures Léa"]
+
+
+def _rows(n, start=0):
+    return [{"id": f"{i:014d}", "raison_sociale": NOMS[i % 5], "ville": VILLES[i % 6],
+             "profession_id": ("plombier", "couvreur")[i % 2], "departement": ("69", "30")[i % 3 == 0],
+             "actif": True, "contactable": False} for i in range(start, start + n)]
+
+
+@pytest.fixture
+def S(tmp_path, monkeypatch):
+    e = make_engine(str(tmp_path / "suspects.db"))
+    migrate.upgrade(e)
+    with e.begin() as c:
+        c.execute(SireneSuspectDB.__table__.insert(), _rows(1000))
+    monkeypatch.setattr(database, "_FTS_TABLES", {})
+    yield e, sessionmaker(bind=e)
+    e.dispose()
+
+
+def _walk(db, per_page=37, **filters):
+    out, after = [], None
+    while True:
+        _, items = db_suspects_list(db, per_page=per_page, after=after, with_total=False, **filters)
+        if not items:
+            return out
+        out += [s.id for s in items]
+        after = (items[-1].ville, items[-1].raison_sociale, items[-1].id)
+
+
+def _walk_back(db, per_page=37, **filters):
+    ref = _offset(db, **filters)
+    out, before = [], db.get(SireneSuspectDB, ref[-1])
+    out.append(before.id)
+    while True:
+        key = (before.ville, before.raison_sociale, before.id)
+        _, items = db_suspects_list(db, per_page=per_page, before=key, with_total=False, **filters)
+        if not items:
+            return out[::-1]
+        out += [s.id for s in reversed(items)]
+        before = items[0]
+
+
+def _offset(db, **filters):
+    total, items = db_suspects_list(db, per_page=10**6, **filters)
+    assert total == len(items)
+    return [s.id for s in items]
+
+
+def test_t01_keyset(S):
+    _, S = S
+    with S() as db:
+        for filters in ({}, {"profession_id": "couvreur"}, {"dept": "30"}, {"search": "plomberie"}):
+            ref = _offset(db, **filters)
+            assert _walk(db, **filters) == ref and len(set(ref)) == len(ref) > 0
+            assert _walk_back(db, **filters) == ref
+        assert len(_offset(db)) == 1000
+
+
+def test_t02_fts(S):
+    e, S = S
+    ids = lambda db, q: {s.id for s in db_suspects_list(db, search=q, per_page=10**6)[1]}
+    with S() as db:
+        assert len(ids(db, "plomb")) == 400
+        assert ids(db, "electricite") == ids(db, "ÉLEC") and len(ids(db, "elec")) == 200
+        assert ids(db, "plomberie nimes") == {f"{i:014d}" for i in range(1000) if i % 5 in (0, 3) and i % 6 == 2}
+        assert ids(db, "etienne") == {f"{i:014d}" for i in range(1000) if i % 6 == 3}
+        assert ids(db, "  ") == ids(db, '"') == ids(db, "") and len(ids(db, "")) == 1000
+
+        db.add(SireneSuspectDB(id="99999999999999", raison_sociale="Zinguerie Ardente", ville="Albi"))
+        db.commit()
+        assert ids(db, "zingu alb") == {"99999999999999"}
+        db.query(SireneSuspectDB).filter_by(id="99999999999999").update({"raison_sociale": "Toiture Albigeoise"})
+        db.query(SireneSuspectDB).filter_by(id="00000000000001").update({"enrichi_at": None})
+        db.commit()
+        assert ids(db, "zingu") == set() and ids(db, "albigeoise") == {"99999999999999"}
+        db.query(SireneSuspectDB).filter_by(id="99999999999999").delete()
+        db.commit()
+        assert ids(db, "albigeoise") == set()
+    with e.connect() as c:
+        c.exec_driver_sql("INSERT INTO sirene_suspects_fts(sirene_suspects_fts) VALUES ('integrity-check')")
+
+
+def test_t03_plans(S):
+    e, S = S
+    seen = []
+
+    def _on(conn, cur, sql, params, *a):
+        if "FROM sirene_suspects" in sql:
+            seen.append((sql, params))
+    event.listen(e, "before_cursor_execute", _on)
+    with S() as db:
+        db_suspects_list(db, after=("Lyon", "Plomberie Martin", "00000000000500"), with_total=False)
+        db_suspects_list(db, profession_id="plombier", after=("Brest", "Plomberie", "0"), with_total=False)
+        db_suspects_list(db, search="plomberie lyon", after=("Lyon", "A", "0"), with_total=False)
+    event.remove(e, "before_cursor_execute", _on)
+    assert len(seen) == 3 and all(p[-2:] == (100, 0) for _, p in seen)      # LIMIT 100, sans saut
+    with e.connect() as c:
+        plans = [" | ".join(r[3] for r in c.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, p)) for sql, p in seen]
+    assert "ix_sirene_suspects_keyset" in plans[0] and "ix_sirene_suspects_prof_keyset" in plans[1]
+    assert "VIRTUAL TABLE INDEX" in plans[2]                 # tri limité aux lignes trouvées
+    for p in plans:
+        assert "SCAN sirene_suspects |" not in p + " |", p
+    assert "TEMP B-TREE" not in plans[0] + plans[1]
+
+
+def test_t04_migration(tmp_path):
+    e = make_engine(str(tmp_path / "m.db"))
+    migrate.upgrade(e, target=4)
+    with e.begin() as c:
+        c.exec_driver_sql("CREATE INDEX ix_sirene_suspects_ville ON sirene_suspects (ville)")
+        c.exec_driver_sql("CREATE INDEX ix_sirene_suspects_profession_id ON sirene_suspects (profession_id)")
+        c.execute(SireneSuspectDB.__table__.insert(), _rows(50))
+    assert [m["version"] for m in migrate.upgrade(e, target=5)] == [5]
+    names = {i["name"] for i in inspect(e).get_indexes("sirene_suspects")}
+    assert {"ix_sirene_suspects_keyset", "ix_sirene_suspects_prof_keyset"} <= names
+    assert not names & {"ix_sirene_suspects_ville", "ix_sirene_suspects_profession_id"}
+    with e.connect() as c:
+        n = c.exec_driver_sql("SELECT count(*) FROM sirene_suspects_fts WHERE sirene_suspects_fts MATCH 'plomberie'").scalar()
+    assert n == 20
+    e.dispose()
+
+
+def test_t05_page(S, monkeypatch):
+    import html, re
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from src.api.routes import professions_admin
+
+    e, S = S
+    monkeypatch.setattr(professions_admin, "SessionLocal", S)
+    monkeypatch.setattr(professions_admin, "_require_admin", lambda token: None)
+    app = FastAPI()
+    app.include_router(professions_admin.router)
+    client = TestClient(app)
+
+    with S() as db:
+        ref = _offset(db, profession_id="plombier")
+    r = client.get("/admin/suspects?token=t&profession_id=plombier")
+    assert r.status_code == 200 and "500 entreprises" in r.text
+    nxt = html.unescape(re.search(r'href="(/admin/suspects\?[^"]*after=[^"]*)"[^>]*>›', r.text).group(1))
+    seen = []
+    event.listen(e, "before_cursor_execute",
+                 lambda conn, cur, sql, params, *a: seen.append(params) if "ORDER BY sirene_suspects.ville" in sql else None)
+    r = client.get(nxt)
+    rows = re.findall(r"<tr><td[^>]*>([^<]+)</td>", r.text)
+    assert r.status_code == 200 and len(rows) == 100 and seen and all(p[-1] == 0 for p in seen)
+    with S() as db:
+        names = [db.get(SireneSuspectDB, i).raison_sociale for i in ref[100:200]]
+    assert [html.unescape(x) for x in rows] == names
+
+    r = client.get(html.unescape(re.search(r'href="(/admin/suspects\?[^"]*after=[^"]*)"[^>]*>›', r.text).group(1)))
+    prev = html.unescape(re.search(r'href="(/admin/suspects\?[^"]*before=[^"]*)"[^>]*>‹', r.text).group(1))
+    assert "page=2" in prev
+    seen.clear()
+    r = client.get(prev)
+    rows = re.findall(r"<tr><td[^>]*>([^<]+)</td>", r.text)
+    assert [html.unescape(x) for x in rows] == names and seen and all(p[-1] == 0 for p in seen)
+    assert "javascript:history.back()" not in r.text
@@ -0,0 +1,312 @@
+"""
+Tests — warming email (src.warming) : plan du jour, livraison concurrente, réconciliation IMAP.
+
+Scénarios :
+  T01  build_plan / ensure_plan   → _warming_day_cap envois par expéditeur, étalés sur la fenêtre,
+                                    plan créé une seule fois par jour
+  T02  deliver_due (stub Brevo)   → seuls les dus partent, un lot par expéditeur, concurrence bornée,
+                                    jamais plus que le plafond du jour par expéditeur
+  T03  Plan gonflé à la main      → excédent "skipped", Brevo ne reçoit que le plafond
+  T03b Crash pendant l'envoi      → "sending" figé remis "planned" après WARMING_STALE_MIN, puis envoyé
+  T04  reconcile (stub IMAP)      → une session par boîte, en-têtes seulement, réponses / relances
+                                    planifiées avec délai, \\Seen + déplacement sur plages d'UID
+"""
+import sys, os, json, re, socketserver, threading, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+import random
+from collections import Counter
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from marketing_module.channels.email.providers import brevo as brevo_provider
+from src.models import Base, WarmingPlanDB
+from src import warming
+from src.scheduler import _WARMING_SENDERS, _warming_day_cap
+
+DAY = date(2026, 4, 2)          # jour 14 du warming → plafond 6
+
+
+# ── Stub Brevo ────────────────────────────────────────────────────────────────
+
+class _StubBrevo(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    calls: list = []
+    inflight = peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = type(self)
+        with cls.lock:
+            cls.inflight += 1
+            cls.peak = max(cls.peak, cls.inflight)
+        time.sleep(0.02)
+        with cls.lock:
+            cls.inflight -= 1
+            cls.calls.append(body)
+        n = len(body.get("messageVersions") or [1])
+        raw = json.dumps({"messageIds": [f"<m{i}>" for i in range(n)], "messageId": "<m0>"}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *a):
+        pass
+
+
+@pytest.fixture
+def env(monkeypatch):
+    e = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False},
+                      poolclass=StaticPool)
+    Base.metadata.create_all(e)
+    Session = sessionmaker(bind=e, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", Session)
+    monkeypatch.setenv("BREVO_API_KEY", "k")
+    monkeypatch.setenv("WARMING_SEND_CONCURRENCY", "3")
+    _StubBrevo.calls, _StubBrevo.peak = [], 0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StubBrevo)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(brevo_provider, "BREVO_API_BASE", f"http://127.0.0.1:{srv.server_address[1]}/v3")
+    yield Session, _StubBrevo
+    srv.shutdown()
+    srv.server_close()
+
+
+def _per_sender(calls):
+    return Counter(c["sender"]["email"] for c in calls for _ in (c.get("messageVersions") or [1]))
+
+
+# ── Tests plan / livraison ────────────────────────────────────────────────────
+
+def test_t01_plan():
+    for d, cap in ((date(2026, 3, 20), 2), (DAY, 6), (date(2026, 6, 1), 10)):
+        items = warming.build_plan(d, random.Random(1))
+        assert _warming_day_cap(d) == cap
+        assert Counter(i["sender"] for i in items) == {s: cap for s in _WARMING_SENDERS}
+        assert all(datetime(d.year, d.month, d.day, 7) <= i["due_at"] < datetime(d.year, d.month, d.day, 21)
+                   for i in items)
+        for s in _WARMING_SENDERS[:3]:                    # une tranche par envoi, pas de rafale
+            due = sorted(i["due_at"] for i in items if i["sender"] == s)
+            gaps = [(b - a).total_seconds() for a, b in zip(due, due[1:])]
+            assert all(g > 14 * 3600 / cap * 0.2 for g in gaps)
+
+
+def test_t01b_ensure_plan_idempotent(env):
+    Session, _ = env
+    assert warming.ensure_plan(DAY) == 6 * len(_WARMING_SENDERS)
+    assert warming.ensure_plan(DAY) == 0
+    with Session() as db:
+        assert db.query(WarmingPlanDB).count() == 6 * len(_WARMING_SENDERS)
+
+
+def test_t02_livraison(env):
+    Session, stub = env
+    warming.ensure_plan(DAY)
+    noon = datetime(2026, 4, 2, 12)
+    with Session() as db:
+        due_noon = db.query(WarmingPlanDB).filter(WarmingPlanDB.due_at <= noon).count()
+
+    res = warming.deliver_due(noon)
+    assert res == {"sent": due_noon, "failed": 0}
+    senders = [c["sender"]["email"] for c in stub.calls]
+    assert len(senders) == len(set(senders))              # un lot par expéditeur
+    assert 1 < stub.peak <= 3
+    assert all(c["headers"] == {"X-Warming": "1"} for c in stub.calls)
+
+    warming.deliver_due(datetime(2026, 4, 2, 23))
+    assert warming.deliver_due(datetime(2026, 4, 2, 23)) == {"sent": 0, "failed": 0}
+    per = _per_sender(stub.calls)
+    assert per == {s: 6 for s in _WARMING_SENDERS}
+    with Session() as db:
+        assert {r.status for r in db.query(WarmingPlanDB)} == {"sent"}
+
+
+def test_t03_plafond(env):
+    Session, stub = env
+    warming.ensure_plan(DAY)
+    s = _WARMING_SENDERS[0]
+    with Session() as db:                                 # 5 envois ajoutés à la main
+        for i in range(5):
+            db.add(WarmingPlanDB(day=DAY.isoformat(), kind="initial", sender=s, receiver="bot-free@presence-ia.com",
+                                 subject="x", body="y", due_at=datetime(2026, 4, 2, 8)))
+        db.commit()
+    warming.deliver_due(datetime(2026, 4, 2, 23))
+    per = _per_sender(stub.calls)
+    assert per[s] == 6 and max(per.values()) == 6
+    with Session() as db:
+        assert db.query(WarmingPlanDB).filter(WarmingPlanDB.status == "skipped").count() == 5
+
+
+
+def test_t03b_reprise_apres_crash(env):
+    Session, stub = env
+    warming.ensure_plan(DAY)
+    noon = datetime(2026, 4, 2, 12)
+    crashed = {it["id"] for it in warming._reserve(noon, 3)}   # réservés, process tué avant l'envoi
+    assert len(crashed) == 3
+
+    warming.deliver_due(noon)                           # envoi récent : laissé à son worker
+    with Session() as db:
+        assert {r.id for r in db.query(WarmingPlanDB).filter(WarmingPlanDB.status == "sending")} == crashed
+        db.query(WarmingPlanDB).filter(WarmingPlanDB.id.in_(crashed)).update(
+            {WarmingPlanDB.locked_at: datetime.utcnow() - timedelta(minutes=31)}, synchronize_session=False)
+        db.commit()
+
+    n_calls = len(stub.calls)
+    assert warming.deliver_due(noon) == {"sent": 3, "failed": 0}
+    assert sum(len(c.get("messageVersions") or [1]) for c in stub.calls[n_calls:]) == 3
+    with Session() as db:
+        assert {r.status for r in db.query(WarmingPlanDB).filter(WarmingPlanDB.id.in_(crashed))} == {"sent"}
+
+# ── Stub IMAP (boîtes réceptrices) ────────────────────────────────────────────
+
+class _Imap(socketserver.StreamRequestHandler):
+    def send(self, data: bytes):
+        self.wfile.write(data)
+        self.wfile.flush()
+
+    def handle(self):
+        srv = self.server
+        srv.sessions += 1
+        folder, user = None, None
+        self.send(b"* OK ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, _, rest = line.strip().decode().partition(" ")
+            cmd, _, args = rest.partition(" ")
+            cmd = cmd.upper()
+            if cmd == "UID":
+                sub, _, args = args.partition(" ")
+                cmd = "UID " + sub.upper()
+            srv.log.append((user, cmd, args))
+            ok = f"{tag} OK done\r\n".encode()
+            box = srv.boxes.get(user, {})
+            if cmd == "CAPABILITY":
+                self.send(b"* CAPABILITY IMAP4rev1\r\n" + ok)
+            elif cmd == "LOGIN":
+                user = args.split()[0].strip('"')
+                self.send(ok)
+            elif cmd == "SELECT":
+                name = args.strip('"')
+                if name not in box:
+                    self.send(f"{tag} NO no such folder\r\n".encode())
+                    continue
+                folder = name
+                self.send(f"* {len(box[name])} EXISTS\r\n* OK [UIDVALIDITY 1]\r\n".encode() + ok)
+            elif cmd == "CREATE":
+                box.setdefault(args.strip('"'), {})
+                self.send(ok)
+            elif cmd == "UID SEARCH":
+                m = re.match(r"\((UNSEEN )?HEADER (\S+) 1\)", args)
+                hits = [u for u, (f, raw) in sorted(box[folder].items())
+                        if (not m.group(1) or "\\Seen" not in f)
+                        and re.search(rb"^" + m.group(2).encode() + rb": 1\r$", raw, re.M | re.I)]
+                self.send(("* SEARCH " + " ".join(map(str, hits)) + "\r\n").encode() + ok)
+            elif cmd == "UID FETCH":
+                spec, _, items = args.partition(" ")
+                out = b""
+                for u in self._uids(spec, box[folder]):
+                    raw = box[folder][u][1]
+                    if "HEADER.FIELDS" in items:
+                        data = b"\r\n".join(l for l in raw.split(b"\r\n\r\n")[0].split(b"\r\n")
+                                            if l.split(b":")[0].upper() in (b"FROM", b"SUBJECT")) + b"\r\n\r\n"
+                    else:
+                        data = raw
+                    out += b"* %d FETCH (UID %d BODY[] {%d}\r\n" % (u, u, len(data)) + data + b")\r\n"
+                self.send(out + ok)
+            elif cmd == "UID STORE":
+                spec, _, rest = args.partition(" ")
+                flag = "\\Deleted" if "Deleted" in rest else "\\Seen"
+                for u in self._uids(spec, box[folder]):
+                    box[folder][u][0].add(flag)
+                self.send(ok)
+            elif cmd == "UID COPY":
+                spec, _, dest = args.partition(" ")
+                for u in self._uids(spec, box[folder]):
+                    f, raw = box[folder][u]
+                    box[dest.strip('"')][len(box[dest.strip('"')]) + 1] = [set(f), raw]
+                self.send(ok)
+            elif cmd == "EXPUNGE":
+                for u in [u for u, (f, _) in box[folder].items() if "\\Deleted" in f]:
+                    del box[folder][u]
+                self.send(ok)
+            elif cmd == "LOGOUT":
+                self.send(b"* BYE\r\n" + ok)
+                return
+            else:
+                self.send(ok)
+
+    @staticmethod
+    def _uids(spec, msgs):
+        out = set()
+        for part in spec.split(","):
+            lo, _, hi = part.partition(":")
+            out |= {u for u in msgs if int(lo) <= u <= int(hi or lo)}
+        return sorted(out)
+
+
+def _raw(frm, subject, header=None):
+    h = f"From: {frm}\r\nTo: bot@presence-ia.com\r\nSubject: {subject}\r\n"
+    if header:
+        h += f"{header}: 1\r\n"
+    return (h + "\r\n" + "corps " * 2000).encode()
+
+
+def test_t04_reconcile(env, monkeypatch):
+    Session, _ = env
+    srv = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _Imap)
+    srv.daemon_threads = True
+    srv.sessions, srv.log = 0, []
+    inbox1 = {}
+    for i in range(1, 9):                                       # 8 envois initiaux
+        inbox1[i] = [set(), _raw(f"Hello <hello{i}@presence-ia.site>", "Point rapide", "X-Warming")]
+    for i in range(9, 13):                                      # 4 réponses du bot (chaîne côté boîte 1)
+        inbox1[i] = [set(), _raw("Bot <bot-paid@presence-ia.com>", "Re: Pour info", "X-Warming-Reply")]
+    inbox1[13] = [set(), _raw("client@ailleurs.fr", "Devis")]   # message normal : intouché
+    inbox1[14] = [{"\\Seen"}, _raw("x@presence-ia.info", "Re: Re: x", "X-Warming-Followup")]
+    srv.boxes = {"bot-free@presence-ia.com": {"INBOX": inbox1},
+                 "bot-paid@presence-ia.com": {"INBOX": {1: [set(), _raw("info@presence-ia.cloud", "Juste un mot",
+                                                                         "X-Warming")]}}}
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setenv("WARMING_IMAP_HOST", "127.0.0.1")
+    monkeypatch.setenv("WARMING_IMAP_PORT", str(srv.server_address[1]))
+    monkeypatch.setenv("WARMING_IMAP_SSL", "false")
+    monkeypatch.setenv("WARMING_MAILBOX_1", "bot-free@presence-ia.com")
+    monkeypatch.setenv("WARMING_MAILBOX_1_PWD", "a")
+    monkeypatch.setenv("WARMING_MAILBOX_2", "bot-paid@presence-ia.com")
+    monkeypatch.setenv("WARMING_MAILBOX_2_PWD", "b")
+    monkeypatch.setattr(warming.random, "random", lambda: 0.1)     # relance à chaque réponse reçue
+    now = datetime(2026, 4, 2, 10)
+    try:
+        n = warming.reconcile(now)
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+    assert srv.sessions == 2
+    with Session() as db:
+        rows = db.query(WarmingPlanDB).all()
+    replies = [r for r in rows if r.kind == "reply"]
+    followups = [r for r in rows if r.kind == "followup"]
+    assert n == len(rows) and len(replies) == 9
+    assert {r.receiver for r in replies if r.sender == "bot-free@presence-ia.com"} == \
+        {f"hello{i}@presence-ia.site" for i in range(1, 9)}
+    assert all(r.subject == "Re: Point rapide" for r in replies if r.sender == "bot-free@presence-ia.com")
+    assert all(now + timedelta(minutes=2) <= r.due_at <= now + timedelta(minutes=18) for r in replies)
+    assert len(followups) == 4 and all(r.receiver == "bot-paid@presence-ia.com" for r in followups)
+    assert all(now + timedelta(minutes=5) <= r.due_at <= now + timedelta(minutes=35) for r in followups)
+
+    cmds = [(u, c, a) for u, c, a in srv.log if u == "bot-free@presence-ia.com"]
+    assert [a for _, c, a in cmds if c == "UID STORE"] == ["1:12,14 +FLAGS (\\Seen)", "1:12,14 +FLAGS (\\Deleted)"]
+    assert not any("RFC822" in a or "BODY.PEEK[]" in a for _, c, a in cmds if c == "UID FETCH")
+    box = srv.boxes["bot-free@presence-ia.com"]
+    assert list(box["INBOX"]) == [13] and len(box["Warming"]) == 13
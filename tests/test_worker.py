@@ -0,0 +1,128 @@
+"""
+Tests — file de jobs (src.jobqueue) et process worker (src.worker).
+
+Scénarios :
+  T01  SCHEDULER_MODE=inprocess   → submit() lance le job dans un thread, rien en file
+  T02  SCHEDULER_MODE=worker      → submit() met en file sans exécuter, doublon fusionné
+  T03  Worker.loop                → jobs exécutés, done / failed + erreur enregistrés
+  T04  requeue_stale              → running sans heartbeat remis en file, abandonné après N essais
+  T05  trigger_outbound (worker)  → route admin : mise en file, _job_outbound non appelé
+"""
+import sys, os, json, threading, time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models import Base, JobQueueDB
+from src import jobqueue
+
+CALLS = []
+
+
+def _probe(**kw):
+    CALLS.append(kw)
+
+
+def _boom(**kw):
+    raise RuntimeError("panne")
+
+
+@pytest.fixture
+def S(monkeypatch, tmp_path):
+    # fichier (pas :memory: + StaticPool) : le worker et ses threads ont chacun leur connexion
+    e = create_engine(f"sqlite:///{tmp_path / 'queue.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(e)
+    S = sessionmaker(bind=e, autoflush=False)
+    monkeypatch.setattr("src.database.SessionLocal", S)
+    monkeypatch.setitem(jobqueue.JOBS, "probe", f"{__name__}:_probe")
+    monkeypatch.setitem(jobqueue.JOBS, "boom", f"{__name__}:_boom")
+    CALLS.clear()
+    return S
+
+
+def _rows(S):
+    with S() as db:
+        return db.query(JobQueueDB).order_by(JobQueueDB.id).all()
+
+
+def test_t01_inprocess_thread(S, monkeypatch):
+    monkeypatch.delenv("SCHEDULER_MODE", raising=False)
+    assert jobqueue.submit("probe", force=True) == {"queued": False, "id": None}
+    deadline = time.time() + 5
+    while not CALLS and time.time() < deadline:
+        time.sleep(0.01)
+    assert CALLS == [{"force": True}]
+    assert _rows(S) == []
+    with pytest.raises(KeyError):
+        jobqueue.submit("inconnu")
+
+
+def test_t02_worker_mise_en_file(S, monkeypatch):
+    monkeypatch.setenv("SCHEDULER_MODE", "worker")
+    a = jobqueue.submit("probe", force=True)
+    b = jobqueue.submit("probe", force=True)
+    c = jobqueue.submit("probe", force=False)
+    assert a["queued"] and a["id"] == b["id"] and c["id"] != a["id"]
+    time.sleep(0.1)
+    assert CALLS == []
+    rows = _rows(S)
+    assert [(r.name, json.loads(r.kwargs), r.status) for r in rows] == [
+        ("probe", {"force": True}, "queued"), ("probe", {"force": False}, "queued")]
+
+
+def test_t03_worker_loop(S, monkeypatch):
+    from src.worker import Worker
+    ids = [jobqueue.enqueue("probe", {"n": 1}), jobqueue.enqueue("boom"), jobqueue.enqueue("probe", {"n": 2})]
+    w = Worker(threads=2, poll=0.05)
+    t = threading.Thread(target=w.loop)
+    t.start()
+    try:
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            if all(r.status in ("done", "failed") for r in _rows(S)):
+                break
+            time.sleep(0.05)
+    finally:
+        w.stop.set()
+        t.join(timeout=10)
+    rows = {r.id: r for r in _rows(S)}
+    assert sorted(c["n"] for c in CALLS) == [1, 2]
+    assert rows[ids[0]].status == "done" and rows[ids[2]].status == "done"
+    assert rows[ids[1]].status == "failed" and "panne" in rows[ids[1]].error
+    assert all(r.attempts == 1 and r.worker == w.name and r.finished_at for r in rows.values())
+    assert jobqueue.claim("x") is None
+
+
+def test_t04_requeue_stale(S, monkeypatch):
+    monkeypatch.setenv("JOB_QUEUE_LEASE_S", "60")
+    monkeypatch.setenv("JOB_QUEUE_MAX_ATTEMPTS", "2")
+    old = datetime.utcnow() - timedelta(minutes=5)
+    with S() as db:
+        db.add_all([
+            JobQueueDB(name="probe", kwargs="{}", status="running", attempts=1, heartbeat_at=old),
+            JobQueueDB(name="probe", kwargs='{"a": 1}', status="running", attempts=2, heartbeat_at=old),
+            JobQueueDB(name="probe", kwargs='{"b": 1}', status="running", attempts=1,
+                       heartbeat_at=datetime.utcnow()),
+        ])
+        db.commit()
+    assert jobqueue.requeue_stale() == 1
+    assert [r.status for r in _rows(S)] == ["queued", "failed", "running"]
+    job = jobqueue.claim("w2")
+    assert job["id"] == 1 and job["attempts"] == 2
+
+
+def test_t05_trigger_outbound_worker(S, monkeypatch):
+    from src.api.routes import admin
+    import src.scheduler as sched
+    monkeypatch.setenv("SCHEDULER_MODE", "worker")
+    monkeypatch.setattr(admin, "_check_token", lambda r: None)
+    monkeypatch.setattr(sched, "_job_outbound", lambda **kw: CALLS.append(kw))
+    body = json.loads(admin.trigger_outbound(None).body)
+    assert body["ok"] and "mis en file" in body["message"]
+    time.sleep(0.1)
+    assert CALLS == []
+    rows = _rows(S)
+    assert len(rows) == 1 and rows[0].name == "outbound" and json.loads(rows[0].kwargs) == {"force": False}